@@ -7,11 +7,18 @@
   - 工程問題偵測（裂縫、變形、偏移）
   - 施工建議生成
   - 多斷面比較報告
+  - 多斷面批次分析（並行請求、結果快取、逐斷面 fallback）
 """
+import copy
+import hashlib
 import json
 import logging
-from dataclasses import dataclass, field
-from typing import Optional
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Optional
 
 import numpy as np
 
@@ -21,6 +28,10 @@ OLLAMA_URL = "http://localhost:11460"
 DEFAULT_MODEL = "zhewei-brain-v5-structured"
 FALLBACK_MODEL = "zhewei-brain-v5"
 
+DEFAULT_MAX_IN_FLIGHT = 4       # 批次分析同時送出的請求數
+CACHE_MAX_ENTRIES = 1024
+FINGERPRINT_RESOLUTION = 0.001  # 幾何指紋量化解析度（m），低於此的差異視為同一斷面
+
 
 @dataclass
 class AnalysisReport:
@@ -40,6 +51,7 @@ def analyze_section(
     section_result,
     model: str = DEFAULT_MODEL,
     context: str = "",
+    cache: Optional["AnalysisCache"] = None,
 ) -> AnalysisReport:
     """
     使用本地 Ollama 模型分析斷面。
@@ -48,9 +60,92 @@ def analyze_section(
         section_result: SectionResult 物件
         model: Ollama 模型名稱
         context: 額外上下文（工程名稱、位置描述等）
+        cache: 分析結果快取（None = 不使用快取）
     Returns:
         AnalysisReport
     """
+    key = _cache_key(section_result, model, context) if cache is not None else None
+    return _analyze(section_result, model, context, cache, key)
+
+
+def analyze_sections(
+    results: list,
+    model: str = DEFAULT_MODEL,
+    context: str = "",
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    cache: Optional["AnalysisCache"] = None,
+    progress: Optional[Callable] = None,
+) -> list[AnalysisReport]:
+    """
+    批次分析多個斷面。
+
+    - 最多 max_in_flight 個請求同時送往 Ollama
+    - 幾何相同（指紋相同）的斷面只分析一次；有 cache 時先查快取，成功結果寫回快取
+    - 每個斷面各自 fallback；Ollama 連線失敗後其餘斷面直接改用規則式分析，不再逐一等待逾時
+
+    Args:
+        results: SectionResult 列表
+        model: Ollama 模型
+        context: 額外上下文（所有斷面共用）
+        max_in_flight: 同時進行的請求上限
+        cache: 分析結果快取（None = 不使用快取）
+        progress: 回呼 progress(done, total, report)，每完成一個斷面呼叫一次
+    Returns:
+        與 results 同順序的 AnalysisReport 列表
+    """
+    if not results:
+        return []
+
+    # 依指紋合併重複斷面
+    groups: dict = OrderedDict()
+    for i, r in enumerate(results):
+        groups.setdefault(_cache_key(r, model, context), []).append(i)
+
+    reports: list = [None] * len(results)
+    offline = threading.Event()
+    done = 0
+
+    def _finish(key, report):
+        nonlocal done
+        for i in groups[key]:
+            reports[i] = report if i == groups[key][0] else copy.deepcopy(report)
+            done += 1
+            if progress:
+                progress(done, len(results), reports[i])
+
+    with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as pool:
+        futures = {}
+        for key, idx in groups.items():
+            cached = cache.get(key) if cache is not None else None
+            if cached is not None:
+                _finish(key, cached)
+            else:
+                futures[pool.submit(_analyze, results[idx[0]], model, context, cache, key, offline)] = key
+        for fut in as_completed(futures):
+            _finish(futures[fut], fut.result())
+
+    if cache is not None:
+        cache.save()
+    return reports
+
+
+def _analyze(
+    section_result,
+    model: str,
+    context: str,
+    cache: Optional["AnalysisCache"],
+    key: Optional[str],
+    offline: Optional[threading.Event] = None,
+) -> AnalysisReport:
+    """
+    分析單一斷面：主模型 → FALLBACK_MODEL → 規則式。
+    offline 為批次共用旗標：任一斷面連線失敗即設定，之後的斷面跳過 Ollama。
+    """
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
     # 準備斷面統計資料
     stats = _compute_section_stats(section_result)
     prompt = _build_analysis_prompt(section_result, stats, context)
@@ -61,37 +156,124 @@ def analyze_section(
         measurements=stats,
     )
 
+    if offline is not None and offline.is_set():
+        return _rule_based_analysis(section_result, stats, report)
+
     # 呼叫本地 Ollama
     try:
-        response = _call_ollama(prompt, model)
-        report.model_used = model
-        report.raw_response = response
-
-        # 解析回應
-        parsed = _parse_response(response)
-        report.summary = parsed.get("summary", response[:200])
-        report.features = parsed.get("features", [])
-        report.issues = parsed.get("issues", [])
-        report.recommendations = parsed.get("recommendations", [])
-
+        _fill_report(report, _call_ollama(prompt, model), model)
     except Exception as e:
+        if offline is not None and isinstance(e, ConnectionError):
+            offline.set()
+            logger.error(f"Ollama 無法連線: {e}，其餘斷面使用規則式分析")
+            return _rule_based_analysis(section_result, stats, report)
         logger.warning(f"Ollama 分析失敗 ({model}): {e}，嘗試 fallback")
         try:
-            response = _call_ollama(prompt, FALLBACK_MODEL)
-            report.model_used = FALLBACK_MODEL
-            report.raw_response = response
-            parsed = _parse_response(response)
-            report.summary = parsed.get("summary", response[:200])
-            report.features = parsed.get("features", [])
-            report.issues = parsed.get("issues", [])
-            report.recommendations = parsed.get("recommendations", [])
+            _fill_report(report, _call_ollama(prompt, FALLBACK_MODEL), FALLBACK_MODEL)
         except Exception as e2:
+            if offline is not None and isinstance(e2, ConnectionError):
+                offline.set()
             logger.error(f"Ollama 完全失敗: {e2}，使用規則式分析")
-            report = _rule_based_analysis(section_result, stats, report)
+            return _rule_based_analysis(section_result, stats, report)
 
+    # 規則式結果不寫入快取，Ollama 恢復後可重新分析
+    if cache is not None:
+        cache.put(key, report)
     return report
 
 
+def _fill_report(report: AnalysisReport, response: str, model: str):
+    """以模型回應填入報告"""
+    report.model_used = model
+    report.raw_response = response
+    parsed = _parse_response(response)
+    report.summary = parsed.get("summary", response[:200])
+    report.features = parsed.get("features", [])
+    report.issues = parsed.get("issues", [])
+    report.recommendations = parsed.get("recommendations", [])
+
+
+# ── 分析快取 ─────────────────────────────────────────────
+
+
+def section_fingerprint(section_result, context: str = "") -> str:
+    """
+    斷面幾何指紋：切面類型、位置、輪廓數、上下文與量化後的 2D 點（與點順序無關）。
+    幾何未變更的斷面重新切出時指紋相同。
+    """
+    h = hashlib.sha1()
+    h.update(f"{section_result.section_type.value}|{section_result.position:.3f}|"
+             f"{len(section_result.contours)}|{context}".encode("utf-8"))
+    pts = section_result.points_2d
+    if section_result.n_points and pts is not None and len(pts):
+        q = np.round(np.asarray(pts, dtype=np.float64) / FINGERPRINT_RESOLUTION).astype(np.int64)
+        q = q[np.lexsort((q[:, 1], q[:, 0]))]
+        h.update(np.ascontiguousarray(q).tobytes())
+    return h.hexdigest()
+
+
+def _cache_key(section_result, model: str, context: str) -> str:
+    return f"{model}:{section_fingerprint(section_result, context)}"
+
+
+class AnalysisCache:
+    """
+    斷面分析結果快取（LRU、執行緒安全）。
+    鍵 = 模型名稱 + 幾何指紋；指定 path 時以 JSON 存檔，下次開啟沿用。
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    for key, data in json.load(f).items():
+                        self._entries[key] = AnalysisReport(**data)
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning(f"分析快取讀取失敗，重新建立: {e}")
+                self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[AnalysisReport]:
+        with self._lock:
+            report = self._entries.get(key)
+            if report is None:
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(report)
+
+    def put(self, key: str, report: AnalysisReport):
+        with self._lock:
+            self._entries[key] = copy.deepcopy(report)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+
+    def save(self):
+        """寫回 JSON（未指定 path 或無變更時略過）"""
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            data = {k: asdict(v) for k, v in self._entries.items()}
+            self._dirty = False
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
 def compare_sections(
     results: list,
     model: str = DEFAULT_MODEL,
@@ -229,6 +411,9 @@ def _call_ollama(prompt: str, model: str, timeout: int = 30) -> str:
         with urllib.request.urlopen(req, timeout=timeout) as resp:
             data = json.loads(resp.read().decode("utf-8"))
             return data.get("response", "")
+    except urllib.error.HTTPError as e:
+        # 伺服器有回應（例如模型不存在），不是連線問題
+        raise RuntimeError(f"Ollama 回應錯誤: {e}")
     except urllib.error.URLError as e:
         raise ConnectionError(f"Ollama 未啟動或連線失敗: {e}")
     except Exception as e:
@@ -224,26 +224,142 @@ def apply_offset(points: np.ndarray, dx: float = 0, dy: float = 0, dz: float = 0
     return points + offset
 
 
-def batch_wgs84_to_twd97(coords: np.ndarray) -> np.ndarray:
+# ── 批次（向量化）投影 ─────────────────────────────────
+# 與上方逐點函式相同的 TM2 級數，改以 numpy 整欄計算；
+# 大陣列（含 np.memmap）分塊處理，每塊暫存約 chunk_size × 200 bytes。
+
+BATCH_CHUNK_SIZE = 1_000_000
+
+
+def _tm2_forward(lon: np.ndarray, lat: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """經緯度 (度) → TWD97 (E, N)，numpy 向量化"""
+    a = TWD97_A
+    f = TWD97_F
+    lon0 = math.radians(TWD97_LON0)
+    k0 = TWD97_K0
+
+    lat_r = np.radians(lat)
+    lon_r = np.radians(lon)
+
+    e2 = 2 * f - f ** 2
+    e_prime2 = e2 / (1 - e2)
+
+    sin_lat = np.sin(lat_r)
+    cos_lat = np.cos(lat_r)
+    tan_lat = np.tan(lat_r)
+    N = a / np.sqrt(1 - e2 * sin_lat ** 2)
+    T = tan_lat ** 2
+    C = e_prime2 * cos_lat ** 2
+    A_coeff = (lon_r - lon0) * cos_lat
+    A2 = A_coeff * A_coeff
+
+    # 子午線弧長
+    M = a * (
+        (1 - e2 / 4 - 3 * e2 ** 2 / 64 - 5 * e2 ** 3 / 256) * lat_r
+        - (3 * e2 / 8 + 3 * e2 ** 2 / 32 + 45 * e2 ** 3 / 1024) * np.sin(2 * lat_r)
+        + (15 * e2 ** 2 / 256 + 45 * e2 ** 3 / 1024) * np.sin(4 * lat_r)
+        - (35 * e2 ** 3 / 3072) * np.sin(6 * lat_r)
+    )
+
+    easting = TWD97_DX + k0 * N * A_coeff * (
+        1
+        + (1 - T + C) * A2 / 6
+        + (5 - 18 * T + T ** 2 + 72 * C - 58 * e_prime2) * A2 * A2 / 120
+    )
+
+    northing = TWD97_DY + k0 * (
+        M + N * tan_lat * A2 * (
+            0.5
+            + (5 - T + 9 * C + 4 * C ** 2) * A2 / 24
+            + (61 - 58 * T + T ** 2 + 600 * C - 330 * e_prime2) * A2 * A2 / 720
+        )
+    )
+    return easting, northing
+
+
+def _tm2_inverse(e: np.ndarray, n: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """TWD97 (E, N) → 經緯度 (度)，numpy 向量化"""
+    a = TWD97_A
+    f = TWD97_F
+    k0 = TWD97_K0
+    lon0 = math.radians(TWD97_LON0)
+
+    e2 = 2 * f - f ** 2
+    e1 = (1 - math.sqrt(1 - e2)) / (1 + math.sqrt(1 - e2))
+
+    M = (n - TWD97_DY) / k0
+    mu = M / (a * (1 - e2 / 4 - 3 * e2 ** 2 / 64 - 5 * e2 ** 3 / 256))
+
+    lat1 = (
+        mu
+        + (3 * e1 / 2 - 27 * e1 ** 3 / 32) * np.sin(2 * mu)
+        + (21 * e1 ** 2 / 16 - 55 * e1 ** 4 / 32) * np.sin(4 * mu)
+        + (151 * e1 ** 3 / 96) * np.sin(6 * mu)
+    )
+
+    e_prime2 = e2 / (1 - e2)
+    sin_lat1 = np.sin(lat1)
+    cos_lat1 = np.cos(lat1)
+    tan_lat1 = np.tan(lat1)
+    w = 1 - e2 * sin_lat1 ** 2
+    N1 = a / np.sqrt(w)
+    T1 = tan_lat1 ** 2
+    C1 = e_prime2 * cos_lat1 ** 2
+    R1 = a * (1 - e2) / (w * np.sqrt(w))
+    D = (e - TWD97_DX) / (N1 * k0)
+    D2 = D * D
+
+    lat = lat1 - (N1 * tan_lat1 / R1) * D2 * (
+        0.5
+        - (5 + 3 * T1 + 10 * C1 - 4 * C1 ** 2 - 9 * e_prime2) * D2 / 24
+        + (61 + 90 * T1 + 298 * C1 + 45 * T1 ** 2 - 252 * e_prime2 - 3 * C1 ** 2) * D2 * D2 / 720
+    )
+
+    lon = lon0 + D * (
+        1
+        - (1 + 2 * T1 + C1) * D2 / 6
+        + (5 - 2 * C1 + 28 * T1 - 3 * C1 ** 2 + 8 * e_prime2 + 24 * T1 ** 2) * D2 * D2 / 120
+    ) / cos_lat1
+
+    return np.degrees(lon), np.degrees(lat)
+
+
+def _batch_project(coords: np.ndarray, project, out: Optional[np.ndarray],
+                   chunk_size: int) -> np.ndarray:
+    coords = np.asarray(coords)  # np.memmap 不會被整檔複製
+    if coords.ndim != 2 or coords.shape[1] not in (2, 3):
+        raise ValueError(f"座標陣列須為 (N, 2) 或 (N, 3)，目前為 {coords.shape}")
+    if out is None:
+        out = np.empty(coords.shape, dtype=np.float64)
+    elif out.shape != coords.shape:
+        raise ValueError(f"out 形狀 {out.shape} 與輸入 {coords.shape} 不符")
+
+    for start in range(0, len(coords), chunk_size):
+        block = coords[start:start + chunk_size]
+        x, y = project(block[:, 0].astype(np.float64), block[:, 1].astype(np.float64))
+        out[start:start + len(block), 0] = x
+        out[start:start + len(block), 1] = y
+        if coords.shape[1] == 3:
+            out[start:start + len(block), 2] = block[:, 2]
+    return out
+
+
+def batch_wgs84_to_twd97(coords: np.ndarray, out: Optional[np.ndarray] = None,
+                         chunk_size: int = BATCH_CHUNK_SIZE) -> np.ndarray:
     """
-    批次 WGS84 → TWD97。
+    批次 WGS84 → TWD97（向量化）。
 
     Args:
-        coords: (N, 3) 陣列，每行 [lon, lat, h]
+        coords: (N, 2) [lon, lat] 或 (N, 3) [lon, lat, h]；可為 np.memmap
+        out: 輸出陣列（可為 np.memmap，處理超過記憶體的資料）；未指定則新配置 float64
+        chunk_size: 每塊點數
     Returns:
-        (N, 3) 陣列，每行 [E, N, H]
+        與輸入同形狀的陣列，每行 [E, N] 或 [E, N, H]
     """
-    result = np.zeros_like(coords)
-    for i in range(len(coords)):
-        e, n, h = wgs84_to_twd97(coords[i, 0], coords[i, 1], coords[i, 2])
-        result[i] = [e, n, h]
-    return result
-
-
-def batch_twd97_to_wgs84(coords: np.ndarray) -> np.ndarray:
-    """批次 TWD97 → WGS84。"""
-    result = np.zeros_like(coords)
-    for i in range(len(coords)):
-        lon, lat, h = twd97_to_wgs84(coords[i, 0], coords[i, 1], coords[i, 2])
-        result[i] = [lon, lat, h]
-    return result
+    return _batch_project(coords, _tm2_forward, out, chunk_size)
+
+
+def batch_twd97_to_wgs84(coords: np.ndarray, out: Optional[np.ndarray] = None,
+                         chunk_size: int = BATCH_CHUNK_SIZE) -> np.ndarray:
+    """批次 TWD97 → WGS84（向量化），參數同 batch_wgs84_to_twd97，輸出 [lon, lat(, h)]。"""
+    return _batch_project(coords, _tm2_inverse, out, chunk_size)
@@ -11,6 +11,7 @@
   6. 匯出 DXF / SVG
 """
 import logging
+import math
 import os
 import sys
 import threading
@@ -28,8 +29,9 @@ if str(_PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(_PROJECT_ROOT))
 
 from construction_brain.pointcloud.loader import PointCloud, load_pointcloud, scan_directory, SUPPORTED_FORMATS
+from construction_brain.pointcloud.lod import LodCache, build_lod_cache, open_lod
 from construction_brain.pointcloud.section_extractor import (
-    SectionParams, SectionType, SectionResult, extract_section,
+    SectionParams, SectionType, SectionResult, extract_section, get_section_index,
 )
 from construction_brain.pointcloud.exporter import export_dxf, export_svg
 from construction_brain.pointcloud.coordinate import (
@@ -38,7 +40,9 @@ from construction_brain.pointcloud.coordinate import (
     batch_wgs84_to_twd97,
 )
 from construction_brain.pointcloud.dimension import measure_contour, measure_distance
-from construction_brain.pointcloud.ai_analyzer import analyze_section, compare_sections
+from construction_brain.pointcloud.ai_analyzer import (
+    AnalysisCache, analyze_section, analyze_sections, compare_sections,
+)
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(message)s")
@@ -57,6 +61,48 @@ GRID_COLOR = "#2a2a4a"
 
 DEFAULT_OUTPUT = str(Path.home() / "Desktop" / "PointCloud_Output")
 
+LOD_MIN_POINTS = 2_000_000   # 超過此點數（下採樣後）自動在背景建立 LOD 快取
+OVERVIEW_POINTS = 1_000_000  # 無 LOD 快取時，載入中邊讀邊取樣的預覽點數上限
+CLOUD_POINT_COLOR = (0x34, 0x98, 0xdb)
+CLOUD_BG_COLOR = (0x0a, 0x0a, 0x1a)
+VIEW_AXES = {"top": (0, 1), "front": (0, 2), "side": (1, 2)}
+CLOUD_REDRAW_DELAY_MS = 30   # 連續縮放/拖曳/視窗調整合併為一次重繪
+
+
+class _OverviewSampler:
+    """
+    載入時邊讀邊取樣的粗略總覽：每塊等距抽點，總數超過上限時整體再減半；
+    同時統計原始點的邊界 / 點數 / 是否有顏色，建立 LOD 快取時不必再掃描一次
+    """
+
+    def __init__(self, max_points: int = OVERVIEW_POINTS):
+        self.max_points = max_points
+        self.points = np.empty((0, 3))
+        self.lo = np.full(3, np.inf)
+        self.hi = np.full(3, -np.inf)
+        self.n_read = 0
+        self.has_color = False
+        self._step = 1
+
+    def add(self, points: np.ndarray, colors: Optional[np.ndarray], total: Optional[int]):
+        if not len(points):
+            return
+        self.lo = np.minimum(self.lo, points.min(axis=0))
+        self.hi = np.maximum(self.hi, points.max(axis=0))
+        self.n_read += len(points)
+        self.has_color = self.has_color or colors is not None
+        if total:
+            self._step = max(self._step, math.ceil(total / self.max_points))
+        merged = np.concatenate([self.points, points[::self._step]])
+        while len(merged) > self.max_points:
+            merged = merged[::2]
+            self._step *= 2
+        self.points = merged   # 整個替換，Tk 執行緒讀到的永遠是完整陣列
+
+    @property
+    def stats(self) -> tuple:
+        return self.lo, self.hi, self.n_read, self.has_color
+
 
 class PointCloudApp:
     """主應用程式"""
@@ -73,12 +119,25 @@ class PointCloudApp:
         self.filepath: str = ""
         self.current_result: Optional[SectionResult] = None
         self.results_history: list[SectionResult] = []
+        self.ai_cache = AnalysisCache()  # 同一斷面（幾何未變）重複分析直接取用
         self.control_points: list[ControlPoint] = []
         self.output_dir = DEFAULT_OUTPUT
 
         # 點雲統計
         self.info: dict = {}
 
+        # 點雲總覽：LOD 快取與視野（每種投影各自記錄平移/縮放）
+        self.lod: Optional[LodCache] = None
+        self.overview: Optional[np.ndarray] = None   # 無快取時載入中的取樣預覽
+        self.overview_bounds: Optional[tuple] = None  # 已讀原始點的 (lo, hi)
+        self.cloud_view_rect: dict = {}
+        self._cloud_gen = 0
+        self._cloud_after = None      # 已排程的重繪（after id）
+        self._cloud_busy = False      # 背景讀取進行中
+        self._cloud_pending = False   # 讀取期間又有新請求
+        self._cloud_image = None
+        self._cloud_drag = None
+
         self._build_ui()
         self._bind_keys()
 
@@ -306,15 +365,27 @@ class PointCloudApp:
         for text, val in [("俯視(XY)", "top"), ("前視(XZ)", "front"), ("側視(YZ)", "side")]:
             ttk.Radiobutton(ctrl, text=text, variable=self.view_var, value=val,
                             command=self._draw_cloud).pack(side="left", padx=3)
-        self.cloud_info = ttk.Label(parent, text="", style="Info.TLabel")
+        ttk.Button(ctrl, text="重設視野", command=self._reset_cloud_view).pack(side="left", padx=8)
+        self.cloud_info = ttk.Label(parent, text="滾輪縮放、拖曳平移、雙擊重設", style="Info.TLabel")
         self.cloud_info.pack(fill="x", padx=5)
 
+        c = self.cloud_canvas
+        c.bind("<Configure>", lambda e: self._draw_cloud())
+        c.bind("<MouseWheel>", lambda e: self._zoom_cloud(e, 1 / 1.25 if e.delta > 0 else 1.25))
+        c.bind("<Button-4>", lambda e: self._zoom_cloud(e, 1 / 1.25))
+        c.bind("<Button-5>", lambda e: self._zoom_cloud(e, 1.25))
+        c.bind("<ButtonPress-1>", self._start_cloud_drag)
+        c.bind("<B1-Motion>", self._drag_cloud)
+        c.bind("<ButtonRelease-1>", lambda e: setattr(self, "_cloud_drag", None))
+        c.bind("<Double-Button-1>", lambda e: self._reset_cloud_view())
+
     # ── AI 分析面板 ──────────────────────────────────
     def _build_ai_panel(self, parent):
         top = ttk.Frame(parent)
         top.pack(fill="x", padx=5, pady=5)
         ttk.Button(top, text="🤖 AI 分析當前斷面", style="Accent.TButton",
                    command=self._ai_analyze).pack(side="left", padx=2)
+        ttk.Button(top, text="🧠 批次分析所有斷面", command=self._ai_analyze_all).pack(side="left", padx=2)
         ttk.Button(top, text="📊 比較所有斷面", command=self._ai_compare).pack(side="left", padx=2)
 
         ttk.Label(top, text="模型:").pack(side="left", padx=(10, 0))
@@ -370,21 +441,79 @@ class PointCloudApp:
         if not filepath:
             return
 
+        self._start_load(filepath)
+
+    def _start_load(self, filepath: str):
+        """
+        背景載入點雲。已有 LOD 快取時先以快取根節點繪製總覽（與檔案大小無關）；
+        沒有快取時邊讀邊取樣，每讀完一塊就更新預覽，不必等完整載入。
+        完整點雲（斷面用）載入後，大型點雲沿用讀檔時的邊界統計在背景建立快取供下次使用。
+        """
         self._set_status(f"載入中: {Path(filepath).name} ...", HIGHLIGHT)
+        self.pcd = None
+        self.lod = None
+        self.overview = None
+        self.overview_bounds = None
+        self.filepath = filepath
+        self.cloud_view_rect = {}
+        voxel = self.voxel_var.get()   # Tk 變數只在主執行緒讀取
+        voxel = voxel if voxel > 0 else None
 
         def _do_load():
+            sampler = _OverviewSampler()
+
+            def _on_chunk(points, colors, total):
+                sampler.add(points, colors, total)
+                overview, bounds, n_read = sampler.points, (sampler.lo, sampler.hi), sampler.n_read
+                self.root.after(0, lambda: self._on_overview(filepath, overview, bounds, n_read, total))
+
             try:
-                voxel = self.voxel_var.get()
-                self.pcd = load_pointcloud(filepath, voxel_size=voxel if voxel > 0 else None)
-                self.filepath = filepath
-                self.info = self._compute_info()
-                self.root.after(0, self._on_loaded)
+                lod = open_lod(filepath)
+                if lod is not None:
+                    self.root.after(0, lambda: self._on_lod_ready(filepath, lod))
+                pcd = load_pointcloud(filepath, voxel_size=voxel,
+                                      on_chunk=_on_chunk if lod is None else None)
             except Exception as e:
-                self.root.after(0, lambda: self._on_load_error(str(e)))
+                msg = str(e)
+                self.root.after(0, lambda: self._on_load_error(msg))
+                return
+            if filepath != self.filepath:
+                return  # 已改載其他檔案
+            self.pcd = pcd
+            self.info = self._compute_info()
+            self.root.after(0, self._on_loaded)
+
+            if lod is None and len(pcd) >= LOD_MIN_POINTS:
+                try:
+                    built = build_lod_cache(filepath, stats=sampler.stats)
+                except Exception as e:
+                    logger.warning(f"LOD 快取建立失敗（不影響已載入的點雲）: {e}")
+                    return
+                self.root.after(0, lambda: self._on_lod_ready(filepath, built))
 
         threading.Thread(target=_do_load, daemon=True).start()
 
+    def _on_overview(self, filepath: str, overview: np.ndarray, bounds: tuple,
+                     n_read: int, total: Optional[int]):
+        if filepath != self.filepath or self.pcd is not None or self.lod is not None:
+            return
+        self.overview = overview
+        self.overview_bounds = bounds
+        done = f"{n_read:,} / {total:,}" if total else f"{n_read:,}"
+        self._set_status(f"載入中: {Path(filepath).name} — 已讀 {done} 點（預覽）", HIGHLIGHT)
+        self._draw_cloud()
+
+    def _on_lod_ready(self, filepath: str, lod: LodCache):
+        if filepath != self.filepath:
+            return
+        self.lod = lod
+        if self.pcd is None:
+            self._set_status(f"總覽已就緒（LOD {lod.total_points:,} 點），完整點雲載入中 ...", HIGHLIGHT)
+        self._draw_cloud()
+
     def _on_loaded(self):
+        self.overview = None
+        self.overview_bounds = None
         name = Path(self.filepath).name
         n = len(self.pcd)
         self.file_label.configure(text=f"✅ {name} ({n:,} 點)")
@@ -469,19 +598,7 @@ class PointCloudApp:
                 path = files[sel[0]]["path"]
                 win.destroy()
                 self.voxel_var.set(0.1)
-                self._set_status(f"載入中: {Path(path).name} ...", HIGHLIGHT)
-
-                def _do():
-                    try:
-                        v = self.voxel_var.get()
-                        self.pcd = load_pointcloud(path, voxel_size=v if v > 0 else None)
-                        self.filepath = path
-                        self.info = self._compute_info()
-                        self.root.after(0, self._on_loaded)
-                    except Exception as e:
-                        self.root.after(0, lambda: self._on_load_error(str(e)))
-
-                threading.Thread(target=_do, daemon=True).start()
+                self._start_load(path)
 
         ttk.Button(win, text="載入", command=_select).pack(pady=5)
 
@@ -515,7 +632,8 @@ class PointCloudApp:
 
         def _do():
             try:
-                result = extract_section(self.pcd, params)
+                # 互動式連續切面：共用同一份索引，只有首次切該軸向時排序
+                result = extract_section(self.pcd, params, get_section_index(self.pcd))
                 self.root.after(0, lambda: self._on_section_done(result))
             except Exception as e:
                 self.root.after(0, lambda: self._set_status(f"生成失敗: {e}", WARN))
@@ -667,57 +785,163 @@ class PointCloudApp:
                  f"寬: {data_w:.3f}m  高: {data_h:.3f}m"
         )
 
+    def _cloud_bounds(self, axes: tuple) -> Optional[tuple]:
+        """目前投影的資料範圍 (x0, x1, y0, y1)"""
+        ax, ay = axes
+        if self.lod is not None:
+            lo, hi = self.lod.origin, self.lod.bounds_max
+        elif self.pcd is not None and len(self.pcd):
+            lo, hi = self.pcd.points.min(axis=0), self.pcd.points.max(axis=0)
+        elif self.overview_bounds is not None:
+            lo, hi = self.overview_bounds
+        else:
+            return None
+        return float(lo[ax]), float(hi[ax]), float(lo[ay]), float(hi[ay])
+
+    def _cloud_viewport(self) -> tuple:
+        """繪圖區 (left, top, width, height)"""
+        margin = 40
+        cw = self.cloud_canvas.winfo_width() or 800
+        ch = self.cloud_canvas.winfo_height() or 600
+        return margin, margin, max(cw - margin * 2, 10), max(ch - margin * 2, 10)
+
+    def _current_cloud_rect(self) -> Optional[tuple]:
+        """目前視野（世界座標），未平移縮放時為整體範圍並依繪圖區比例補齊"""
+        view = self.view_var.get()
+        rect = self.cloud_view_rect.get(view)
+        if rect is not None:
+            return rect
+        bounds = self._cloud_bounds(VIEW_AXES[view])
+        if bounds is None:
+            return None
+        x0, x1, y0, y1 = bounds
+        _, _, vw, vh = self._cloud_viewport()
+        data_w = (x1 - x0) or 1
+        data_h = (y1 - y0) or 1
+        scale = min(vw / data_w, vh / data_h)
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        half_w, half_h = vw / scale / 2, vh / scale / 2
+        return cx - half_w, cx + half_w, cy - half_h, cy + half_h
+
+    def _reset_cloud_view(self):
+        self.cloud_view_rect.pop(self.view_var.get(), None)
+        self._draw_cloud()
+
+    def _zoom_cloud(self, event, factor: float):
+        rect = self._current_cloud_rect()
+        if rect is None:
+            return
+        x0, x1, y0, y1 = rect
+        left, top, vw, vh = self._cloud_viewport()
+        # 以游標位置為中心縮放
+        fx = min(max((event.x - left) / vw, 0), 1)
+        fy = min(max(1 - (event.y - top) / vh, 0), 1)
+        px, py = x0 + (x1 - x0) * fx, y0 + (y1 - y0) * fy
+        self.cloud_view_rect[self.view_var.get()] = (
+            px - (px - x0) * factor, px + (x1 - px) * factor,
+            py - (py - y0) * factor, py + (y1 - py) * factor,
+        )
+        self._draw_cloud()
+
+    def _start_cloud_drag(self, event):
+        self._cloud_drag = (event.x, event.y, self._current_cloud_rect())
+
+    def _drag_cloud(self, event):
+        if not self._cloud_drag or self._cloud_drag[2] is None:
+            return
+        sx, sy, (x0, x1, y0, y1) = self._cloud_drag
+        _, _, vw, vh = self._cloud_viewport()
+        dx = (event.x - sx) / vw * (x1 - x0)
+        dy = (event.y - sy) / vh * (y1 - y0)
+        self.cloud_view_rect[self.view_var.get()] = (x0 - dx, x1 - dx, y0 + dy, y1 + dy)
+        self._draw_cloud()
+
     def _draw_cloud(self):
-        if self.pcd is None:
+        """排程重繪：短時間內的多次請求（<Configure>、拖曳、滾輪）以 after 去抖動，只重繪最後一次"""
+        if self._cloud_after is not None:
+            self.root.after_cancel(self._cloud_after)
+        self._cloud_after = self.root.after(CLOUD_REDRAW_DELAY_MS, self._fetch_cloud)
+
+    def _fetch_cloud(self):
+        """
+        取得目前視野的點並繪製：有 LOD 快取時只讀視野與縮放程度需要的節點，
+        讀取在背景執行緒進行，同時只有一個讀取；讀取期間的新請求待完成後以最新視野再讀一次
+        """
+        self._cloud_after = None
+        if self._cloud_busy:
+            self._cloud_pending = True
+            return
+        if self.pcd is None and self.lod is None and self.overview is None:
             return
+        rect = self._current_cloud_rect()
+        if rect is None:
+            return
+        view = self.view_var.get()
+        axes = VIEW_AXES[view]
+        _, _, vw, _ = self._cloud_viewport()
+        pixel_size = (rect[1] - rect[0]) / vw
+        self._cloud_gen += 1
+        gen = self._cloud_gen
+        lod, pcd, overview = self.lod, self.pcd, self.overview
+        self._cloud_busy = True
+
+        def _fetch():
+            try:
+                if lod is not None:
+                    pts, _ = lod.points_for_view(axes, rect, pixel_size)
+                    source = f"LOD {lod.total_points:,} 點"
+                elif pcd is not None:
+                    pts = pcd.points
+                    source = f"{len(pcd):,} 點"
+                else:
+                    pts = overview
+                    source = f"載入中預覽 {len(overview):,} 點"
+                px, py = pts[:, axes[0]], pts[:, axes[1]]
+                inside = (px >= rect[0]) & (px <= rect[1]) & (py >= rect[2]) & (py <= rect[3])
+                px, py = px[inside], py[inside]
+                self.root.after(0, lambda: self._render_cloud(gen, view, rect, px, py, source))
+            except Exception as e:
+                logger.warning(f"點雲總覽繪製失敗: {e}")
+            finally:
+                self.root.after(0, self._on_cloud_fetched)
+
+        threading.Thread(target=_fetch, daemon=True).start()
+
+    def _on_cloud_fetched(self):
+        self._cloud_busy = False
+        if self._cloud_pending:
+            self._cloud_pending = False
+            self._fetch_cloud()
 
+    def _render_cloud(self, gen: int, view: str, rect: tuple, px: np.ndarray, py: np.ndarray, source: str):
+        """將點柵格化成影像一次貼上（不逐點建立 Canvas 物件）"""
+        if gen != self._cloud_gen:
+            return
         canvas = self.cloud_canvas
         canvas.delete("all")
         cw = canvas.winfo_width() or 800
         ch = canvas.winfo_height() or 600
-        margin = 40
-
-        pts = self.pcd.points
-        view = self.view_var.get()
-
-        # 選擇投影軸
-        if view == "top":
-            px, py = pts[:, 0], pts[:, 1]
-            xlabel, ylabel = "X", "Y"
-        elif view == "front":
-            px, py = pts[:, 0], pts[:, 2]
-            xlabel, ylabel = "X", "Z"
-        else:
-            px, py = pts[:, 1], pts[:, 2]
-            xlabel, ylabel = "Y", "Z"
-
-        # 下採樣顯示
-        max_draw = 10000
-        if len(px) > max_draw:
-            idx = np.random.choice(len(px), max_draw, replace=False)
-            px, py = px[idx], py[idx]
-
-        xmin, xmax = px.min(), px.max()
-        ymin, ymax = py.min(), py.max()
-        data_w = xmax - xmin or 1
-        data_h = ymax - ymin or 1
-        view_w = cw - margin * 2
-        view_h = ch - margin * 2
-        scale = min(view_w / data_w, view_h / data_h)
-        ox = margin + (view_w - data_w * scale) / 2
-        oy = margin + (view_h - data_h * scale) / 2
-
-        # 繪製
-        for i in range(len(px)):
-            sx = (px[i] - xmin) * scale + ox
-            sy = ch - ((py[i] - ymin) * scale + oy)
-            # 用 Z 值著色
-            canvas.create_oval(sx, sy, sx + 2, sy + 2, fill="#3498db", outline="")
+        left, top, vw, vh = self._cloud_viewport()
+        x0, x1, y0, y1 = rect
+
+        img = np.empty((vh, vw, 3), dtype=np.uint8)
+        img[:] = CLOUD_BG_COLOR
+        if len(px):
+            ix = ((px - x0) / (x1 - x0) * (vw - 1)).astype(np.int64)
+            iy = ((1 - (py - y0) / (y1 - y0)) * (vh - 1)).astype(np.int64)
+            img[iy, ix] = CLOUD_POINT_COLOR
+        header = f"P6 {vw} {vh} 255 ".encode("ascii")
+        self._cloud_image = tk.PhotoImage(data=header + img.tobytes(), format="PPM")
+        canvas.create_image(left, top, image=self._cloud_image, anchor="nw")
+
+        def to_screen(x, y):
+            return left + (x - x0) / (x1 - x0) * vw, top + (1 - (y - y0) / (y1 - y0)) * vh
 
         # 軸標
+        xlabel, ylabel = {"top": ("X", "Y"), "front": ("X", "Z"), "side": ("Y", "Z")}[view]
         canvas.create_text(cw / 2, ch - 5, text=xlabel, fill="#888", font=("Consolas", 10))
         canvas.create_text(10, ch / 2, text=ylabel, fill="#888", font=("Consolas", 10), angle=90)
-        canvas.create_text(cw / 2, 12, text=f"{view} 視圖 ({len(self.pcd):,} 點)",
+        canvas.create_text(cw / 2, 12, text=f"{view} 視圖 ({source}，顯示 {len(px):,} 點)",
                            fill=HIGHLIGHT, font=("Microsoft JhengHei UI", 11, "bold"))
 
         # 切面指示線
@@ -725,11 +949,11 @@ class PointCloudApp:
             pos = self.current_result.position
             sec = self.current_result.section_type
             if sec == SectionType.PLAN and view in ("front", "side"):
-                sy = ch - ((pos - ymin) * scale + oy)
-                canvas.create_line(margin, sy, cw - margin, sy, fill=WARN, width=2, dash=(6, 3))
+                _, sy = to_screen(x0, pos)
+                canvas.create_line(left, sy, left + vw, sy, fill=WARN, width=2, dash=(6, 3))
             elif sec == SectionType.ELEVATION_X and view == "top":
-                sx = (pos - xmin) * scale + ox
-                canvas.create_line(sx, margin, sx, ch - margin, fill=WARN, width=2, dash=(6, 3))
+                sx, _ = to_screen(pos, y0)
+                canvas.create_line(sx, top, sx, top + vh, fill=WARN, width=2, dash=(6, 3))
 
     # ── 座標功能 ─────────────────────────────────────
     def _apply_offset(self):
@@ -902,7 +1126,7 @@ class PointCloudApp:
 
         def _do():
             try:
-                report = analyze_section(result, model=model)
+                report = analyze_section(result, model=model, cache=self.ai_cache)
                 self.root.after(0, lambda: self._show_report(report))
             except Exception as e:
                 self.root.after(0, lambda: self._show_ai_error(str(e)))
@@ -954,6 +1178,43 @@ class PointCloudApp:
         self.ai_text.insert("end", "  ollama serve\n")
         self._set_status(f"AI 分析失敗: {msg}", WARN)
 
+    def _ai_analyze_all(self):
+        if not self.results_history:
+            messagebox.showwarning("提示", "請先生成斷面")
+            return
+
+        results = list(self.results_history)
+        self.ai_text.delete("1.0", "end")
+        self.ai_text.insert("end", f"🧠 正在批次分析 {len(results)} 個斷面...\n\n")
+        self._set_status("AI 批次分析中...", HIGHLIGHT)
+        model = self.model_var.get()
+
+        def _progress(done, total, report):
+            self.root.after(0, lambda: self._set_status(f"AI 批次分析 {done}/{total}", HIGHLIGHT))
+
+        def _do():
+            try:
+                reports = analyze_sections(results, model=model, cache=self.ai_cache, progress=_progress)
+                self.root.after(0, lambda: self._show_batch_reports(reports))
+            except Exception as e:
+                self.root.after(0, lambda: self._show_ai_error(str(e)))
+
+        threading.Thread(target=_do, daemon=True).start()
+
+    def _show_batch_reports(self, reports: list):
+        self.ai_text.delete("1.0", "end")
+        self.ai_text.insert("end", f"🧠 批次分析報告（{len(reports)} 個斷面）\n", "header")
+        self.ai_text.insert("end", f"{'='*50}\n\n")
+        for report in reports:
+            self.ai_text.insert("end", f"■ {report.section_type} @ {report.position:.2f}m  [{report.model_used}]\n")
+            self.ai_text.insert("end", f"  {report.summary}\n")
+            for i in report.issues:
+                self.ai_text.insert("end", f"  ⚠️ {i}\n")
+            self.ai_text.insert("end", "\n")
+        n_rule = sum(r.model_used == "rule_based" for r in reports)
+        note = f"（{n_rule} 個使用規則式分析）" if n_rule else ""
+        self._set_status(f"✅ AI 批次分析完成 {len(reports)} 個斷面{note}", SUCCESS)
+
     def _ai_compare(self):
         if len(self.results_history) < 2:
             messagebox.showwarning("提示", "需要至少 2 個斷面才能比較")
@@ -4,11 +4,20 @@
 來源：RS10 光達、無人機航拍、手持掃描儀（iPhone LiDAR 等）
 
 不依賴 Open3D（相容 Python 3.12+），使用純 numpy + laspy。
+
+大檔案採分塊（chunk）串流讀取：每讀一塊就先做體素下採樣再累積，
+峰值記憶體約為「一塊原始點 + 下採樣後結果」，不需整檔載入。
+  - LAS/LAZ：laspy.open(...).chunk_iterator
+  - PLY：完整解析 header，binary 依屬性型別建 dtype（含顏色），ASCII 向量化解析
+  - XYZ/PTS：逐塊讀行後以 pandas C 引擎或 np.fromstring 一次解析
 """
+import io
+import itertools
 import logging
+from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterator, Optional
 
 import numpy as np
 
@@ -16,12 +25,14 @@ logger = logging.getLogger(__name__)
 
 SUPPORTED_FORMATS = {".las", ".laz", ".ply", ".xyz", ".pts"}
 
+DEFAULT_CHUNK_POINTS = 2_000_000  # 每塊點數（float64 xyz 約 48 MB）
+
 
 @dataclass
 class PointCloud:
     """輕量點雲容器（取代 Open3D PointCloud）"""
-    points: np.ndarray                      # (N, 3) float64
-    colors: Optional[np.ndarray] = None     # (N, 3) float64, 0~1
+    points: np.ndarray                      # (N, 3) float64（或 float32，見 load_pointcloud dtype）
+    colors: Optional[np.ndarray] = None     # (N, 3) 0~1，dtype 同 points
 
     def __len__(self):
         return len(self.points)
@@ -37,13 +48,20 @@ class PointCloud:
         return PointCloud(points=self.points[idx], colors=new_colors)
 
 
-def load_pointcloud(filepath: str, voxel_size: Optional[float] = None) -> PointCloud:
+def load_pointcloud(filepath: str, voxel_size: Optional[float] = None,
+                    dtype=np.float64, chunk_points: int = DEFAULT_CHUNK_POINTS,
+                    on_chunk: Optional[Callable] = None) -> PointCloud:
     """
     統一載入點雲。
 
     Args:
         filepath: 點雲檔案路徑
-        voxel_size: 若指定則自動體素下採樣 (單位：公尺)
+        voxel_size: 若指定則邊讀邊體素下採樣 (單位：公尺)，結果與整檔載入後下採樣相同
+        dtype: 座標/顏色儲存型別；np.float32 可省一半記憶體，
+               但 TWD97 等大座標值精度僅約 1~3 cm，需要毫米精度請維持 float64
+        chunk_points: 每塊讀取點數（控制峰值記憶體）
+        on_chunk: 每讀完一塊（下採樣前）呼叫 on_chunk(points, colors, total)，
+                  colors 為原始值或 None，total 為 header 點數（未知為 None）；供邊讀邊預覽
     Returns:
         PointCloud
     """
@@ -55,131 +73,411 @@ def load_pointcloud(filepath: str, voxel_size: Optional[float] = None) -> PointC
 
     logger.info(f"載入點雲: {path.name} ({ext})")
 
-    if ext in (".las", ".laz"):
-        pcd = _load_las(filepath)
-    elif ext == ".ply":
-        pcd = _load_ply(filepath)
-    elif ext == ".xyz":
-        pcd = _load_xyz(filepath)
-    elif ext == ".pts":
-        pcd = _load_pts(filepath)
-    else:
-        raise ValueError(f"不支援的格式: {ext}")
-
-    logger.info(f"載入完成: {len(pcd):,} 點")
+    reader = _open_reader(filepath, ext, chunk_points)
+    acc = _ChunkAccumulator(voxel_size, dtype, reader.total)
+    for points, colors in reader.chunks():
+        if on_chunk is not None:
+            on_chunk(points, colors, reader.total)
+        acc.add(points, colors)
+    pcd = acc.result(reader.color_scale)
 
     if voxel_size and voxel_size > 0:
-        pcd = pcd.voxel_down_sample(voxel_size)
-        logger.info(f"下採樣 (voxel={voxel_size}m): {len(pcd):,} 點")
+        logger.info(f"載入完成: {acc.n_read:,} 點 → 下採樣 (voxel={voxel_size}m): {len(pcd):,} 點")
+    else:
+        logger.info(f"載入完成: {len(pcd):,} 點")
 
     return pcd
 
 
-def _load_las(filepath: str) -> PointCloud:
-    """LAS/LAZ → PointCloud"""
-    import laspy
-
-    las = laspy.read(filepath)
-    points = np.vstack([las.x, las.y, las.z]).T.astype(np.float64)
+def iter_pointcloud_chunks(filepath: str, chunk_points: int = DEFAULT_CHUNK_POINTS
+                           ) -> Iterator[PointCloud]:
+    """逐塊讀取點雲（顏色已正規化為 0~1，座標為 float64），供自訂串流處理使用"""
+    ext = Path(filepath).suffix.lower()
+    if ext not in SUPPORTED_FORMATS:
+        raise ValueError(f"不支援的格式: {ext}，支援: {SUPPORTED_FORMATS}")
+    reader = _open_reader(filepath, ext, chunk_points)
+    for points, colors in reader.chunks():
+        if colors is not None:
+            colors = _normalize_colors(colors.astype(np.float64), reader.color_scale)
+        yield PointCloud(points=points, colors=colors)
 
-    colors = None
-    if hasattr(las, "red") and hasattr(las, "green") and hasattr(las, "blue"):
-        colors = np.vstack([las.red, las.green, las.blue]).T.astype(np.float64)
-        max_val = colors.max()
-        if max_val > 255:
-            colors /= 65535.0
-        elif max_val > 0:
-            colors /= 255.0
 
-    return PointCloud(points=points, colors=colors)
+# ── 分塊累積 + 串流體素下採樣 ───────────────────────────
 
 
-def _load_ply(filepath: str) -> PointCloud:
-    """PLY (ASCII) → PointCloud"""
-    path = Path(filepath)
-    with open(path, "rb") as f:
-        header_lines = []
-        while True:
-            line = f.readline().decode("ascii", errors="ignore").strip()
-            header_lines.append(line)
-            if line == "end_header":
-                break
+class _ChunkAccumulator:
+    """
+    累積各塊點雲。有 voxel_size 時，每塊先取塊內各體素第一個點，
+    再剔除先前塊已出現過的體素 — 等同整檔 voxel_down_sample（保留檔案中第一個點、維持原順序）。
+    無 voxel_size 且已知總點數時直接預先配置陣列，避免最後 concatenate 的兩倍峰值。
+    """
 
-        # 解析 header
-        n_vertices = 0
-        props = []
-        in_vertex = False
-        for line in header_lines:
-            if line.startswith("element vertex"):
-                n_vertices = int(line.split()[-1])
-                in_vertex = True
-            elif line.startswith("element"):
-                in_vertex = False
-            elif in_vertex and line.startswith("property"):
-                parts = line.split()
-                props.append(parts[-1])  # 屬性名
-
-        # 讀取數據
-        is_binary = any("binary" in h for h in header_lines)
-        if is_binary:
-            # 簡化：只讀 float32 x,y,z
-            dtype = np.dtype([(p, np.float32) for p in props[:3]])
-            data = np.fromfile(f, dtype=dtype, count=n_vertices)
-            points = np.column_stack([data[p] for p in props[:3]]).astype(np.float64)
+    def __init__(self, voxel_size: Optional[float], dtype, total: Optional[int]):
+        self.voxel_size = voxel_size if voxel_size and voxel_size > 0 else None
+        self.dtype = np.dtype(dtype)
+        self.n_read = 0
+        self._runs = []   # 已出現體素鍵：數段各自排序的陣列，長度由舊到新遞減（見 _add_keys）
+        self._points = []
+        self._colors = []
+        self._color_max = 0.0
+        self._prealloc = None
+        if self.voxel_size is None and total:
+            self._prealloc = [np.empty((total, 3), dtype=self.dtype), None, 0]
+
+    def add(self, points: np.ndarray, colors: Optional[np.ndarray]):
+        n = len(points)
+        if n == 0:
+            return
+        self.n_read += n
+        if colors is not None:
+            self._color_max = max(self._color_max, float(colors.max()))
+
+        if self.voxel_size is not None:
+            keys = _voxel_keys(points, self.voxel_size)
+            keys, first = np.unique(keys, return_index=True)   # 塊內各體素第一個點
+            fresh = ~self._seen(keys)
+            self._add_keys(keys[fresh])
+            new = np.sort(first[fresh])
+            points = points[new]
+            colors = colors[new] if colors is not None else None
+
+        if self._prealloc is not None:
+            buf_points, buf_colors, pos = self._prealloc
+            if pos + len(points) > len(buf_points):
+                # header 點數不準：改用清單累積
+                self._points.append(buf_points[:pos])
+                if buf_colors is not None:
+                    self._colors.append(buf_colors[:pos])
+                self._prealloc = None
+            else:
+                buf_points[pos:pos + len(points)] = points
+                if colors is not None:
+                    if buf_colors is None:
+                        buf_colors = np.empty_like(buf_points)
+                        self._prealloc[1] = buf_colors
+                    buf_colors[pos:pos + len(points)] = colors
+                self._prealloc[2] = pos + len(points)
+                return
+
+        self._points.append(points.astype(self.dtype, copy=False))
+        if colors is not None:
+            self._colors.append(colors.astype(self.dtype, copy=False))
+
+    def _seen(self, keys: np.ndarray) -> np.ndarray:
+        """keys（已排序）中先前塊已出現過的體素"""
+        seen = np.zeros(len(keys), dtype=bool)
+        for run in self._runs:
+            pos = np.minimum(np.searchsorted(run, keys), len(run) - 1)
+            seen |= run[pos] == keys
+        return seen
+
+    def _add_keys(self, keys: np.ndarray):
+        """
+        加入新體素鍵：與不大於它的末段合併後重新排序，段長維持遞減，
+        段數為 O(log K)，每個鍵只被重新排序 O(log K) 次（不必每塊重排全部已知體素）
+        """
+        if not len(keys):
+            return
+        while self._runs and len(self._runs[-1]) <= len(keys):
+            keys = np.sort(np.concatenate([self._runs.pop(), keys]))
+        self._runs.append(keys)
+
+    def result(self, color_scale: str) -> PointCloud:
+        if self._prealloc is not None:
+            buf_points, buf_colors, pos = self._prealloc
+            points = buf_points[:pos]
+            colors = buf_colors[:pos] if buf_colors is not None else None
         else:
-            rows = []
-            for _ in range(n_vertices):
-                line = f.readline().decode("ascii", errors="ignore").strip()
-                if line:
-                    rows.append([float(x) for x in line.split()])
-            data = np.array(rows)
-            points = data[:, :3].astype(np.float64)
-
-    colors = None
-    prop_names = [p.lower() for p in props]
-    if "red" in prop_names and "green" in prop_names and "blue" in prop_names:
-        ri = prop_names.index("red")
-        gi = prop_names.index("green")
-        bi = prop_names.index("blue")
-        if not is_binary and data.shape[1] > max(ri, gi, bi):
-            colors = data[:, [ri, gi, bi]].astype(np.float64)
-            if colors.max() > 1.0:
-                colors /= 255.0
-
-    return PointCloud(points=points, colors=colors)
-
-
-def _load_xyz(filepath: str) -> PointCloud:
-    """XYZ 純文字 → PointCloud"""
-    data = np.loadtxt(filepath, comments="#", delimiter=None)
-    points = data[:, :3].astype(np.float64)
-
-    colors = None
-    if data.shape[1] >= 6:
-        colors = data[:, 3:6].astype(np.float64)
-        if colors.max() > 1.0:
-            colors /= 255.0
-
-    return PointCloud(points=points, colors=colors)
-
-
-def _load_pts(filepath: str) -> PointCloud:
-    """PTS 格式 → PointCloud"""
-    lines = Path(filepath).read_text().strip().split("\n")
-    start = 0
-    try:
-        int(lines[0].strip())
-        start = 1
-    except ValueError:
-        pass
+            points = (np.concatenate(self._points) if self._points
+                      else np.empty((0, 3), dtype=self.dtype))
+            colors = np.concatenate(self._colors) if self._colors else None
+        if colors is not None and len(colors) != len(points):
+            colors = None
+        if colors is not None:
+            colors = _normalize_colors(colors, color_scale, self._color_max)
+        return PointCloud(points=points, colors=colors)
 
-    rows = []
-    for line in lines[start:]:
-        parts = line.strip().split()
-        if len(parts) >= 3:
-            rows.append([float(x) for x in parts[:3]])
 
-    return PointCloud(points=np.array(rows, dtype=np.float64))
+def _voxel_keys(points: np.ndarray, voxel_size: float) -> np.ndarray:
+    """體素索引 (ix, iy, iz) 打包成 24 bytes 的一維鍵，可直接排序 / searchsorted / 比較相等"""
+    keys = np.floor(points / voxel_size).astype(np.int64)
+    return np.ascontiguousarray(keys).view("V24").ravel()
+
+
+def _normalize_colors(colors: np.ndarray, scale: str, max_val: float = None) -> np.ndarray:
+    """
+    將原始顏色值正規化為 0~1（就地運算）
+    scale: "auto" 依最大值判斷（>255 視為 16-bit，>1 視為 8-bit）；
+           "int" 為整數顏色（LAS：>255 視為 16-bit，否則 8-bit）；或指定 "u8"/"u16"
+    """
+    if max_val is None:
+        max_val = float(colors.max()) if len(colors) else 0.0
+    if scale == "int":
+        scale = "u16" if max_val > 255 else "u8"
+    if scale == "u16" or (scale == "auto" and max_val > 255):
+        colors /= 65535.0
+    elif scale == "u8" or (scale == "auto" and max_val > 1.0):
+        colors /= 255.0
+    return colors
+
+
+# ── 各格式分塊讀取器 ─────────────────────────────────────
+
+
+class _Reader(ABC):
+    """分塊讀取器介面：chunks() 產生 (points float64 (n,3), 原始顏色 (n,3) 或 None)"""
+    total: Optional[int] = None   # 已知總點數（可預先配置）
+    color_scale: str = "auto"
+
+    @abstractmethod
+    def chunks(self) -> Iterator[tuple]:
+        ...
+
+
+def _open_reader(filepath: str, ext: str, chunk_points: int) -> _Reader:
+    if ext in (".las", ".laz"):
+        return _LasReader(filepath, chunk_points)
+    if ext == ".ply":
+        return _PlyReader(filepath, chunk_points)
+    if ext == ".xyz":
+        return _TextReader(filepath, chunk_points, color_cols=(3, 6))
+    if ext == ".pts":
+        # PTS：x y z intensity r g b，第一行可能是點數
+        return _TextReader(filepath, chunk_points, color_cols=(4, 7), count_header=True)
+    raise ValueError(f"不支援的格式: {ext}")
+
+
+class _LasReader(_Reader):
+    """LAS/LAZ → 以 laspy chunk_iterator 分塊讀取"""
+
+    def __init__(self, filepath: str, chunk_points: int):
+        self.filepath = filepath
+        self.chunk_points = chunk_points
+        import laspy
+        with laspy.open(filepath) as f:
+            self.total = int(f.header.point_count)
+            dims = set(f.header.point_format.dimension_names)
+        self.has_color = {"red", "green", "blue"} <= dims
+        self.color_scale = "int"
+
+    def chunks(self):
+        import laspy
+        with laspy.open(self.filepath) as f:
+            for chunk in f.chunk_iterator(self.chunk_points):
+                points = np.empty((len(chunk), 3), dtype=np.float64)
+                points[:, 0] = chunk.x
+                points[:, 1] = chunk.y
+                points[:, 2] = chunk.z
+                colors = None
+                if self.has_color:
+                    colors = np.empty((len(chunk), 3), dtype=np.float64)
+                    colors[:, 0] = chunk.red
+                    colors[:, 1] = chunk.green
+                    colors[:, 2] = chunk.blue
+                yield points, colors
+
+
+# PLY 屬性型別 → numpy 型別
+_PLY_TYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2", "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4", "double": "f8", "float64": "f8",
+}
+
+
+@dataclass
+class _PlyElement:
+    name: str
+    count: int
+    props: list = field(default_factory=list)   # [(name, ply_type)]，list 屬性為 (name, None)
+
+
+def _parse_ply_header(f) -> tuple[str, list]:
+    """解析 PLY header，回傳 (format, elements)；檔案指標停在資料起點"""
+    if f.readline().strip() != b"ply":
+        raise ValueError("不是有效的 PLY 檔案")
+    fmt = "ascii"
+    elements = []
+    while True:
+        raw = f.readline()
+        if not raw:
+            raise ValueError("PLY header 未結束 (缺少 end_header)")
+        parts = raw.decode("ascii", errors="ignore").split()
+        if not parts:
+            continue
+        if parts[0] == "end_header":
+            break
+        if parts[0] == "format":
+            fmt = parts[1]
+        elif parts[0] == "element":
+            elements.append(_PlyElement(parts[1], int(parts[2])))
+        elif parts[0] == "property" and elements:
+            if parts[1] == "list":
+                elements[-1].props.append((parts[-1], None))
+            else:
+                elements[-1].props.append((parts[-1], parts[1]))
+    return fmt, elements
+
+
+class _PlyReader(_Reader):
+    """PLY (ASCII / binary little/big endian) → 依 header 屬性型別完整讀取，含顏色"""
+
+    def __init__(self, filepath: str, chunk_points: int):
+        self.filepath = filepath
+        self.chunk_points = chunk_points
+        with open(filepath, "rb") as f:
+            self.fmt, self.elements = _parse_ply_header(f)
+            self.data_offset = f.tell()
+        vertex = next((e for e in self.elements if e.name == "vertex"), None)
+        if vertex is None:
+            raise ValueError("PLY 檔案沒有 vertex element")
+        self.vertex = vertex
+        self.total = vertex.count
+        names = [p[0].lower() for p in vertex.props]
+        self.xyz_idx = [names.index(c) for c in ("x", "y", "z")]
+        self.color_idx = None
+        for prefix in ("", "diffuse_"):
+            cols = [f"{prefix}{c}" for c in ("red", "green", "blue")]
+            if all(c in names for c in cols):
+                self.color_idx = [names.index(c) for c in cols]
+                break
+        self.color_scale = "auto"
+        if self.color_idx is not None:
+            ctype = _PLY_TYPES.get(vertex.props[self.color_idx[0]][1] or "", "")
+            self.color_scale = {"u1": "u8", "u2": "u16"}.get(ctype, "auto")
+
+    def _vertex_dtype(self, byte_order: str) -> np.dtype:
+        if any(t is None for _, t in self.vertex.props):
+            raise ValueError("binary PLY 的 vertex 含 list 屬性，不支援")
+        return np.dtype([(f"p{i}", byte_order + _PLY_TYPES[t])
+                         for i, (_, t) in enumerate(self.vertex.props)])
+
+    def _skip_before_vertex(self, f, byte_order: str):
+        """略過 vertex 之前的固定長度 element（binary）"""
+        for e in self.elements:
+            if e is self.vertex:
+                return
+            if any(t is None for _, t in e.props):
+                raise ValueError(f"binary PLY 的 vertex 前有 list 屬性 element ({e.name})，不支援")
+            size = sum(np.dtype(_PLY_TYPES[t]).itemsize for _, t in e.props)
+            f.seek(size * e.count, 1)
+
+    def chunks(self):
+        with open(self.filepath, "rb") as f:
+            f.seek(self.data_offset)
+            if self.fmt == "ascii":
+                yield from self._ascii_chunks(f)
+            else:
+                byte_order = "<" if self.fmt == "binary_little_endian" else ">"
+                dtype = self._vertex_dtype(byte_order)
+                self._skip_before_vertex(f, byte_order)
+                remaining = self.vertex.count
+                while remaining > 0:
+                    n = min(self.chunk_points, remaining)
+                    data = np.fromfile(f, dtype=dtype, count=n)
+                    if len(data) == 0:
+                        break
+                    remaining -= len(data)
+                    yield self._split(data)
+
+    def _split(self, data: np.ndarray):
+        points = np.empty((len(data), 3), dtype=np.float64)
+        for j, i in enumerate(self.xyz_idx):
+            points[:, j] = data[f"p{i}"]
+        colors = None
+        if self.color_idx is not None:
+            colors = np.empty((len(data), 3), dtype=np.float64)
+            for j, i in enumerate(self.color_idx):
+                colors[:, j] = data[f"p{i}"]
+        return points, colors
+
+    def _ascii_chunks(self, f):
+        # ASCII：先略過 vertex 之前的 element（每個元素一行）
+        for e in self.elements:
+            if e is self.vertex:
+                break
+            for _ in range(e.count):
+                f.readline()
+        n_cols = len(self.vertex.props)
+        remaining = self.vertex.count
+        while remaining > 0:
+            lines = list(itertools.islice(f, min(self.chunk_points, remaining)))
+            if not lines:
+                break
+            remaining -= len(lines)
+            data = _parse_text_block(b"".join(lines), n_cols)
+            points = data[:, self.xyz_idx].astype(np.float64, copy=False)
+            colors = data[:, self.color_idx] if self.color_idx is not None else None
+            yield points, colors
+
+
+class _TextReader(_Reader):
+    """XYZ / PTS 純文字：逐塊讀行，向量化解析"""
+
+    def __init__(self, filepath: str, chunk_points: int, color_cols: tuple,
+                 count_header: bool = False):
+        self.filepath = filepath
+        self.chunk_points = chunk_points
+        self.color_cols = color_cols
+        self.count_header = count_header
+
+    def chunks(self):
+        with open(self.filepath, "rb") as f:
+            lines = (ln for ln in f if ln.strip() and not ln.lstrip().startswith(b"#"))
+            first = next(lines, None)
+            if first is None:
+                return
+            if self.count_header and len(first.split()) == 1:
+                first = next(lines, None)   # PTS 點數行
+                if first is None:
+                    return
+            n_cols = len(first.replace(b",", b" ").split())
+            if n_cols < 3:
+                raise ValueError(f"點雲文字格式欄數不足: {first[:80]!r}")
+            lines = itertools.chain([first], lines)
+            c0, c1 = self.color_cols
+            while True:
+                block = list(itertools.islice(lines, self.chunk_points))
+                if not block:
+                    break
+                data = _parse_text_block(b"".join(block), n_cols)
+                points = data[:, :3].astype(np.float64, copy=False)
+                colors = data[:, c0:c1] if data.shape[1] >= c1 else None
+                yield points, colors
+
+
+def _parse_text_block(text: bytes, n_cols: int) -> np.ndarray:
+    """
+    將一塊以空白/逗號分隔的數值文字解析為 (n, n_cols) 陣列
+    優先使用 pandas C 引擎，其次 np.fromstring；欄數不一致時退回 np.loadtxt 逐行容錯
+    """
+    text = text.replace(b",", b" ")
+    try:
+        import pandas as pd
+        df = pd.read_csv(io.BytesIO(text), sep=r"\s+", header=None, engine="c",
+                         dtype=np.float64, usecols=range(n_cols), on_bad_lines="skip")
+        return df.to_numpy()
+    except ImportError:
+        pass
+    except (ValueError, TypeError):
+        return _parse_text_lenient(text, n_cols)
+
+    flat = np.fromstring(text.decode("ascii", errors="ignore"), dtype=np.float64, sep=" ")
+    if len(flat) % n_cols == 0:
+        data = flat.reshape(-1, n_cols)
+        if len(data) == text.count(b"\n") + (0 if text.endswith(b"\n") else 1):
+            return data
+    return _parse_text_lenient(text, n_cols)
+
+
+def _parse_text_lenient(text: bytes, n_cols: int) -> np.ndarray:
+    """容錯解析：只取每行前 n_cols 欄，略過欄數不足的行"""
+    rows = [ln.split()[:n_cols] for ln in text.splitlines()]
+    rows = [r for r in rows if len(r) == n_cols]
+    if not rows:
+        return np.empty((0, n_cols))
+    return np.array(rows, dtype=np.float64)
 
 
 def scan_directory(root_dir: str, recursive: bool = True) -> list[dict]:
@@ -0,0 +1,373 @@
+"""
+築未科技 — 點雲 LOD 八分樹快取
+大型點雲一次建立多解析度磚塊快取（存在來源檔旁的 <檔名>.lod/ 目錄），
+檢視器只讀取目前視野與縮放程度需要的節點；首次繪製只需根節點，與檔案大小無關。
+
+快取格式：
+  meta.json              來源檔大小 / 修改時間、立方體原點與邊長、各節點點數
+  r.npy, r0.npy, r07.npy 節點點資料；名稱為自根節點起的八分位序列（digit = x<<2 | y<<1 | z）
+
+每個節點存放其範圍內以 spacing = 邊長 / LOD_GRID 體素取樣的點，本身即是完整預覽；
+葉節點（點數不超過 LEAF_POINTS 或已達最大深度）保留全部點，八分樹依點的實際分布自動加深。座標以 float32 存放（相對立方體原點），數公里範圍內誤差 < 1 mm。
+
+用法：
+    from construction_brain.pointcloud.lod import build_lod_cache, open_lod
+
+    lod = open_lod("scan.las") or build_lod_cache("scan.las")
+    pts, colors = lod.points_for_view(axes=(0, 1), rect=(x0, x1, y0, y1), pixel_size=0.05)
+"""
+import bisect
+import heapq
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from .loader import DEFAULT_CHUNK_POINTS, iter_pointcloud_chunks
+
+logger = logging.getLogger(__name__)
+
+LOD_VERSION = 1
+LOD_GRID = 128              # 每個節點每軸的取樣格數
+LEAF_POINTS = 200_000       # 葉節點點數上限（超過則再細分）
+MAX_DEPTH = 6
+MAX_CACHED_NODES = 256      # 記憶體中保留的節點數（LRU）
+POINT_BUDGET = 1_000_000    # 單一視野最多讀取的點數
+
+_RECORD = np.dtype([("xyz", "<f4", 3), ("rgb", "u1", 3)])
+
+
+def lod_cache_dir(filepath: str) -> Path:
+    """快取目錄：來源檔旁的 <檔名>.lod/"""
+    path = Path(filepath)
+    return path.with_name(path.name + ".lod")
+
+
+def _source_stamp(filepath: str) -> dict:
+    st = os.stat(filepath)
+    return {"source_size": st.st_size, "source_mtime_ns": st.st_mtime_ns}
+
+
+# ── 建立快取 ─────────────────────────────────────────────
+
+
+def build_lod_cache(filepath: str, chunk_points: int = DEFAULT_CHUNK_POINTS,
+                    progress: Optional[Callable] = None, stats: Optional[tuple] = None) -> "LodCache":
+    """
+    串流建立 LOD 快取（記憶體用量約為一塊讀取點數 + 單一路徑上的節點取樣）。
+
+    1. 掃描一次取得邊界與點數，決定分桶深度
+    2. 再掃描一次，依最細格分桶寫入暫存檔
+    3. 深度優先由葉往上：點數不超過 LEAF_POINTS 的子樹直接成為葉節點（存全部點），
+       父節點合併子節點取樣後再以自己的 spacing 取樣
+
+    Args:
+        progress: 回呼 progress(stage, done, total)
+        stats: 呼叫端讀檔時已取得的 (lo, hi, total, has_color)，提供則略過步驟 1 的掃描
+    """
+    start = time.time()
+    final_dir = lod_cache_dir(filepath)
+    work_dir = final_dir.with_name(final_dir.name + f".tmp{os.getpid()}")
+    shutil.rmtree(work_dir, ignore_errors=True)
+    (work_dir / "buckets").mkdir(parents=True)
+
+    try:
+        # 1. 邊界
+        if stats is not None:
+            lo, hi, total, has_color = stats
+            lo = np.asarray(lo, dtype=np.float64)
+            hi = np.asarray(hi, dtype=np.float64)
+        else:
+            lo = np.full(3, np.inf)
+            hi = np.full(3, -np.inf)
+            total = 0
+            has_color = False
+            for chunk in iter_pointcloud_chunks(filepath, chunk_points):
+                if len(chunk) == 0:
+                    continue
+                lo = np.minimum(lo, chunk.points.min(axis=0))
+                hi = np.maximum(hi, chunk.points.max(axis=0))
+                total += len(chunk)
+                has_color = has_color or chunk.colors is not None
+                if progress:
+                    progress("bounds", total, None)
+        if total == 0:
+            raise ValueError("點雲沒有任何點")
+
+        size = float(max((hi - lo).max(), 1e-6)) * (1 + 1e-9)
+        # 以最不利的線狀分布（道路、隧道：每層僅 2 個子節點有點）估計分桶深度，
+        # 面狀或體狀分布會在建立節點時提早收斂成葉節點
+        depth = min(MAX_DEPTH, max(0, math.ceil(math.log2(max(total / LEAF_POINTS, 1)))))
+        n_cells = 1 << depth
+
+        # 2. 依葉節點分桶
+        done = 0
+        for chunk in iter_pointcloud_chunks(filepath, chunk_points):
+            if len(chunk) == 0:
+                continue
+            rel = chunk.points - lo
+            ijk = np.clip((rel / size * n_cells).astype(np.int64), 0, n_cells - 1)
+            codes = _morton(ijk, depth)
+            records = np.empty(len(chunk), dtype=_RECORD)
+            records["xyz"] = rel
+            records["rgb"] = (np.clip(chunk.colors, 0, 1) * 255).astype(np.uint8) \
+                if chunk.colors is not None else 0
+            order = np.argsort(codes, kind="stable")
+            codes = codes[order]
+            records = records[order]
+            bounds = np.flatnonzero(np.diff(codes)) + 1
+            for part_codes, part in zip(np.split(codes, bounds), np.split(records, bounds)):
+                with open(work_dir / "buckets" / f"{int(part_codes[0])}.bin", "ab") as f:
+                    part.tofile(f)
+            done += len(chunk)
+            if progress:
+                progress("bucket", done, total)
+
+        # 3. 由葉往上建立節點
+        nodes = {}
+        buckets = {int(p.stem): p.stat().st_size // _RECORD.itemsize
+                   for p in (work_dir / "buckets").glob("*.bin")}
+        builder = _NodeBuilder(work_dir, size, depth, buckets, nodes, has_color)
+        builder.build("r", 0, 0)
+        shutil.rmtree(work_dir / "buckets")
+
+        meta = {
+            "version": LOD_VERSION,
+            "source": Path(filepath).name,
+            **_source_stamp(filepath),
+            "origin": lo.tolist(),
+            "bounds_max": hi.tolist(),
+            "size": size,
+            "depth": depth,
+            "grid": LOD_GRID,
+            "total_points": total,
+            "has_color": has_color,
+            "nodes": nodes,
+        }
+        with open(work_dir / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        shutil.rmtree(final_dir, ignore_errors=True)
+        os.replace(work_dir, final_dir)
+    except BaseException:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+
+    logger.info(f"LOD 快取完成: {Path(filepath).name} {total:,} 點, 深度 {depth}, "
+                f"{len(nodes)} 節點, {time.time() - start:.1f}s → {final_dir}")
+    return LodCache(final_dir)
+
+
+def _morton(ijk: np.ndarray, depth: int) -> np.ndarray:
+    """葉節點格座標 → 八分位序列編碼（每層 3 bits，根在最高位）"""
+    codes = np.zeros(len(ijk), dtype=np.int64)
+    for level in range(depth):
+        bit = depth - 1 - level
+        digit = (((ijk[:, 0] >> bit) & 1) << 2) | (((ijk[:, 1] >> bit) & 1) << 1) | ((ijk[:, 2] >> bit) & 1)
+        codes = (codes << 3) | digit
+    return codes
+
+
+def _voxel_first(records: np.ndarray, origin: np.ndarray, spacing: float) -> np.ndarray:
+    """以 spacing（= 節點邊長 / LOD_GRID）體素取樣，每格保留第一個點"""
+    if len(records) == 0:
+        return records
+    # 點都在節點範圍內，每軸格號 0..LOD_GRID，可壓成單一整數鍵
+    base = LOD_GRID + 2
+    ijk = np.clip(np.floor((records["xyz"] - origin) / spacing).astype(np.int64), 0, base - 1)
+    keys = (ijk[:, 0] * base + ijk[:, 1]) * base + ijk[:, 2]
+    _, idx = np.unique(keys, return_index=True)
+    idx.sort()
+    return records[idx]
+
+
+class _NodeBuilder:
+    """深度優先建立節點：同時只保留根到目前節點路徑上的子節點取樣"""
+
+    def __init__(self, work_dir: Path, size: float, depth: int, buckets: dict, nodes: dict,
+                 has_color: bool):
+        self.work_dir = work_dir
+        self.size = size
+        self.depth = depth
+        self.buckets = sorted(buckets)
+        self.nodes = nodes
+        self.has_color = has_color
+        # 每層各編碼前綴下的點數，用來略過空子樹與判斷葉節點
+        self.counts = []
+        for level in range(depth + 1):
+            shift = 3 * (depth - level)
+            counts = {}
+            for code, n in buckets.items():
+                counts[code >> shift] = counts.get(code >> shift, 0) + n
+            self.counts.append(counts)
+
+    def build(self, name: str, level: int, code: int) -> Optional[np.ndarray]:
+        """建立節點並回傳供父節點使用的取樣（以父節點 spacing）"""
+        count = self.counts[level].get(code)
+        if count is None:
+            return None
+        node_size = self.size / (1 << level)
+        origin = _node_origin(name, self.size)
+
+        if level == self.depth or count <= LEAF_POINTS:
+            points = self._read_buckets(level, code)  # 葉節點保留全部點
+        else:
+            parts = [self.build(name + str(d), level + 1, (code << 3) | d) for d in range(8)]
+            merged = np.concatenate([p for p in parts if p is not None and len(p)])
+            points = _voxel_first(merged, origin, node_size / LOD_GRID)
+
+        self._save(name, points)
+        if level == 0:
+            return None
+        parent_size = node_size * 2
+        return _voxel_first(points, _node_origin(name[:-1], self.size), parent_size / LOD_GRID)
+
+    def _read_buckets(self, level: int, code: int) -> np.ndarray:
+        """讀取子樹下所有分桶"""
+        shift = 3 * (self.depth - level)
+        first = bisect.bisect_left(self.buckets, code << shift)
+        last = bisect.bisect_left(self.buckets, (code + 1) << shift)
+        parts = [np.fromfile(self.work_dir / "buckets" / f"{c}.bin", dtype=_RECORD)
+                 for c in self.buckets[first:last]]
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def _save(self, name: str, records: np.ndarray):
+        if self.has_color:
+            np.save(self.work_dir / f"{name}.npy", records)
+        else:
+            np.save(self.work_dir / f"{name}.npy", np.ascontiguousarray(records["xyz"]))
+        self.nodes[name] = int(len(records))
+
+
+def _node_origin(name: str, size: float) -> np.ndarray:
+    """節點立方體原點（相對整體原點）"""
+    origin = np.zeros(3)
+    half = size
+    for d in name[1:]:
+        half /= 2
+        d = int(d)
+        origin += half * np.array([(d >> 2) & 1, (d >> 1) & 1, d & 1])
+    return origin
+
+
+# ── 讀取快取 ─────────────────────────────────────────────
+
+
+def open_lod(filepath: str) -> Optional["LodCache"]:
+    """開啟來源檔旁的 LOD 快取；不存在、版本不符或來源檔已變更時回傳 None"""
+    cache_dir = lod_cache_dir(filepath)
+    try:
+        with open(cache_dir / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        stamp = _source_stamp(filepath)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if meta.get("version") != LOD_VERSION or any(meta.get(k) != v for k, v in stamp.items()):
+        return None
+    return LodCache(cache_dir, meta)
+
+
+class LodCache:
+    """已建立的 LOD 快取：依視野選節點、讀節點（LRU 快取、執行緒安全）"""
+
+    def __init__(self, cache_dir: Path, meta: dict = None):
+        self.cache_dir = Path(cache_dir)
+        if meta is None:
+            with open(self.cache_dir / "meta.json", encoding="utf-8") as f:
+                meta = json.load(f)
+        self.meta = meta
+        self.origin = np.array(meta["origin"], dtype=np.float64)
+        self.bounds_max = np.array(meta["bounds_max"], dtype=np.float64)
+        self.size = float(meta["size"])
+        self.depth = int(meta["depth"])
+        self.grid = int(meta["grid"])
+        self.nodes = meta["nodes"]
+        self.total_points = int(meta["total_points"])
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+
+    def node_bounds(self, name: str) -> tuple[np.ndarray, np.ndarray]:
+        lo = self.origin + _node_origin(name, self.size)
+        return lo, lo + self.size / (1 << (len(name) - 1))
+
+    def node_spacing(self, name: str) -> float:
+        """節點點間距（葉節點為 0：全解析度）"""
+        if not any(name + str(d) in self.nodes for d in range(8)):
+            return 0.0
+        return self.size / (1 << (len(name) - 1)) / self.grid
+
+    def select(self, axes: tuple, rect: tuple, pixel_size: float,
+               point_budget: int = POINT_BUDGET) -> list[str]:
+        """
+        選出覆蓋視野的節點：由粗到細細分與視野相交的節點，
+        直到點間距小於一個像素、已是葉節點，或再細分會超過點數預算
+        axes: 投影軸，例如 (0, 1) 為俯視
+        rect: (x0, x1, y0, y1) 視野範圍（世界座標）
+        """
+        x0, x1, y0, y1 = rect
+        ax, ay = axes
+
+        def visible(name):
+            lo, hi = self.node_bounds(name)
+            return not (hi[ax] < x0 or lo[ax] > x1 or hi[ay] < y0 or lo[ay] > y1)
+
+        if "r" not in self.nodes or not visible("r"):
+            return []
+        selected = {"r"}
+        total = self.nodes["r"]
+        heap = [(-self.node_spacing("r"), "r")]
+        while heap:
+            neg_spacing, name = heapq.heappop(heap)
+            if -neg_spacing <= pixel_size:
+                break  # 剩下的節點都已夠細
+            children = [c for c in (name + str(d) for d in range(8)) if c in self.nodes and visible(c)]
+            new_total = total - self.nodes[name] + sum(self.nodes[c] for c in children)
+            if not children or new_total > point_budget:
+                continue
+            selected.discard(name)
+            selected.update(children)
+            total = new_total
+            for c in children:
+                if self.node_spacing(c) > 0:
+                    heapq.heappush(heap, (-self.node_spacing(c), c))
+        return sorted(selected)
+
+    def load(self, name: str) -> tuple[np.ndarray, Optional[np.ndarray]]:
+        """讀取節點 → (points (N, 3) float64 世界座標, colors (N, 3) 0~1 或 None)"""
+        with self._lock:
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                return self._loaded[name]
+        data = np.load(self.cache_dir / f"{name}.npy")
+        if data.dtype.names:
+            points = data["xyz"].astype(np.float64) + self.origin
+            colors = data["rgb"].astype(np.float32) / 255.0
+        else:
+            points = data.astype(np.float64) + self.origin
+            colors = None
+        with self._lock:
+            self._loaded[name] = (points, colors)
+            while len(self._loaded) > MAX_CACHED_NODES:
+                self._loaded.popitem(last=False)
+        return points, colors
+
+    def points_for_view(self, axes: tuple, rect: tuple, pixel_size: float,
+                        point_budget: int = POINT_BUDGET) -> tuple[np.ndarray, Optional[np.ndarray]]:
+        """讀取視野所需節點並合併"""
+        names = self.select(axes, rect, pixel_size, point_budget)
+        parts = [self.load(n) for n in names]
+        if not parts:
+            return np.empty((0, 3)), None
+        points = np.concatenate([p for p, _ in parts])
+        colors = None
+        if all(c is not None for _, c in parts):
+            colors = np.concatenate([c for _, c in parts])
+        return points, colors
@@ -11,15 +11,22 @@
     # 或指定切面：
     pipe.plan_view(z=1.2, output="floor_plan.dxf")
     pipe.elevation_view(direction="x", position=5.0, output="east_elevation.dxf")
+
+    # 批次（多核）：每個檔案一個 worker process，結果依檔名順序回傳
+    batch_process("scans/", "output/", workers=8)
 """
 import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterator, Optional
 
 from .loader import load_pointcloud, scan_directory
 from .section_extractor import (
     SectionParams, SectionType, SectionResult,
-    extract_section, auto_sections,
+    extract_section, iter_auto_sections,
 )
 from .exporter import export_dxf, export_svg
 
@@ -123,7 +130,8 @@ class PointCloudPipeline:
         return result
 
     def auto_generate(self, output_dir: str, n_plans: int = 3, n_elevations: int = 4,
-                      thickness: float = 0.1, formats: tuple = ("dxf", "svg")) -> list[dict]:
+                      thickness: float = 0.1, formats: tuple = ("dxf", "svg"),
+                      export_workers: int = 2) -> list[dict]:
         """
         自動生成多個平面圖和立面圖。
 
@@ -133,50 +141,176 @@ class PointCloudPipeline:
             n_elevations: 立面圖數量
             thickness: 切片厚度
             formats: 輸出格式 ("dxf", "svg" 或兩者)
+            export_workers: 輸出執行緒數；切下一個切面的同時輸出前面的切面，0 = 依序輸出
         Returns:
-            生成結果列表
+            生成結果列表（依切面順序）
         """
         out = Path(output_dir)
         out.mkdir(parents=True, exist_ok=True)
 
-        results = auto_sections(self.pcd, n_plans=n_plans, n_elevations=n_elevations, thickness=thickness)
-        outputs = []
-
-        for i, result in enumerate(results):
-            if result.n_points == 0:
-                logger.warning(f"切面 {i} 無點，跳過")
-                continue
-
-            type_name = result.section_type.value
-            pos_str = f"{result.position:.1f}".replace(".", "_")
-            base_name = f"{type_name}_{pos_str}"
-
-            files = {}
-            if "dxf" in formats:
-                dxf_path = str(out / f"{base_name}.dxf")
-                export_dxf(result, dxf_path)
-                files["dxf"] = dxf_path
-
-            if "svg" in formats:
-                svg_path = str(out / f"{base_name}.svg")
-                export_svg(result, svg_path)
-                files["svg"] = svg_path
-
-            outputs.append({
-                "type": type_name,
-                "position": result.position,
-                "n_points": result.n_points,
-                "n_contours": len(result.contours),
-                "bounds": result.bounds,
-                "files": files,
-            })
+        sections = iter_auto_sections(self.pcd, n_plans=n_plans, n_elevations=n_elevations, thickness=thickness)
+        pool = ThreadPoolExecutor(max_workers=export_workers) if export_workers > 0 else None
+        pending = []
+        try:
+            for i, result in enumerate(sections):
+                if result.n_points == 0:
+                    logger.warning(f"切面 {i} 無點，跳過")
+                    continue
+                if pool is None:
+                    pending.append(_export_section(result, out, formats))
+                else:
+                    pending.append(pool.submit(_export_section, result, out, formats))
+            outputs = [p.result() if pool is not None else p for p in pending]
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
 
         logger.info(f"自動生成完成: {len(outputs)} 個圖面 → {output_dir}")
         return outputs
 
 
+def _export_section(result: SectionResult, out: Path, formats: tuple) -> dict:
+    """輸出單一切面的 DXF / SVG"""
+    type_name = result.section_type.value
+    pos_str = f"{result.position:.1f}".replace(".", "_")
+    base_name = f"{type_name}_{pos_str}"
+
+    files = {}
+    if "dxf" in formats:
+        dxf_path = str(out / f"{base_name}.dxf")
+        export_dxf(result, dxf_path)
+        files["dxf"] = dxf_path
+
+    if "svg" in formats:
+        svg_path = str(out / f"{base_name}.svg")
+        export_svg(result, svg_path)
+        files["svg"] = svg_path
+
+    return {
+        "type": type_name,
+        "position": result.position,
+        "n_points": result.n_points,
+        "n_contours": len(result.contours),
+        "bounds": result.bounds,
+        "files": files,
+    }
+
+
+# ── 批次處理 ─────────────────────────────────────────────
+
+
+def _process_file(task: dict) -> dict:
+    """處理單一點雲檔案（在 worker process 或本 process 內執行），失敗時回傳含 error 的結果"""
+    logger.info(f"處理: {task['name']} ({task['size_mb']} MB)")
+    start = time.time()
+    try:
+        pipe = PointCloudPipeline(task["path"], voxel_size=task["voxel_size"])
+        results = pipe.auto_generate(task["out_sub"], n_plans=task["n_plans"],
+                                     n_elevations=task["n_elevations"])
+        entry = {"file": task["name"], "info": pipe.info, "outputs": results}
+    except Exception as e:
+        logger.error(f"處理失敗 {task['name']}: {e}")
+        entry = {"file": task["name"], "error": str(e)}
+    entry["duration"] = round(time.time() - start, 2)
+    return entry
+
+
+def _process_file_isolated(task: dict) -> dict:
+    """在專屬的單一 worker process 重跑（該檔案讓 worker 崩潰或 OOM 時不影響其他檔案）"""
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        try:
+            return pool.submit(_process_file, task).result()
+        except BrokenProcessPool as e:
+            return {"file": task["name"], "error": f"worker 異常結束: {e}"}
+
+
+def _batch_tasks(input_dir: str, output_dir: str, voxel_size: float,
+                 n_plans: int, n_elevations: int) -> list[dict]:
+    files = scan_directory(input_dir)
+    if not files:
+        logger.warning(f"目錄 {input_dir} 中沒有點雲檔案")
+    return [{
+        "index": i,
+        "path": f["path"],
+        "name": f["name"],
+        "size_mb": f["size_mb"],
+        "out_sub": str(Path(output_dir) / Path(f["name"]).stem),
+        "voxel_size": voxel_size,
+        "n_plans": n_plans,
+        "n_elevations": n_elevations,
+    } for i, f in enumerate(files)]
+
+
+def iter_batch_process(input_dir: str, output_dir: str, voxel_size: float = 0.02,
+                       n_plans: int = 3, n_elevations: int = 4, workers: int = 1,
+                       retries: int = 1) -> Iterator[tuple[int, dict]]:
+    """
+    串流式批次處理：每完成一個檔案就 yield (檔案序號, 結果)，完成順序不保證。
+
+    Args:
+        workers: worker process 數；1 = 在本 process 依序處理，0 = CPU 核心數。
+                 每個 worker 處理完一個檔案即重啟，記憶體上限約為單一檔案（下採樣後）的用量
+        retries: 失敗檔案的重試次數；平行模式下每次重試都在獨立的 worker process 執行
+    """
+    tasks = _batch_tasks(input_dir, output_dir, voxel_size, n_plans, n_elevations)
+    yield from _run_batch(tasks, workers, retries)
+
+
+def _run_batch(tasks: list[dict], workers: int, retries: int) -> Iterator[tuple[int, dict]]:
+    if not tasks:
+        return
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        for task in tasks:
+            for attempt in range(1, retries + 2):
+                result = _process_file(task)
+                if "error" not in result:
+                    break
+            result["attempts"] = attempt
+            yield task["index"], result
+        return
+
+    logger.info(f"批次處理: {len(tasks)} 個檔案, {workers} workers")
+    failed = []
+    # max_tasks_per_child=1：每個檔案用新的 process，處理完即歸還記憶體（會改用 spawn 啟動）
+    pool = ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1)
+    try:
+        futures = {pool.submit(_process_file, t): t for t in tasks}
+        for fut in as_completed(futures):
+            task = futures[fut]
+            try:
+                result = fut.result()
+            except BrokenProcessPool as e:
+                # 任一 worker 崩潰會讓整個 pool 失效，未完成的檔案都改為個別重試
+                result = {"file": task["name"], "error": f"worker 異常結束: {e}"}
+            if "error" in result and retries > 0:
+                failed.append(task)
+                continue
+            result["attempts"] = 1
+            yield task["index"], result
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    for attempt in range(2, retries + 2):
+        if not failed:
+            break
+        logger.info(f"重試 {len(failed)} 個失敗檔案（第 {attempt} 次）")
+        with ThreadPoolExecutor(max_workers=min(workers, len(failed))) as retry_pool:
+            futures = {retry_pool.submit(_process_file_isolated, t): t for t in failed}
+            failed = []
+            for fut in as_completed(futures):
+                task = futures[fut]
+                result = fut.result()
+                if "error" in result and attempt <= retries:
+                    failed.append(task)
+                    continue
+                result["attempts"] = attempt
+                yield task["index"], result
+
+
 def batch_process(input_dir: str, output_dir: str, voxel_size: float = 0.02,
-                  n_plans: int = 3, n_elevations: int = 4) -> list[dict]:
+                  n_plans: int = 3, n_elevations: int = 4, workers: int = 1,
+                  retries: int = 1, progress: Optional[Callable] = None) -> list[dict]:
     """
     批次處理：掃描目錄內所有點雲檔案，自動生成平立面圖。
 
@@ -186,26 +320,18 @@ def batch_process(input_dir: str, output_dir: str, voxel_size: float = 0.02,
         voxel_size: 下採樣大小
         n_plans: 每個檔案生成幾張平面圖
         n_elevations: 每個檔案生成幾張立面圖
+        workers: 平行 worker process 數（1 = 依序處理，0 = CPU 核心數）；
+                 平行模式以 spawn 啟動 worker，呼叫端腳本需有 if __name__ == "__main__" 保護
+        retries: 失敗檔案重試次數
+        progress: 回呼 progress(done, total, result)，每完成一個檔案呼叫一次
+    Returns:
+        結果列表，依掃描（檔名）順序排列，與完成先後無關
     """
-    files = scan_directory(input_dir)
-    if not files:
-        logger.warning(f"目錄 {input_dir} 中沒有點雲檔案")
-        return []
-
-    all_results = []
-    for f in files:
-        logger.info(f"處理: {f['name']} ({f['size_mb']} MB)")
-        try:
-            out_sub = str(Path(output_dir) / Path(f["name"]).stem)
-            pipe = PointCloudPipeline(f["path"], voxel_size=voxel_size)
-            results = pipe.auto_generate(out_sub, n_plans=n_plans, n_elevations=n_elevations)
-            all_results.append({
-                "file": f["name"],
-                "info": pipe.info,
-                "outputs": results,
-            })
-        except Exception as e:
-            logger.error(f"處理失敗 {f['name']}: {e}")
-            all_results.append({"file": f["name"], "error": str(e)})
-
-    return all_results
+    tasks = _batch_tasks(input_dir, output_dir, voxel_size, n_plans, n_elevations)
+    results = {}
+    for index, result in _run_batch(tasks, workers, retries):
+        results[index] = result
+        if progress:
+            progress(len(results), len(tasks), result)
+
+    return [results[i] for i in sorted(results)]
@@ -8,9 +8,10 @@
   - 剖面圖（任意平面切面）
 """
 import logging
+import threading
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Optional
+from typing import Iterator, Optional
 
 import numpy as np
 
@@ -48,46 +49,123 @@ class SectionResult:
     unit: str = "m"
 
 
-def extract_section(pcd, params: SectionParams) -> SectionResult:
+# ── 切面空間索引 ─────────────────────────────────────────
+
+
+class SectionIndex:
+    """
+    切面空間索引：每個切割軸向（X / Y / Z / 剖面法向）只排序一次，
+    之後每個切面以二分搜尋取出切片厚度內的點，成本隨切片點數而非整個點雲。
+
+    每個軸向額外佔用約 12~16 bytes/點（排序索引 + 排序後座標），首次使用該軸向時才建立。
+    """
+
+    MAX_CROSS_AXES = 4  # 任意角度剖面最多保留幾個角度的索引
+
+    def __init__(self, points: np.ndarray):
+        self.points = points
+        self._axes = {}   # key → (order, sorted_values)
+        self._lock = threading.Lock()
+
+    def _values(self, key: tuple) -> np.ndarray:
+        kind, arg = key
+        if kind == "axis":
+            return self.points[:, arg]
+        angle_rad = np.radians(arg)
+        normal = np.array([np.cos(angle_rad), np.sin(angle_rad), 0.0])
+        return np.dot(self.points[:, :2], normal[:2])
+
+    def _axis(self, key: tuple):
+        with self._lock:
+            entry = self._axes.get(key)
+            if entry is not None:
+                return entry
+            values = self._values(key)
+            order = np.argsort(values, kind="stable")
+            if len(order) < 2 ** 31:
+                order = order.astype(np.int32)
+            entry = (order, values[order])
+            if key[0] == "cross":
+                crosses = [k for k in self._axes if k[0] == "cross"]
+                if len(crosses) >= self.MAX_CROSS_AXES:
+                    del self._axes[crosses[0]]
+            self._axes[key] = entry
+            return entry
+
+    def query(self, key: tuple, position: float, thickness: float) -> np.ndarray:
+        """
+        回傳 |value - position| <= thickness/2 的點索引（依原始點順序排列）
+        key: ("axis", 0|1|2) 或 ("cross", angle)
+        """
+        order, sorted_values = self._axis(key)
+        half = thickness / 2
+        # 搜尋範圍略為放寬，再以與全掃描相同的條件過濾，確保邊界點判定一致
+        pad = 1e-9 * max(1.0, abs(position) + half)
+        lo, hi = np.searchsorted(sorted_values, [position - half - pad, position + half + pad])
+        keep = np.abs(sorted_values[lo:hi] - position) <= half
+        return np.sort(order[lo:hi][keep])
+
+
+def get_section_index(pcd) -> SectionIndex:
+    """取得點雲的切面索引（建立一次後掛在 pcd 上重用；點陣列被替換時重建）"""
+    index = getattr(pcd, "_section_index", None)
+    if index is None or index.points is not pcd.points:
+        index = SectionIndex(pcd.points)
+        pcd._section_index = index
+    return index
+
+
+def _slice(points: np.ndarray, index: Optional[SectionIndex], key: tuple,
+           values, params: SectionParams) -> np.ndarray:
+    """取切片厚度內的點：有索引走二分搜尋，否則全量遮罩"""
+    if index is not None:
+        return points[index.query(key, params.position, params.thickness)]
+    mask = np.abs(values() - params.position) <= params.thickness / 2
+    return points[mask]
+
+
+def extract_section(pcd, params: SectionParams, index: Optional[SectionIndex] = None) -> SectionResult:
     """
     從點雲提取切面。
 
     Args:
         pcd: PointCloud (from loader)
         params: SectionParams 切面參數
+        index: 切面空間索引（見 get_section_index）；未指定時沿用 pcd 上已建立的索引，
+               都沒有則全量掃描
     Returns:
         SectionResult
     """
     points = pcd.points
+    if index is None:
+        index = getattr(pcd, "_section_index", None)
+        if index is not None and index.points is not points:
+            index = None
     logger.info(f"提取切面: type={params.section_type.value}, pos={params.position}, thickness={params.thickness}")
 
     # 根據切面類型提取點
     if params.section_type == SectionType.PLAN:
         # 平面圖：取 Z 在 [position - thickness/2, position + thickness/2] 的點
-        mask = np.abs(points[:, 2] - params.position) <= params.thickness / 2
-        slice_points = points[mask]
+        slice_points = _slice(points, index, ("axis", 2), lambda: points[:, 2], params)
         # 投影到 XY 平面
         points_2d = slice_points[:, :2]  # (X, Y)
 
     elif params.section_type == SectionType.ELEVATION_X:
         # X 方向立面：取 X 在範圍的點，投影到 YZ
-        mask = np.abs(points[:, 0] - params.position) <= params.thickness / 2
-        slice_points = points[mask]
+        slice_points = _slice(points, index, ("axis", 0), lambda: points[:, 0], params)
         points_2d = slice_points[:, 1:3]  # (Y, Z)
 
     elif params.section_type == SectionType.ELEVATION_Y:
         # Y 方向立面：取 Y 在範圍的點，投影到 XZ
-        mask = np.abs(points[:, 1] - params.position) <= params.thickness / 2
-        slice_points = points[mask]
+        slice_points = _slice(points, index, ("axis", 1), lambda: points[:, 1], params)
         points_2d = np.column_stack([slice_points[:, 0], slice_points[:, 2]])  # (X, Z)
 
     elif params.section_type == SectionType.CROSS:
         # 任意角度剖面
         angle_rad = np.radians(params.angle)
         normal = np.array([np.cos(angle_rad), np.sin(angle_rad), 0.0])
-        distances = np.dot(points[:, :2], normal[:2])
-        mask = np.abs(distances - params.position) <= params.thickness / 2
-        slice_points = points[mask]
+        slice_points = _slice(points, index, ("cross", float(params.angle)),
+                              lambda: np.dot(points[:, :2], normal[:2]), params)
         # 投影到剖面座標系
         tangent = np.array([-np.sin(angle_rad), np.cos(angle_rad)])
         proj_h = np.dot(slice_points[:, :2], tangent)
@@ -154,15 +232,24 @@ def auto_sections(pcd, n_plans: int = 3, n_elevations: int = 4, thickness: float
     Returns:
         SectionResult 列表
     """
+    results = list(iter_auto_sections(pcd, n_plans, n_elevations, thickness))
+    n_x = n_elevations // 2
+    logger.info(f"自動生成 {len(results)} 個切面 ({n_plans} 平面 + {n_x} X立面 + {n_elevations - n_x} Y立面)")
+    return results
+
+
+def iter_auto_sections(pcd, n_plans: int = 3, n_elevations: int = 4,
+                       thickness: float = 0.1) -> Iterator[SectionResult]:
+    """同 auto_sections，但每完成一個切面就 yield，呼叫端可邊切邊輸出"""
     points = pcd.points
-    results = []
+    index = get_section_index(pcd)  # 各軸向排序一次，所有切面共用
 
     # 使用直方圖找點密度最高的位置
     z_positions = _find_dense_positions(points[:, 2], n_plans)
     logger.info(f"平面圖高度 (Z): {[f'{z:.1f}' for z in z_positions]}")
     for z in z_positions:
         params = SectionParams(section_type=SectionType.PLAN, position=float(z), thickness=thickness)
-        results.append(extract_section(pcd, params))
+        yield extract_section(pcd, params, index)
 
     # 立面圖
     n_x = n_elevations // 2
@@ -172,16 +259,13 @@ def auto_sections(pcd, n_plans: int = 3, n_elevations: int = 4, thickness: float
     logger.info(f"X立面位置: {[f'{x:.1f}' for x in x_positions]}")
     for x in x_positions:
         params = SectionParams(section_type=SectionType.ELEVATION_X, position=float(x), thickness=thickness)
-        results.append(extract_section(pcd, params))
+        yield extract_section(pcd, params, index)
 
     y_positions = _find_dense_positions(points[:, 1], n_y)
     logger.info(f"Y立面位置: {[f'{y:.1f}' for y in y_positions]}")
     for y in y_positions:
         params = SectionParams(section_type=SectionType.ELEVATION_Y, position=float(y), thickness=thickness)
-        results.append(extract_section(pcd, params))
-
-    logger.info(f"自動生成 {len(results)} 個切面 ({n_plans} 平面 + {n_x} X立面 + {n_y} Y立面)")
-    return results
+        yield extract_section(pcd, params, index)
 
 
 def _find_dense_positions(values: np.ndarray, n: int, n_bins: int = 100) -> list[float]:
@@ -227,31 +311,22 @@ def _extract_contours(points: np.ndarray, tolerance: float) -> list[list[tuple]]
 
     try:
         from scipy.spatial import Delaunay
-        from collections import defaultdict
 
         # Delaunay 三角化
         tri = Delaunay(points)
 
         # 提取邊界邊（只屬於一個三角形的邊）
-        edge_count = defaultdict(int)
-        for simplex in tri.simplices:
-            for i in range(3):
-                edge = tuple(sorted([simplex[i], simplex[(i + 1) % 3]]))
-                edge_count[edge] += 1
+        edges, counts = _count_edges(tri.simplices, len(points))
 
         # Alpha shape：根據邊長過濾
         mean_dist = np.mean(np.linalg.norm(np.diff(np.sort(points, axis=0)[:100], axis=0), axis=1))
         alpha_threshold = mean_dist * 5
 
-        boundary_edges = []
-        for edge, count in edge_count.items():
-            p1, p2 = points[edge[0]], points[edge[1]]
-            edge_len = np.linalg.norm(p2 - p1)
-            if count == 1 or edge_len > alpha_threshold:
-                if edge_len <= alpha_threshold * 2:
-                    boundary_edges.append(edge)
+        lengths = _edge_lengths(points, edges, (alpha_threshold, alpha_threshold * 2))
+        keep = ((counts == 1) | (lengths > alpha_threshold)) & (lengths <= alpha_threshold * 2)
+        boundary_edges = edges[keep]
 
-        if not boundary_edges:
+        if len(boundary_edges) == 0:
             # fallback: convex hull
             from scipy.spatial import ConvexHull
             hull = ConvexHull(points)
@@ -260,15 +335,15 @@ def _extract_contours(points: np.ndarray, tolerance: float) -> list[list[tuple]]
             return [contour]
 
         # 串連邊界邊為輪廓線
-        contours = _chain_edges(boundary_edges, points)
+        chains = _chain_edges(boundary_edges)
 
         # 簡化輪廓
         simplified = []
-        for contour in contours:
-            if len(contour) >= 3:
-                simplified_contour = _douglas_peucker(contour, tolerance)
-                if len(simplified_contour) >= 3:
-                    simplified.append(simplified_contour)
+        for chain in chains:
+            coords = points[chain].astype(np.float64)
+            kept = _douglas_peucker(coords, tolerance)
+            if len(kept) >= 3:
+                simplified.append(list(map(tuple, coords[kept].tolist())))
 
         return simplified
 
@@ -284,17 +359,52 @@ def _extract_contours(points: np.ndarray, tolerance: float) -> list[list[tuple]]
             return []
 
 
-def _chain_edges(edges: list, points: np.ndarray) -> list[list[tuple]]:
-    """將離散的邊串連成連續的輪廓線"""
+# 向量化距離與逐點 np.dot / np.linalg.norm（BLAS，可能使用 FMA）的捨入可差 1 ulp；
+# 落在門檻或最大值附近此範圍內的值改用逐點公式重算，確保判斷與逐點版本逐位元一致
+_ULP_GUARD = 64 * np.finfo(np.float64).eps
+
+
+def _count_edges(simplices: np.ndarray, n_points: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    統計三角網每條邊被幾個三角形共用
+    回傳 (edges (E, 2) 依首次出現順序、端點由小到大, counts (E,))
+    """
+    edges = simplices[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2).astype(np.int64)
+    edges.sort(axis=1)
+    keys = edges[:, 0] * n_points + edges[:, 1]
+    _, first, counts = np.unique(keys, return_index=True, return_counts=True)
+    order = np.argsort(first, kind="stable")
+    return edges[first[order]], counts[order]
+
+
+def _edge_lengths(points: np.ndarray, edges: np.ndarray, thresholds: tuple) -> np.ndarray:
+    """各邊長度；接近門檻的邊以 np.linalg.norm 重算"""
+    d = points[edges[:, 1]] - points[edges[:, 0]]
+    lengths = np.sqrt(d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1])
+    guard = _ULP_GUARD * (float(np.abs(points).max()) + 1.0)
+    near = np.zeros(len(lengths), dtype=bool)
+    for t in thresholds:
+        near |= np.abs(lengths - t) <= guard
+    for i in np.flatnonzero(near):
+        lengths[i] = np.linalg.norm(d[i])
+    return lengths
+
+
+def _chain_edges(edges: np.ndarray) -> list[np.ndarray]:
+    """
+    將離散的邊串連成連續的輪廓線，回傳各輪廓的點索引（首尾相同 = 閉合）
+    分岔點的走向取決於鄰接集合的走訪順序，沿用原本的集合運算以保持輸出一致；
+    座標留給呼叫端一次以陣列取出
+    """
     from collections import defaultdict
 
     adj = defaultdict(set)
-    for a, b in edges:
+    for a, b in edges.tolist():
         adj[a].add(b)
         adj[b].add(a)
 
     visited = set()
-    contours = []
+    chains = []
 
     for start in adj:
         if start in visited:
@@ -306,7 +416,7 @@ def _chain_edges(edges: list, points: np.ndarray) -> list[list[tuple]]:
 
         while current is not None and current not in visited:
             visited.add(current)
-            chain.append((float(points[current, 0]), float(points[current, 1])))
+            chain.append(current)
 
             neighbors = adj[current] - {prev}
             unvisited = neighbors - visited
@@ -315,42 +425,73 @@ def _chain_edges(edges: list, points: np.ndarray) -> list[list[tuple]]:
 
         if len(chain) >= 3:
             chain.append(chain[0])  # 閉合
-            contours.append(chain)
+            chains.append(np.array(chain, dtype=np.int64))
 
-    return contours
+    return chains
 
 
-def _douglas_peucker(points: list[tuple], tolerance: float) -> list[tuple]:
-    """Douglas-Peucker 線段簡化演算法"""
-    if len(points) <= 2:
-        return points
+def _douglas_peucker(coords: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Douglas-Peucker 線段簡化演算法（堆疊迭代版，每段一次向量化計算所有點到線段距離）
+    Args:
+        coords: (N, 2) float64 座標
+    Returns:
+        保留點的索引（遞增）
+    """
+    n = len(coords)
+    if n <= 2:
+        return np.arange(n)
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    guard = _ULP_GUARD * (float(np.abs(coords).max()) + 1.0)
+    stack = [(0, n - 1)]
+
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
 
-    # 找最遠點
-    start = np.array(points[0])
-    end = np.array(points[-1])
-    line_vec = end - start
-    line_len = np.linalg.norm(line_vec)
-
-    if line_len == 0:
-        return [points[0], points[-1]]
-
-    line_unit = line_vec / line_len
-    max_dist = 0
-    max_idx = 0
-
-    for i in range(1, len(points) - 1):
-        p = np.array(points[i])
-        proj = np.dot(p - start, line_unit)
-        proj = np.clip(proj, 0, line_len)
-        closest = start + proj * line_unit
-        dist = np.linalg.norm(p - closest)
-        if dist > max_dist:
-            max_dist = dist
-            max_idx = i
-
-    if max_dist > tolerance:
-        left = _douglas_peucker(points[:max_idx + 1], tolerance)
-        right = _douglas_peucker(points[max_idx:], tolerance)
-        return left[:-1] + right
-    else:
-        return [points[0], points[-1]]
+        start = coords[i]
+        line_vec = coords[j] - start
+        line_len = np.linalg.norm(line_vec)
+        if line_len == 0:
+            continue
+        line_unit = line_vec / line_len
+
+        # 找最遠點
+        seg = coords[i + 1:j]
+        d = seg - start
+        proj = np.clip(d[:, 0] * line_unit[0] + d[:, 1] * line_unit[1], 0, line_len)
+        r = seg - (start + proj[:, None] * line_unit)
+        dist = np.sqrt(r[:, 0] * r[:, 0] + r[:, 1] * r[:, 1])
+
+        top = dist.max()
+        if top + guard <= tolerance:
+            continue
+        candidates = np.flatnonzero(dist >= top - guard)
+        if len(candidates) == 1 and top - guard > tolerance:
+            # 最遠點唯一且明確超過容差
+            max_idx = i + 1 + int(candidates[0])
+            keep[max_idx] = True
+            stack.append((max_idx, j))
+            stack.append((i, max_idx))
+            continue
+
+        # 最大值或容差附近的候選以逐點公式重算，取第一個最大者
+        max_dist = 0.0
+        max_idx = 0
+        for k in candidates:
+            p = seg[k]
+            pr = np.clip(np.dot(p - start, line_unit), 0, line_len)
+            dk = np.linalg.norm(p - (start + pr * line_unit))
+            if dk > max_dist:
+                max_dist = dk
+                max_idx = i + 1 + int(k)
+
+        if max_dist > tolerance and max_idx:
+            keep[max_idx] = True
+            stack.append((max_idx, j))
+            stack.append((i, max_idx))
+
+    return np.flatnonzero(keep)
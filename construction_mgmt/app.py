@@ -2,6 +2,7 @@
 營建自動化管理系統 — FastAPI 主程式
 本地運行 port 8020
 """
+import asyncio
 import os
 import sys
 import json
@@ -40,6 +41,7 @@ from database import (init_db, get_db, create_project, get_project, list_project
                      list_project_plans, get_project_plan_item, search_project_plans, import_project_plans,
                      UPLOAD_DIR, ensure_dirs)
 from file_parser import parse_uploaded_file, parse_contract_xls
+from bulk_import import import_contract_file, new_import_job, get_import_progress
 
 app = FastAPI(
     title="營建自動化管理系統",
@@ -336,9 +338,13 @@ async def api_add_custom_field(project_id: int, data: dict):
 @app.post("/api/projects/{project_id}/contract/upload")
 async def api_upload_contract_xls(
     project_id: int,
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    job_id: Optional[str] = Query(None)
 ):
-    """上傳契約詳細表 Excel (.xls/.xlsx) 並匯入"""
+    """
+    上傳契約詳細表 Excel (.xls/.xlsx) 並串流匯入
+    前端可自帶 job_id，匯入期間以 /api/import-jobs/{job_id} 輪詢進度
+    """
     existing = get_project(project_id)
     if not existing:
         raise HTTPException(status_code=404, detail="工程不存在")
@@ -359,18 +365,14 @@ async def api_upload_contract_xls(
         content = await file.read()
         f.write(content)
 
-    # 解析契約詳細表
-    result = parse_contract_xls(stored_path)
+    # 串流解析 + 批次匯入（在執行緒中執行，匯入期間仍可回應進度查詢）
+    job_id = new_import_job(project_id, job_id)
+    result = await asyncio.to_thread(import_contract_file, project_id, stored_path, job_id)
 
-    if result.get("error"):
+    if not result.get("success"):
         return {"success": False, "error": result["error"]}
 
-    items = result.get("items", [])
-    if not items:
-        return {"success": False, "error": "未解析到任何契約項目"}
-
-    # 匯入資料庫
-    count = import_contract_items(project_id, items)
+    count = result["imported_count"]
 
     # 記錄文件
     add_document(
@@ -384,12 +386,24 @@ async def api_upload_contract_xls(
 
     return {
         "success": True,
+        "job_id": job_id,
         "imported_count": count,
         "stats": result.get("stats", {}),
+        "errors": result.get("errors", []),
+        "duration": result.get("duration"),
         "message": f"已匯入 {count} 筆契約項目"
     }
 
 
+@app.get("/api/import-jobs/{job_id}")
+async def api_import_job_progress(job_id: str):
+    """查詢批次匯入進度"""
+    job = get_import_progress(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="匯入工作不存在")
+    return {"success": True, "data": job}
+
+
 @app.get("/api/projects/{project_id}/contract/items")
 async def api_get_contract_items(
     project_id: int,
@@ -552,11 +566,12 @@ async def api_import_regulation(data: dict):
     if not data.get('reg_code') or not data.get('reg_name') or not data.get('articles'):
         raise HTTPException(status_code=400, detail="缺少必要欄位: reg_code, reg_name, articles")
 
+    errors = []
     count = import_regulations(
         data['reg_code'], data['reg_name'], data['articles'],
-        data.get('source_file', ''), data.get('effective_date', '')
+        data.get('source_file', ''), data.get('effective_date', ''), errors=errors
     )
-    return {"success": True, "imported_count": count, "message": f"已匯入 {count} 條條文"}
+    return {"success": True, "imported_count": count, "errors": errors, "message": f"已匯入 {count} 條條文"}
 
 
 # ===== API: 自主檢查表 =====
@@ -833,8 +848,9 @@ async def api_get_special_term(project_id: int, term_id: int):
 
 @app.post("/api/projects/{project_id}/special-terms/import")
 async def api_import_special_terms(project_id: int, data: dict):
-    count = import_special_terms(project_id, data.get('articles', []))
-    return {"success": True, "imported": count, "message": f"已匯入 {count} 段特訂條款"}
+    errors = []
+    count = import_special_terms(project_id, data.get('articles', []), errors=errors)
+    return {"success": True, "imported": count, "errors": errors, "message": f"已匯入 {count} 段特訂條款"}
 
 
 # ===== API: 施工技術規範 =====
@@ -859,8 +875,9 @@ async def api_get_tech_spec(project_id: int, spec_id: int):
 
 @app.post("/api/projects/{project_id}/tech-specs/import")
 async def api_import_tech_specs(project_id: int, data: dict):
-    count = import_tech_specs(project_id, data.get('articles', []))
-    return {"success": True, "imported": count, "message": f"已匯入 {count} 段施工技術規範"}
+    errors = []
+    count = import_tech_specs(project_id, data.get('articles', []), errors=errors)
+    return {"success": True, "imported": count, "errors": errors, "message": f"已匯入 {count} 段施工技術規範"}
 
 
 # ===== API: 交通工程手冊 =====
@@ -885,8 +902,9 @@ async def api_get_traffic_manual(project_id: int, item_id: int):
 
 @app.post("/api/projects/{project_id}/traffic-manual/import")
 async def api_import_traffic_manual(project_id: int, data: dict):
-    count = import_traffic_manual(project_id, data.get('articles', []))
-    return {"success": True, "imported": count, "message": f"已匯入 {count} 段交通工程手冊"}
+    errors = []
+    count = import_traffic_manual(project_id, data.get('articles', []), errors=errors)
+    return {"success": True, "imported": count, "errors": errors, "message": f"已匯入 {count} 段交通工程手冊"}
 
 
 # ===== API: 工程計畫 =====
@@ -911,8 +929,9 @@ async def api_get_project_plan(project_id: int, item_id: int):
 
 @app.post("/api/projects/{project_id}/project-plans/import")
 async def api_import_project_plans(project_id: int, data: dict):
-    count = import_project_plans(project_id, data.get('articles', []))
-    return {"success": True, "imported": count, "message": f"已匯入 {count} 段工程計畫"}
+    errors = []
+    count = import_project_plans(project_id, data.get('articles', []), errors=errors)
+    return {"success": True, "imported": count, "errors": errors, "message": f"已匯入 {count} 段工程計畫"}
 
 
 # ===== API: 語音自動化 =====
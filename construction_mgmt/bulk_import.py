@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+營建自動化 — 大型檔案批次匯入
+Excel 逐列串流解析 → 整欄驗證 → executemany 單一交易寫入，並提供匯入進度查詢
+"""
+import itertools
+import logging
+import threading
+import time
+import uuid
+
+from database import import_contract_items
+from file_parser import ContractParseError, add_contract_stat, iter_contract_xls, new_contract_stats
+
+log = logging.getLogger(__name__)
+
+# 匯入進度：job_id → { project_id, status, done, total, started_at, ... }
+_jobs = {}
+_jobs_lock = threading.Lock()
+JOB_KEEP_SECONDS = 3600  # 完成的工作保留多久供查詢
+
+
+def _update_job(job_id: str, **fields):
+    with _jobs_lock:
+        _jobs.setdefault(job_id, {}).update(fields)
+
+
+def get_import_progress(job_id: str) -> dict:
+    """查詢匯入進度（供前端輪詢）"""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def _prune_jobs():
+    cutoff = time.time() - JOB_KEEP_SECONDS
+    with _jobs_lock:
+        for job_id in [k for k, v in _jobs.items()
+                       if v.get("finished_at") and v["finished_at"] < cutoff]:
+            del _jobs[job_id]
+
+
+def new_import_job(project_id: int, job_id: str = None) -> str:
+    """登記匯入工作（job_id 可由前端自帶，以便上傳同時輪詢進度）"""
+    _prune_jobs()
+    job_id = job_id or uuid.uuid4().hex[:12]
+    _update_job(job_id, project_id=project_id, status="pending", done=0, total=None,
+                started_at=time.time(), finished_at=None)
+    return job_id
+
+
+def import_contract_file(project_id: int, filepath: str, job_id: str = None, progress=None) -> dict:
+    """
+    串流匯入契約詳細表：解析器每產生一筆就交給 bulk_insert，不先組成完整 list
+    progress: 額外的回呼 progress(done, total)；job_id 有值時同步更新進度表
+    回傳: { success, imported_count, stats, errors, duration } 或 { success: False, error }
+    """
+    start = time.time()
+    stats = new_contract_stats()
+
+    def counted(items):
+        for item in items:
+            add_contract_stat(stats, item)
+            yield item
+
+    def on_progress(done, total):
+        if job_id:
+            _update_job(job_id, status="importing", done=done, total=total)
+        if progress:
+            progress(done, total)
+
+    def fail(message):
+        if job_id:
+            _update_job(job_id, status="failed", error=message, finished_at=time.time())
+        return {"success": False, "error": message}
+
+    errors = []
+    try:
+        items = iter_contract_xls(filepath)
+        # 先取第一筆：檔案無項目時不動到資料庫既有資料
+        first = next(items, None)
+        if first is None:
+            return fail("未解析到任何契約項目")
+        count = import_contract_items(project_id, counted(itertools.chain([first], items)),
+                                      progress=on_progress, errors=errors)
+    except ContractParseError as e:
+        return fail(str(e))
+    except Exception as e:
+        # 資料庫 / 檔案讀取 / 活頁簿格式錯誤：工作不能停在 importing
+        log.exception(f"契約匯入失敗: {filepath}")
+        return fail(f"匯入失敗: {e}")
+
+    if job_id:
+        _update_job(job_id, status="done", done=count, total=count, finished_at=time.time())
+    return {
+        "success": True,
+        "imported_count": count,
+        "stats": stats,
+        "errors": errors,
+        "duration": round(time.time() - start, 3),
+    }
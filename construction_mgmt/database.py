@@ -5,12 +5,18 @@ SQLite 本地優先儲存
 import sqlite3
 import os
 import json
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
 DB_DIR = os.path.join(os.path.dirname(__file__), "data")
 DB_PATH = os.path.join(DB_DIR, "projects.db")
 UPLOAD_DIR = os.path.join(DB_DIR, "uploads")
 
+# 每條連線的 prepared statement 快取數（常駐連線才能真正重用）
+STATEMENT_CACHE_SIZE = 256
+
 
 def ensure_dirs():
     """確保資料目錄存在"""
@@ -18,16 +24,100 @@ def ensure_dirs():
     os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
-def get_db():
-    """取得資料庫連線"""
+# ===== 連線池（每執行緒一條常駐連線） =====
+
+class PooledConnection(sqlite3.Connection):
+    """
+    執行緒常駐連線：close() 不真正關閉，只回滾未提交的變更（與原本關閉連線的語意相同），
+    連線與其 prepared statement 快取留給同執行緒下一次 get_db() 重用
+    """
+
+    def close(self):
+        if self.in_transaction and not getattr(_local, "tx_depth", 0):
+            self.rollback()
+
+    def commit(self):
+        # transaction() 區塊內的 commit 延後到區塊結束
+        if not getattr(_local, "tx_depth", 0):
+            sqlite3.Connection.commit(self)
+
+    def really_close(self):
+        sqlite3.Connection.close(self)
+
+
+_local = threading.local()
+_pool_lock = threading.Lock()
+_pool = []  # 所有已開啟的常駐連線（供 close_db_pool 關閉）
+_pool_generation = 0  # close_db_pool 後遞增，讓各執行緒丟棄已關閉的連線
+
+
+def _open_connection(path: str) -> PooledConnection:
     ensure_dirs()
-    conn = sqlite3.connect(DB_PATH, timeout=10)
+    conn = sqlite3.connect(path, timeout=10, factory=PooledConnection,
+                           cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("PRAGMA foreign_keys=ON")
+    with _pool_lock:
+        _pool.append(conn)
     return conn
 
 
+def get_db():
+    """取得資料庫連線（本執行緒的常駐連線，PRAGMA 只在建立時設定一次）"""
+    conns = getattr(_local, "conns", None)
+    if conns is None or _local.generation != _pool_generation:
+        conns = _local.conns = {}
+        _local.generation = _pool_generation
+    conn = conns.get(DB_PATH)
+    if conn is None:
+        conn = conns[DB_PATH] = _open_connection(DB_PATH)
+    elif conn.in_transaction and not getattr(_local, "tx_depth", 0):
+        # 上一個呼叫端例外中斷、未 close，丟棄殘留的未提交變更
+        conn.rollback()
+    return conn
+
+
+@contextmanager
+def transaction():
+    """
+    交易區塊：正常結束 commit，例外 rollback
+    區塊內呼叫的 CRUD 函式共用同一連線與交易（其 commit 會延後到區塊結束）
+
+        with transaction() as conn:
+            conn.execute("DELETE FROM ...")
+            conn.executemany("INSERT INTO ...", rows)
+    """
+    conn = get_db()
+    depth = getattr(_local, "tx_depth", 0)
+    _local.tx_depth = depth + 1
+    if depth == 0:
+        conn.execute("BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        _local.tx_depth = depth
+        if depth == 0:
+            conn.rollback()
+        raise
+    _local.tx_depth = depth
+    if depth == 0:
+        conn.commit()
+
+
+def close_db_pool():
+    """關閉所有常駐連線（程式結束或測試切換 DB_PATH 時呼叫）"""
+    global _pool_generation
+    with _pool_lock:
+        conns, _pool[:] = list(_pool), []
+        _pool_generation += 1
+    for conn in conns:
+        try:
+            conn.really_close()
+        except sqlite3.Error:
+            pass
+
+
 def init_db():
     """初始化資料庫表格"""
     conn = get_db()
@@ -723,11 +813,281 @@ def init_db():
         except Exception:
             pass  # 欄位已存在
 
+    # ===== 全文檢索索引（FTS5） =====
+    init_fts(conn)
+
     conn.commit()
     conn.close()
     print(f"[CMS] 資料庫初始化完成: {DB_PATH}")
 
 
+# ===== 全文檢索（FTS5 trigram） =====
+#
+# 以 external-content FTS5 虛擬表索引長文字欄位，由 trigger 與來源表保持同步。
+# trigram tokenizer 不需斷詞即可對中文做子字串比對；關鍵字少於 3 字時 trigram
+# 無法 MATCH，改走來源表 LIKE（片段仍在 SQL 端以 instr/substr 產生）。
+
+# FTS 表名: (來源表, 索引欄位)
+FTS_TABLES = {
+    "special_terms_fts": ("special_terms", ("content",)),
+    "tech_specs_fts": ("tech_specs", ("content",)),
+    "traffic_manual_fts": ("traffic_manual", ("content",)),
+    "project_plans_fts": ("project_plans", ("content",)),
+    "regulations_fts": ("regulations", ("article_title", "article_content")),
+    "scanned_documents_fts": ("scanned_documents", ("ocr_text",)),
+}
+
+FTS_MIN_TERM = 3       # trigram 最短可 MATCH 長度
+SNIPPET_CONTEXT = 60   # 片段前後字數
+SNIPPET_TOKENS = 64    # snippet() 最大 token 數（trigram 約等於字數）
+
+_fts_supported = None
+
+
+def fts_supported() -> bool:
+    """檢查 SQLite 是否支援 FTS5 trigram tokenizer（3.34+）"""
+    global _fts_supported
+    if _fts_supported is None:
+        try:
+            probe = sqlite3.connect(":memory:")
+            probe.execute("CREATE VIRTUAL TABLE t USING fts5(x, tokenize='trigram')")
+            probe.close()
+            _fts_supported = True
+        except sqlite3.OperationalError:
+            _fts_supported = False
+    return _fts_supported
+
+
+def _create_fts_triggers(cursor, fts: str, src: str, cols: tuple):
+    """建立來源表 → FTS 的同步 trigger（逐句 execute，可在交易中執行）"""
+    col_list = ", ".join(cols)
+    new_vals = ", ".join(f"new.{c}" for c in cols)
+    old_vals = ", ".join(f"old.{c}" for c in cols)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {src} BEGIN
+            INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {new_vals});
+        END""")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {src} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.id, {old_vals});
+        END""")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {src} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.id, {old_vals});
+            INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {new_vals});
+        END""")
+
+
+def _drop_fts_triggers(cursor, fts: str):
+    for suffix in ("ai", "ad", "au"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+
+
+def init_fts(conn):
+    """建立 FTS5 虛擬表與同步 trigger；新建立的索引會從既有資料回填"""
+    if not fts_supported():
+        print("[CMS] SQLite 不支援 FTS5 trigram，全文搜尋改用 LIKE")
+        return
+    cursor = conn.cursor()
+    for fts, (src, cols) in FTS_TABLES.items():
+        existed = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (fts,)).fetchone()
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                {", ".join(cols)}, content='{src}', content_rowid='id', tokenize='trigram'
+            )""")
+        _create_fts_triggers(cursor, fts, src, cols)
+        if not existed:
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def rebuild_fts_indexes() -> dict:
+    """重建所有全文索引（既有資料庫升級或索引損毀時使用），回傳各表筆數"""
+    conn = get_db()
+    init_fts(conn)
+    counts = {}
+    if fts_supported():
+        for fts, (src, _) in FTS_TABLES.items():
+            conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+            conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('optimize')")
+            counts[fts] = conn.execute(f"SELECT COUNT(*) FROM {src}").fetchone()[0]
+    conn.commit()
+    conn.close()
+    return counts
+
+
+def _fts_phrase(keyword: str) -> str:
+    """將關鍵字包成 FTS5 phrase（整串子字串比對，跳脫雙引號）"""
+    return '"' + keyword.replace('"', '""') + '"'
+
+
+def fts_search(fts: str, keyword: str, columns: str, where: str = "", params: tuple = (),
+               snippet_col: int = -1, fallback_order: str = "t.id") -> list:
+    """
+    全文搜尋共用查詢
+    fts: FTS_TABLES 中的表名；columns: 來源表（別名 t）要取的欄位
+    where/params: 額外條件（以 AND 接在搜尋條件後）
+    回傳 dict 列表，含 SQL 端產生的 snippet 欄位；FTS 路徑依 bm25 相關度排序，
+    短關鍵字 LIKE 路徑依 fallback_order 排序
+    """
+    src, cols = FTS_TABLES[fts]
+    snip_src = cols[snippet_col]
+    extra = f" AND {where}" if where else ""
+    conn = get_db()
+    cursor = conn.cursor()
+    if fts_supported() and len(keyword) >= FTS_MIN_TERM:
+        col_idx = snippet_col % len(cols)
+        cursor.execute(f"""
+            SELECT {columns},
+                   snippet({fts}, {col_idx}, '', '', '...', {SNIPPET_TOKENS}) AS snippet
+            FROM {fts} JOIN {src} t ON t.id = {fts}.rowid
+            WHERE {fts} MATCH ?{extra}
+            ORDER BY bm25({fts})
+        """, (_fts_phrase(keyword),) + tuple(params))
+    else:
+        like_cond = " OR ".join(f"t.{c} LIKE '%' || q.kw || '%'" for c in cols)
+        pos = f"instr(t.{snip_src}, q.kw)"
+        start = f"max(1, {pos} - {SNIPPET_CONTEXT})"
+        cursor.execute(f"""
+            SELECT {columns},
+                   CASE WHEN {pos} > {SNIPPET_CONTEXT + 1} THEN '...' ELSE '' END
+                   || substr(t.{snip_src}, {start}, length(q.kw) + {SNIPPET_CONTEXT * 2})
+                   || CASE WHEN {start} + length(q.kw) + {SNIPPET_CONTEXT * 2} <= length(t.{snip_src})
+                           THEN '...' ELSE '' END AS snippet
+            FROM {src} t, (SELECT ? AS kw) q
+            WHERE ({like_cond}){extra}
+            ORDER BY {fallback_order}
+        """, (keyword,) + tuple(params))
+    rows = [dict(r) for r in cursor.fetchall()]
+    conn.close()
+    return rows
+
+
+# ===== 批次匯入（串流 executemany + 單一交易） =====
+#
+# 匯入流程：逐塊（chunk）取列 → 整欄型別驗證 → executemany，全部在同一交易內完成。
+# 有全文索引的表在匯入期間暫停同步 trigger，匯入後以 INSERT ... SELECT 一次補建索引。
+
+BULK_CHUNK_SIZE = 2000
+BULK_MAX_ERRORS = 50  # 回報的驗證錯誤上限
+
+
+def _to_real(v):
+    if v is None or v == '':
+        return None
+    if isinstance(v, (int, float)):
+        return float(v)
+    return float(str(v).replace(',', '').strip())
+
+
+def _to_int(v):
+    if v is None or v == '':
+        return None
+    return int(_to_real(v))
+
+
+_COERCE = {"real": _to_real, "int": _to_int}
+_NUMERIC_TYPES = frozenset((int, float, bool, type(None)))
+
+
+def _validate_columns(columns: list, names: tuple, types: tuple, offset: int, errors: list) -> list:
+    """
+    整欄驗證：數值欄先以一次 set(map(type, ...)) 檢查整欄型別，全為數值/NULL 就原樣寫入；
+    含字串時才逐值轉換（"1,234" → 1234.0、"" → NULL），轉換失敗設為 NULL 並記錄錯誤。
+    旗標欄一律轉為 0/1（None / "" → 0）；文字欄交由 SQLite 欄位 affinity 處理。
+    columns: 依欄位轉置後的資料；offset: 本塊第一列在整批中的序號
+    """
+    out = []
+    for name, kind, values in zip(names, types, columns):
+        if kind == "flag":
+            out.append([1 if v else 0 for v in values])
+            continue
+        fn = _COERCE.get(kind)
+        if fn is None or set(map(type, values)) <= _NUMERIC_TYPES:
+            out.append(values)
+            continue
+        fixed = []
+        for i, v in enumerate(values):
+            try:
+                fixed.append(fn(v))
+            except (TypeError, ValueError):
+                fixed.append(None)
+                if len(errors) < BULK_MAX_ERRORS:
+                    errors.append({"row": offset + i, "field": name, "value": str(v)})
+        out.append(fixed)
+    return out
+
+
+def _chunked(rows, size: int):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _fts_for_table(table: str):
+    if not fts_supported():
+        return None
+    for fts, (src, cols) in FTS_TABLES.items():
+        if src == table:
+            return fts, cols
+    return None
+
+
+def bulk_insert(table: str, columns: tuple, rows, types: tuple = None,
+                replace_where: str = None, replace_params: tuple = (),
+                progress=None, total: int = None, chunk_size: int = BULK_CHUNK_SIZE) -> dict:
+    """
+    串流批次寫入
+    columns: 欄位名稱；rows: 可迭代的 tuple（可為 generator，不需先整批轉成 list）
+    types: 各欄型別 'real'/'int' 會驗證轉換；'flag' 轉為 0/1；'text'/None 交由 SQLite 處理
+    replace_where: 匯入前刪除符合條件的舊資料（如 "project_id = ?"）
+    progress: 回呼 progress(done, total)，每寫完一塊呼叫一次
+    回傳: { inserted, errors: [{row, field, value}], duration }
+    """
+    start = time.time()
+    types = types or (None,) * len(columns)
+    errors = []
+    done = 0
+    fts_info = _fts_for_table(table)
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+    with transaction() as conn:
+        cursor = conn.cursor()
+        if fts_info:
+            fts, fts_cols = fts_info
+            _drop_fts_triggers(cursor, fts)
+        if replace_where:
+            if fts_info:
+                col_list = ", ".join(fts_cols)
+                cursor.execute(
+                    f"INSERT INTO {fts}({fts}, rowid, {col_list}) "
+                    f"SELECT 'delete', id, {col_list} FROM {table} WHERE {replace_where}",
+                    replace_params)
+            cursor.execute(f"DELETE FROM {table} WHERE {replace_where}", replace_params)
+        max_id = cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+
+        for chunk in _chunked(rows, chunk_size):
+            cols = _validate_columns(list(zip(*chunk)), columns, types, done, errors)
+            cursor.executemany(sql, zip(*cols))
+            done += len(chunk)
+            if progress:
+                progress(done, total)
+
+        if fts_info:
+            col_list = ", ".join(fts_cols)
+            cursor.execute(
+                f"INSERT INTO {fts}(rowid, {col_list}) SELECT id, {col_list} FROM {table} WHERE id > ?",
+                (max_id,))
+            _create_fts_triggers(cursor, fts, table, fts_cols)
+
+    return {"inserted": done, "errors": errors, "duration": round(time.time() - start, 3)}
+
+
 # ===== CRUD 操作 =====
 
 def create_project(data: dict) -> int:
@@ -957,33 +1317,34 @@ def add_personnel(project_id: int, data: dict) -> int:
 
 # ===== 契約詳細表 CRUD =====
 
-def import_contract_items(project_id: int, items: list) -> int:
-    """匯入契約詳細表項目（全部替換）"""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM contract_items WHERE project_id = ?", (project_id,))
-
-    count = 0
-    for item in items:
-        cursor.execute(
-            """INSERT INTO contract_items 
-               (project_id, row_order, level, parent_code, item_code,
-                item_number, item_name, unit, quantity, unit_price, total_price,
-                remark_code, is_category, is_subtotal)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (project_id, item.get('row_order', count),
-             item.get('level', 0), item.get('parent_code', ''),
-             item.get('item_code', ''), item.get('item_number', ''),
-             item.get('item_name', ''), item.get('unit', ''),
-             item.get('quantity'), item.get('unit_price'),
-             item.get('total_price'), item.get('remark_code', ''),
-             item.get('is_category', 0), item.get('is_subtotal', 0))
-        )
-        count += 1
-
-    conn.commit()
-    conn.close()
-    return count
+CONTRACT_ITEM_TYPES = (None, "int", "int", "text", "text", "text", "text", "text",
+                       "real", "real", "real", "text", "flag", "flag")
+
+
+def import_contract_items(project_id: int, items, progress=None, errors: list = None) -> int:
+    """
+    匯入契約詳細表項目（全部替換；items 可為 list 或 generator，串流寫入）
+    errors: 若提供，附加數值欄位驗證錯誤 [{row, field, value}]
+    """
+    result = bulk_insert(
+        "contract_items",
+        ("project_id", "row_order", "level", "parent_code", "item_code",
+         "item_number", "item_name", "unit", "quantity", "unit_price", "total_price",
+         "remark_code", "is_category", "is_subtotal"),
+        ((project_id, item.get('row_order', i),
+          item.get('level', 0), item.get('parent_code', ''),
+          item.get('item_code', ''), item.get('item_number', ''),
+          item.get('item_name', ''), item.get('unit', ''),
+          item.get('quantity'), item.get('unit_price'),
+          item.get('total_price'), item.get('remark_code', ''),
+          item.get('is_category', 0), item.get('is_subtotal', 0))
+         for i, item in enumerate(items)),
+        types=CONTRACT_ITEM_TYPES,
+        replace_where="project_id = ?", replace_params=(project_id,),
+        progress=progress, total=len(items) if isinstance(items, list) else None)
+    if errors is not None:
+        errors.extend(result["errors"])
+    return result["inserted"]
 
 
 def get_contract_items(project_id: int, category: str = None) -> list:
@@ -1076,47 +1437,29 @@ def delete_contract_item(item_id: int) -> bool:
 
 
 def get_contract_summary(project_id: int) -> dict:
-    """取得契約詳細表摘要統計"""
+    """取得契約詳細表摘要統計（單一聚合查詢）"""
     conn = get_db()
     cursor = conn.cursor()
-
-    cursor.execute("SELECT COUNT(*) FROM contract_items WHERE project_id = ?", (project_id,))
-    total = cursor.fetchone()[0]
-
-    cursor.execute(
-        "SELECT COUNT(*) FROM contract_items WHERE project_id = ? AND is_category = 1",
-        (project_id,)
-    )
-    categories = cursor.fetchone()[0]
-
-    cursor.execute(
-        "SELECT COUNT(*) FROM contract_items WHERE project_id = ? AND is_category = 0 AND is_subtotal = 0 AND unit != ''",
-        (project_id,)
-    )
-    work_items = cursor.fetchone()[0]
-
-    # 各大類小計
-    cursor.execute(
-        "SELECT item_name, total_price FROM contract_items WHERE project_id = ? AND is_subtotal = 1 ORDER BY row_order",
-        (project_id,)
-    )
-    subtotals = [{'name': r[0], 'amount': r[1]} for r in cursor.fetchall()]
-
-    # 總價
-    cursor.execute(
-        "SELECT total_price FROM contract_items WHERE project_id = ? AND item_name LIKE '%總價%' ORDER BY row_order DESC LIMIT 1",
-        (project_id,)
-    )
+    cursor.execute("""
+        SELECT COUNT(*) AS total,
+               COALESCE(SUM(is_category = 1), 0) AS categories,
+               COALESCE(SUM(is_category = 0 AND is_subtotal = 0 AND unit != ''), 0) AS work_items,
+               (SELECT json_group_array(json_object('name', item_name, 'amount', total_price))
+                  FROM (SELECT item_name, total_price FROM contract_items
+                        WHERE project_id = :pid AND is_subtotal = 1 ORDER BY row_order)) AS subtotals,
+               (SELECT total_price FROM contract_items
+                 WHERE project_id = :pid AND item_name LIKE '%總價%'
+                 ORDER BY row_order DESC LIMIT 1) AS grand_total
+        FROM contract_items WHERE project_id = :pid
+    """, {"pid": project_id})
     row = cursor.fetchone()
-    grand_total = row[0] if row else None
-
     conn.close()
     return {
-        'total_rows': total,
-        'categories': categories,
-        'work_items': work_items,
-        'subtotals': subtotals,
-        'grand_total': grand_total
+        'total_rows': row['total'],
+        'categories': row['categories'],
+        'work_items': row['work_items'],
+        'subtotals': json.loads(row['subtotals']),
+        'grand_total': row['grand_total']
     }
 
 
@@ -1353,90 +1696,61 @@ def delete_daily_log(log_id: int) -> bool:
 
 
 def get_daily_log_stats(project_id: int) -> dict:
-    """取得施工日誌統計"""
+    """取得施工日誌統計（單一聚合查詢）"""
     conn = get_db()
     cursor = conn.cursor()
-
-    cursor.execute("SELECT COUNT(*) FROM construction_logs WHERE project_id = ?", (project_id,))
-    total = cursor.fetchone()[0]
-
-    cursor.execute(
-        "SELECT COUNT(*) FROM construction_logs WHERE project_id = ? AND day_status = 'working'",
-        (project_id,)
-    )
-    working = cursor.fetchone()[0]
-
-    cursor.execute(
-        "SELECT COUNT(*) FROM construction_logs WHERE project_id = ? AND day_status = 'rain_stop'",
-        (project_id,)
-    )
-    rain_stop = cursor.fetchone()[0]
-
-    cursor.execute(
-        "SELECT COUNT(*) FROM construction_logs WHERE project_id = ? AND day_status = 'holiday'",
-        (project_id,)
-    )
-    holiday = cursor.fetchone()[0]
-
-    cursor.execute(
-        "SELECT MIN(log_date), MAX(log_date) FROM construction_logs WHERE project_id = ?",
-        (project_id,)
-    )
+    cursor.execute("""
+        SELECT COUNT(*) AS total,
+               COALESCE(SUM(day_status = 'working'), 0) AS working,
+               COALESCE(SUM(day_status = 'rain_stop'), 0) AS rain_stop,
+               COALESCE(SUM(day_status = 'holiday'), 0) AS holiday,
+               MIN(log_date) AS first_date,
+               MAX(log_date) AS last_date,
+               -- 各月日誌數
+               (SELECT json_group_array(json_object('month', month, 'count', cnt))
+                  FROM (SELECT substr(log_date, 1, 7) AS month, COUNT(*) AS cnt
+                        FROM construction_logs WHERE project_id = :pid
+                        GROUP BY month ORDER BY month)) AS monthly,
+               -- 有日誌的日期列表（用於日曆標記）
+               (SELECT json_group_array(json_object('date', log_date, 'status', day_status))
+                  FROM (SELECT log_date, day_status FROM construction_logs
+                        WHERE project_id = :pid ORDER BY log_date)) AS dates
+        FROM construction_logs WHERE project_id = :pid
+    """, {"pid": project_id})
     row = cursor.fetchone()
-    first_date = row[0] if row else None
-    last_date = row[1] if row else None
-
-    # 各月日誌數
-    cursor.execute(
-        """SELECT substr(log_date, 1, 7) as month, COUNT(*) as cnt
-           FROM construction_logs WHERE project_id = ?
-           GROUP BY month ORDER BY month""",
-        (project_id,)
-    )
-    monthly = [{'month': r[0], 'count': r[1]} for r in cursor.fetchall()]
-
-    # 有日誌的日期列表（用於日曆標記）
-    cursor.execute(
-        "SELECT log_date, day_status FROM construction_logs WHERE project_id = ? ORDER BY log_date",
-        (project_id,)
-    )
-    dates = [{'date': r[0], 'status': r[1]} for r in cursor.fetchall()]
-
     conn.close()
     return {
-        'total_logs': total,
-        'working_days': working,
-        'rain_stop_days': rain_stop,
-        'holiday_days': holiday,
-        'first_date': first_date,
-        'last_date': last_date,
-        'monthly': monthly,
-        'dates': dates
+        'total_logs': row['total'],
+        'working_days': row['working'],
+        'rain_stop_days': row['rain_stop'],
+        'holiday_days': row['holiday'],
+        'first_date': row['first_date'],
+        'last_date': row['last_date'],
+        'monthly': json.loads(row['monthly']),
+        'dates': json.loads(row['dates'])
     }
 
 
 # ===== 參考法規 CRUD =====
 
-def import_regulations(reg_code: str, reg_name: str, articles: list, source_file: str = '', effective_date: str = '') -> int:
-    """匯入法規條文（全部替換同一 reg_code）"""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM regulations WHERE reg_code = ?", (reg_code,))
-
-    count = 0
-    for art in articles:
-        cursor.execute(
-            """INSERT INTO regulations
-               (reg_code, reg_name, article_number, article_title, article_content, source_file, effective_date, category)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-            (reg_code, reg_name, art.get('number'), art.get('title', ''),
-             art.get('content', ''), source_file, effective_date, art.get('category', 'quality'))
-        )
-        count += 1
-
-    conn.commit()
-    conn.close()
-    return count
+def import_regulations(reg_code: str, reg_name: str, articles: list, source_file: str = '', effective_date: str = '', progress=None, errors: list = None) -> int:
+    """
+    匯入法規條文（全部替換同一 reg_code）
+    errors: 若提供，附加欄位驗證錯誤 [{row, field, value}]
+    """
+    result = bulk_insert(
+        "regulations",
+        ("reg_code", "reg_name", "article_number", "article_title", "article_content",
+         "source_file", "effective_date", "category"),
+        ((reg_code, reg_name, art.get('number'), art.get('title', ''),
+          art.get('content', ''), source_file, effective_date, art.get('category', 'quality'))
+         for art in articles),
+        types=(None, None, "text", "text", "text", None, None, "text"),
+        replace_where="reg_code = ?", replace_params=(reg_code,),
+        progress=progress, total=len(articles))
+    if errors is not None:
+        errors.extend(result["errors"])
+    return result["inserted"]
 
 
 def list_regulations(category: str = None) -> list:
@@ -1459,18 +1773,15 @@ def list_regulations(category: str = None) -> list:
 
 def get_regulation_articles(reg_code: str, keyword: str = None) -> list:
     """取得法規條文（可搜尋）"""
+    if keyword:
+        return fts_search("regulations_fts", keyword, "t.*", "t.reg_code = ?", (reg_code,),
+                          fallback_order="t.article_number")
     conn = get_db()
     cursor = conn.cursor()
-    if keyword:
-        cursor.execute(
-            "SELECT * FROM regulations WHERE reg_code = ? AND (article_content LIKE ? OR article_title LIKE ?) ORDER BY article_number",
-            (reg_code, f'%{keyword}%', f'%{keyword}%')
-        )
-    else:
-        cursor.execute(
-            "SELECT * FROM regulations WHERE reg_code = ? ORDER BY article_number",
-            (reg_code,)
-        )
+    cursor.execute(
+        "SELECT * FROM regulations WHERE reg_code = ? ORDER BY article_number",
+        (reg_code,)
+    )
     articles = [dict(r) for r in cursor.fetchall()]
     conn.close()
     return articles
@@ -1722,26 +2033,24 @@ def delete_photo_record(record_id: int) -> bool:
 
 # ===== 進度管理 CRUD =====
 
-def import_schedule_tasks(project_id: int, tasks: list) -> int:
+def import_schedule_tasks(project_id: int, tasks: list, progress=None) -> int:
     """批次匯入施工網圖任務"""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM schedule_tasks WHERE project_id=?", (project_id,))
-    count = 0
-    for i, t in enumerate(tasks):
-        cursor.execute("""
-            INSERT INTO schedule_tasks (project_id, task_id, wbs, task_name, duration_days,
-                early_start, late_start, early_finish, late_finish, predecessors, successors, progress_pct, is_critical, sort_order)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (project_id, t.get('task_id'), t.get('wbs', ''), t.get('task_name', ''),
-              t.get('duration_days'), t.get('early_start', ''), t.get('late_start', ''),
-              t.get('early_finish', ''), t.get('late_finish', ''),
-              t.get('predecessors', ''), t.get('successors', ''),
-              t.get('progress_pct', 0), 1 if t.get('is_critical') else 0, i))
-        count += 1
-    conn.commit()
-    conn.close()
-    return count
+    result = bulk_insert(
+        "schedule_tasks",
+        ("project_id", "task_id", "wbs", "task_name", "duration_days",
+         "early_start", "late_start", "early_finish", "late_finish",
+         "predecessors", "successors", "progress_pct", "is_critical", "sort_order"),
+        ((project_id, t.get('task_id'), t.get('wbs', ''), t.get('task_name', ''),
+          t.get('duration_days'), t.get('early_start', ''), t.get('late_start', ''),
+          t.get('early_finish', ''), t.get('late_finish', ''),
+          t.get('predecessors', ''), t.get('successors', ''),
+          t.get('progress_pct', 0), 1 if t.get('is_critical') else 0, i)
+         for i, t in enumerate(tasks)),
+        types=(None, None, "text", "text", "real", "text", "text", "text", "text",
+               "text", "text", "real", "flag", None),
+        replace_where="project_id = ?", replace_params=(project_id,),
+        progress=progress, total=len(tasks))
+    return result["inserted"]
 
 
 def list_schedule_tasks(project_id: int) -> list:
@@ -1754,40 +2063,34 @@ def list_schedule_tasks(project_id: int) -> list:
     return rows
 
 
-def import_scurve_data(project_id: int, items: list, monthly: list) -> dict:
-    """批次匯入 S-Curve 資料"""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM scurve_items WHERE project_id=?", (project_id,))
-    cursor.execute("DELETE FROM scurve_monthly WHERE project_id=?", (project_id,))
-
-    item_count = 0
-    for i, it in enumerate(items):
-        cursor.execute("""
-            INSERT INTO scurve_items (project_id, item_code, item_name, amount, weight_pct, sort_order)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (project_id, it.get('item_code', ''), it.get('item_name', ''),
-              it.get('amount', 0), it.get('weight_pct', 0), i))
-        item_count += 1
-
-    month_count = 0
-    for m in monthly:
-        cursor.execute("""
-            INSERT INTO scurve_monthly (project_id, year_month, work_days, cumulative_days, cumulative_days_pct,
-                planned_progress, planned_cumulative, actual_progress, actual_cumulative,
-                planned_amount, planned_cumulative_amount, actual_amount, actual_cumulative_amount)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (project_id, m.get('year_month', ''), m.get('work_days', 0),
+def import_scurve_data(project_id: int, items: list, monthly: list, progress=None) -> dict:
+    """批次匯入 S-Curve 資料（項目與月進度同一交易）"""
+    with transaction():
+        item_result = bulk_insert(
+            "scurve_items",
+            ("project_id", "item_code", "item_name", "amount", "weight_pct", "sort_order"),
+            ((project_id, it.get('item_code', ''), it.get('item_name', ''),
+              it.get('amount', 0), it.get('weight_pct', 0), i)
+             for i, it in enumerate(items)),
+            types=(None, "text", "text", "real", "real", None),
+            replace_where="project_id = ?", replace_params=(project_id,),
+            progress=progress, total=len(items))
+        month_result = bulk_insert(
+            "scurve_monthly",
+            ("project_id", "year_month", "work_days", "cumulative_days", "cumulative_days_pct",
+             "planned_progress", "planned_cumulative", "actual_progress", "actual_cumulative",
+             "planned_amount", "planned_cumulative_amount", "actual_amount", "actual_cumulative_amount"),
+            ((project_id, m.get('year_month', ''), m.get('work_days', 0),
               m.get('cumulative_days', 0), m.get('cumulative_days_pct', 0),
               m.get('planned_progress', 0), m.get('planned_cumulative', 0),
               m.get('actual_progress', 0), m.get('actual_cumulative', 0),
               m.get('planned_amount', 0), m.get('planned_cumulative_amount', 0),
-              m.get('actual_amount', 0), m.get('actual_cumulative_amount', 0)))
-        month_count += 1
-
-    conn.commit()
-    conn.close()
-    return {"items": item_count, "monthly": month_count}
+              m.get('actual_amount', 0), m.get('actual_cumulative_amount', 0))
+             for m in monthly),
+            types=(None, "text") + ("real",) * 11,
+            replace_where="project_id = ?", replace_params=(project_id,),
+            progress=progress, total=len(monthly))
+    return {"items": item_result["inserted"], "monthly": month_result["inserted"]}
 
 
 def get_scurve_data(project_id: int) -> dict:
@@ -1856,18 +2159,18 @@ def delete_submittal_control(item_id: int) -> bool:
     conn.commit(); conn.close()
     return True
 
-def import_submittal_control(project_id: int, items: list) -> int:
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM submittal_control WHERE project_id=?", (project_id,))
-    for i, d in enumerate(items):
-        cursor.execute("""INSERT INTO submittal_control (project_id, seq, plan_name, submit_date, review_date, approval_date, status, reviewer, notes, sort_order)
-            VALUES (?,?,?,?,?,?,?,?,?,?)""",
-            (project_id, d.get('seq'), d.get('plan_name',''), d.get('submit_date',''),
-             d.get('review_date',''), d.get('approval_date',''), d.get('status','pending'),
-             d.get('reviewer',''), d.get('notes',''), i))
-    conn.commit(); conn.close()
-    return len(items)
+def import_submittal_control(project_id: int, items: list, progress=None) -> int:
+    result = bulk_insert(
+        "submittal_control",
+        ("project_id", "seq", "plan_name", "submit_date", "review_date", "approval_date",
+         "status", "reviewer", "notes", "sort_order"),
+        ((project_id, d.get('seq'), d.get('plan_name',''), d.get('submit_date',''),
+          d.get('review_date',''), d.get('approval_date',''), d.get('status','pending'),
+          d.get('reviewer',''), d.get('notes',''), i)
+         for i, d in enumerate(items)),
+        replace_where="project_id = ?", replace_params=(project_id,),
+        progress=progress, total=len(items))
+    return result["inserted"]
 
 
 # ===== 檢試驗管制 CRUD =====
@@ -1912,20 +2215,21 @@ def delete_test_control(item_id: int) -> bool:
     conn.commit(); conn.close()
     return True
 
-def import_test_control(project_id: int, items: list) -> int:
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM test_control WHERE project_id=?", (project_id,))
-    for i, d in enumerate(items):
-        cursor.execute("""INSERT INTO test_control (project_id, seq, material_name, spec_item, planned_date, actual_date, quantity, sample_date, sample_qty, sample_freq, cumulative_qty, cumulative_sample, test_result, inspector, file_ref, notes, sort_order)
-            VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)""",
-            (project_id, d.get('seq'), d.get('material_name',''), d.get('spec_item',''),
-             d.get('planned_date',''), d.get('actual_date',''), d.get('quantity',''),
-             d.get('sample_date',''), d.get('sample_qty',''), d.get('sample_freq',''),
-             d.get('cumulative_qty',''), d.get('cumulative_sample',''), d.get('test_result',''),
-             d.get('inspector',''), d.get('file_ref',''), d.get('notes',''), i))
-    conn.commit(); conn.close()
-    return len(items)
+def import_test_control(project_id: int, items: list, progress=None) -> int:
+    result = bulk_insert(
+        "test_control",
+        ("project_id", "seq", "material_name", "spec_item", "planned_date", "actual_date",
+         "quantity", "sample_date", "sample_qty", "sample_freq", "cumulative_qty",
+         "cumulative_sample", "test_result", "inspector", "file_ref", "notes", "sort_order"),
+        ((project_id, d.get('seq'), d.get('material_name',''), d.get('spec_item',''),
+          d.get('planned_date',''), d.get('actual_date',''), d.get('quantity',''),
+          d.get('sample_date',''), d.get('sample_qty',''), d.get('sample_freq',''),
+          d.get('cumulative_qty',''), d.get('cumulative_sample',''), d.get('test_result',''),
+          d.get('inspector',''), d.get('file_ref',''), d.get('notes',''), i)
+         for i, d in enumerate(items)),
+        replace_where="project_id = ?", replace_params=(project_id,),
+        progress=progress, total=len(items))
+    return result["inserted"]
 
 
 # ===== 零用金 CRUD =====
@@ -2028,38 +2332,58 @@ def delete_payment_estimate(estimate_id: int) -> bool:
     conn.commit(); conn.close()
     return True
 
-def import_payment_estimates(project_id: int, estimates: list) -> int:
-    conn = get_db()
-    cursor = conn.cursor()
-    # Delete existing items first
-    cursor.execute("SELECT id FROM payment_estimates WHERE project_id=?", (project_id,))
-    for row in cursor.fetchall():
-        cursor.execute("DELETE FROM estimate_items WHERE estimate_id=?", (row[0],))
-    cursor.execute("DELETE FROM payment_estimates WHERE project_id=?", (project_id,))
-    count = 0
-    for est in estimates:
-        cursor.execute("""INSERT INTO payment_estimates (project_id, period_no, period_start, period_end,
-            contract_amount, changed_amount, current_estimate, cumulative_estimate, prev_cumulative,
-            this_period, retention, price_adjustment, deduction, prepayment_deduct, payable, completion_pct, notes)
-            VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)""",
-            (project_id, est.get('period_no'), est.get('period_start',''), est.get('period_end',''),
-             est.get('contract_amount',0), est.get('changed_amount',0), est.get('current_estimate',0),
-             est.get('cumulative_estimate',0), est.get('prev_cumulative',0), est.get('this_period',0),
-             est.get('retention',0), est.get('price_adjustment',0), est.get('deduction',0),
-             est.get('prepayment_deduct',0), est.get('payable',0), est.get('completion_pct',0),
-             est.get('notes','')))
-        eid = cursor.lastrowid
-        for i, it in enumerate(est.get('items', [])):
-            cursor.execute("""INSERT INTO estimate_items (estimate_id, item_code, item_name, contract_amount, changed_amount, cumulative_amount, prev_cumulative, this_period, sort_order)
-                VALUES (?,?,?,?,?,?,?,?,?)""",
-                (eid, it.get('item_code',''), it.get('item_name',''), it.get('contract_amount',0),
-                 it.get('changed_amount',0), it.get('cumulative_amount',0), it.get('prev_cumulative',0),
-                 it.get('this_period',0), i))
-        count += 1
-    conn.commit(); conn.close()
+def import_payment_estimates(project_id: int, estimates: list, progress=None) -> int:
+    with transaction() as conn:
+        cursor = conn.cursor()
+        # Delete existing items first
+        cursor.execute("DELETE FROM estimate_items WHERE estimate_id IN "
+                       "(SELECT id FROM payment_estimates WHERE project_id=?)", (project_id,))
+        cursor.execute("DELETE FROM payment_estimates WHERE project_id=?", (project_id,))
+        count = 0
+        for est in estimates:
+            cursor.execute("""INSERT INTO payment_estimates (project_id, period_no, period_start, period_end,
+                contract_amount, changed_amount, current_estimate, cumulative_estimate, prev_cumulative,
+                this_period, retention, price_adjustment, deduction, prepayment_deduct, payable, completion_pct, notes)
+                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)""",
+                (project_id, est.get('period_no'), est.get('period_start',''), est.get('period_end',''),
+                 est.get('contract_amount',0), est.get('changed_amount',0), est.get('current_estimate',0),
+                 est.get('cumulative_estimate',0), est.get('prev_cumulative',0), est.get('this_period',0),
+                 est.get('retention',0), est.get('price_adjustment',0), est.get('deduction',0),
+                 est.get('prepayment_deduct',0), est.get('payable',0), est.get('completion_pct',0),
+                 est.get('notes','')))
+            eid = cursor.lastrowid
+            bulk_insert(
+                "estimate_items",
+                ("estimate_id", "item_code", "item_name", "contract_amount", "changed_amount",
+                 "cumulative_amount", "prev_cumulative", "this_period", "sort_order"),
+                ((eid, it.get('item_code',''), it.get('item_name',''), it.get('contract_amount',0),
+                  it.get('changed_amount',0), it.get('cumulative_amount',0), it.get('prev_cumulative',0),
+                  it.get('this_period',0), i)
+                 for i, it in enumerate(est.get('items', []))),
+                types=(None, "text", "text", "real", "real", "real", "real", "real", None))
+            count += 1
+            if progress:
+                progress(count, len(estimates))
     return count
 
 
+# ===== 條文類文件（特訂條款 / 技術規範 / 交通手冊 / 工程計畫）共用匯入 =====
+
+def _import_articles(table: str, project_id: int, articles: list, progress=None, errors: list = None) -> int:
+    result = bulk_insert(
+        table,
+        ("project_id", "seq", "title", "content", "page_start", "page_end", "sort_order"),
+        ((project_id, a.get('seq', i+1), a.get('title',''), a.get('content',''),
+          a.get('page_start'), a.get('page_end'), i)
+         for i, a in enumerate(articles)),
+        types=(None, "text", "text", "text", "int", "int", None),
+        replace_where="project_id = ?", replace_params=(project_id,),
+        progress=progress, total=len(articles))
+    if errors is not None:
+        errors.extend(result["errors"])
+    return result["inserted"]
+
+
 # ===== 特訂條款 CRUD =====
 
 def list_special_terms(project_id: int) -> list:
@@ -2079,34 +2403,12 @@ def get_special_term(term_id: int) -> dict:
     return dict(row) if row else None
 
 def search_special_terms(project_id: int, keyword: str) -> list:
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, seq, title, page_start, page_end, content FROM special_terms WHERE project_id=? AND content LIKE ? ORDER BY sort_order",
-        (project_id, f'%{keyword}%'))
-    results = []
-    for r in cursor.fetchall():
-        d = dict(r)
-        # Extract snippet around keyword
-        idx = d['content'].find(keyword)
-        start = max(0, idx - 60)
-        end = min(len(d['content']), idx + len(keyword) + 60)
-        d['snippet'] = ('...' if start > 0 else '') + d['content'][start:end] + ('...' if end < len(d['content']) else '')
-        del d['content']
-        results.append(d)
-    conn.close()
-    return results
+    return fts_search("special_terms_fts", keyword,
+                      "t.id, t.seq, t.title, t.page_start, t.page_end",
+                      "t.project_id = ?", (project_id,), fallback_order="t.sort_order")
 
-def import_special_terms(project_id: int, articles: list) -> int:
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM special_terms WHERE project_id=?", (project_id,))
-    for i, a in enumerate(articles):
-        cursor.execute("""INSERT INTO special_terms (project_id, seq, title, content, page_start, page_end, sort_order)
-            VALUES (?,?,?,?,?,?,?)""",
-            (project_id, a.get('seq', i+1), a.get('title',''), a.get('content',''),
-             a.get('page_start'), a.get('page_end'), i))
-    conn.commit(); conn.close()
-    return len(articles)
+def import_special_terms(project_id: int, articles: list, progress=None, errors: list = None) -> int:
+    return _import_articles("special_terms", project_id, articles, progress, errors)
 
 
 # ===== 施工技術規範 CRUD =====
@@ -2128,33 +2430,12 @@ def get_tech_spec(spec_id: int) -> dict:
     return dict(row) if row else None
 
 def search_tech_specs(project_id: int, keyword: str) -> list:
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, seq, title, page_start, page_end, content FROM tech_specs WHERE project_id=? AND content LIKE ? ORDER BY sort_order",
-        (project_id, f'%{keyword}%'))
-    results = []
-    for r in cursor.fetchall():
-        d = dict(r)
-        idx = d['content'].find(keyword)
-        start = max(0, idx - 60)
-        end = min(len(d['content']), idx + len(keyword) + 60)
-        d['snippet'] = ('...' if start > 0 else '') + d['content'][start:end] + ('...' if end < len(d['content']) else '')
-        del d['content']
-        results.append(d)
-    conn.close()
-    return results
+    return fts_search("tech_specs_fts", keyword,
+                      "t.id, t.seq, t.title, t.page_start, t.page_end",
+                      "t.project_id = ?", (project_id,), fallback_order="t.sort_order")
 
-def import_tech_specs(project_id: int, articles: list) -> int:
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM tech_specs WHERE project_id=?", (project_id,))
-    for i, a in enumerate(articles):
-        cursor.execute("""INSERT INTO tech_specs (project_id, seq, title, content, page_start, page_end, sort_order)
-            VALUES (?,?,?,?,?,?,?)""",
-            (project_id, a.get('seq', i+1), a.get('title',''), a.get('content',''),
-             a.get('page_start'), a.get('page_end'), i))
-    conn.commit(); conn.close()
-    return len(articles)
+def import_tech_specs(project_id: int, articles: list, progress=None, errors: list = None) -> int:
+    return _import_articles("tech_specs", project_id, articles, progress, errors)
 
 
 # ===== 交通工程手冊 CRUD =====
@@ -2176,33 +2457,12 @@ def get_traffic_manual_item(item_id: int) -> dict:
     return dict(row) if row else None
 
 def search_traffic_manual(project_id: int, keyword: str) -> list:
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, seq, title, page_start, page_end, content FROM traffic_manual WHERE project_id=? AND content LIKE ? ORDER BY sort_order",
-        (project_id, f'%{keyword}%'))
-    results = []
-    for r in cursor.fetchall():
-        d = dict(r)
-        idx = d['content'].find(keyword)
-        start = max(0, idx - 60)
-        end = min(len(d['content']), idx + len(keyword) + 60)
-        d['snippet'] = ('...' if start > 0 else '') + d['content'][start:end] + ('...' if end < len(d['content']) else '')
-        del d['content']
-        results.append(d)
-    conn.close()
-    return results
+    return fts_search("traffic_manual_fts", keyword,
+                      "t.id, t.seq, t.title, t.page_start, t.page_end",
+                      "t.project_id = ?", (project_id,), fallback_order="t.sort_order")
 
-def import_traffic_manual(project_id: int, articles: list) -> int:
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM traffic_manual WHERE project_id=?", (project_id,))
-    for i, a in enumerate(articles):
-        cursor.execute("""INSERT INTO traffic_manual (project_id, seq, title, content, page_start, page_end, sort_order)
-            VALUES (?,?,?,?,?,?,?)""",
-            (project_id, a.get('seq', i+1), a.get('title',''), a.get('content',''),
-             a.get('page_start'), a.get('page_end'), i))
-    conn.commit(); conn.close()
-    return len(articles)
+def import_traffic_manual(project_id: int, articles: list, progress=None, errors: list = None) -> int:
+    return _import_articles("traffic_manual", project_id, articles, progress, errors)
 
 
 # ===== 工程計畫 CRUD =====
@@ -2224,58 +2484,39 @@ def get_project_plan_item(item_id: int) -> dict:
     return dict(row) if row else None
 
 def search_project_plans(project_id: int, keyword: str) -> list:
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, seq, title, page_start, page_end, content FROM project_plans WHERE project_id=? AND content LIKE ? ORDER BY sort_order",
-        (project_id, f'%{keyword}%'))
-    results = []
-    for r in cursor.fetchall():
-        d = dict(r)
-        idx = d['content'].find(keyword)
-        start = max(0, idx - 60)
-        end = min(len(d['content']), idx + len(keyword) + 60)
-        d['snippet'] = ('...' if start > 0 else '') + d['content'][start:end] + ('...' if end < len(d['content']) else '')
-        del d['content']
-        results.append(d)
-    conn.close()
-    return results
+    return fts_search("project_plans_fts", keyword,
+                      "t.id, t.seq, t.title, t.page_start, t.page_end",
+                      "t.project_id = ?", (project_id,), fallback_order="t.sort_order")
 
-def import_project_plans(project_id: int, articles: list) -> int:
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM project_plans WHERE project_id=?", (project_id,))
-    for i, a in enumerate(articles):
-        cursor.execute("""INSERT INTO project_plans (project_id, seq, title, content, page_start, page_end, sort_order)
-            VALUES (?,?,?,?,?,?,?)""",
-            (project_id, a.get('seq', i+1), a.get('title',''), a.get('content',''),
-             a.get('page_start'), a.get('page_end'), i))
-    conn.commit(); conn.close()
-    return len(articles)
+def import_project_plans(project_id: int, articles: list, progress=None, errors: list = None) -> int:
+    return _import_articles("project_plans", project_id, articles, progress, errors)
 
 
 def get_stats() -> dict:
-    """取得系統統計"""
+    """取得系統統計（單一聚合查詢）"""
     conn = get_db()
     cursor = conn.cursor()
-
-    cursor.execute("SELECT COUNT(*) FROM projects")
-    total = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(*) FROM projects WHERE status = 'active'")
-    active = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(*) FROM project_documents")
-    docs = cursor.fetchone()[0]
-
+    cursor.execute("""
+        SELECT COUNT(*) AS total,
+               COALESCE(SUM(status = 'active'), 0) AS active,
+               (SELECT COUNT(*) FROM project_documents) AS docs
+        FROM projects
+    """)
+    row = cursor.fetchone()
     conn.close()
     return {
-        "total_projects": total,
-        "active_projects": active,
-        "total_documents": docs
+        "total_projects": row['total'],
+        "active_projects": row['active'],
+        "total_documents": row['docs']
     }
 
 
 # 初始化
 if __name__ == "__main__":
+    import sys
     init_db()
+    if "--rebuild-fts" in sys.argv:
+        for name, n in rebuild_fts_indexes().items():
+            print(f"  {name}: {n} 筆")
+        print("全文索引重建完成")
     print("資料庫初始化完成")
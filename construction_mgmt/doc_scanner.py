@@ -47,13 +47,13 @@ DOC_CATEGORIES = {
 _ocr_reader = None
 
 
-def get_ocr_reader():
-    """延遲載入 EasyOCR（避免啟動時佔用 GPU）"""
+def get_ocr_reader(gpu: bool = True):
+    """延遲載入 EasyOCR（避免啟動時佔用 GPU）；每個 process 一份，gpu 僅在首次載入時生效"""
     global _ocr_reader
     if _ocr_reader is None:
         import easyocr
-        log.info("載入 EasyOCR（繁中+英文）...")
-        _ocr_reader = easyocr.Reader(['ch_tra', 'en'], gpu=True)
+        log.info(f"[pid {os.getpid()}] 載入 EasyOCR（繁中+英文, gpu={gpu}）...")
+        _ocr_reader = easyocr.Reader(['ch_tra', 'en'], gpu=gpu)
         log.info("EasyOCR 載入完成")
     return _ocr_reader
 
@@ -83,6 +83,18 @@ def ocr_from_image(image_data: bytes, preprocess: bool = True) -> dict:
     """
     start = time.time()
 
+    # 內容雜湊快取：同一張掃描重複上傳時直接回傳先前結果
+    from ocr_engine import OCRCache, get_ocr_cache, hash_bytes
+    cache = get_ocr_cache()
+    cache_key = OCRCache.make_key(hash_bytes(image_data), kind="image",
+                                  engine="easyocr", preprocess=preprocess)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        cached["cached"] = True
+        cached["duration"] = round(time.time() - start, 2)
+        log.info(f"OCR 快取命中: {cached.get('line_count', 0)} 行")
+        return cached
+
     try:
         img = Image.open(io.BytesIO(image_data))
         if img.mode == 'RGBA':
@@ -115,7 +127,7 @@ def ocr_from_image(image_data: bytes, preprocess: bool = True) -> dict:
 
         log.info(f"OCR 完成: {len(lines)} 行, {len(full_text)} chars, avg_conf={avg_conf}, {elapsed}s")
 
-        return {
+        result = {
             "text": full_text,
             "lines": lines,
             "line_count": len(lines),
@@ -124,6 +136,9 @@ def ocr_from_image(image_data: bytes, preprocess: bool = True) -> dict:
             "duration": elapsed,
             "image_size": [img.width, img.height]
         }
+        cache.put(cache_key, result)
+        result["cached"] = False
+        return result
     except Exception as e:
         log.error(f"OCR 失敗: {e}")
         return {"text": "", "lines": [], "line_count": 0, "char_count": 0,
@@ -484,13 +499,7 @@ def get_scanned_document(scan_id: int) -> dict:
 
 
 def search_scanned_documents(project_id: int, query: str) -> list:
-    """搜尋掃描文件（全文搜尋 OCR 文字）"""
-    from database import get_db
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT * FROM scanned_documents WHERE project_id=? AND ocr_text LIKE ? ORDER BY created_at DESC",
-        (project_id, f"%{query}%"))
-    rows = [dict(r) for r in cursor.fetchall()]
-    conn.close()
-    return rows
+    """搜尋掃描文件（FTS5 全文搜尋 OCR 文字，依相關度排序）"""
+    from database import fts_search
+    return fts_search("scanned_documents_fts", query, "t.*",
+                      "t.project_id = ?", (project_id,), fallback_order="t.created_at DESC")
@@ -171,22 +171,13 @@ def parse_image(filepath: str) -> dict:
 
 
 def _try_ocr_pdf(filepath: str) -> Optional[str]:
-    """嘗試對 PDF 進行 OCR"""
+    """嘗試對 PDF 進行 OCR（逐頁平行 + 結果快取，見 ocr_engine）"""
     try:
-        import fitz
-        from PIL import Image
-        import pytesseract
-        import io
-
-        doc = fitz.open(filepath)
-        full_text = []
-        for page in doc:
-            pix = page.get_pixmap(dpi=300)
-            img = Image.open(io.BytesIO(pix.tobytes("png")))
-            text = pytesseract.image_to_string(img, lang='chi_tra+eng')
-            full_text.append(text)
-        doc.close()
-        return '\n'.join(full_text)
+        from ocr_engine import ocr_pdf
+        pages = ocr_pdf(filepath, dpi=300, engine="tesseract")
+        if pages and all("error" in p for p in pages):
+            return None
+        return '\n'.join(p["text"] for p in pages)
     except Exception:
         return None
 
@@ -370,80 +361,102 @@ def extract_term_definitions(text: str) -> list:
     return terms
 
 
-def parse_contract_xls(filepath: str) -> dict:
-    """
-    解析契約詳細表 Excel (.xls/.xlsx)
-    回傳結構化的契約項目列表，對應 contract_items 資料表
-    
-    Excel 格式：
-    C0=項次 | C1=項目及說明 | C2=單位 | C3=數量 | C4=單價 | C5=複價 | C6=編碼(備註)
-    """
-    ext = os.path.splitext(filepath)[1].lower()
-    rows_data = []
+class ContractParseError(Exception):
+    """契約詳細表讀取失敗（訊息可直接回傳給前端）"""
+
 
-    # 讀取 Excel
+def _iter_sheet_rows(filepath: str):
+    """逐列讀取 Excel 第一個工作表（.xlsx 使用 read_only 串流模式，不整表載入）"""
+    ext = os.path.splitext(filepath)[1].lower()
     if ext == '.xls':
         try:
             import xlrd
-            wb = xlrd.open_workbook(filepath)
-            ws = wb.sheet_by_index(0)
-            for r in range(ws.nrows):
-                row = []
-                for c in range(ws.ncols):
-                    val = ws.cell_value(r, c)
-                    if isinstance(val, float) and val == int(val):
-                        val = int(val)
-                    row.append(val if val else '')
-                rows_data.append(row)
         except ImportError:
-            return {"error": "需要安裝 xlrd: pip install xlrd", "items": []}
+            raise ContractParseError("需要安裝 xlrd: pip install xlrd")
+        try:
+            wb = xlrd.open_workbook(filepath, on_demand=True)
+            ws = wb.sheet_by_index(0)
         except Exception as e:
-            return {"error": f"XLS 解析失敗: {str(e)}", "items": []}
+            raise ContractParseError(f"XLS 解析失敗: {str(e)}")
+        for r in range(ws.nrows):
+            row = []
+            for val in ws.row_values(r):
+                if isinstance(val, float) and val == int(val):
+                    val = int(val)
+                row.append(val if val else '')
+            yield row
     else:
         try:
             from openpyxl import load_workbook
-            wb = load_workbook(filepath, data_only=True)
+        except ImportError:
+            raise ContractParseError("需要安裝 openpyxl: pip install openpyxl")
+        try:
+            wb = load_workbook(filepath, data_only=True, read_only=True)
             ws = wb.active
-            for row in ws.iter_rows(values_only=True):
+            rows = ws.iter_rows(values_only=True)
+        except Exception as e:
+            raise ContractParseError(f"XLSX 解析失敗: {str(e)}")
+        try:
+            for row in rows:
                 row_data = []
                 for cell in row:
                     val = cell if cell is not None else ''
                     if isinstance(val, float) and val == int(val):
                         val = int(val)
                     row_data.append(val)
-                rows_data.append(row_data)
-        except ImportError:
-            return {"error": "需要安裝 openpyxl: pip install openpyxl", "items": []}
-        except Exception as e:
-            return {"error": f"XLSX 解析失敗: {str(e)}", "items": []}
-
-    if not rows_data:
-        return {"error": "Excel 檔案為空", "items": []}
-
-    # 跳過標題行
-    start_row = 0
-    for i, row in enumerate(rows_data):
-        c1 = str(row[1] if len(row) > 1 else '').strip()
-        if '項' in c1 and '說明' in c1:
-            start_row = i + 1
-            break
-        if '項目' in c1:
-            start_row = i + 1
-            break
+                yield row_data
+        finally:
+            wb.close()
+
+
+def _is_contract_header(row) -> bool:
+    c1 = str(row[1] if len(row) > 1 else '').strip()
+    return ('項' in c1 and '說明' in c1) or '項目' in c1
+
+
+def iter_contract_xls(filepath: str):
+    """
+    串流解析契約詳細表 Excel (.xls/.xlsx)，逐筆 yield 契約項目（對應 contract_items 資料表）
+    每個項目會保留到下一個項目出現才 yield，以便把跨行名稱接回同一項目
+
+    Excel 格式：
+    C0=項次 | C1=項目及說明 | C2=單位 | C3=數量 | C4=單價 | C5=複價 | C6=編碼(備註)
+    讀檔失敗時拋出 ContractParseError
+    """
+    # 跳過標題行：找到標題前先暫存，找不到標題則從第一列開始處理
+    pre_header = []
+    header_found = False
+
+    def body_rows():
+        nonlocal header_found
+        any_row = False
+        for row in _iter_sheet_rows(filepath):
+            any_row = True
+            if header_found:
+                yield row
+            elif _is_contract_header(row):
+                header_found = True
+                pre_header.clear()
+            else:
+                pre_header.append(row)
+        if not any_row:
+            raise ContractParseError("Excel 檔案為空")
+        if not header_found:
+            yield from pre_header
 
     # 大類代碼辨識
     LEVEL1_CODES = {'壹', '貳', '參', '肆', '伍', '陸', '柒', '捌', '玖', '拾'}
     LEVEL2_CODES = {'甲', '乙', '丙', '丁', '戊', '己', '庚', '辛'}
 
-    items = []
     current_l1 = ''  # 壹、貳...
     current_l2 = ''  # 甲、乙...
     current_l3 = ''  # A、B、C...
-    pending_name_parts = []  # 跨行名稱暫存
+    pending = None   # 尚未 yield 的上一個項目（可能還有跨行名稱）
+    row_order = 0
 
-    for r in range(start_row, len(rows_data)):
-        row = rows_data[r]
+    for row in body_rows():
         # 確保至少 7 欄
+        row = list(row)
         while len(row) < 7:
             row.append('')
 
@@ -461,14 +474,14 @@ def parse_contract_xls(filepath: str) -> dict:
 
         # 處理跨行名稱（上一行名稱未完，此行只有 C1 或 C6 有值）
         if not c0 and not c2 and not c5 and (c1 or c6):
-            if items and not c1.startswith('小計') and not c1.startswith('合計') and not c1.startswith('總價') and '合計' not in c1:
+            if pending and not c1.startswith('小計') and not c1.startswith('合計') and not c1.startswith('總價') and '合計' not in c1:
                 # 附加到上一個項目的名稱
                 if c1:
-                    items[-1]['item_name'] += c1
-                if c6 and items[-1].get('remark_code'):
-                    items[-1]['remark_code'] += c6
+                    pending['item_name'] += c1
+                if c6 and pending.get('remark_code'):
+                    pending['remark_code'] += c6
                 elif c6:
-                    items[-1]['remark_code'] = c6
+                    pending['remark_code'] = c6
                 continue
 
         # 判斷層級
@@ -525,65 +538,86 @@ def parse_contract_xls(filepath: str) -> dict:
             is_subtotal = 1
             level = 0
 
-        # 數值處理
-        quantity = None
-        unit_price = None
-        total_price = None
-
-        if c3 and c3 != '':
-            try:
-                quantity = float(c3)
-            except (ValueError, TypeError):
-                pass
-
-        if c4 and c4 != '':
-            try:
-                unit_price = float(c4)
-            except (ValueError, TypeError):
-                pass
-
-        if c5 and c5 != '':
-            try:
-                total_price = float(c5)
-            except (ValueError, TypeError):
-                pass
-
         if not c1 and not c0:
             continue
 
-        item = {
-            'row_order': len(items),
+        # 數值欄位原樣保留，型別轉換由匯入端整欄驗證（database.bulk_insert）
+        if pending:
+            yield pending
+        pending = {
+            'row_order': row_order,
             'level': level,
             'parent_code': parent_code,
             'item_code': item_code,
             'item_number': c0,
             'item_name': c1,
             'unit': c2,
-            'quantity': quantity,
-            'unit_price': unit_price,
-            'total_price': total_price,
+            'quantity': c3 or None,
+            'unit_price': c4 or None,
+            'total_price': c5 or None,
             'remark_code': c6,
             'is_category': is_category,
             'is_subtotal': is_subtotal
         }
-        items.append(item)
+        row_order += 1
+
+    if pending:
+        yield pending
+
+
+def _to_float_or_none(val):
+    if val is None or val == '':
+        return None
+    try:
+        return float(val)
+    except (ValueError, TypeError):
+        return None
 
-    # 統計
-    work_items = [i for i in items if not i['is_category'] and not i['is_subtotal'] and i['unit']]
-    categories = [i for i in items if i['is_category']]
-    subtotals = [i for i in items if i['is_subtotal']]
+
+def parse_contract_xls(filepath: str) -> dict:
+    """
+    解析契約詳細表 Excel (.xls/.xlsx)
+    回傳結構化的契約項目列表，對應 contract_items 資料表
+    （大型契約請改用 bulk_import.import_contract_file 串流匯入）
+    """
+    items = []
+    try:
+        for item in iter_contract_xls(filepath):
+            for key in ('quantity', 'unit_price', 'total_price'):
+                item[key] = _to_float_or_none(item[key])
+            items.append(item)
+    except ContractParseError as e:
+        return {"error": str(e), "items": []}
 
     return {
         "items": items,
-        "stats": {
-            "total_rows": len(items),
-            "work_items": len(work_items),
-            "categories": len(categories),
-            "subtotals": len(subtotals)
-        }
+        "stats": contract_item_stats(items)
     }
 
 
+def new_contract_stats() -> dict:
+    return {"total_rows": 0, "work_items": 0, "categories": 0, "subtotals": 0}
+
+
+def add_contract_stat(stats: dict, item: dict):
+    """累計單一契約項目到統計（串流匯入時邊讀邊算）"""
+    stats["total_rows"] += 1
+    if item['is_category']:
+        stats["categories"] += 1
+    if item['is_subtotal']:
+        stats["subtotals"] += 1
+    if not item['is_category'] and not item['is_subtotal'] and item['unit']:
+        stats["work_items"] += 1
+
+
+def contract_item_stats(items) -> dict:
+    """契約項目統計"""
+    stats = new_contract_stats()
+    for i in items:
+        add_contract_stat(stats, i)
+    return stats
+
+
 def map_field_name(key: str) -> Optional[str]:
     """將中文欄位名對應到資料庫欄位"""
     mapping = {
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+營建自動化 — OCR 引擎層
+內容雜湊結果快取（磁碟） + PDF 逐頁平行 OCR（每個 worker 常駐一個 reader）
+
+用法：
+    from ocr_engine import ocr_pdf, iter_pdf_ocr, get_ocr_cache
+
+    pages = ocr_pdf("合約.pdf")                # 依頁序回傳
+    for page in iter_pdf_ocr("合約.pdf"):      # 哪一頁先完成就先回傳
+        print(page["page"], page["char_count"])
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Iterator, Optional
+
+log = logging.getLogger(__name__)
+
+# ===== 設定 =====
+OCR_CACHE_DIR = Path(os.environ.get(
+    "OCR_CACHE_DIR", str(Path(__file__).parent / "data" / "ocr_cache")))
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", "0")) or (os.cpu_count() or 1)
+OCR_PDF_DPI = int(os.environ.get("OCR_PDF_DPI", "300"))
+TESSERACT_LANG = "chi_tra+eng"
+
+# 快取鍵版本：OCR 輸出格式變更時遞增，舊快取自動失效
+CACHE_VERSION = 1
+
+
+# ===== 結果快取 =====
+
+class OCRCache:
+    """以內容 SHA-256 為鍵的 OCR 結果快取（每筆一個 JSON 檔）"""
+
+    def __init__(self, cache_dir: Path = OCR_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(content_hash: str, **params) -> str:
+        """內容雜湊 + OCR 參數（引擎、DPI、頁碼、前處理…）→ 快取鍵"""
+        raw = json.dumps({"v": CACHE_VERSION, "h": content_hash, **params},
+                         sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: dict):
+        """原子寫入（先寫暫存檔再 rename），避免多 process 同時寫出半個檔"""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError as e:
+            log.warning(f"OCR 快取寫入失敗: {e}")
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+
+    def clear(self) -> int:
+        """清除所有快取，回傳刪除筆數"""
+        count = 0
+        for p in self.cache_dir.glob("*/*.json"):
+            try:
+                p.unlink()
+                count += 1
+            except OSError:
+                pass
+        return count
+
+
+_cache = None
+
+
+def get_ocr_cache() -> OCRCache:
+    """取得共用 OCR 快取"""
+    global _cache
+    if _cache is None:
+        _cache = OCRCache()
+    return _cache
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(filepath: str, chunk_size: int = 1 << 20) -> str:
+    """分塊計算檔案 SHA-256（大型 PDF 不整檔載入記憶體）"""
+    h = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# ===== OCR reader（每個 process 一個，常駐重用） =====
+
+def get_reader(engine: str = "tesseract", gpu: bool = False):
+    """
+    取得本 process 的常駐 OCR reader（首次呼叫時載入模型）
+    EasyOCR 與文件掃描共用 doc_scanner.get_ocr_reader 的單例，同一 process 只載入一份模型
+    """
+    if engine == "easyocr":
+        from doc_scanner import get_ocr_reader
+        return get_ocr_reader(gpu=gpu)
+    if engine == "tesseract":
+        import pytesseract
+        return pytesseract
+    raise ValueError(f"不支援的 OCR 引擎: {engine}")
+
+
+def run_ocr(img, engine: str = "tesseract", gpu: bool = False) -> dict:
+    """
+    對 PIL Image 執行 OCR
+    回傳: { text, lines: [{text, confidence, bbox}], line_count, char_count, avg_confidence }
+    """
+    reader = get_reader(engine, gpu)
+    lines = []
+    if engine == "easyocr":
+        import numpy as np
+        for (bbox, text, conf) in reader.readtext(np.array(img), detail=1, paragraph=False):
+            text = text.strip()
+            if text:
+                lines.append({
+                    "text": text,
+                    "confidence": round(float(conf), 3),
+                    "bbox": [[int(p[0]), int(p[1])] for p in bbox]
+                })
+        full_text = "\n".join(l["text"] for l in lines)
+    else:
+        full_text = reader.image_to_string(img, lang=TESSERACT_LANG)
+        lines = [{"text": t.strip(), "confidence": None, "bbox": None}
+                 for t in full_text.splitlines() if t.strip()]
+
+    confs = [l["confidence"] for l in lines if l["confidence"] is not None]
+    return {
+        "text": full_text,
+        "lines": lines,
+        "line_count": len(lines),
+        "char_count": len(full_text),
+        "avg_confidence": round(sum(confs) / len(confs), 3) if confs else 0,
+    }
+
+
+# ===== PDF 逐頁 OCR（worker 端） =====
+
+_worker_doc = {"key": None, "doc": None}   # 僅 pool worker 使用；pool 結束時隨 process 釋放
+
+
+def _init_worker(engine: str, gpu: bool):
+    """ProcessPool initializer：worker 啟動時就先載入 reader"""
+    try:
+        get_reader(engine, gpu)
+    except Exception as e:
+        log.warning(f"OCR worker 預載失敗（將於首頁重試）: {e}")
+
+
+def _open_pdf(filepath: str):
+    """同一 worker 連續處理同一份 PDF 時重用已開啟的文件（以路徑 + 修改時間 + 大小辨識，重新上傳即重開）"""
+    import fitz
+    st = os.stat(filepath)
+    key = (filepath, st.st_mtime_ns, st.st_size)
+    if _worker_doc["key"] != key:
+        if _worker_doc["doc"] is not None:
+            _worker_doc["doc"].close()
+        _worker_doc["key"], _worker_doc["doc"] = None, None
+        _worker_doc["doc"] = fitz.open(filepath)
+        _worker_doc["key"] = key
+    return _worker_doc["doc"]
+
+
+def _ocr_pdf_page(filepath: str, page_no: int, dpi: int, engine: str, gpu: bool) -> dict:
+    """點陣化單一 PDF 頁面並 OCR（在 worker process 內執行）"""
+    try:
+        doc = _open_pdf(filepath)
+    except Exception as e:
+        return {"text": "", "lines": [], "line_count": 0, "char_count": 0,
+                "avg_confidence": 0, "error": str(e), "page": page_no, "duration": 0}
+    return _ocr_page(doc, page_no, dpi, engine, gpu)
+
+
+def _ocr_page(doc, page_no: int, dpi: int, engine: str, gpu: bool) -> dict:
+    """點陣化已開啟文件的單一頁面並 OCR"""
+    from PIL import Image
+
+    start = time.time()
+    try:
+        page = doc[page_no]
+        pix = page.get_pixmap(dpi=dpi)
+        img = Image.open(io.BytesIO(pix.tobytes("png")))
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        result = run_ocr(img, engine, gpu)
+        result["image_size"] = [img.width, img.height]
+    except Exception as e:
+        result = {"text": "", "lines": [], "line_count": 0, "char_count": 0,
+                  "avg_confidence": 0, "error": str(e)}
+    result["page"] = page_no
+    result["duration"] = round(time.time() - start, 2)
+    return result
+
+
+# ===== PDF OCR（呼叫端 API） =====
+
+def pdf_page_count(filepath: str) -> int:
+    import fitz
+    with fitz.open(filepath) as doc:
+        return doc.page_count
+
+
+def iter_pdf_ocr(filepath: str, dpi: int = OCR_PDF_DPI, engine: str = "tesseract",
+                 workers: int = None, gpu: bool = False, use_cache: bool = True) -> Iterator[dict]:
+    """
+    串流式 PDF OCR：每頁完成即 yield（順序不保證，以 result["page"] 辨識頁碼）
+    已快取頁面立即回傳，其餘頁面分派到 process pool 平行點陣化 + OCR
+    """
+    cache = get_ocr_cache() if use_cache else None
+    n_pages = pdf_page_count(filepath)
+    file_hash = hash_file(filepath) if cache else ""
+
+    def page_key(page_no):
+        return OCRCache.make_key(file_hash, kind="pdf_page", page=page_no,
+                                 dpi=dpi, engine=engine)
+
+    pending = []
+    for page_no in range(n_pages):
+        cached = cache.get(page_key(page_no)) if cache else None
+        if cached is not None:
+            cached["cached"] = True
+            yield cached
+        else:
+            pending.append(page_no)
+
+    if not pending:
+        return
+
+    def finish(result):
+        if cache and "error" not in result:
+            cache.put(page_key(result["page"]), result)
+        result["cached"] = False
+        return result
+
+    workers = min(workers or OCR_WORKERS, len(pending))
+    if workers <= 1:
+        # 單頁或單核：直接在本 process 處理，省去 pool 啟動成本；
+        # 文件隨本次呼叫開關，不在伺服器 process 內留著（Windows 上會鎖住暫存檔）
+        import fitz
+        with fitz.open(filepath) as doc:
+            for page_no in pending:
+                yield finish(_ocr_page(doc, page_no, dpi, engine, gpu))
+        return
+
+    log.info(f"PDF OCR: {len(pending)}/{n_pages} 頁待處理, {workers} workers")
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               initargs=(engine, gpu))
+    try:
+        futures = [pool.submit(_ocr_pdf_page, filepath, p, dpi, engine, gpu)
+                   for p in pending]
+        for fut in as_completed(futures):
+            yield finish(fut.result())
+    finally:
+        # 呼叫端提前停止迭代時，取消尚未開始的頁面
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def ocr_pdf(filepath: str, dpi: int = OCR_PDF_DPI, engine: str = "tesseract",
+            workers: int = None, gpu: bool = False, use_cache: bool = True) -> list:
+    """平行 OCR 整份 PDF，回傳依頁序排列的逐頁結果"""
+    pages = list(iter_pdf_ocr(filepath, dpi, engine, workers, gpu, use_cache))
+    pages.sort(key=lambda r: r["page"])
+    return pages
@@ -16,20 +16,33 @@
 
     # 非同步
     await event_bus.publish_async("decision.alert", {"level": 3})
+
+    # 重播歷史（依事件模式與時間區間）
+    events = event_bus.replay("water_level.*", since="2025-06-01T08:00:00")
+
+    # 佇列分發：慢速訂閱者在背景 event loop 上消化自己的佇列，不拖慢發布端
+    event_bus.subscribe("sensor.*", upload_to_cloud, queue_size=1000,
+                        overflow=OverflowPolicy.COALESCE,
+                        coalesce_key=lambda e: e.data.get("station_id"))
+    event_bus.get_dispatch_stats()   # 各佇列訂閱者的深度、丟棄數、延遲
 """
 import asyncio
 import logging
 import threading
 import time
 import uuid
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 log = logging.getLogger("core.event_bus")
 
+DISPATCH_WORKERS = 16          # 背景分發執行同步 callback 的執行緒數
+DEFAULT_BLOCK_TIMEOUT = 5.0    # BLOCK 策略下發布端最多等待秒數，逾時則丟棄該事件
+
 
 class EventPriority(Enum):
     LOW = 0
@@ -59,6 +72,13 @@ class Event:
         }
 
 
+class OverflowPolicy(Enum):
+    """佇列訂閱者的佇列滿載策略"""
+    DROP_OLDEST = "drop_oldest"   # 丟棄最舊的待處理事件
+    BLOCK = "block"               # 發布端等待（最多 block_timeout 秒）
+    COALESCE = "coalesce"         # 同一 key 只保留最新事件；不同 key 滿載時丟棄最舊
+
+
 @dataclass
 class Subscription:
     """訂閱記錄"""
@@ -66,6 +86,355 @@ class Subscription:
     event_pattern: str       # 支援 wildcard: "water_level.*", "*"
     subscriber_id: str = ""
     is_async: bool = False
+    queue: Optional["_SubscriberQueue"] = None   # 佇列分發（None = 發布時直接呼叫）
+
+
+class _TrieNode:
+    """訂閱索引的 segment trie 節點"""
+    __slots__ = ("children", "suffixes")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.suffixes: Dict[Tuple[str, ...], str] = {}   # 後綴 segments → pattern
+
+
+class _TopicIndex:
+    """
+    訂閱 pattern 索引，匹配成本取決於事件類型的 segment 數而非訂閱數。
+    語意與 EventBus._pattern_match 完全相同：
+
+    - 無 "*" 的 pattern → 精確 dict
+    - "*" → 匹配所有
+    - 單一 "*" 且佔滿整個 segment（"a.*"、"*.alert"、"a.*.c"）→ 前綴 segment trie，
+      節點上以後綴 segments 查表；"a.*.c" 等同 startswith("a.") 且 endswith(".c")，
+      即前後綴 segments 相符且事件的 segment 數多於前綴（後綴）
+    - 其餘（"water*"、多個 "*"）→ 逐一比對（罕見）
+
+    match() 依 pattern 加入順序回傳，與原本逐一走訪訂閱表的分發順序一致。
+    """
+
+    def __init__(self):
+        self._order: Dict[str, int] = {}
+        self._counter = 0
+        self._exact: set = set()
+        self._match_all = False
+        self._root = _TrieNode()
+        self._irregular: List[str] = []
+
+    def add(self, pattern: str):
+        self._order[pattern] = self._counter
+        self._counter += 1
+        split = self._split_wildcard(pattern)
+        if pattern == "*":
+            self._match_all = True
+        elif "*" not in pattern:
+            self._exact.add(pattern)
+        elif split is None:
+            self._irregular.append(pattern)
+        else:
+            prefix, suffix = split
+            node = self._root
+            for seg in prefix:
+                node = node.children.setdefault(seg, _TrieNode())
+            node.suffixes[suffix] = pattern
+
+    def remove(self, pattern: str):
+        del self._order[pattern]
+        split = self._split_wildcard(pattern)
+        if pattern == "*":
+            self._match_all = False
+        elif "*" not in pattern:
+            self._exact.discard(pattern)
+        elif split is None:
+            self._irregular.remove(pattern)
+        else:
+            prefix, suffix = split
+            path = [self._root]
+            for seg in prefix:
+                path.append(path[-1].children[seg])
+            del path[-1].suffixes[suffix]
+            # 清掉空節點
+            for seg, parent, node in zip(reversed(prefix), reversed(path[:-1]), reversed(path[1:])):
+                if node.children or node.suffixes:
+                    break
+                del parent.children[seg]
+
+    def match(self, event_type: str) -> List[str]:
+        """回傳匹配的 pattern（依加入順序）"""
+        matched = []
+        if self._match_all:
+            matched.append("*")
+        if event_type in self._exact:
+            matched.append(event_type)
+        segs = event_type.split(".")
+        n = len(segs)
+        node = self._root
+        depth = 0
+        while node is not None and depth < n:
+            if node.suffixes:
+                for k in range(n):
+                    pattern = node.suffixes.get(tuple(segs[n - k:]) if k else ())
+                    if pattern is not None:
+                        matched.append(pattern)
+            node = node.children.get(segs[depth])
+            depth += 1
+        for pattern in self._irregular:
+            if EventBus._pattern_match(pattern, event_type):
+                matched.append(pattern)
+        if len(matched) > 1:
+            matched.sort(key=self._order.__getitem__)
+        return matched
+
+    @staticmethod
+    def _split_wildcard(pattern: str) -> Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+        """"a.b.*.c" → (("a", "b"), ("c",))；非單一、完整 segment 的 "*" 回傳 None"""
+        if pattern == "*" or pattern.count("*") != 1:
+            return None
+        prefix, suffix = pattern.split("*")
+        if (prefix and not prefix.endswith(".")) or (suffix and not suffix.startswith(".")):
+            return None
+        return (tuple(prefix[:-1].split(".")) if prefix else (),
+                tuple(suffix[1:].split(".")) if suffix else ())
+
+
+class EventHistory:
+    """
+    固定容量的事件歷史 ring buffer（不含鎖，由 EventBus 保護）。
+    append 為 O(1)，超過容量時覆寫最舊的事件。
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._buf: List[Optional[Event]] = [None] * self.capacity
+        self._next = 0
+        self._count = 0
+
+    def append(self, event: Event):
+        self._buf[self._next] = event
+        self._next = (self._next + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def clear(self):
+        self._buf = [None] * self.capacity
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Event]:
+        """由舊到新"""
+        for i in range(self._next - self._count, self._next):
+            yield self._buf[i % self.capacity]
+
+    def newest_first(self) -> Iterator[Event]:
+        """由新到舊"""
+        for i in range(self._next - 1, self._next - 1 - self._count, -1):
+            yield self._buf[i % self.capacity]
+
+
+class _SubscriberQueue:
+    """
+    單一訂閱者的有界佇列（發布端任意執行緒 put，背景 event loop 上的 worker 取出分發）
+    """
+
+    def __init__(self, sub: Subscription, maxsize: int, overflow: OverflowPolicy,
+                 coalesce_key: Union[Callable, str, None], block_timeout: float):
+        self.sub = sub
+        self.maxsize = max(1, maxsize)
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        if coalesce_key is None:
+            self._key_fn = lambda e: e.event_type
+        elif callable(coalesce_key):
+            self._key_fn = coalesce_key
+        else:
+            self._key_fn = lambda e, k=coalesce_key: e.data.get(k)
+        self._items: deque = deque()          # [key, event, 入列時間]
+        self._pending: Dict[Any, list] = {}   # COALESCE：key → 佇列中的項目
+        self._cond = threading.Condition()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._waiting = False
+        self._busy = False
+        self._closed = False
+        self.worker = None                     # 背景 loop 上的 worker（concurrent Future）
+        self.stats = {
+            "delivered": 0, "dropped": 0, "coalesced": 0, "errors": 0,
+            "max_depth": 0, "lag_last_ms": 0.0, "lag_max_ms": 0.0, "lag_total_ms": 0.0,
+            "blocked_ms": 0.0,
+        }
+
+    def put(self, event: Event, can_block: bool = True) -> bool:
+        """放入事件；回傳 False 表示事件被丟棄"""
+        notify = False
+        with self._cond:
+            if self._closed:
+                return False
+            key = None
+            if self.overflow == OverflowPolicy.COALESCE:
+                key = self._key_fn(event)
+                entry = self._pending.get(key)
+                if entry is not None:
+                    entry[1] = event   # 保留原位置與入列時間，延遲反映最舊的未處理資料
+                    self.stats["coalesced"] += 1
+                    return True
+            if len(self._items) >= self.maxsize:
+                if self.overflow == OverflowPolicy.BLOCK and can_block:
+                    start = time.monotonic()
+                    deadline = start + self.block_timeout
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    self.stats["blocked_ms"] += (time.monotonic() - start) * 1000
+                    if len(self._items) >= self.maxsize or self._closed:
+                        self.stats["dropped"] += 1
+                        return False
+                else:
+                    old = self._items.popleft()
+                    if self.overflow == OverflowPolicy.COALESCE:
+                        self._pending.pop(old[0], None)
+                    self.stats["dropped"] += 1
+            entry = [key, event, time.monotonic()]
+            self._items.append(entry)
+            if self.overflow == OverflowPolicy.COALESCE:
+                self._pending[key] = entry
+            self.stats["max_depth"] = max(self.stats["max_depth"], len(self._items))
+            if self._waiting:
+                self._waiting = False
+                notify = True
+        if notify:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return True
+
+    def _take(self) -> Optional[list]:
+        with self._cond:
+            if not self._items:
+                self._busy = False
+                self._waiting = True
+                self._wakeup.clear()
+                return None
+            entry = self._items.popleft()
+            if self.overflow == OverflowPolicy.COALESCE:
+                self._pending.pop(entry[0], None)
+            self._busy = True
+            self._cond.notify()
+            return entry
+
+    async def run(self, bus: "EventBus"):
+        """worker：逐一分發，同步 callback 在執行緒池執行以免卡住 event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        with self._cond:
+            self._waiting = not self._items
+        sub = self.sub
+        while True:
+            entry = self._take()
+            if entry is None:
+                await self._wakeup.wait()
+                continue
+            event = entry[1]
+            lag_ms = (time.monotonic() - entry[2]) * 1000
+            st = self.stats
+            st["lag_last_ms"] = lag_ms
+            st["lag_max_ms"] = max(st["lag_max_ms"], lag_ms)
+            st["lag_total_ms"] += lag_ms
+            try:
+                if sub.is_async:
+                    await sub.callback(event)
+                else:
+                    await self._loop.run_in_executor(None, sub.callback, event)
+                st["delivered"] += 1
+                bus._stats["total_delivered"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                st["errors"] += 1
+                bus._stats["total_errors"] += 1
+                log.error(f"事件處理錯誤 [{sub.subscriber_id}] {event.event_type}: {e}")
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self.worker is not None:
+            self.worker.cancel()
+
+    def idle(self) -> bool:
+        with self._cond:
+            return not self._items and not self._busy
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            st = dict(self.stats)
+            depth = len(self._items)
+        handled = st["delivered"] + st["errors"]
+        st["lag_avg_ms"] = st.pop("lag_total_ms") / handled if handled else 0.0
+        return {
+            "pattern": self.sub.event_pattern,
+            "policy": self.overflow.value,
+            "queue_size": self.maxsize,
+            "depth": depth,
+            **st,
+        }
+
+
+class _Dispatcher:
+    """常駐背景 event loop（首次需要時啟動）"""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def thread(self) -> Optional[threading.Thread]:
+        return self._thread
+
+    def ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                loop.set_default_executor(ThreadPoolExecutor(
+                    max_workers=DISPATCH_WORKERS, thread_name_prefix="event_bus"))
+                self._thread = threading.Thread(target=loop.run_forever, name="event_bus_dispatch",
+                                                daemon=True)
+                self._thread.start()
+                self._loop = loop
+            return self._loop
+
+    def run(self, coro) -> Any:
+        """在背景 loop 執行 coroutine 並等待結果（取代每次 asyncio.run 建立新 loop）"""
+        return asyncio.run_coroutine_threadsafe(coro, self.ensure_started()).result()
+
+    def start_worker(self, queue: _SubscriberQueue, bus: "EventBus"):
+        queue.worker = asyncio.run_coroutine_threadsafe(queue.run(bus), self.ensure_started())
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+
+        async def _shutdown():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await loop.shutdown_default_executor()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_shutdown(), loop).result(timeout)
+        except Exception as e:
+            log.warning(f"事件分發 loop 關閉逾時: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not thread.is_alive():
+            loop.close()
 
 
 class EventBus:
@@ -79,13 +448,17 @@ class EventBus:
     4. 事件歷史（ring buffer）
     5. 錯誤隔離（一個 subscriber 失敗不影響其他）
     6. 執行緒安全
+    7. 佇列分發（queue_size > 0）：各訂閱者有自己的有界佇列，在常駐背景 loop 上分發，
+       慢速訂閱者只會累積自己的延遲，不會拖慢發布端或其他訂閱者
     """
 
     def __init__(self, history_size: int = 500):
         self._subscriptions: Dict[str, List[Subscription]] = defaultdict(list)
+        self._index = _TopicIndex()
         self._lock = threading.RLock()
-        self._history: List[Event] = []
+        self._history = EventHistory(history_size)
         self._history_size = history_size
+        self._dispatcher = _Dispatcher()
         self._stats = {
             "total_published": 0,
             "total_delivered": 0,
@@ -95,7 +468,10 @@ class EventBus:
     # ===== 訂閱 =====
 
     def subscribe(self, event_pattern: str, callback: Callable,
-                  subscriber_id: str = "") -> str:
+                  subscriber_id: str = "", queue_size: int = 0,
+                  overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+                  coalesce_key: Union[Callable, str, None] = None,
+                  block_timeout: float = DEFAULT_BLOCK_TIMEOUT) -> str:
         """
         訂閱事件
 
@@ -107,6 +483,10 @@ class EventBus:
                 - "*" — 匹配所有事件
             callback: 回呼函數，接收 Event 參數
             subscriber_id: 訂閱者 ID（用於取消訂閱）
+            queue_size: > 0 時改為佇列分發，佇列最多容納的待處理事件數
+            overflow: 佇列滿載策略（DROP_OLDEST / BLOCK / COALESCE）
+            coalesce_key: COALESCE 的合併鍵；callable(event) 或 data 欄位名稱，預設為 event_type
+            block_timeout: BLOCK 策略下發布端最多等待秒數
 
         Returns:
             subscriber_id
@@ -122,7 +502,13 @@ class EventBus:
             is_async=is_async,
         )
 
+        if queue_size > 0:
+            sub.queue = _SubscriberQueue(sub, queue_size, overflow, coalesce_key, block_timeout)
+            self._dispatcher.start_worker(sub.queue, self)
+
         with self._lock:
+            if event_pattern not in self._subscriptions:
+                self._index.add(event_pattern)
             self._subscriptions[event_pattern].append(sub)
 
         log.debug(f"訂閱: {subscriber_id} → {event_pattern}")
@@ -132,20 +518,32 @@ class EventBus:
         """取消訂閱"""
         with self._lock:
             for pattern in list(self._subscriptions.keys()):
+                for s in self._subscriptions[pattern]:
+                    if s.subscriber_id == subscriber_id:
+                        self._close_queue(s)
                 self._subscriptions[pattern] = [
                     s for s in self._subscriptions[pattern]
                     if s.subscriber_id != subscriber_id
                 ]
                 if not self._subscriptions[pattern]:
                     del self._subscriptions[pattern]
+                    self._index.remove(pattern)
 
     def unsubscribe_all(self, event_pattern: str = ""):
         """取消所有訂閱（或指定 pattern）"""
         with self._lock:
             if event_pattern:
-                self._subscriptions.pop(event_pattern, None)
+                subs = self._subscriptions.pop(event_pattern, None)
+                if subs is not None:
+                    self._index.remove(event_pattern)
+                    for s in subs:
+                        self._close_queue(s)
             else:
+                for subs in self._subscriptions.values():
+                    for s in subs:
+                        self._close_queue(s)
                 self._subscriptions.clear()
+                self._index = _TopicIndex()
 
     # ===== 發布 =====
 
@@ -173,13 +571,14 @@ class EventBus:
         # 記錄歷史
         with self._lock:
             self._history.append(event)
-            if len(self._history) > self._history_size:
-                self._history = self._history[-self._history_size:]
             self._stats["total_published"] += 1
 
         # 分發給匹配的訂閱者
         matched = self._match_subscribers(event_type)
         for sub in matched:
+            if sub.queue is not None:
+                self._enqueue(sub, event)
+                continue
             try:
                 if sub.is_async:
                     # 同步 context 中呼叫 async callback
@@ -187,7 +586,8 @@ class EventBus:
                         loop = asyncio.get_running_loop()
                         loop.create_task(sub.callback(event))
                     except RuntimeError:
-                        asyncio.run(sub.callback(event))
+                        # 沒有執行中的 loop：交給常駐背景 loop，不再每次建立/關閉新 loop
+                        self._dispatcher.run(sub.callback(event))
                 else:
                     sub.callback(event)
                 self._stats["total_delivered"] += 1
@@ -209,12 +609,13 @@ class EventBus:
 
         with self._lock:
             self._history.append(event)
-            if len(self._history) > self._history_size:
-                self._history = self._history[-self._history_size:]
             self._stats["total_published"] += 1
 
         matched = self._match_subscribers(event_type)
         for sub in matched:
+            if sub.queue is not None:
+                self._enqueue(sub, event)
+                continue
             try:
                 if sub.is_async:
                     await sub.callback(event)
@@ -231,12 +632,47 @@ class EventBus:
 
     def get_history(self, event_type: str = "", limit: int = 50) -> List[Event]:
         """查詢事件歷史"""
+        return self.replay(event_type, limit=limit)
+
+    def replay(self, event_type: str = "", since: Union[str, datetime, None] = None,
+               until: Union[str, datetime, None] = None, limit: Optional[int] = None,
+               callback: Optional[Callable] = None) -> List[Event]:
+        """
+        依事件模式與時間區間重播歷史
+
+        Args:
+            event_type: 事件模式（同 subscribe，支援 wildcard；空字串 = 全部）
+            since / until: 時間區間（含端點），datetime 或 ISO 字串
+            limit: 只取最新的 limit 筆（None = 全部）
+            callback: 依時間順序逐筆呼叫 callback(event)（在鎖外執行）
+
+        Returns:
+            符合條件的事件（由舊到新）
+        """
+        since_s = since.isoformat() if isinstance(since, datetime) else since
+        until_s = until.isoformat() if isinstance(until, datetime) else until
+        if limit is not None and limit <= 0:
+            return []
+
+        selected = []
         with self._lock:
-            if event_type:
-                filtered = [e for e in self._history if self._pattern_match(event_type, e.event_type)]
-            else:
-                filtered = list(self._history)
-        return filtered[-limit:]
+            for e in self._history.newest_first():
+                # 同一本地時區的 ISO 時間字串可直接比較大小
+                if until_s is not None and e.timestamp > until_s:
+                    continue
+                if since_s is not None and e.timestamp < since_s:
+                    continue
+                if event_type and not self._pattern_match(event_type, e.event_type):
+                    continue
+                selected.append(e)
+                if limit is not None and len(selected) >= limit:
+                    break
+        selected.reverse()
+
+        if callback:
+            for e in selected:
+                callback(e)
+        return selected
 
     def get_stats(self) -> dict:
         """取得統計"""
@@ -252,15 +688,64 @@ class EventBus:
         with self._lock:
             return {k: len(v) for k, v in self._subscriptions.items()}
 
+    def get_dispatch_stats(self) -> Dict[str, dict]:
+        """
+        取得各佇列訂閱者的分發統計
+        depth / max_depth: 目前 / 最大佇列深度
+        delivered / dropped / coalesced / errors: 累計事件數
+        lag_*_ms: 事件入列到開始處理的延遲
+        blocked_ms: BLOCK 策略下發布端累計等待時間
+        """
+        with self._lock:
+            queued = [s for subs in self._subscriptions.values() for s in subs if s.queue is not None]
+        return {s.subscriber_id: s.queue.snapshot() for s in queued}
+
+    # ===== 佇列分發 =====
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """等待所有佇列訂閱者處理完待處理事件；逾時回傳 False"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                queues = [s.queue for subs in self._subscriptions.values() for s in subs
+                          if s.queue is not None]
+            if all(q.idle() for q in queues):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.002)
+
+    def close(self, timeout: float = 5.0):
+        """停止背景分發 loop（佇列中未處理的事件會被捨棄）"""
+        with self._lock:
+            for subs in self._subscriptions.values():
+                for s in subs:
+                    self._close_queue(s)
+                subs[:] = [s for s in subs if s.queue is None]
+            for pattern in [p for p, subs in self._subscriptions.items() if not subs]:
+                del self._subscriptions[pattern]
+                self._index.remove(pattern)
+        self._dispatcher.stop(timeout)
+
     # ===== 內部 =====
 
+    def _enqueue(self, sub: Subscription, event: Event):
+        # 在分發 loop 上（async callback 內）發布時不能等待，否則會卡住消化佇列的 loop
+        can_block = threading.current_thread() is not self._dispatcher.thread
+        sub.queue.put(event, can_block=can_block)
+
+    @staticmethod
+    def _close_queue(sub: Subscription):
+        """關閉訂閱者佇列並停止其 worker"""
+        if sub.queue is not None:
+            sub.queue.close()
+
     def _match_subscribers(self, event_type: str) -> List[Subscription]:
-        """找出匹配的訂閱者，按優先級排序"""
+        """找出匹配的訂閱者（經 _TopicIndex，成本與訂閱數無關）"""
         matched = []
         with self._lock:
-            for pattern, subs in self._subscriptions.items():
-                if self._pattern_match(pattern, event_type):
-                    matched.extend(subs)
+            for pattern in self._index.match(event_type):
+                matched.extend(self._subscriptions[pattern])
         return matched
 
     @staticmethod
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+星空進階疊圖 Benchmark
+以合成星空幀（固定星點 + 雜訊 + 飛機/衛星亮線）比較
+「全部載入記憶體 + 整張 sigma clip」(舊) 與「逐幀寫入磁碟暫存 + 分塊並行 sigma clip」(新)
+的耗時與 Python 端峰值記憶體（tracemalloc），並確認兩者輸出逐位元相同。
+
+執行：
+  python scripts/benchmark_advanced_stack.py [--frames 40] [--width 1920] [--height 1080] [--memory-mb 256]
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts" / "starfield"))
+
+from advanced_stack import (  # noqa: E402
+    load_images, sigma_clip_stack, spool_frames, tiled_stack,
+)
+
+
+def make_frames(out_dir: Path, n: int, w: int, h: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    sky = rng.normal(20, 3, (h, w, 3))
+    for x, y in rng.integers(0, [w, h], (400, 2)):
+        cv2.circle(sky, (int(x), int(y)), 2, (220, 220, 220), -1)
+    for i in range(n):
+        img = sky + rng.normal(0, 4, sky.shape)
+        if i % 5 == 0:  # 飛機 / 衛星軌跡
+            p0, p1 = rng.integers(0, [w, h], (2, 2))
+            cv2.line(img, tuple(int(v) for v in p0), tuple(int(v) for v in p1), (255, 255, 255), 3)
+        cv2.imwrite(str(out_dir / f"frame_{i:04d}.png"), np.clip(img, 0, 255).astype(np.uint8))
+
+
+def measure(fn):
+    tracemalloc.start()
+    t = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - t
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, elapsed, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=40)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--memory-mb", type=float, default=256)
+    parser.add_argument("--workers", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        frame_dir = Path(tmp) / "frames"
+        frame_dir.mkdir()
+        make_frames(frame_dir, args.frames, args.width, args.height)
+        print(f"{args.frames} 幀 {args.width}x{args.height}，記憶體上限 {args.memory_mb:.0f} MB")
+
+        def legacy():
+            _, imgs = load_images(str(frame_dir))
+            return sigma_clip_stack(imgs)
+
+        def tiled():
+            spool, _, _ = spool_frames(sorted(frame_dir.glob("*.png")), tmp)
+            with spool:
+                result, info = tiled_stack(spool, memory_mb=args.memory_mb, workers=args.workers)
+            return np.clip(result, 0, 255).astype(np.uint8), info
+
+        old, old_s, old_mb = measure(legacy)
+        (new, info), new_s, new_mb = measure(tiled)
+
+    assert np.array_equal(old, new), "分塊結果與整張 sigma clip 不一致"
+    print(f"舊（整張）  {old_s:7.2f} s  峰值 {old_mb:8.0f} MB")
+    print(f"新（分塊）  {new_s:7.2f} s  峰值 {new_mb:8.0f} MB  "
+          f"({info['tiles']} 塊 × {info['tile_rows']} 列，{info['workers']} 執行緒)")
+    print("輸出逐位元相同")
+
+
+if __name__ == "__main__":
+    main()
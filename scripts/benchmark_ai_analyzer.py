@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+斷面 AI 批次分析 Benchmark
+啟動模擬的本地 Ollama 伺服器（固定注入延遲），比較
+「逐斷面 analyze_section」(舊) 與「analyze_sections 並行 + 快取」(新) 的總耗時，
+並確認兩者報告一致；另測試伺服器離線時批次不會逐一等待。
+
+執行：
+  python scripts/benchmark_ai_analyzer.py [--sections 24] [--latency 0.25] [--in-flight 8]
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from construction_brain.pointcloud import ai_analyzer  # noqa: E402
+from construction_brain.pointcloud.section_extractor import SectionResult, SectionType  # noqa: E402
+
+
+class MockOllama(BaseHTTPRequestHandler):
+    """回應 /api/generate：sleep latency 後回傳由 prompt 決定的固定 JSON"""
+    latency = 0.25
+    failing_models: set = set()
+    calls = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with MockOllama.lock:
+            MockOllama.calls += 1
+        time.sleep(self.latency)
+        if body["model"] in self.failing_models:
+            self.send_response(500)
+            self.end_headers()
+            return
+        digest = abs(hash(body["prompt"])) % 1000
+        answer = {"summary": f"斷面 #{digest}", "features": ["擋土牆"], "issues": [], "recommendations": []}
+        data = json.dumps({"response": json.dumps(answer, ensure_ascii=False)}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_sections(n: int, seed: int = 0) -> list:
+    """沿線 U 形渠道斷面，寬度逐樁變化"""
+    rng = np.random.default_rng(seed)
+    sections = []
+    for i in range(n):
+        w = 3.0 + 0.05 * i
+        t = rng.uniform(0, 1, 2000)
+        pts = np.column_stack([np.where(t < 0.5, rng.uniform(-w / 2, w / 2, 2000), rng.choice([-w / 2, w / 2], 2000)),
+                               np.where(t < 0.5, 0.0, rng.uniform(0, 2, 2000))])
+        sections.append(SectionResult(section_type=SectionType.ELEVATION_X, position=10.0 * i,
+                                      points_2d=pts, n_points=len(pts)))
+    return sections
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sections", type=int, default=24)
+    parser.add_argument("--latency", type=float, default=0.25)
+    parser.add_argument("--in-flight", type=int, default=8)
+    args = parser.parse_args()
+
+    MockOllama.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ai_analyzer.OLLAMA_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    sections = make_sections(args.sections)
+    print(f"斷面 {len(sections)}  模擬延遲 {args.latency * 1000:.0f} ms  並行上限 {args.in_flight}")
+
+    t = time.perf_counter()
+    old = [ai_analyzer.analyze_section(s) for s in sections]
+    old_s = time.perf_counter() - t
+
+    cache = ai_analyzer.AnalysisCache()
+    t = time.perf_counter()
+    new = ai_analyzer.analyze_sections(sections, max_in_flight=args.in_flight, cache=cache)
+    new_s = time.perf_counter() - t
+    assert [asdict(r) for r in old] == [asdict(r) for r in new], "批次結果與逐斷面分析不一致"
+
+    MockOllama.calls = 0
+    t = time.perf_counter()
+    again = ai_analyzer.analyze_sections(make_sections(args.sections), max_in_flight=args.in_flight, cache=cache)
+    cached_s = time.perf_counter() - t
+    assert MockOllama.calls == 0 and [asdict(r) for r in again] == [asdict(r) for r in new]
+
+    # 主模型失敗 → 各斷面各自改用 fallback 模型
+    MockOllama.failing_models = {ai_analyzer.DEFAULT_MODEL}
+    t = time.perf_counter()
+    fb = ai_analyzer.analyze_sections(sections, max_in_flight=args.in_flight)
+    fb_s = time.perf_counter() - t
+    assert all(r.model_used == ai_analyzer.FALLBACK_MODEL for r in fb)
+    MockOllama.failing_models = set()
+
+    # 伺服器離線 → 首個連線失敗後其餘直接規則式
+    server.shutdown()
+    server.server_close()
+    t = time.perf_counter()
+    off = ai_analyzer.analyze_sections(sections, max_in_flight=args.in_flight)
+    off_s = time.perf_counter() - t
+    assert all(r.model_used == "rule_based" for r in off)
+
+    print(f"逐斷面（舊）       {old_s * 1000:9.1f} ms")
+    print(f"批次並行（新）     {new_s * 1000:9.1f} ms  ({old_s / new_s:.1f}x)")
+    print(f"批次重跑（快取）   {cached_s * 1000:9.1f} ms  (0 次請求)")
+    print(f"主模型失敗 fallback {fb_s * 1000:8.1f} ms")
+    print(f"伺服器離線         {off_s * 1000:9.1f} ms  (全部規則式)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+iPhone 串流接收 Benchmark
+以合成 JPEG 產生器（預設 1920x1080，固定 fps）模擬 /ws/cam-feed，偵測端每幀固定耗時，比較
+「handler 內直接全尺寸 imdecode + 每幀 ack + 偵測端 sleep 輪詢 last_raw 再 resize」(舊) 與
+「CameraIngest 背景縮小解碼 + FrameMailbox 條件通知 + 合併 ack」(新) 的：
+event loop 延遲（同一 loop 上的計時器晚到多少）、接收→偵測取用的端到端延遲、處理與丟棄幀數。
+
+執行：
+  python scripts/benchmark_camera_ingest.py [--seconds 5] [--fps 30] [--detect-ms 40] [--width 1920 --height 1080]
+"""
+import argparse
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts" / "starfield"))
+
+from frame_ingest import CameraIngest  # noqa: E402
+
+DETECT_SIZE = (640, 480)
+ACK_INTERVAL = 0.25
+
+
+def make_jpegs(n: int = 8, w: int = 1920, h: int = 1080):
+    rng = np.random.default_rng(0)
+    base = rng.normal(20, 6, (h, w, 3)).clip(0, 255).astype(np.uint8)
+    out = []
+    for i in range(n):
+        f = base.copy()
+        cv2.circle(f, (200 + i * 150, h // 2), 12, (255, 255, 255), -1)
+        out.append(cv2.imencode(".jpg", f, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes())
+    return out
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000
+
+
+async def loop_monitor(stop: asyncio.Event, lags: list, period: float = 0.005):
+    """量測 event loop 延遲：每 period 醒來一次，記錄比預期晚多少"""
+    while not stop.is_set():
+        t = time.perf_counter()
+        await asyncio.sleep(period)
+        lags.append(time.perf_counter() - t - period)
+
+
+async def run(mode: str, jpegs, seconds: float, fps: float, detect_ms: float):
+    latencies, lags = [], []
+    processed = [0]
+    acks = [0]
+    stop = asyncio.Event()
+    running = True
+
+    if mode == "legacy":
+        shared = {"frame": None, "ts": 0.0, "id": 0}
+        lock = threading.Lock()
+
+        def detection():
+            last_id = 0
+            while running:
+                with lock:
+                    frame, ts, fid = shared["frame"], shared["ts"], shared["id"]
+                if frame is None or fid == last_id:
+                    time.sleep(0.02)
+                    continue
+                last_id = fid
+                frame = cv2.resize(frame.copy(), DETECT_SIZE)
+                latencies.append(time.time() - ts)
+                time.sleep(detect_ms / 1000)
+                processed[0] += 1
+
+        async def receive(data):
+            now = time.time()
+            frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            with lock:
+                shared["frame"], shared["ts"] = frame, now
+                shared["id"] += 1
+            acks[0] += 1
+    else:
+        ingest = CameraIngest(target_size=DETECT_SIZE)
+        last_ack = [0.0]
+
+        def detection():
+            seq = 0
+            while running:
+                item = ingest.mailbox.get(seq, timeout=0.2)
+                if item is None:
+                    continue
+                seq, frame, ts = item
+                latencies.append(time.time() - ts)
+                time.sleep(detect_ms / 1000)
+                processed[0] += 1
+
+        async def receive(data):
+            now = time.time()
+            ingest.submit(data, now)
+            if now - last_ack[0] >= ACK_INTERVAL:
+                last_ack[0] = now
+                ingest.get_stats()
+                acks[0] += 1
+
+    worker = threading.Thread(target=detection, daemon=True)
+    worker.start()
+    monitor = asyncio.create_task(loop_monitor(stop, lags))
+    n = int(seconds * fps)
+    start = time.perf_counter()
+    for i in range(n):
+        await receive(jpegs[i % len(jpegs)])
+        delay = start + (i + 1) / fps - time.perf_counter()
+        await asyncio.sleep(max(delay, 0))
+    await asyncio.sleep(0.3)
+    stop.set()
+    await monitor
+    running = False
+    worker.join(timeout=2)
+    if mode != "legacy":
+        ingest.close()
+    return {
+        "sent": n, "processed": processed[0], "dropped": n - processed[0], "acks": acks[0],
+        "lat_p50": percentile(latencies, 0.5), "lat_p95": percentile(latencies, 0.95),
+        "lag_p95": percentile(lags, 0.95), "lag_max": percentile(lags, 1.0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--detect-ms", type=float, default=40.0)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    args = parser.parse_args()
+
+    jpegs = make_jpegs(w=args.width, h=args.height)
+    print(f"{args.width}x{args.height} JPEG {args.fps:.0f} fps × {args.seconds:.0f} 秒（{len(jpegs[0]) // 1024} KB/幀），"
+          f"偵測 {args.detect_ms:.0f} ms/幀")
+    for name, mode in (("舊（loop 內解碼 + 輪詢）", "legacy"), ("新（ingest + mailbox）  ", "ingest")):
+        r = asyncio.run(run(mode, jpegs, args.seconds, args.fps, args.detect_ms))
+        print(f"{name}  loop 延遲 p95 {r['lag_p95']:6.1f} ms  max {r['lag_max']:6.1f} ms │ "
+              f"端到端 p50 {r['lat_p50']:6.1f} ms  p95 {r['lat_p95']:6.1f} ms │ "
+              f"偵測 {r['processed']:>4}/{r['sent']}  丟棄 {r['dropped']:>4}  ack {r['acks']:>4}")
+
+
+if __name__ == "__main__":
+    main()
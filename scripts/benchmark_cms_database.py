@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+construction_mgmt 資料庫 Benchmark
+比較「每次呼叫開新連線 + 多次查詢」(舊) 與「執行緒常駐連線 + 單一聚合查詢」(新)
+的各端點延遲，並確認兩者回傳結果一致；另比較契約項目逐筆 INSERT 與串流批次匯入。
+
+執行：
+  python scripts/benchmark_cms_database.py [--rounds 500] [--import-rows 10000]
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "construction_mgmt"))
+
+import database as db  # noqa: E402
+
+
+# ===== 舊版實作（每次開新連線、逐項查詢） =====
+
+def legacy_get_db():
+    db.ensure_dirs()
+    conn = sqlite3.connect(db.DB_PATH, timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def legacy_contract_summary(project_id):
+    conn = legacy_get_db()
+    c = conn.cursor()
+    c.execute("SELECT COUNT(*) FROM contract_items WHERE project_id = ?", (project_id,))
+    total = c.fetchone()[0]
+    c.execute("SELECT COUNT(*) FROM contract_items WHERE project_id = ? AND is_category = 1", (project_id,))
+    categories = c.fetchone()[0]
+    c.execute("SELECT COUNT(*) FROM contract_items WHERE project_id = ? AND is_category = 0 "
+              "AND is_subtotal = 0 AND unit != ''", (project_id,))
+    work_items = c.fetchone()[0]
+    c.execute("SELECT item_name, total_price FROM contract_items WHERE project_id = ? "
+              "AND is_subtotal = 1 ORDER BY row_order", (project_id,))
+    subtotals = [{'name': r[0], 'amount': r[1]} for r in c.fetchall()]
+    c.execute("SELECT total_price FROM contract_items WHERE project_id = ? AND item_name LIKE '%總價%' "
+              "ORDER BY row_order DESC LIMIT 1", (project_id,))
+    row = c.fetchone()
+    conn.close()
+    return {'total_rows': total, 'categories': categories, 'work_items': work_items,
+            'subtotals': subtotals, 'grand_total': row[0] if row else None}
+
+
+def legacy_daily_log_stats(project_id):
+    conn = legacy_get_db()
+    c = conn.cursor()
+    counts = {}
+    c.execute("SELECT COUNT(*) FROM construction_logs WHERE project_id = ?", (project_id,))
+    counts['total_logs'] = c.fetchone()[0]
+    for status, key in (('working', 'working_days'), ('rain_stop', 'rain_stop_days'),
+                        ('holiday', 'holiday_days')):
+        c.execute("SELECT COUNT(*) FROM construction_logs WHERE project_id = ? AND day_status = ?",
+                  (project_id, status))
+        counts[key] = c.fetchone()[0]
+    c.execute("SELECT MIN(log_date), MAX(log_date) FROM construction_logs WHERE project_id = ?", (project_id,))
+    first_date, last_date = c.fetchone()
+    c.execute("SELECT substr(log_date, 1, 7) as month, COUNT(*) FROM construction_logs "
+              "WHERE project_id = ? GROUP BY month ORDER BY month", (project_id,))
+    monthly = [{'month': r[0], 'count': r[1]} for r in c.fetchall()]
+    c.execute("SELECT log_date, day_status FROM construction_logs WHERE project_id = ? ORDER BY log_date",
+              (project_id,))
+    dates = [{'date': r[0], 'status': r[1]} for r in c.fetchall()]
+    conn.close()
+    return {**counts, 'first_date': first_date, 'last_date': last_date,
+            'monthly': monthly, 'dates': dates}
+
+
+def legacy_stats():
+    conn = legacy_get_db()
+    c = conn.cursor()
+    c.execute("SELECT COUNT(*) FROM projects")
+    total = c.fetchone()[0]
+    c.execute("SELECT COUNT(*) FROM projects WHERE status = 'active'")
+    active = c.fetchone()[0]
+    c.execute("SELECT COUNT(*) FROM project_documents")
+    docs = c.fetchone()[0]
+    conn.close()
+    return {"total_projects": total, "active_projects": active, "total_documents": docs}
+
+
+def legacy_get_project_row(project_id):
+    conn = legacy_get_db()
+    row = conn.execute("SELECT * FROM projects WHERE id = ?", (project_id,)).fetchone()
+    conn.close()
+    return dict(row)
+
+
+def pooled_get_project_row(project_id):
+    conn = db.get_db()
+    row = conn.execute("SELECT * FROM projects WHERE id = ?", (project_id,)).fetchone()
+    conn.close()
+    return dict(row)
+
+
+def legacy_import_contract_items(project_id, items):
+    conn = legacy_get_db()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM contract_items WHERE project_id = ?", (project_id,))
+    for count, item in enumerate(items):
+        cursor.execute(
+            """INSERT INTO contract_items
+               (project_id, row_order, level, parent_code, item_code,
+                item_number, item_name, unit, quantity, unit_price, total_price,
+                remark_code, is_category, is_subtotal)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (project_id, item.get('row_order', count), item.get('level', 0), item.get('parent_code', ''),
+             item.get('item_code', ''), item.get('item_number', ''), item.get('item_name', ''),
+             item.get('unit', ''), item.get('quantity'), item.get('unit_price'), item.get('total_price'),
+             item.get('remark_code', ''), item.get('is_category', 0), item.get('is_subtotal', 0)))
+    conn.commit()
+    conn.close()
+
+
+def legacy_import_special_terms(project_id, articles):
+    conn = legacy_get_db()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM special_terms WHERE project_id=?", (project_id,))
+    for i, a in enumerate(articles):
+        cursor.execute("""INSERT INTO special_terms (project_id, seq, title, content, page_start, page_end, sort_order)
+            VALUES (?,?,?,?,?,?,?)""",
+            (project_id, a.get('seq', i+1), a.get('title',''), a.get('content',''),
+             a.get('page_start'), a.get('page_end'), i))
+    conn.commit()
+    conn.close()
+
+
+# ===== 測試資料 =====
+
+def seed(n_items=2000, n_logs=600):
+    pid = db.create_project({"project_name": "Benchmark 工程", "status": "active"})
+    items = []
+    for i in range(n_items):
+        if i % 100 == 0:
+            items.append({'row_order': i, 'level': 0, 'item_code': '壹', 'item_name': '大類',
+                          'is_category': 1})
+        elif i % 100 == 99:
+            items.append({'row_order': i, 'level': 2, 'item_name': '小計', 'total_price': 1000.0 * i,
+                          'is_subtotal': 1})
+        else:
+            items.append({'row_order': i, 'level': 3, 'item_number': str(i), 'item_name': f'工項{i}',
+                          'unit': 'M3', 'quantity': 1.5, 'unit_price': 100.0, 'total_price': 150.0})
+    items.append({'row_order': n_items, 'item_name': '總價', 'total_price': 9.9e6, 'is_subtotal': 1})
+    db.import_contract_items(pid, items)
+    statuses = ['working'] * 5 + ['rain_stop', 'holiday']
+    base = time.mktime((2025, 1, 1, 0, 0, 0, 0, 0, -1))
+    for d in range(n_logs):
+        date = time.strftime('%Y-%m-%d', time.localtime(base + d * 86400))
+        db.create_daily_log(pid, {'log_date': date, 'day_status': statuses[d % len(statuses)]})
+    return pid
+
+
+def bench(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000)
+    return statistics.median(samples), sorted(samples)[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=500)
+    parser.add_argument("--import-rows", type=int, default=10000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="cms_bench_")
+    db.DB_DIR = tmp
+    db.DB_PATH = os.path.join(tmp, "projects.db")
+    db.UPLOAD_DIR = os.path.join(tmp, "uploads")
+    db.init_db()
+    pid = seed()
+
+    cases = [
+        ("connection + 單筆查詢", lambda: legacy_get_project_row(pid), lambda: pooled_get_project_row(pid)),
+        ("get_contract_summary", lambda: legacy_contract_summary(pid), lambda: db.get_contract_summary(pid)),
+        ("get_daily_log_stats", lambda: legacy_daily_log_stats(pid), lambda: db.get_daily_log_stats(pid)),
+        ("get_stats", legacy_stats, db.get_stats),
+    ]
+
+    print(f"DB: {db.DB_PATH}  rounds={args.rounds}")
+    print(f"{'端點':<24}{'舊 p50 ms':>12}{'新 p50 ms':>12}{'舊 p95 ms':>12}{'新 p95 ms':>12}{'加速':>8}")
+    for name, old, new in cases:
+        assert old() == new(), f"{name}: 新舊結果不一致"
+        old_p50, old_p95 = bench(old, args.rounds)
+        new_p50, new_p95 = bench(new, args.rounds)
+        print(f"{name:<24}{old_p50:>12.3f}{new_p50:>12.3f}{old_p95:>12.3f}{new_p95:>12.3f}"
+              f"{old_p50 / new_p50:>7.1f}x")
+
+    # 匯入（逐筆 INSERT vs 串流 executemany）；交替執行各取最佳值，兩邊都要先刪掉同量舊資料
+    items = [{'row_order': i, 'level': 3, 'item_number': str(i), 'item_name': f'工項{i}', 'unit': 'M3',
+              'quantity': 1.5, 'unit_price': 100.0, 'total_price': 150.0}
+             for i in range(args.import_rows)]
+    articles = [{'seq': i, 'title': f'第{i}條', 'content': '契約條款內容' * 40}
+                for i in range(args.import_rows // 5)]
+    import_cases = [
+        (f"import_contract_items x{len(items)}",
+         lambda: legacy_import_contract_items(pid, items),
+         lambda: db.import_contract_items(pid, iter(items))),
+        (f"import_special_terms x{len(articles)} (FTS)",
+         lambda: legacy_import_special_terms(pid, articles),
+         lambda: db.import_special_terms(pid, articles)),
+    ]
+    print()
+    for name, old, new in import_cases:
+        old_ms, new_ms = [], []
+        for _ in range(3):
+            for fn, out in ((old, old_ms), (new, new_ms)):
+                t = time.perf_counter()
+                fn()
+                out.append((time.perf_counter() - t) * 1000)
+        print(f"{name:<40} 舊 {min(old_ms):8.1f} ms → 新 {min(new_ms):8.1f} ms "
+              f"({min(old_ms) / min(new_ms):.1f}x)")
+
+    db.close_db_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+EventBus 發布吞吐量 Benchmark
+以數千個訂閱（各站精確 topic + 站別 wildcard + 全域 alert）模擬高頻遙測，比較
+「逐一比對所有 pattern + list 切片歷史」(舊) 與「_TopicIndex + ring buffer」(新) 的 publish 吞吐量，
+並確認兩者匹配到的訂閱者與順序完全相同。
+
+執行：
+  python scripts/benchmark_event_bus.py [--stations 2000] [--events 20000]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from core.event_bus import EventBus, EventPriority  # noqa: E402
+
+
+class LegacyEventBus(EventBus):
+    """舊版：每次 publish 逐一比對所有 pattern，歷史超過容量時整段切片"""
+
+    def __init__(self, history_size: int = 500):
+        super().__init__(history_size)
+        self._history = []
+
+    def publish(self, event_type, data=None, source="", priority=EventPriority.NORMAL):
+        from core.event_bus import Event
+        event = Event(event_type=event_type, data=data or {}, source=source, priority=priority)
+        with self._lock:
+            self._history.append(event)
+            if len(self._history) > self._history_size:
+                self._history = self._history[-self._history_size:]
+            self._stats["total_published"] += 1
+        for sub in self._match_subscribers(event_type):
+            sub.callback(event)
+            self._stats["total_delivered"] += 1
+        return event
+
+    def _match_subscribers(self, event_type):
+        matched = []
+        with self._lock:
+            for pattern, subs in self._subscriptions.items():
+                if self._pattern_match(pattern, event_type):
+                    matched.extend(subs)
+        return matched
+
+
+def setup(bus: EventBus, n_stations: int):
+    sink = lambda e: None  # noqa: E731
+    for i in range(n_stations):
+        bus.subscribe(f"water_level.WA-{i:04d}.reading", sink)
+        bus.subscribe(f"sensor.WA-{i:04d}.*", sink)
+    bus.subscribe("*.alert", sink)
+    bus.subscribe("water_level.*", sink)
+    bus.subscribe("*", sink)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stations", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--history", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    topics = []
+    for _ in range(args.events):
+        i = rng.randrange(args.stations)
+        topics.append(rng.choice([f"water_level.WA-{i:04d}.reading", f"sensor.WA-{i:04d}.dht",
+                                  f"sensor.WA-{i:04d}.alert", "system.health"]))
+
+    old_bus, new_bus = LegacyEventBus(args.history), EventBus(args.history)
+    setup(old_bus, args.stations)
+    setup(new_bus, args.stations)
+    n_subs = new_bus.get_stats()["active_subscriptions"]
+    print(f"訂閱 {n_subs:,}  事件 {args.events:,}  歷史容量 {args.history:,}")
+
+    for t in set(topics[:2000]):
+        old_patterns = [s.event_pattern for s in old_bus._match_subscribers(t)]
+        new_patterns = [s.event_pattern for s in new_bus._match_subscribers(t)]
+        assert old_patterns == new_patterns, f"{t}: 匹配結果不一致"
+
+    results = {}
+    for name, bus in (("舊", old_bus), ("新", new_bus)):
+        t0 = time.perf_counter()
+        for t in topics:
+            bus.publish(t, {"level_m": 1.0})
+        results[name] = time.perf_counter() - t0
+        print(f"{name}  {results[name]:7.2f} s  {args.events / results[name]:>10,.0f} events/s")
+    assert [e.event_type for e in old_bus._history] == \
+        [e.event_type for e in new_bus.get_history(limit=args.history)], "歷史內容不一致"
+    print(f"加速 {results['舊'] / results['新']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
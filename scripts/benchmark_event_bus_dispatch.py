@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+EventBus 分發 Benchmark
+1. 同步 publish 呼叫 async callback：每次 asyncio.run 建立新 loop (舊) vs 常駐背景 loop (新)
+2. 一個慢速訂閱者（每筆 sleep）+ 一個快速訂閱者：直接呼叫 (舊) vs 佇列分發 (新) 的發布吞吐量，
+   以及佇列分發下快速訂閱者的延遲與慢速訂閱者的丟棄 / 合併數
+
+執行：
+  python scripts/benchmark_event_bus_dispatch.py [--events 2000] [--slow-ms 5]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from core.event_bus import EventBus, OverflowPolicy  # noqa: E402
+
+
+def bench_async_callbacks(n_events: int):
+    received = []
+
+    async def on_event(e):
+        received.append(e.data["i"])
+
+    # 舊：每個 callback 一個新 loop
+    t = time.perf_counter()
+    for i in range(n_events):
+        asyncio.run(on_event(type("E", (), {"data": {"i": i}})()))
+    old_s = time.perf_counter() - t
+
+    bus = EventBus()
+    bus.subscribe("sensor.*", on_event)
+    received.clear()
+    t = time.perf_counter()
+    for i in range(n_events):
+        bus.publish("sensor.dht", {"i": i})
+    new_s = time.perf_counter() - t
+    assert received == list(range(n_events))
+    bus.close()
+    print(f"async callback x{n_events}: asyncio.run {old_s * 1000:8.1f} ms → 常駐 loop {new_s * 1000:8.1f} ms "
+          f"({old_s / new_s:.1f}x)")
+
+
+def bench_slow_subscriber(n_events: int, slow_ms: float):
+    def slow(e):
+        time.sleep(slow_ms / 1000)
+
+    fast_seen = []
+
+    # 舊：直接呼叫，慢速訂閱者卡住發布端
+    bus = EventBus()
+    bus.subscribe("sensor.*", slow)
+    bus.subscribe("sensor.*", lambda e: fast_seen.append(e))
+    n_inline = max(1, n_events // 10)
+    t = time.perf_counter()
+    for i in range(n_inline):
+        bus.publish("sensor.dht", {"station_id": f"S{i % 20}", "i": i})
+    inline_rate = n_inline / (time.perf_counter() - t)
+
+    # 新：佇列分發，慢速訂閱者只保留各站最新值
+    bus = EventBus()
+    bus.subscribe("sensor.*", slow, subscriber_id="slow", queue_size=100,
+                  overflow=OverflowPolicy.COALESCE, coalesce_key="station_id")
+    bus.subscribe("sensor.*", lambda e: fast_seen.append(e), subscriber_id="fast", queue_size=10000)
+    fast_seen.clear()
+    t = time.perf_counter()
+    for i in range(n_events):
+        bus.publish("sensor.dht", {"station_id": f"S{i % 20}", "i": i})
+    queued_rate = n_events / (time.perf_counter() - t)
+    bus.flush(30)
+    stats = bus.get_dispatch_stats()
+    bus.close()
+    assert len(fast_seen) == n_events
+
+    print(f"慢速訂閱者 {slow_ms} ms/筆：直接呼叫 {inline_rate:10,.0f} events/s → 佇列分發 {queued_rate:10,.0f} events/s "
+          f"({queued_rate / inline_rate:.0f}x)")
+    for sid, st in stats.items():
+        print(f"  {sid:<5} 處理 {st['delivered']:>6}  丟棄 {st['dropped']:>5}  合併 {st['coalesced']:>6}  "
+              f"最大深度 {st['max_depth']:>5}  延遲 avg {st['lag_avg_ms']:7.2f} ms  max {st['lag_max_ms']:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--slow-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    bench_async_callbacks(args.events)
+    bench_slow_subscriber(args.events, args.slow_ms)
+
+
+if __name__ == "__main__":
+    main()
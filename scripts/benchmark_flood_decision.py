@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+FloodDecisionEngine 趨勢分析 Benchmark
+以合成水位紀錄（每站 30 秒一筆，含暴雨漲退）重播多站，比較
+「_history list + pop(0)，每次 decide 以 Python sum 重算最近 10 筆回歸」(舊) 與
+「TrendWindow 環狀緩衝 + 累計和增量更新，另含 1h / 6h 時間窗與 EWMA 上升率」(新) 的
+決策吞吐量；並與「時間平移後回歸」的精確參考逐筆比對警報等級 / 趨勢 / 變化率
+（舊版直接以 epoch 秒平方相減，累計和有抵消誤差）。
+
+執行：
+  python scripts/benchmark_flood_decision.py [--stations 200] [--hours 6] [--interval 30]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from water_alert.config import StationConfig, SystemConfig  # noqa: E402
+from water_alert.flood_decision_engine import FloodDecisionEngine  # noqa: E402
+
+
+class LegacyEngine(FloodDecisionEngine):
+    """
+    舊版趨勢分析：list 歷史 + pop(0) + 每次 decide 以 Python sum 重算
+    windows=True 時另外每次重算 1h / 6h 時間窗（不用累計和時的做法）；
+    shift=True 時回歸前把時間平移到窗口第一筆（數學上相同，但沒有 epoch 秒平方相減的抵消誤差），作為精確參考
+    """
+
+    def __init__(self, station, system=None, windows=False, shift=False):
+        super().__init__(station, system)
+        self._legacy = []
+        self._legacy_windows = windows
+        self._shift = shift
+        if windows:
+            self._max_history = int(max(system.trend_windows_sec) / 30) + 1
+
+    def _record(self, ts, score, level):
+        self._legacy.append({"ts": ts, "score": score, "level": level})
+        if len(self._legacy) > self._max_history:
+            self._legacy.pop(0)
+        if self._legacy_windows:
+            for sec in self.system.trend_windows_sec:
+                self._slope([h for h in self._legacy if ts - h["ts"] <= sec])
+
+    def _slope(self, recent):
+        times = [h["ts"] for h in recent]
+        if self._shift:
+            times = [t - times[0] for t in times]
+        scores = [h["score"] for h in recent]
+        n = len(scores)
+        sum_t = sum(times)
+        sum_s = sum(scores)
+        sum_ts = sum(t * s for t, s in zip(times, scores))
+        sum_t2 = sum(t * t for t in times)
+        denom = n * sum_t2 - sum_t * sum_t
+        if abs(denom) < 1e-10:
+            return None
+        return (n * sum_ts - sum_t * sum_s) / denom
+
+    def _analyze_trend(self, current_score):
+        if len(self._legacy) < 3:
+            return "stable", 0.0
+        slope = self._slope(self._legacy[-10:])
+        if slope is None:
+            return "stable", 0.0
+        rate_per_hour = slope * 3600
+        if rate_per_hour > 2:
+            trend = "rising"
+        elif rate_per_hour < -2:
+            trend = "falling"
+        else:
+            trend = "stable"
+        return trend, rate_per_hour
+
+
+def make_series(n_stations: int, ticks: int, seed: int = 0):
+    """每站一條水位序列（m）+ 濕度 + 預報雨量"""
+    rng = random.Random(seed)
+    series = []
+    for _ in range(n_stations):
+        level, rows = rng.uniform(0.5, 1.5), []
+        storm_at, storm_len = rng.randrange(ticks), rng.randrange(60, 400)
+        for i in range(ticks):
+            surge = 0.01 if storm_at <= i < storm_at + storm_len else -0.004
+            level = max(0.2, level + surge + rng.gauss(0, 0.01))
+            rows.append((level, rng.uniform(60, 99), rng.uniform(0, 60)))
+        series.append(rows)
+    return series
+
+
+def replay(make_engine, series, t0, interval):
+    decisions = []
+    stations = [StationConfig(station_id=f"WA-{i:04d}", station_name=f"站 {i}")
+                for i in range(len(series))]
+    engines = [make_engine(st) for st in stations]
+    start = time.perf_counter()
+    for tick in range(len(series[0])):
+        ts = t0 + tick * interval
+        for engine, rows in zip(engines, series):
+            level, humidity, rain = rows[tick]
+            inputs = [engine.normalize_radar(level), engine.normalize_dht(25.0, humidity),
+                      engine.normalize_forecast(rain)]
+            d = engine.decide(inputs, ts=ts)
+            decisions.append((d.alert_level, d.trend, d.rate_of_change))
+    return time.perf_counter() - start, decisions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stations", type=int, default=200)
+    parser.add_argument("--hours", type=float, default=6.0)
+    parser.add_argument("--interval", type=float, default=30.0, help="取樣間隔（秒）")
+    args = parser.parse_args()
+
+    ticks = int(args.hours * 3600 / args.interval)
+    series = make_series(args.stations, ticks)
+    t0 = 1_780_000_000.0       # 2026 年的 epoch 秒
+    n = args.stations * ticks
+    print(f"{args.stations} 站 × {ticks} 筆（{args.hours:g} 小時 @ {args.interval:g}s）＝ {n:,} 次決策")
+
+    only10 = SystemConfig(trend_windows_sec=())
+    full = SystemConfig(trend_windows_sec=(3600, 21600), trend_ewma_halflife_sec=600)
+    _, ref = replay(lambda st: LegacyEngine(st, only10, shift=True), series, t0, args.interval)
+    rows = [
+        ("舊 10 筆（list + 每次重算）       ", lambda st: LegacyEngine(st, only10)),
+        ("新 10 筆（TrendWindow）           ", lambda st: FloodDecisionEngine(st, only10)),
+        ("舊 10 筆 + 1h/6h 每次重算         ", lambda st: LegacyEngine(st, full, windows=True)),
+        ("新 10 筆 + 1h/6h 增量 + EWMA      ", lambda st: FloodDecisionEngine(st, full)),
+    ]
+    print("與精確參考（時間平移後回歸）比對：")
+    for name, make_engine in rows:
+        sec, res = replay(make_engine, series, t0, args.interval)
+        same_level = sum(a[0] == b[0] for a, b in zip(ref, res))
+        same_trend = sum(a[1] == b[1] for a, b in zip(ref, res))
+        max_diff = max(abs(a[2] - b[2]) for a, b in zip(ref, res))
+        print(f"  {name}{sec:6.2f} s  {n / sec:>9,.0f} 決策/s  "
+              f"等級一致 {same_level:,}  趨勢一致 {same_trend:,}  變化率最大誤差 {max_diff:.1e} 分/hr")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+/ws/detect 畫面廣播 Benchmark
+以假 WebSocket（記錄送出位元組，可設定每次 send 延遲模擬慢速連線）比較
+「每個客戶端各自 25 fps 迴圈：JPEG 編碼 + base64 + JSON」(舊) 與 FrameBroadcaster（一次編碼、二進位、最新一張）(新)
+在不同觀看者數量下的 CPU 時間與頻寬，並列出慢速觀看者的丟幀數。
+
+執行：
+  python scripts/benchmark_frame_broadcast.py [--seconds 3] [--viewers 1 10 50] [--fps 15]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts" / "starfield"))
+
+from frame_broadcaster import FrameBroadcaster  # noqa: E402
+
+
+class FakeWS:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.frames = 0
+        self.bytes = 0
+
+    async def send_text(self, text):
+        self.bytes += len(text.encode("utf-8"))
+        if '"frame"' in text[:20]:
+            self.frames += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+
+    async def send_bytes(self, data):
+        self.bytes += len(data)
+        self.frames += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+
+
+def make_frames(n: int = 30):
+    rng = np.random.default_rng(0)
+    base = rng.normal(15, 4, (480, 640, 3)).clip(0, 255).astype(np.uint8)
+    frames = []
+    for i in range(n):
+        f = base.copy()
+        cv2.circle(f, (20 + i * 20, 240), 6, (0, 255, 0), 2)
+        cv2.putText(f, f"#{i}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        frames.append(f)
+    return frames
+
+
+def fake_stats():
+    return {"total_frames": 1234, "confirmed_tracks": 2, "total_events": 5,
+            "classification_counts": {"ufo": 1, "airplane": 4}, "star_mask_ready": True}
+
+
+class Producer(threading.Thread):
+    """模擬偵測執行緒：以固定 fps 更新最新畫面"""
+
+    def __init__(self, frames, fps, on_frame=None):
+        super().__init__(daemon=True)
+        self.frames, self.fps, self.on_frame = frames, fps, on_frame
+        self.latest = frames[0]
+        self.running = True
+
+    def run(self):
+        i = 0
+        while self.running:
+            self.latest = self.frames[i % len(self.frames)]
+            if self.on_frame:
+                self.on_frame(self.latest)
+            i += 1
+            time.sleep(1 / self.fps)
+
+
+async def legacy(n_viewers: int, seconds: float, fps: float, frames):
+    producer = Producer(frames, fps)
+    producer.start()
+    clients = [FakeWS() for _ in range(n_viewers)]
+
+    async def client_loop(ws):
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            _, buf = cv2.imencode(".jpg", producer.latest, [cv2.IMWRITE_JPEG_QUALITY, 70])
+            b64 = base64.b64encode(buf).decode("utf-8")
+            await ws.send_text(json.dumps({"type": "frame", "data": b64, "fps": 15.0,
+                                           "stats": fake_stats(), "new_events": []}))
+            await asyncio.sleep(0.04)
+
+    cpu = time.process_time()
+    await asyncio.gather(*(client_loop(ws) for ws in clients))
+    cpu = time.process_time() - cpu
+    producer.running = False
+    return cpu, clients
+
+
+async def broadcast(n_viewers: int, seconds: float, fps: float, frames, slow_delay: float):
+    bc = FrameBroadcaster(meta_fn=lambda: {"fps": 15.0, "stats": fake_stats()}, events_fn=lambda: [])
+    bc.start()
+    clients = [FakeWS() for _ in range(n_viewers)]
+    slow = FakeWS(delay=slow_delay)
+    tasks = [asyncio.create_task(bc.serve(ws)) for ws in clients + [slow]]
+    await asyncio.sleep(0)
+    producer = Producer(frames, fps, on_frame=bc.publish)
+    cpu = time.process_time()
+    producer.start()
+    await asyncio.sleep(seconds)
+    producer.running = False
+    cpu = time.process_time() - cpu
+    stats = bc.get_stats()
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await bc.stop()
+    return cpu, clients, slow, stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--viewers", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--fps", type=float, default=15.0)
+    parser.add_argument("--slow-ms", type=float, default=300.0, help="慢速觀看者每次 send 的延遲")
+    args = parser.parse_args()
+
+    frames = make_frames()
+    print(f"640x480 畫面 {args.fps:.0f} fps，每組 {args.seconds:.0f} 秒")
+    for n in args.viewers:
+        old_cpu, old_clients = asyncio.run(legacy(n, args.seconds, args.fps, frames))
+        new_cpu, new_clients, slow, stats = asyncio.run(
+            broadcast(n, args.seconds, args.fps, frames, args.slow_ms / 1000))
+        old_bw = sum(c.bytes for c in old_clients) / args.seconds / n / 1024
+        new_bw = sum(c.bytes for c in new_clients) / args.seconds / n / 1024
+        old_fps = sum(c.frames for c in old_clients) / args.seconds / n
+        new_fps = sum(c.frames for c in new_clients) / args.seconds / n
+        slow_stats = stats["viewers"][-1]
+        print(f"觀看者 {n:>3}：舊 CPU {old_cpu:5.2f} s  {old_fps:5.1f} 幀/秒/人  {old_bw:7.0f} KB/s/人 │ "
+              f"新 CPU {new_cpu:5.2f} s  {new_fps:5.1f} 幀/秒/人  {new_bw:7.0f} KB/s/人  "
+              f"編碼 {stats['encoded']} 次  慢速觀看者送出 {slow_stats['sent']} 丟棄 {slow_stats['dropped']}")
+
+
+if __name__ == "__main__":
+    main()
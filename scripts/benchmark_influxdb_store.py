@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+水情時序儲存 Benchmark
+以模擬 InfluxDB（每次 HTTP 寫入 / Flux 查詢延遲 --rtt-ms，中段斷線 --outage 秒）重播多站 30 秒一筆的
+水位 + 決策寫入，比較
+「每筆一次 HTTP 寫入、斷線即丟棄、get_latest 走 Flux 查詢」(舊) 與
+「本地 SQLite 先落地 + 背景批次上傳 + 退避重試、記憶體最新值」(新) 的
+寫入端延遲、HTTP 請求數、斷線期間資料保留率與 get_latest 延遲，並量測本地查詢 / 降採樣查詢延遲。
+
+執行：
+  python scripts/benchmark_influxdb_store.py [--stations 10] [--hours 2] [--rtt-ms 5] [--outage 2]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from water_alert.influxdb_store import InfluxDBStore  # noqa: E402
+
+
+class FakeInflux:
+    """模擬上游：每次請求耗時 rtt；down 為 True 時拋出連線錯誤"""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.down = False
+        self.requests = 0
+        self.points = 0
+
+    def write(self, n: int):
+        time.sleep(self.rtt)
+        self.requests += 1
+        if self.down:
+            raise ConnectionError("connection refused")
+        self.points += n
+
+    def query_latest(self):
+        time.sleep(self.rtt)
+        self.requests += 1
+
+
+class LegacyStore(InfluxDBStore):
+    """舊版：每筆同步寫入一次，失敗丟棄；get_latest 查詢上游"""
+
+    def __init__(self, fake, local_path):
+        super().__init__(local_path=local_path)
+        self.fake = fake
+        self._write_api = object()
+
+    def _write_point(self, measurement, station_id, fields, extra_tags=None, ts=None):
+        try:
+            self.fake.write(1)
+        except Exception:
+            pass
+
+    def get_latest(self, measurement, station_id):
+        self.fake.query_latest()
+        return None
+
+
+class NewStore(InfluxDBStore):
+    """新版：上傳改送模擬上游（批次大小 = 一次請求）"""
+
+    def __init__(self, fake, local_path, **kw):
+        super().__init__(local_path=local_path, **kw)
+        self.fake = fake
+        self._write_api = object()
+        self.local.track_sync = True
+        self._start_sync()
+
+    def _upload(self, batch):
+        self.fake.write(len(batch))
+
+
+def run(store, fake, stations, ticks, outage_at, outage_sec, t0):
+    """依時間順序寫入；寫到 outage_at 比例時上游斷線 outage_sec 秒（寫入不中斷）"""
+    lat = []
+    restore = None
+    for tick in range(ticks):
+        if tick == int(ticks * outage_at) and outage_sec > 0:
+            fake.down = True
+            restore = threading.Timer(outage_sec, lambda: setattr(fake, "down", False))
+            restore.start()
+        ts = t0 + tick * 30
+        for s in range(stations):
+            sid = f"WA-{s:03d}"
+            t = time.perf_counter()
+            store._write_point("water_level", sid, {"distance_m": 3.0, "water_level_m": 1 + tick * 1e-3,
+                                                    "signal_strength": -60}, ts=ts)
+            store._write_point("decision", sid, {"weighted_score": 40.0, "alert_level": 1},
+                               {"alert_name": "注意", "trend": "rising"}, ts=ts)
+            lat.append(time.perf_counter() - t)
+    if restore:
+        restore.join()
+    return sorted(lat)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stations", type=int, default=10)
+    parser.add_argument("--hours", type=float, default=2.0, help="重播時長（30 秒一筆）")
+    parser.add_argument("--rtt-ms", type=float, default=5.0)
+    parser.add_argument("--outage", type=float, default=2.0, help="上游斷線秒數（壁鐘）")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    ticks = int(args.hours * 3600 / 30)
+    n = ticks * args.stations * 2
+    t0 = time.time() - args.hours * 3600
+    print(f"{args.stations} 站 × {ticks} 筆 × 2 measurement ＝ {n:,} 點，RTT {args.rtt_ms:g} ms，"
+          f"上游斷線 {args.outage:g} s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, make in (("舊（逐筆 HTTP）", lambda f: LegacyStore(f, os.path.join(tmp, "old.db"))),
+                           ("新（本地 + 批次）", lambda f: NewStore(f, os.path.join(tmp, "new.db"),
+                                                                  flush_interval_sec=0.5))):
+            fake = FakeInflux(args.rtt_ms / 1000)
+            store = make(fake)
+            lat = run(store, fake, args.stations, ticks, 0.3, args.outage, t0)
+            write_sec = sum(lat)    # 呼叫端花在寫入的時間（不含等待斷線恢復）
+            store.flush(timeout=60)
+            t = time.perf_counter()
+            for s in range(args.stations):
+                store.get_latest("water_level", f"WA-{s:03d}")
+            latest_ms = (time.perf_counter() - t) / args.stations * 1000
+            print(f"  {name:<10} 寫入 {write_sec:6.2f} s（{n / write_sec:>8,.0f} 點/s，p99 {lat[int(len(lat) * 0.99)] * 1000:6.2f} ms/站）"
+                  f"  HTTP 請求 {fake.requests:>6,}  上游收到 {fake.points / n:6.1%}  get_latest {latest_ms:6.3f} ms")
+            if isinstance(store, NewStore):
+                t = time.perf_counter()
+                rows = store.query_water_level("WA-000", hours=1)
+                q_ms = (time.perf_counter() - t) * 1000
+                t = time.perf_counter()
+                roll = store.query_rollup("water_level", "WA-000", "water_level_m", every=300, hours=args.hours)
+                r_ms = (time.perf_counter() - t) * 1000
+                print(f"  本地查詢：1 小時原始 {len(rows)} 筆 {q_ms:.2f} ms，{args.hours:g} 小時 5 分鐘彙總 "
+                      f"{len(roll)} 桶 {r_ms:.2f} ms，{store.get_stats()}")
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+LoRa 閘道器 Benchmark（LoopbackBus 虛擬空中介面，不需無線模組）
+1. 分框：舊版 _rx_loop（bytes 緩衝 += / 逐包切片 + 逐位元 CRC）與 FrameParser（bytearray + 讀取位移 + 查表 CRC）
+   在不同讀取區塊大小下的封包/s，並驗證解出的封包相同
+2. 多節點：N 個站端每秒上報水位、每 5 秒上報一次警報給總機，總機每秒連續觸發多次廣播警報，鏈路掉包率 --loss；
+   比較舊版（呼叫端直接 write、無 ACK / 合併 / 預算）與新版（優先權佇列 + ACK 重傳 + 合併 + 佔空比預算）
+   的警報送達率、實際送出封包數與空中時間
+
+執行：
+  python scripts/benchmark_lora_gateway.py [--frames 20000] [--nodes 8] [--seconds 10] [--loss 0.1]
+"""
+import argparse
+import logging
+import random
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from water_alert.lora_gateway import (  # noqa: E402
+    FrameParser, LoopbackBus, LoRaGateway, LoRaPacket, MsgType,
+)
+
+
+# ===== 舊版實作 =====
+
+def legacy_crc16(data: bytes) -> int:
+    crc = 0xFFFF
+    for b in data:
+        crc ^= b
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+    return crc & 0xFFFF
+
+
+def legacy_decode(raw: bytes):
+    if len(raw) < 10 or raw[0:2] != b"\xAA\x55":
+        return None
+    src, dst, mtype, seq, plen = struct.unpack(">BBBBH", raw[2:8])
+    payload = raw[8:8 + plen]
+    if struct.unpack(">H", raw[8 + plen:10 + plen])[0] != legacy_crc16(raw[2:8 + plen]):
+        return None
+    return LoRaPacket(src_addr=src, dst_addr=dst, msg_type=mtype, seq_num=seq, payload=payload)
+
+
+def legacy_parse(chunks):
+    """舊版 _rx_loop 的緩衝與搜尋邏輯"""
+    out = []
+    buffer = b""
+    for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= 10:
+            idx = buffer.find(b"\xAA\x55")
+            if idx < 0:
+                buffer = b""
+                break
+            if idx > 0:
+                buffer = buffer[idx:]
+            if len(buffer) < 8:
+                break
+            plen = struct.unpack(">H", buffer[6:8])[0]
+            total_len = 8 + plen + 2
+            if len(buffer) < total_len:
+                break
+            pkt = legacy_decode(buffer[:total_len])
+            buffer = buffer[total_len:]
+            if pkt:
+                out.append(pkt)
+    return out
+
+
+class LegacyGateway(LoRaGateway):
+    """舊版傳送：呼叫端執行緒直接 write，無佇列 / ACK / 合併 / 佔空比"""
+
+    def send(self, dst_addr, msg_type, payload=b"", priority=None, coalesce=False):
+        if not self._serial or not self._serial.is_open:
+            return False
+        with self._lock:
+            self._seq = (self._seq + 1) % 256
+            seq = self._seq
+        raw = LoRaPacket(self.my_addr, dst_addr, msg_type, seq, payload).encode()
+        self._serial.write(raw)
+        with self._tx_cond:
+            self._stats["sent"] += 1
+            self._stats["airtime_sec"] += self.airtime(len(raw))
+        return True
+
+    def _handle_packet(self, pkt):
+        self._stats["rx"] += 1
+        for cb in self._callbacks.get(pkt.msg_type, []):
+            cb(pkt)
+
+
+# ===== 1. 分框 =====
+
+def bench_parser(n_frames: int):
+    rng = random.Random(0)
+    stream = bytearray()
+    for i in range(n_frames):
+        payload = bytes(rng.randrange(256) for _ in range(rng.randrange(2, 40)))
+        stream += LoRaPacket(rng.randrange(1, 20), 0, MsgType.WATER_LEVEL, i % 256, payload).encode()
+    stream = bytes(stream)
+    print(f"分框：{n_frames:,} 封包，{len(stream) / 1024:.0f} KB")
+    for size in (256, 4096, 65536):
+        chunks = [stream[i:i + size] for i in range(0, len(stream), size)]
+        t = time.perf_counter()
+        old = legacy_parse(chunks)
+        old_sec = time.perf_counter() - t
+        parser = FrameParser()
+        t = time.perf_counter()
+        new = [p for c in chunks for p in parser.feed(c)]
+        new_sec = time.perf_counter() - t
+        same = [(p.seq_num, p.payload) for p in old] == [(p.seq_num, p.payload) for p in new]
+        print(f"  讀取區塊 {size:>6} B  舊 {len(old) / old_sec:>9,.0f} 包/s │ 新 {len(new) / new_sec:>9,.0f} 包/s  "
+              f"×{old_sec / new_sec:5.1f}  結果一致 {same}")
+
+
+# ===== 2. 多節點 =====
+
+def run_network(gateway_cls, n_nodes: int, seconds: float, loss: float):
+    bus = LoopbackBus(loss=loss, seed=1)
+    kw = dict(ack_timeout_sec=0.5, max_retries=4)
+    hq = gateway_cls(0, **kw)
+    nodes = [gateway_cls(i + 1, **kw) for i in range(n_nodes)]
+    for g in [hq] + nodes:
+        g.connect(bus.port(timeout=0.05))
+        g.start()
+
+    alerts_rx, broadcast_rx = set(), [0] * n_nodes
+    hq.on(MsgType.ALERT, lambda p: alerts_rx.add((p.src_addr, p.payload)))
+    for i, g in enumerate(nodes):
+        g.on(MsgType.ALERT, lambda p, i=i: broadcast_rx.__setitem__(i, broadcast_rx[i] + 1))
+
+    alerts_tx = set()
+    running = True
+
+    def station(i, g):
+        k = 0
+        while running:
+            g.send(0, MsgType.WATER_LEVEL, struct.pack(">H", 1000 + k), coalesce=True)
+            if k % 5 == 0:
+                payload = struct.pack(">BBH", 2, 60, k)
+                alerts_tx.add((g.my_addr, payload))
+                g.send(0, MsgType.ALERT, payload)
+            k += 1
+            time.sleep(1.0)
+
+    threads = [threading.Thread(target=station, args=(i, g), daemon=True) for i, g in enumerate(nodes)]
+    for th in threads:
+        th.start()
+    # 總機：每秒各站決策各觸發一次廣播警報（同一秒內連續 n_nodes 次，等級在 2~3 間跳動）
+    for k in range(int(seconds)):
+        for j in range(n_nodes):
+            hq.broadcast_alert(2 + (k + j) % 2, "水位上升")
+        time.sleep(1.0)
+    running = False
+    for g in [hq] + nodes:
+        g.flush(timeout=10)
+    time.sleep(0.3)
+
+    stats = [g.get_stats() for g in [hq] + nodes]
+    for g in [hq] + nodes:
+        g.stop()
+    return {
+        "alert_ratio": len(alerts_rx & alerts_tx) / max(len(alerts_tx), 1),
+        "alerts": len(alerts_tx),
+        "broadcast_sent": stats[0]["sent"],
+        "broadcast_rx_avg": sum(broadcast_rx) / n_nodes,
+        "frames": sum(s["sent"] for s in stats),
+        "airtime": sum(s["airtime_sec"] for s in stats),
+        "retransmits": sum(s["retransmits"] for s in stats),
+        "coalesced": sum(s["coalesced"] for s in stats),
+        "latency": stats[1].get("ack_latency_ms"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--nodes", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--loss", type=float, default=0.1, help="鏈路掉包率")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    bench_parser(args.frames)
+
+    print(f"\n多節點：{args.nodes} 站 + 總機，{args.seconds:.0f} 秒，掉包率 {args.loss:.0%}")
+    for name, cls in (("舊（直接 write）", LegacyGateway), ("新（佇列 + ACK）", LoRaGateway)):
+        r = run_network(cls, args.nodes, args.seconds, args.loss)
+        print(f"  {name}  站端警報送達 {r['alert_ratio']:6.1%}（{r['alerts']} 則）  "
+              f"總機廣播送出 {r['broadcast_sent']:3d} 包 / 每站收到 {r['broadcast_rx_avg']:5.1f}  "
+              f"全網 {r['frames']:4d} 包 空中時間 {r['airtime']:6.2f} s  "
+              f"重傳 {r['retransmits']}  合併 {r['coalesced']}  ACK 延遲 {r['latency']}")
+
+
+if __name__ == "__main__":
+    main()
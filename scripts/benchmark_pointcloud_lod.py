@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+點雲 LOD 快取 Benchmark
+以合成的二進位 PLY 點雲比較「完整載入後才能顯示總覽」(舊) 與「讀 LOD 快取根節點」(新)
+的首次繪製時間，並確認葉節點點數合計等於原始點數。
+
+執行：
+  python scripts/benchmark_pointcloud_lod.py [--points 5000000]
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from construction_brain.pointcloud.loader import load_pointcloud  # noqa: E402
+from construction_brain.pointcloud.lod import build_lod_cache, open_lod  # noqa: E402
+
+
+def write_ply(path: Path, n_points: int, seed: int = 0):
+    """長 500 m 的道路走廊（路面 + 兩側擋土牆），binary little endian"""
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(0, 500, n_points)
+    side = rng.integers(0, 3, n_points)
+    y = np.where(side == 0, rng.uniform(-6, 6, n_points), np.where(side == 1, -6.0, 6.0))
+    z = np.where(side == 0, 0.0, rng.uniform(0, 4, n_points)) + 0.01 * rng.standard_normal(n_points)
+    rec = np.empty(n_points, dtype=[("x", "<f4"), ("y", "<f4"), ("z", "<f4")])
+    rec["x"], rec["y"], rec["z"] = x, y, z
+    header = ("ply\nformat binary_little_endian 1.0\n"
+              f"element vertex {n_points}\n"
+              "property float x\nproperty float y\nproperty float z\nend_header\n")
+    with open(path, "wb") as f:
+        f.write(header.encode("ascii"))
+        rec.tofile(f)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="lod_bench_"))
+    try:
+        ply = tmp / "corridor.ply"
+        write_ply(ply, args.points)
+        print(f"點數 {args.points:,}  檔案 {ply.stat().st_size / 1e6:.1f} MB")
+
+        # 舊：完整載入後取整體範圍繪製
+        t = time.perf_counter()
+        pcd = load_pointcloud(str(ply))
+        full_s = time.perf_counter() - t
+
+        t = time.perf_counter()
+        build_lod_cache(str(ply))
+        build_s = time.perf_counter() - t
+
+        # 新：開啟快取，讀整體視野（800 px 寬）需要的節點
+        t = time.perf_counter()
+        lod = open_lod(str(ply))
+        lo, hi = lod.origin, lod.bounds_max
+        rect = (lo[0], hi[0], lo[1], hi[1])
+        first, _ = lod.points_for_view((0, 1), rect, (hi[0] - lo[0]) / 800)
+        first_s = time.perf_counter() - t
+
+        # 放大到 1/50 長度
+        cx = (lo[0] + hi[0]) / 2
+        w = (hi[0] - lo[0]) / 50
+        t = time.perf_counter()
+        zoom, _ = lod.points_for_view((0, 1), (cx - w / 2, cx + w / 2, lo[1], hi[1]), w / 800)
+        zoom_s = time.perf_counter() - t
+
+        leaves = [n for n in lod.nodes if lod.node_spacing(n) == 0]
+        assert sum(lod.nodes[n] for n in leaves) == len(pcd), "葉節點點數合計與原始點數不一致"
+
+        print(f"完整載入（舊首次繪製） {full_s * 1000:9.1f} ms")
+        print(f"LOD 建立（一次性背景） {build_s * 1000:9.1f} ms  ({len(lod.nodes)} 節點)")
+        print(f"LOD 首次繪製           {first_s * 1000:9.1f} ms  ({len(first):,} 點)")
+        print(f"LOD 放大 1/50          {zoom_s * 1000:9.1f} ms  ({len(zoom):,} 點)")
+        print(f"首次繪製加速 {full_s / first_s:.0f}x")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+點雲切面輪廓提取 回歸比對 + Benchmark
+以合成切面語料（牆體環帶、隧道斷面、含孔洞填充面、分離物件、格點、少點退化）比較
+逐點 Python 版（舊）與向量化版（新）的邊界邊、串連結果、Douglas-Peucker 簡化與最終輪廓，
+要求逐位元一致，並列出耗時。
+
+執行：
+  python scripts/benchmark_section_contours.py [--scale 1.0]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from construction_brain.pointcloud import section_extractor as se  # noqa: E402
+
+
+# ===== 舊版實作（逐三角形 / 逐邊 / 遞迴） =====
+
+def legacy_extract_contours(points: np.ndarray, tolerance: float) -> list[list[tuple]]:
+    """
+    從 2D 點集提取輪廓線。
+    使用 Alpha Shape / Concave Hull 方法。
+    """
+    if len(points) < 3:
+        return []
+
+    try:
+        from scipy.spatial import Delaunay
+        from collections import defaultdict
+
+        # Delaunay 三角化
+        tri = Delaunay(points)
+
+        # 提取邊界邊（只屬於一個三角形的邊）
+        edge_count = defaultdict(int)
+        for simplex in tri.simplices:
+            for i in range(3):
+                edge = tuple(sorted([simplex[i], simplex[(i + 1) % 3]]))
+                edge_count[edge] += 1
+
+        # Alpha shape：根據邊長過濾
+        mean_dist = np.mean(np.linalg.norm(np.diff(np.sort(points, axis=0)[:100], axis=0), axis=1))
+        alpha_threshold = mean_dist * 5
+
+        boundary_edges = []
+        for edge, count in edge_count.items():
+            p1, p2 = points[edge[0]], points[edge[1]]
+            edge_len = np.linalg.norm(p2 - p1)
+            if count == 1 or edge_len > alpha_threshold:
+                if edge_len <= alpha_threshold * 2:
+                    boundary_edges.append(edge)
+
+        if not boundary_edges:
+            # fallback: convex hull
+            from scipy.spatial import ConvexHull
+            hull = ConvexHull(points)
+            contour = [(float(points[i, 0]), float(points[i, 1])) for i in hull.vertices]
+            contour.append(contour[0])  # 閉合
+            return [contour]
+
+        # 串連邊界邊為輪廓線
+        contours = legacy_chain_edges(boundary_edges, points)
+
+        # 簡化輪廓
+        simplified = []
+        for contour in contours:
+            if len(contour) >= 3:
+                simplified_contour = legacy_douglas_peucker(contour, tolerance)
+                if len(simplified_contour) >= 3:
+                    simplified.append(simplified_contour)
+
+        return simplified
+
+    except Exception as e:
+        print(f"輪廓提取失敗: {e}，使用 ConvexHull 替代")
+        try:
+            from scipy.spatial import ConvexHull
+            hull = ConvexHull(points)
+            contour = [(float(points[i, 0]), float(points[i, 1])) for i in hull.vertices]
+            contour.append(contour[0])
+            return [contour]
+        except Exception:
+            return []
+
+
+def legacy_chain_edges(edges: list, points: np.ndarray) -> list[list[tuple]]:
+    """將離散的邊串連成連續的輪廓線"""
+    from collections import defaultdict
+
+    adj = defaultdict(set)
+    for a, b in edges:
+        adj[a].add(b)
+        adj[b].add(a)
+
+    visited = set()
+    contours = []
+
+    for start in adj:
+        if start in visited:
+            continue
+
+        chain = []
+        current = start
+        prev = None
+
+        while current is not None and current not in visited:
+            visited.add(current)
+            chain.append((float(points[current, 0]), float(points[current, 1])))
+
+            neighbors = adj[current] - {prev}
+            unvisited = neighbors - visited
+            prev = current
+            current = next(iter(unvisited), None)
+
+        if len(chain) >= 3:
+            chain.append(chain[0])  # 閉合
+            contours.append(chain)
+
+    return contours
+
+
+def legacy_douglas_peucker(points: list[tuple], tolerance: float) -> list[tuple]:
+    """Douglas-Peucker 線段簡化演算法"""
+    if len(points) <= 2:
+        return points
+
+    # 找最遠點
+    start = np.array(points[0])
+    end = np.array(points[-1])
+    line_vec = end - start
+    line_len = np.linalg.norm(line_vec)
+
+    if line_len == 0:
+        return [points[0], points[-1]]
+
+    line_unit = line_vec / line_len
+    max_dist = 0
+    max_idx = 0
+
+    for i in range(1, len(points) - 1):
+        p = np.array(points[i])
+        proj = np.dot(p - start, line_unit)
+        proj = np.clip(proj, 0, line_len)
+        closest = start + proj * line_unit
+        dist = np.linalg.norm(p - closest)
+        if dist > max_dist:
+            max_dist = dist
+            max_idx = i
+
+    if max_dist > tolerance:
+        left = legacy_douglas_peucker(points[:max_idx + 1], tolerance)
+        right = legacy_douglas_peucker(points[max_idx:], tolerance)
+        return left[:-1] + right
+    else:
+        return [points[0], points[-1]]
+
+
+def legacy_boundary_edges(points, tri, alpha_threshold):
+    """舊版 _extract_contours 中的邊界邊挑選段落"""
+    from collections import defaultdict
+    edge_count = defaultdict(int)
+    for simplex in tri.simplices:
+        for i in range(3):
+            edge = tuple(sorted([simplex[i], simplex[(i + 1) % 3]]))
+            edge_count[edge] += 1
+    boundary_edges = []
+    for edge, count in edge_count.items():
+        p1, p2 = points[edge[0]], points[edge[1]]
+        edge_len = np.linalg.norm(p2 - p1)
+        if count == 1 or edge_len > alpha_threshold:
+            if edge_len <= alpha_threshold * 2:
+                boundary_edges.append(edge)
+    return boundary_edges
+
+
+# ===== 回歸語料 =====
+
+def corpus(scale: float = 1.0, seed: int = 42) -> list:
+    rng = np.random.default_rng(seed)
+    out = []
+
+    def n_(k):
+        return max(int(k * scale), 10)
+
+    # 房間外牆：矩形環帶（含 TWD97 量級座標平移）
+    for n, offset in ((n_(2000), (0, 0)), (n_(20000), (250000.0, 2700000.0))):
+        t = rng.uniform(0, 1, n)
+        side = rng.integers(0, 4, n)
+        x = np.select([side == 0, side == 1, side == 2], [t * 10, 10 + 0 * t, t * 10], 0 * t)
+        y = np.select([side == 0, side == 1, side == 2], [0 * t, t * 6, 6 + 0 * t], t * 6)
+        out.append(np.column_stack([x, y]) + rng.normal(0, 0.02, (n, 2)) + offset)
+    # 隧道斷面：圓弧 + 底板
+    n = n_(15000)
+    a = rng.uniform(0, np.pi, n)
+    r = 5 + rng.normal(0, 0.02, n)
+    floor = np.column_stack([rng.uniform(-5, 5, n // 5), rng.normal(0, 0.02, n // 5)])
+    out.append(np.vstack([np.column_stack([r * np.cos(a), r * np.sin(a)]), floor]))
+    # 填充面 + 中央孔洞
+    P = rng.uniform(0, 5, (n_(8000), 2))
+    out.append(P[np.hypot(P[:, 0] - 2.5, P[:, 1] - 2.5) > 1])
+    # 多個分離物件
+    out.append(np.vstack([rng.normal(c, 0.3, (n_(1500), 2)) for c in ((0, 0), (5, 0), (0, 5), (5, 5))]))
+    # 格點（大量共圓，距離常出現完全相等）
+    out.append(np.stack(np.meshgrid(np.arange(40.0), np.arange(30.0)), -1).reshape(-1, 2) * 0.05)
+    # 少點 / 共線
+    out.append(rng.uniform(0, 1, (10, 2)))
+    out.append(np.array([[0, 0], [1, 0], [2, 0.0]]))
+    return out
+
+
+def open_polylines(rng, n_lines: int = 40) -> list:
+    """DP 用開放折線：隨機漫步 + 含重複點 + 正弦曲線"""
+    lines = []
+    for i in range(n_lines):
+        n = int(rng.integers(3, 3000))
+        walk = np.cumsum(rng.normal(0, 0.05, (n, 2)), axis=0)
+        if i % 5 == 0:
+            walk = np.repeat(walk, 2, axis=0)
+        lines.append(walk)
+    x = np.linspace(0, 20, 5000)
+    lines.append(np.column_stack([x, np.sin(x)]))
+    lines.append(np.column_stack([x, np.round(np.sin(x), 2)]))
+    return lines
+
+
+def timed(fn, *args):
+    t = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=float, default=1.0, help="語料點數倍率")
+    args = parser.parse_args()
+    from scipy.spatial import Delaunay
+
+    old_total = new_total = 0.0
+    print(f"{'點數':>8}{'邊界邊':>8}{'輪廓':>6}{'舊 ms':>10}{'新 ms':>10}{'加速':>8}")
+    for P in corpus(args.scale):
+        old, old_s = timed(legacy_extract_contours, P, 0.01)
+        new, new_s = timed(se._extract_contours, P, 0.01)
+        assert old == new, f"{len(P)} 點：輪廓結果不一致"
+        old_total += old_s
+        new_total += new_s
+
+        # 逐階段比對：邊界邊與串連（最終輪廓常因閉合線 DP 退化而為空，需單獨驗證）
+        n_edges = 0
+        if len(P) > 3:
+            tri = Delaunay(P)
+            edges, counts = se._count_edges(tri.simplices, len(P))
+            mean_dist = np.mean(np.linalg.norm(np.diff(np.sort(P, axis=0)[:100], axis=0), axis=1))
+            alpha = mean_dist * 5
+            lengths = se._edge_lengths(P, edges, (alpha, alpha * 2))
+            keep = ((counts == 1) | (lengths > alpha)) & (lengths <= alpha * 2)
+            legacy_edges = legacy_boundary_edges(P, tri, alpha)
+            assert [tuple(e) for e in edges[keep].tolist()] == legacy_edges, "邊界邊不一致"
+            n_edges = len(legacy_edges)
+            old_chains = legacy_chain_edges(legacy_edges, P)
+            new_chains = [list(map(tuple, P[c].tolist())) for c in se._chain_edges(edges[keep])]
+            assert old_chains == new_chains, "輪廓串連不一致"
+            for chain in old_chains:
+                opened = chain[:-1]
+                kept = se._douglas_peucker(np.array(opened), 0.01)
+                assert legacy_douglas_peucker(opened, 0.01) == [opened[k] for k in kept], "DP 不一致"
+
+        print(f"{len(P):>8}{n_edges:>8}{len(new):>6}{old_s * 1000:>10.1f}{new_s * 1000:>10.1f}"
+              f"{old_s / max(new_s, 1e-9):>7.1f}x")
+
+    rng = np.random.default_rng(7)
+    dp_old = dp_new = 0.0
+    for line in open_polylines(rng):
+        pts = list(map(tuple, line.tolist()))
+        for tol in (0.0, 0.01, 0.1):
+            old, s1 = timed(legacy_douglas_peucker, pts, tol)
+            kept, s2 = timed(se._douglas_peucker, line, tol)
+            assert old == [pts[k] for k in kept], "DP 不一致"
+            dp_old += s1
+            dp_new += s2
+
+    print(f"\n輪廓提取合計  舊 {old_total * 1000:8.1f} ms → 新 {new_total * 1000:8.1f} ms "
+          f"({old_total / new_total:.1f}x)")
+    print(f"Douglas-Peucker 開放折線  舊 {dp_old * 1000:8.1f} ms → 新 {dp_new * 1000:8.1f} ms "
+          f"({dp_old / dp_new:.1f}x)")
+    print("全部結果一致")
+
+
+if __name__ == "__main__":
+    main()
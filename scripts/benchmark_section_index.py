@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+點雲切面索引 Benchmark
+以合成的帶狀走廊點雲（沿 X 軸延伸的道路/隧道）逐樁切立面，
+比較「每個切面全量遮罩」(舊) 與「SectionIndex 二分搜尋」(新) 的切片時間，並確認切出的點完全相同。
+
+執行：
+  python scripts/benchmark_section_index.py [--points 5000000] [--stations 200]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from construction_brain.pointcloud.loader import PointCloud  # noqa: E402
+from construction_brain.pointcloud.section_extractor import (  # noqa: E402
+    SectionIndex, SectionParams, SectionType, _slice,
+)
+
+
+def corridor_cloud(n_points: int, length: float = 2000.0, seed: int = 0) -> PointCloud:
+    """長 length 公尺、寬 12 m 的路面 + 兩側擋土牆"""
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(0, length, n_points)
+    side = rng.integers(0, 3, n_points)
+    y = np.where(side == 0, rng.uniform(-6, 6, n_points), np.where(side == 1, -6.0, 6.0))
+    z = np.where(side == 0, 0.0, rng.uniform(0, 4, n_points)) + 0.01 * rng.standard_normal(n_points)
+    return PointCloud(points=np.column_stack([x, y, z]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=5_000_000)
+    parser.add_argument("--stations", type=int, default=200)
+    parser.add_argument("--thickness", type=float, default=0.1)
+    args = parser.parse_args()
+
+    pcd = corridor_cloud(args.points)
+    points = pcd.points
+    stations = np.linspace(5, 1995, args.stations)
+    params_list = [SectionParams(section_type=SectionType.ELEVATION_X, position=float(s),
+                                 thickness=args.thickness) for s in stations]
+    print(f"點數 {len(points):,}  樁數 {len(stations)}  厚度 {args.thickness} m")
+
+    t = time.perf_counter()
+    old = [_slice(points, None, ("axis", 0), lambda: points[:, 0], p) for p in params_list]
+    old_s = time.perf_counter() - t
+
+    t = time.perf_counter()
+    index = SectionIndex(points)
+    index.query(("axis", 0), 0.0, 0.0)  # 建立 X 軸索引
+    build_s = time.perf_counter() - t
+    t = time.perf_counter()
+    new = [_slice(points, index, ("axis", 0), None, p) for p in params_list]
+    query_s = time.perf_counter() - t
+
+    for a, b in zip(old, new):
+        assert np.array_equal(a, b), "索引切片結果與全量遮罩不一致"
+    n_out = sum(len(a) for a in old)
+
+    print(f"切片輸出總點數 {n_out:,}")
+    print(f"全量遮罩     {old_s * 1000:9.1f} ms  ({old_s / len(stations) * 1000:.2f} ms/切面)")
+    print(f"索引建立     {build_s * 1000:9.1f} ms  (每軸一次)")
+    print(f"索引查詢     {query_s * 1000:9.1f} ms  ({query_s / len(stations) * 1000:.3f} ms/切面)")
+    print(f"加速（含建立）{old_s / (build_s + query_s):8.1f}x   （不含建立）{old_s / query_s:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+星點對齊 Benchmark
+以合成星空（已知的旋轉 + 平移，模擬地球自轉；另混入數張雲層遮蔽幀）比較
+「逐幀全解析度 ORB + 匹配 + RANSAC」(舊) 與 StarAligner（基準特徵快取、金字塔匹配 + 質心精修）(新)
+的每幀耗時與 homography 誤差（格點投影到真值位置的平均距離），以及壞幀是否在疊圖前被排除。
+行程池的加速取決於核心數，另外列出 align_spool 的總耗時。
+
+執行：
+  python scripts/benchmark_star_align.py [--frames 24] [--width 1920] [--height 1080] [--workers 0]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts" / "starfield"))
+
+from advanced_stack import FrameSpool, StarAligner, align_spool  # noqa: E402
+
+
+def legacy_estimate(ref_gray, img):
+    """舊版 align_to_reference 的單幀流程（每次呼叫重新計算基準特徵）"""
+    orb = cv2.ORB_create(nfeatures=500)
+    ref_kps, ref_des = orb.detectAndCompute(ref_gray, None)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    kps, des = orb.detectAndCompute(gray, None)
+    if des is None or len(kps) < 4:
+        return None
+    good = [p[0] for p in cv2.BFMatcher(cv2.NORM_HAMMING).knnMatch(des, ref_des, k=2)
+            if len(p) == 2 and p[0].distance < 0.75 * p[1].distance]
+    if len(good) < 4:
+        return None
+    src = np.float32([kps[m.queryIdx].pt for m in good])
+    dst = np.float32([ref_kps[m.trainIdx].pt for m in good])
+    M, _ = cv2.findHomography(src, dst, cv2.RANSAC, 5.0)
+    return M
+
+
+def make_frames(n: int, w: int, h: int, n_bad: int, seed: int = 0):
+    """回傳 (frames, 真值 homography 清單（幀 → 基準），壞幀索引)"""
+    rng = np.random.default_rng(seed)
+    sky = np.zeros((h, w), np.float32)
+    for x, y, b in zip(rng.uniform(0, w, 1500), rng.uniform(0, h, 1500), rng.uniform(40, 255, 1500)):
+        cv2.circle(sky, (int(x), int(y)), 1, float(b), -1)
+    sky = cv2.GaussianBlur(sky, (0, 0), 1.2)
+    pole = (w * 0.3, -h * 2.0)  # 天極在畫面外，星點繞極旋轉
+    frames, affines = [], []
+    bad = set(rng.choice(np.arange(1, n), n_bad, replace=False).tolist()) if n_bad else set()
+    for i in range(n):
+        A = cv2.getRotationMatrix2D(pole, 0.02 * i, 1.0)
+        A[:, 2] += rng.normal(0, 2, 2)
+        img = cv2.warpAffine(sky, A, (w, h)) + rng.normal(12, 3, (h, w))
+        if i in bad:  # 雲層：大範圍亮霧 + 星點消失
+            img = cv2.GaussianBlur(img, (0, 0), 25) + 60
+        frames.append(cv2.cvtColor(np.clip(img, 0, 255).astype(np.uint8), cv2.COLOR_GRAY2BGR))
+        affines.append(np.vstack([A, [0, 0, 1]]))
+    truths = [affines[0] @ np.linalg.inv(A) for A in affines]
+    return frames, truths, bad
+
+
+def error_px(M, truth, w, h):
+    if M is None:
+        return float("nan")
+    grid = np.float32([(x, y) for x in np.linspace(0, w, 5) for y in np.linspace(0, h, 5)]).reshape(-1, 1, 2)
+    a = cv2.perspectiveTransform(grid, M.astype(np.float64))
+    b = cv2.perspectiveTransform(grid, truth)
+    return float(np.mean(np.linalg.norm(a - b, axis=2)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=24)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--bad", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=0)
+    args = parser.parse_args()
+
+    w, h = args.width, args.height
+    frames, truths, bad = make_frames(args.frames, w, h, args.bad)
+    good_idx = [i for i in range(1, args.frames) if i not in bad]
+    print(f"{args.frames} 幀 {w}x{h}，雲層遮蔽幀 {sorted(bad)}")
+
+    ref_gray = cv2.cvtColor(frames[0], cv2.COLOR_BGR2GRAY)
+    t = time.perf_counter()
+    legacy = {i: legacy_estimate(ref_gray, frames[i]) for i in range(1, args.frames)}
+    old_ms = (time.perf_counter() - t) * 1000 / (args.frames - 1)
+    old_err = np.array([error_px(legacy[i], truths[i], w, h) for i in good_idx])
+    old_bad = sum(legacy[i] is not None for i in bad)
+    print(f"舊（全解析度，每幀重算基準）      {old_ms:7.1f} ms/幀  誤差中位數 {np.nanmedian(old_err):6.2f} px  "
+          f"誤差 >5 px {int(np.sum(~(old_err <= 5)))} 幀  壞幀仍被對齊 {old_bad}/{len(bad)}")
+
+    for levels in (0, 1):
+        aligner = StarAligner(frames[0], pyramid_levels=levels)
+        t = time.perf_counter()
+        est = {i: aligner.estimate(frames[i], i) for i in range(1, args.frames)}
+        ms = (time.perf_counter() - t) * 1000 / (args.frames - 1)
+        err = np.array([error_px(est[i][0], truths[i], w, h) for i in good_idx])
+        kept_bad = sum(est[i][1].ok for i in bad)
+        lost_good = sum(not est[i][1].ok for i in good_idx)
+        resid = np.mean([est[i][1].residual_px for i in good_idx if est[i][1].ok])
+        print(f"新（金字塔 {levels} 層，基準快取）    {ms:7.1f} ms/幀  誤差中位數 {np.nanmedian(err):6.2f} px  "
+              f"誤差 >5 px {int(np.sum(err > 5))} 幀  殘差 {resid:4.2f} px  "
+              f"壞幀仍被對齊 {kept_bad}/{len(bad)}  好幀被排除 {lost_good}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spool = FrameSpool(tmp, args.frames, frames[0].shape)
+        for f in frames:
+            spool.append(f)
+        with spool:
+            t = time.perf_counter()
+            results = align_spool(spool, workers=args.workers, pyramid_levels=1)
+            total = time.perf_counter() - t
+            rejected = sorted(r.index for r in results if not r.ok)
+            print(f"align_spool：{total:.2f} s，排除 {rejected}，剩餘 {len(spool)} 幀")
+
+
+if __name__ == "__main__":
+    main()
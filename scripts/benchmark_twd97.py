@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+TWD97 ↔ WGS84 批次投影 Benchmark
+比較逐點呼叫純量 TM2 公式（舊）與 numpy 向量化分塊計算（新）的吞吐量 (點/秒)，並列出最大差異。
+
+執行：
+  python scripts/benchmark_twd97.py [--points 2000000] [--scalar-points 50000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from construction_brain.pointcloud.coordinate import (  # noqa: E402
+    batch_twd97_to_wgs84, batch_wgs84_to_twd97, twd97_to_wgs84, wgs84_to_twd97,
+)
+
+
+def scalar_batch(fn, coords):
+    """舊版 batch_*：逐點呼叫純量函式"""
+    result = np.zeros_like(coords)
+    for i in range(len(coords)):
+        result[i] = fn(coords[i, 0], coords[i, 1], coords[i, 2])
+    return result
+
+
+def rate(n, seconds):
+    return f"{n / seconds:>14,.0f} 點/秒"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=2_000_000)
+    parser.add_argument("--scalar-points", type=int, default=50_000,
+                        help="逐點版只跑這麼多點（太慢）")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    lonlat = np.column_stack([rng.uniform(119.5, 122.0, args.points),
+                              rng.uniform(21.9, 25.3, args.points),
+                              rng.uniform(0, 500, args.points)])
+    ns = min(args.scalar_points, args.points)
+
+    for name, scalar_fn, vec_fn, src in (
+        ("WGS84 → TWD97", wgs84_to_twd97, batch_wgs84_to_twd97, lonlat),
+        ("TWD97 → WGS84", twd97_to_wgs84, batch_twd97_to_wgs84, batch_wgs84_to_twd97(lonlat)),
+    ):
+        t = time.perf_counter()
+        ref = scalar_batch(scalar_fn, src[:ns])
+        scalar_s = time.perf_counter() - t
+
+        t = time.perf_counter()
+        out = vec_fn(src)
+        vec_s = time.perf_counter() - t
+
+        diff = np.abs(out[:ns, :2] - ref[:, :2]).max()
+        unit = "m" if name.endswith("TWD97") else "°"
+        print(f"{name}")
+        print(f"  逐點   {ns:>10,} 點 {scalar_s:8.3f} s {rate(ns, scalar_s)}")
+        print(f"  向量化 {len(src):>10,} 點 {vec_s:8.3f} s {rate(len(src), vec_s)}")
+        print(f"  加速 {(len(src) / vec_s) / (ns / scalar_s):.0f}x   最大差異 {diff:.2e} {unit}")
+
+
+if __name__ == "__main__":
+    main()
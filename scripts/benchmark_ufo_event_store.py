@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+UFO 事件查詢 Benchmark
+產生 N 筆合成事件 JSON，比較
+「/api/history 掃描 glob + 逐檔 json.load、/api/stats 逐筆重算」(舊) 與
+UFOEventStore（SQLite 索引分頁查詢 + 增量統計表）(新) 的查詢延遲，並驗證篩選結果一致。
+
+執行：
+  python scripts/benchmark_ufo_event_store.py [--events 2000 10000] [--repeat 5]
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts" / "starfield"))
+
+from ufo_event_store import UFOEventStore  # noqa: E402
+
+CLASSES = ["airplane", "satellite", "meteor", "bird", "insect", "ufo"]
+
+
+def make_events(n: int):
+    rng = random.Random(0)
+    t0 = datetime(2026, 1, 1, 20, 0, 0)
+    events = []
+    for i in range(n):
+        start = t0 + timedelta(seconds=i * 37)
+        cls = rng.choice(CLASSES)
+        events.append({
+            "event_id": f"UFO-{start.strftime('%Y%m%d-%H%M%S')}-{i}",
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(seconds=5)).isoformat(),
+            "classification": cls,
+            "confidence": round(rng.random(), 2),
+            "duration_sec": round(rng.uniform(0.5, 20), 1),
+            "avg_speed": round(rng.uniform(0, 400), 1),
+            "max_speed": round(rng.uniform(400, 800), 1),
+            "trajectory_points": rng.randint(3, 300),
+            "trajectory_length_px": round(rng.uniform(10, 900), 1),
+            "avg_brightness": round(rng.uniform(20, 255), 1),
+            "is_flashing": cls == "airplane",
+            "flash_frequency": 1.0 if cls == "airplane" else 0.0,
+            "screenshot_path": "", "trail_image_path": "",
+            "trajectory": [[rng.uniform(0, 640), rng.uniform(0, 480)] for _ in range(60)],
+        })
+    return events
+
+
+def legacy_history(event_dir: Path, limit: int):
+    events = []
+    for f in sorted(event_dir.glob("UFO-*.json"), reverse=True)[:limit]:
+        with open(f, encoding="utf-8") as fp:
+            events.append(json.load(fp))
+    return events
+
+
+def legacy_filter(event_dir: Path, classification: str, min_speed: float, limit: int):
+    """舊版要依分類 + 速度篩選全部歷史時只能讀取所有檔案"""
+    events = []
+    for f in sorted(event_dir.glob("UFO-*.json"), reverse=True):
+        with open(f, encoding="utf-8") as fp:
+            e = json.load(fp)
+        if e["classification"] == classification and e["avg_speed"] >= min_speed:
+            events.append(e)
+    return len(events), events[:limit]
+
+
+def legacy_stats(event_dir: Path):
+    events = legacy_history(event_dir, None)
+    durations = [e["duration_sec"] for e in events]
+    speeds = [e["avg_speed"] for e in events if e["avg_speed"] > 0]
+    return {"avg_duration": round(sum(durations) / len(durations), 1),
+            "avg_speed": round(sum(speeds) / len(speeds), 1),
+            "ufo_count": sum(1 for e in events if e["classification"] == "ufo")}
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, nargs="+", default=[2000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for n in args.events:
+        with tempfile.TemporaryDirectory() as tmp:
+            event_dir = Path(tmp)
+            events = make_events(n)
+            for e in events:
+                with open(event_dir / f"{e['event_id']}.json", "w", encoding="utf-8") as f:
+                    json.dump(e, f, ensure_ascii=False, indent=2)
+
+            t = time.perf_counter()
+            store = UFOEventStore(event_dir / "events.db")
+            store.add_many(events)
+            import_ms = (time.perf_counter() - t) * 1000
+
+            rows = [
+                ("歷史 100 筆", lambda: legacy_history(event_dir, 100),
+                 lambda: store.query(limit=100, full=True)["events"]),
+                ("ufo 且速度≥200 第 1 頁", lambda: legacy_filter(event_dir, "ufo", 200, 50)[1],
+                 lambda: store.query(classification="ufo", min_speed=200, limit=50, full=True)["events"]),
+                ("統計", lambda: legacy_stats(event_dir), store.stats),
+            ]
+            print(f"事件 {n:,} 筆（匯入資料庫 {import_ms:.0f} ms）")
+            for name, old_fn, new_fn in rows:
+                old_ms, old = timeit(old_fn, args.repeat)
+                new_ms, new = timeit(new_fn, args.repeat)
+                if isinstance(old, list):
+                    same = [e["event_id"] for e in old] == [e["event_id"] for e in new]
+                else:
+                    same = all(old[k] == new[k] for k in old)
+                print(f"  {name:<18} 舊 {old_ms:9.1f} ms │ 新 {new_ms:7.2f} ms  "
+                      f"×{old_ms / max(new_ms, 1e-3):7.0f}  結果一致 {same}")
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+UFO 多路串流 Benchmark
+以合成夜空來源（synthetic://，即時 15 fps）模擬 N 台攝影機，其中一路使用昂貴的 night_sky 預設
+（非局部均值降噪），其餘為 raw，比較：
+  舊：每路一個 AppState 式偵測迴圈（各自執行緒，偵測完 sleep 10 ms），多台攝影機 = 多個行程
+  新：MultiStreamRuntime（共用 worker、虛擬時間公平排程、全域 CPU 預算）
+輸出每路偵測 fps、擷取→偵測延遲 p95、實際使用核心數，以及每多一個行程的啟動（import）成本。
+
+執行：
+  python scripts/benchmark_ufo_multistream.py [--streams 4] [--seconds 15] [--cpu-budget 0.5]
+"""
+import argparse
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+ROOT = Path(__file__).resolve().parent.parent
+STARFIELD = ROOT / "scripts" / "starfield"
+sys.path.insert(0, str(STARFIELD))
+
+from ufo_multistream import DetectionStream, MultiStreamRuntime  # noqa: E402
+
+
+def stream_specs(n: int):
+    return [(f"cam{i}", f"synthetic://?objects=2&seed={i}", "night_sky" if i == 0 else "raw")
+            for i in range(n)]
+
+
+def run_legacy(specs, seconds, out_dir):
+    """每路一條獨立偵測迴圈（等同各開一個 ufo_web_service）"""
+    streams = [DetectionStream(sid, url, preset=preset, output_dir=out_dir) for sid, url, preset in specs]
+    running = True
+
+    def loop(stream):
+        seq = 0
+        while running:
+            item = stream.mailbox.get(seq, timeout=0.5)
+            if item is None:
+                continue
+            seq, frame, _ = item
+            t = time.perf_counter()
+            stream.process(frame)
+            stream._stats["busy_sec"] += time.perf_counter() - t
+            time.sleep(0.01)
+
+    for s in streams:
+        s.start()
+    threads = [threading.Thread(target=loop, args=(s,), daemon=True) for s in streams]
+    cpu, t = time.process_time(), time.perf_counter()
+    for th in threads:
+        th.start()
+    time.sleep(seconds)
+    cores = (time.process_time() - cpu) / (time.perf_counter() - t)
+    running = False
+    for th in threads:
+        th.join(timeout=5)
+    stats = [s.get_stats() for s in streams]
+    for s in streams:
+        s.stop()
+    return cores, stats
+
+
+def run_runtime(specs, seconds, out_dir, cpu_budget):
+    runtime = MultiStreamRuntime(cpu_budget=cpu_budget, output_dir=out_dir)
+    for sid, url, preset in specs:
+        runtime.add_stream(sid, url, preset=preset)
+    cpu, t = time.process_time(), time.perf_counter()
+    time.sleep(seconds)
+    cores = (time.process_time() - cpu) / (time.perf_counter() - t)
+    stats = runtime.get_stats()
+    runtime.stop()
+    return cores, stats["streams"]
+
+
+def import_cost() -> float:
+    t = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import ufo_multistream"], cwd=STARFIELD, check=True)
+    return time.perf_counter() - t
+
+
+def report(name, cores, stats, seconds):
+    print(f"{name}  使用 {cores:4.2f} 核心")
+    for s in stats:
+        print(f"    {s['stream_id']:<6} {s['preset']:<10} {s['processed'] / seconds:5.1f} fps  "
+              f"{s['process_ms_avg']:7.1f} ms/幀  CPU {s['cpu_sec']:5.2f} s  "
+              f"延遲 p95 {s['latency_ms']['p95']:7.1f} ms  丟棄 {s['dropped']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=15.0)
+    parser.add_argument("--cpu-budget", type=float, default=0.5, help="新版全域 CPU 預算（核心）")
+    args = parser.parse_args()
+
+    specs = stream_specs(args.streams)
+    per_proc = import_cost()
+    print(f"{args.streams} 路合成串流（cam0 = night_sky，其餘 raw），每組 {args.seconds:.0f} 秒")
+    print(f"行程啟動（import）成本 {per_proc:.2f} s/行程 → 舊 {per_proc * args.streams:.2f} s，新 {per_proc:.2f} s\n")
+    with TemporaryDirectory() as tmp:
+        cores, stats = run_legacy(specs, args.seconds, tmp)
+        report("舊（每路獨立迴圈）           ", cores, stats, args.seconds)
+    with TemporaryDirectory() as tmp:
+        cores, stats = run_runtime(specs, args.seconds, tmp, args.cpu_budget)
+        report(f"新（runtime，預算 {args.cpu_budget} 核心）", cores, stats, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+星空 UFO 追蹤器 Benchmark
+以合成軌跡（成對交會的等速物體 + 漏偵測 + 雜訊亮點）比較
+「Python 雙迴圈距離矩陣 + 貪心匹配 + 差分速度」(舊) 與
+「NumPy 批次卡爾曼 + 負對數似然成本 + 匈牙利法」(新) 的每幀處理速度與 ID 互換次數；
+未安裝 SciPy 時新版退回貪心匹配，一併列出。
+
+執行：
+  python scripts/benchmark_ufo_tracker.py [--objects 60] [--frames 300] [--clutter 40]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts" / "starfield"))
+
+import ufo_detector  # noqa: E402
+from ufo_detector import Detection, MultiTracker, Track  # noqa: E402
+
+
+class LegacyMultiTracker(MultiTracker):
+    """舊版 update：逐對計算距離、貪心最近鄰、以最後兩點差分外推"""
+
+    def update(self, detections):
+        now = time.time()
+        for t in self.tracks:
+            if len(t.detections) >= 2:
+                t.predicted_x = t.detections[-1].cx + t.velocity_x
+                t.predicted_y = t.detections[-1].cy + t.velocity_y
+            elif t.detections:
+                t.predicted_x = t.detections[-1].cx
+                t.predicted_y = t.detections[-1].cy
+        used_det, used_trk = set(), set()
+        if self.tracks and detections:
+            costs = np.zeros((len(self.tracks), len(detections)))
+            for i, t in enumerate(self.tracks):
+                for j, d in enumerate(detections):
+                    costs[i, j] = np.sqrt((t.predicted_x - d.cx) ** 2 + (t.predicted_y - d.cy) ** 2)
+            while True:
+                min_val = costs.min() if costs.size > 0 else self.max_distance + 1
+                if min_val > self.max_distance:
+                    break
+                i, j = np.unravel_index(costs.argmin(), costs.shape)
+                if i in used_trk or j in used_det:
+                    costs[i, j] = 99999
+                    continue
+                trk = self.tracks[i]
+                trk.detections.append(detections[j])
+                trk.missed = 0
+                trk.age += 1
+                trk.last_seen = now
+                if len(trk.detections) >= 2:
+                    d_prev, d_curr = trk.detections[-2], trk.detections[-1]
+                    dt = d_curr.timestamp - d_prev.timestamp
+                    if dt > 0:
+                        trk.velocity_x = (d_curr.cx - d_prev.cx) / dt * 0.033
+                        trk.velocity_y = (d_curr.cy - d_prev.cy) / dt * 0.033
+                        speed = np.sqrt((d_curr.cx - d_prev.cx) ** 2 + (d_curr.cy - d_prev.cy) ** 2) / dt
+                        trk.speed_px_per_sec = 0.7 * trk.speed_px_per_sec + 0.3 * speed
+                used_trk.add(i)
+                used_det.add(j)
+                costs[i, :] = 99999
+                costs[:, j] = 99999
+        for j, d in enumerate(detections):
+            if j not in used_det:
+                t = Track(color=self._get_color(), first_seen=now, last_seen=now)
+                t.detections.append(d)
+                t.predicted_x, t.predicted_y = d.cx, d.cy
+                self.tracks.append(t)
+        for i, t in enumerate(self.tracks):
+            if i not in used_trk:
+                t.missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+        return [t for t in self.tracks if t.age >= self.min_hits]
+
+
+def make_scenario(n_objects: int, n_frames: int, n_clutter: int, fps: float = 15.0,
+                  p_detect: float = 0.9, noise_px: float = 1.5, seed: int = 0):
+    """
+    成對物體在畫面中各自的交會點相遇（飛機 / 衛星交錯），速度 20~120 px/s。
+    回傳每幀的 (detections, gt_ids)，雜訊亮點的 gt_id 為 -1。
+    """
+    rng = np.random.default_rng(seed)
+    w, h = 1920, 1080
+    t_cross = n_frames / fps / 2
+    starts, vels = [], []
+    for _ in range(n_objects // 2):
+        meet = rng.uniform([300, 200], [w - 300, h - 200])
+        for _ in range(2):
+            ang = rng.uniform(0, 2 * np.pi)
+            v = rng.uniform(20, 120) * np.array([np.cos(ang), np.sin(ang)])
+            vels.append(v)
+            # 兩者通過交會點的時間相差 ±0.5 秒，路徑交錯但不完全重疊
+            starts.append(meet - v * (t_cross + rng.uniform(-0.5, 0.5)))
+    starts, vels = np.array(starts), np.array(vels)
+
+    frames = []
+    for f in range(n_frames):
+        ts = f / fps
+        pos = starts + vels * ts + rng.normal(0, noise_px, starts.shape)
+        dets, gt = [], []
+        visible = (rng.random(len(pos)) < p_detect) & (pos[:, 0] > 0) & (pos[:, 0] < w) & \
+            (pos[:, 1] > 0) & (pos[:, 1] < h)
+        for k in np.flatnonzero(visible):
+            dets.append(pos[k])
+            gt.append(int(k))
+        for c in rng.uniform([0, 0], [w, h], (n_clutter, 2)):
+            dets.append(c)
+            gt.append(-1)
+        order = rng.permutation(len(dets))
+        frames.append(([Detection(x=int(dets[i][0]), y=int(dets[i][1]), w=3, h=3,
+                                  cx=float(dets[i][0]), cy=float(dets[i][1]), area=9,
+                                  brightness=80.0, max_brightness=120.0, frame_id=f, timestamp=ts)
+                        for i in order], [gt[i] for i in order]))
+    return frames
+
+
+def run(tracker: MultiTracker, frames) -> dict:
+    """回傳每幀耗時與 ID 互換次數（物體被指派的軌跡 ID 與前一次不同）"""
+    last_id = {}
+    switches = 0
+    elapsed = 0.0
+    for dets, gt in frames:
+        t = time.perf_counter()
+        tracker.update(dets)
+        elapsed += time.perf_counter() - t
+        owner = {id(trk.detections[-1]): trk.track_id for trk in tracker.tracks
+                 if trk.missed == 0 and trk.age >= tracker.min_hits}
+        for d, g in zip(dets, gt):
+            tid = owner.get(id(d))
+            if g < 0 or tid is None:
+                continue
+            if g in last_id and last_id[g] != tid:
+                switches += 1
+            last_id[g] = tid
+    return {"fps": len(frames) / elapsed, "switches": switches}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--objects", type=int, default=60)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--clutter", type=int, default=40)
+    args = parser.parse_args()
+
+    frames = make_scenario(args.objects, args.frames, args.clutter)
+    n_det = sum(len(d) for d, _ in frames) / len(frames)
+    print(f"物體 {args.objects}（{args.objects // 2} 組交會）  幀數 {args.frames}  "
+          f"每幀雜訊 {args.clutter}  平均偵測 {n_det:.0f}/幀")
+
+    kw = dict(max_missed=15, min_hits=3, max_distance=80, frame_interval=1 / 15)
+    old = run(LegacyMultiTracker(**kw), frames)
+    new = run(MultiTracker(**kw), frames)
+    lsa, ufo_detector.linear_sum_assignment = ufo_detector.linear_sum_assignment, None
+    greedy = run(MultiTracker(**kw), frames)
+    ufo_detector.linear_sum_assignment = lsa
+    print(f"舊（雙迴圈 + 貪心）          {old['fps']:8.1f} 幀/秒  ID 互換 {old['switches']:>4}")
+    print(f"新（卡爾曼 + 貪心，無 SciPy）{greedy['fps']:8.1f} 幀/秒  ID 互換 {greedy['switches']:>4}")
+    print(f"新（卡爾曼 + 匈牙利）        {new['fps']:8.1f} 幀/秒  ID 互換 {new['switches']:>4}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,19 +3,29 @@
 星空攝影 — 進階疊圖引擎
 功能：
   - Sigma clipping（去除飛機/衛星軌跡等異常值）
-  - Star alignment（星點對齊，補償地球自轉）
+  - Star alignment（星點對齊，補償地球自轉；行程池並行、金字塔匹配、殘差過大的幀排除）
   - Star trails（星軌模式，max 疊圖 + 漸變尾巴）
   - Dark frame calibration（暗場校正，減去暗電流雜訊）
   - 自動曝光偵測（跳過過亮幀）
+  - 分塊串流疊圖（幀逐張寫入磁碟暫存，依列區塊多執行緒疊合，記憶體上限可設定）
 """
 
 import argparse
 import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 import cv2
 import numpy as np
 from pathlib import Path
 from datetime import datetime
 
+# 分塊疊圖每個像素值（幀 × 列 × 寬 × 通道）的工作記憶體估計：
+# float32 堆疊 + NaN 遮罩副本 + nanmean/nanstd 暫存 + 布林遮罩，約 32 bytes
+TILE_BYTES_PER_VALUE = 32
+DEFAULT_MEMORY_MB = 1024
+
 
 # ---------------------------------------------------------------------------
 # 工具函式
@@ -71,14 +81,16 @@ def filter_bright_frames(imgs: list, files: list = None,
 # Dark Frame Calibration
 # ---------------------------------------------------------------------------
 
-def create_master_dark(dark_dir: str, pattern: str = "*.png") -> np.ndarray:
-    """從暗場目錄建立 master dark frame（中位數疊合）"""
-    _, darks = load_images(dark_dir, pattern)
-    if len(darks) < 1:
+def create_master_dark(dark_dir: str, pattern: str = "*.png", work_dir: str = None,
+                       memory_mb: float = DEFAULT_MEMORY_MB) -> np.ndarray:
+    """從暗場目錄建立 master dark frame（分塊中位數疊合）"""
+    files = sorted(Path(dark_dir).glob(pattern))
+    spool, _, _ = spool_frames(files, work_dir or str(Path(dark_dir).parent))
+    if spool is None:
         raise ValueError(f"暗場目錄中找不到影像：{dark_dir}")
-    print(f"建立 Master Dark：{len(darks)} 張暗場影像")
-    stack = np.array(darks, dtype=np.float32)
-    master = np.median(stack, axis=0)
+    with spool:
+        print(f"建立 Master Dark：{len(spool)} 張暗場影像")
+        master, _ = tiled_stack(spool, "median", memory_mb=memory_mb)
     return master
 
 
@@ -96,24 +108,20 @@ def apply_dark_calibration(imgs: list, master_dark: np.ndarray) -> list:
 # Sigma Clipping Stack
 # ---------------------------------------------------------------------------
 
-def sigma_clip_stack(imgs: list, sigma: float = 2.5, iterations: int = 3) -> np.ndarray:
+def _sigma_clip_block(stack: np.ndarray, sigma: float, iterations: int):
     """
-    Sigma clipping 疊圖 — 逐像素去除超過 sigma 倍標準差的異常值後取平均
-    有效去除飛機、衛星、流星等短暫亮點
+    對 (N, ...) float32 堆疊做 sigma clipping，回傳 (平均值 float32, 各迭代排除數)
+    每個像素獨立計算，因此分塊處理與整張處理結果逐位元相同
     """
-    if len(imgs) < 3:
-        print("⚠️ Sigma clipping 需要至少 3 張影像，改用 median")
-        stack = np.array(imgs, dtype=np.float32)
-        return np.median(stack, axis=0).astype(np.uint8)
-
-    stack = np.array(imgs, dtype=np.float32)  # (N, H, W, C)
     mask = np.ones(stack.shape, dtype=bool)    # True = 保留
+    rejected = []
 
-    for iteration in range(iterations):
+    for _ in range(iterations):
         masked = np.where(mask, stack, np.nan)
         with np.errstate(all='ignore'):
             mean = np.nanmean(masked, axis=0)   # (H, W, C)
             std = np.nanstd(masked, axis=0)      # (H, W, C)
+        del masked
 
         # 標記超出 sigma 倍標準差的像素
         lower = mean - sigma * std
@@ -126,95 +134,436 @@ def sigma_clip_stack(imgs: list, sigma: float = 2.5, iterations: int = 3) -> np.
             new_mask[:, too_few] = mask[:, too_few]
         changed = (mask != new_mask).sum()
         mask = new_mask
-        print(f"  Sigma clip 迭代 {iteration+1}/{iterations}：排除 {(~mask).sum()} 個像素值")
+        rejected.append(int((~mask).sum()))
         if changed == 0:
             break
 
     masked = np.where(mask, stack, np.nan)
     with np.errstate(all='ignore'):
         result = np.nanmean(masked, axis=0)
+    return result, rejected
+
+
+def sigma_clip_stack(imgs: list, sigma: float = 2.5, iterations: int = 3) -> np.ndarray:
+    """
+    Sigma clipping 疊圖 — 逐像素去除超過 sigma 倍標準差的異常值後取平均
+    有效去除飛機、衛星、流星等短暫亮點
+    整個堆疊一次載入記憶體；大量全解析度幀請改用 FrameSpool + tiled_stack
+    """
+    if len(imgs) < 3:
+        print("⚠️ Sigma clipping 需要至少 3 張影像，改用 median")
+        stack = np.array(imgs, dtype=np.float32)
+        return np.median(stack, axis=0).astype(np.uint8)
+
+    stack = np.array(imgs, dtype=np.float32)  # (N, H, W, C)
+    result, rejected = _sigma_clip_block(stack, sigma, iterations)
+    for i, n in enumerate(rejected):
+        print(f"  Sigma clip 迭代 {i+1}/{iterations}：排除 {n} 個像素值")
     result = np.clip(result, 0, 255).astype(np.uint8)
     return result
 
 
+# ---------------------------------------------------------------------------
+# 分塊串流疊圖
+# ---------------------------------------------------------------------------
+
+class FrameSpool:
+    """
+    磁碟暫存的影格堆疊 — 逐張寫入 np.memmap (N, H, W, C) uint8
+    疊圖時依列區塊讀取所有幀，記憶體用量與幀數、解析度脫鉤
+    """
+
+    def __init__(self, work_dir: str, capacity: int, shape: tuple):
+        self.shape = tuple(shape)
+        self.capacity = capacity
+        fd, self.path = tempfile.mkstemp(prefix="frames_", suffix=".u8", dir=work_dir)
+        os.close(fd)
+        self._data = np.memmap(self.path, dtype=np.uint8, mode="w+",
+                               shape=(max(capacity, 1),) + self.shape)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        if not -self.count <= i < self.count:
+            raise IndexError(i)
+        return self._data[i % self.count]
+
+    def __setitem__(self, i: int, img: np.ndarray):
+        if not -self.count <= i < self.count:
+            raise IndexError(i)
+        self._data[i % self.count] = img
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self._data[i]
+
+    def append(self, img: np.ndarray) -> bool:
+        """寫入一幀；尺寸不符或已滿時回傳 False"""
+        if img.shape != self.shape or self.count >= self.capacity:
+            return False
+        self._data[self.count] = img
+        self.count += 1
+        return True
+
+    def compact(self, keep: list):
+        """只保留 keep 中的幀（依原順序前移），用於排除對齊失敗等壞幀"""
+        for new_i, old_i in enumerate(keep):
+            if new_i != old_i:
+                self._data[new_i] = self._data[old_i]
+        self.count = len(keep)
+
+    def flush(self):
+        self._data.flush()
+
+    def rows(self, y0: int, y1: int) -> np.ndarray:
+        """所有幀的第 y0~y1 列，(N, y1-y0, W, C) 唯讀視圖"""
+        return self._data[:self.count, y0:y1]
+
+    def close(self):
+        if self._data is not None:
+            self._data.flush()
+            self._data._mmap.close()
+            self._data = None
+            Path(self.path).unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def spool_frames(files: list, work_dir: str,
+                 max_brightness: float = None, min_brightness: float = None,
+                 master_dark: np.ndarray = None):
+    """
+    逐張讀取影像 → 曝光過濾 → 暗場校正 → 寫入 FrameSpool，同時只有一幀在記憶體中
+    回傳 (spool, kept_files, brightness_report)；report 格式與 filter_bright_frames 相同
+    """
+    report = {"total": 0, "kept": 0, "rejected_bright": 0,
+              "rejected_dark": 0, "brightness_values": []}
+    spool = None
+    kept = []
+    for f in files:
+        img = cv2.imread(str(f))
+        if img is None:
+            continue
+        report["total"] += 1
+        if max_brightness is not None or min_brightness is not None:
+            b = frame_brightness(img)
+            report["brightness_values"].append(round(b, 2))
+            if max_brightness is not None and b > max_brightness:
+                report["rejected_bright"] += 1
+                continue
+            if min_brightness is not None and b < min_brightness:
+                report["rejected_dark"] += 1
+                continue
+        if master_dark is not None:
+            img = apply_dark_calibration([img], master_dark)[0]
+        if spool is None:
+            spool = FrameSpool(work_dir, len(files), img.shape)
+        if not spool.append(img):
+            print(f"  {Path(f).name}: 尺寸 {img.shape} 與第一幀 {spool.shape} 不符，略過")
+            continue
+        kept.append(f)
+    report["kept"] = len(kept)
+    return spool, kept, report
+
+
+def _reduce_block(block: np.ndarray, method: str, sigma: float, iterations: int):
+    """單一列區塊的疊合，回傳 (float32 結果, 各迭代排除數)"""
+    if method == "sigma_clip" and len(block) >= 3:
+        return _sigma_clip_block(block, sigma, iterations)
+    if method in ("sigma_clip", "median"):
+        return np.median(block, axis=0), []
+    if method == "mean":
+        return np.mean(block, axis=0), []
+    raise ValueError(f"不支援的分塊疊圖方法：{method}")
+
+
+def plan_tiles(n_frames: int, shape: tuple, memory_mb: float, workers: int) -> int:
+    """依記憶體上限計算每塊列數：workers 塊同時處理時總工作記憶體不超過 memory_mb"""
+    row_values = n_frames * int(np.prod(shape[1:]))
+    per_tile = memory_mb * 1024 * 1024 / max(workers, 1)
+    return int(max(1, min(shape[0], per_tile // (row_values * TILE_BYTES_PER_VALUE))))
+
+
+def tiled_stack(spool: FrameSpool, method: str = "sigma_clip",
+                sigma: float = 2.5, iterations: int = 3,
+                memory_mb: float = DEFAULT_MEMORY_MB, workers: int = 0):
+    """
+    分塊疊圖：影像依列切成區塊，每塊讀取所有幀的同一區域後疊合，
+    各區塊以執行緒池並行（NumPy 運算期間釋放 GIL）
+
+    method: sigma_clip | median | mean
+    回傳 (float32 結果 (H, W, C), 資訊 dict)
+    """
+    n = len(spool)
+    if n == 0:
+        raise ValueError("沒有可疊合的影像")
+    workers = workers or os.cpu_count() or 1
+    h = spool.shape[0]
+    tile_rows = plan_tiles(n, spool.shape, memory_mb, workers)
+    tiles = [(y, min(y + tile_rows, h)) for y in range(0, h, tile_rows)]
+    workers = min(workers, len(tiles))
+    if method == "sigma_clip" and n < 3:
+        print("⚠️ Sigma clipping 需要至少 3 張影像，改用 median")
+
+    result = np.empty(spool.shape, dtype=np.float32)
+    rejected = [0] * iterations
+
+    def work(tile):
+        y0, y1 = tile
+        block = np.asarray(spool.rows(y0, y1), dtype=np.float32)
+        out, rej = _reduce_block(block, method, sigma, iterations)
+        result[y0:y1] = out
+        return rej
+
+    print(f"  分塊疊圖：{len(tiles)} 塊 × {tile_rows} 列，{workers} 執行緒，記憶體上限 {memory_mb:.0f} MB")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i, rej in enumerate(pool.map(work, tiles)):
+            # 提早收斂的區塊，之後的迭代排除數維持不變
+            for k in range(iterations):
+                rejected[k] += rej[min(k, len(rej) - 1)] if rej else 0
+            if (i + 1) % 10 == 0 or i + 1 == len(tiles):
+                print(f"  疊圖進度：{i+1}/{len(tiles)} 塊")
+    if method == "sigma_clip" and n >= 3:
+        for k, total in enumerate(rejected):
+            print(f"  Sigma clip 迭代 {k+1}/{iterations}：排除 {total} 個像素值")
+
+    info = {"frames": n, "tiles": len(tiles), "tile_rows": tile_rows,
+            "workers": workers, "memory_mb": memory_mb}
+    if method == "sigma_clip" and n >= 3:
+        info["sigma_rejected"] = rejected
+    return result, info
+
+
 # ---------------------------------------------------------------------------
 # Star Alignment
 # ---------------------------------------------------------------------------
 
-def detect_stars(gray: np.ndarray, max_stars: int = 200) -> np.ndarray:
-    """偵測星點，回傳 keypoints 座標陣列 (N, 2)"""
-    # 用 ORB 偵測亮點特徵
+def detect_stars(gray: np.ndarray, max_stars: int = 200):
+    """偵測星點，回傳 (座標陣列 (N, 2) float32, ORB 描述子)"""
     orb = cv2.ORB_create(nfeatures=max_stars)
-    # 先做閾值處理突出星點
-    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
     kps, des = orb.detectAndCompute(gray, None)
-    if kps is None or len(kps) == 0:
-        return np.array([]), None
+    if kps is None or len(kps) == 0 or des is None:
+        return np.empty((0, 2), dtype=np.float32), None
     pts = np.array([kp.pt for kp in kps], dtype=np.float32)
     return pts, des
 
 
-def align_to_reference(imgs: list, ref_index: int = 0) -> list:
+def refine_centroids(gray: np.ndarray, pts: np.ndarray, radius: int = 3) -> np.ndarray:
+    """以 (2r+1)² 視窗內扣除背景後的亮度加權質心修正星點位置（次像素）"""
+    h, w = gray.shape[:2]
+    out = pts.astype(np.float32).copy()
+    for k, (x, y) in enumerate(pts):
+        xi, yi = int(round(x)), int(round(y))
+        x0, x1 = max(xi - radius, 0), min(xi + radius + 1, w)
+        y0, y1 = max(yi - radius, 0), min(yi + radius + 1, h)
+        win = gray[y0:y1, x0:x1].astype(np.float32)
+        if win.size == 0:
+            continue
+        win = win - win.min()
+        total = win.sum()
+        if total <= 0:
+            continue
+        ys, xs = np.mgrid[y0:y1, x0:x1]
+        out[k] = ((xs * win).sum() / total, (ys * win).sum() / total)
+    return out
+
+
+@dataclass
+class AlignResult:
+    """單幀對齊結果；residual_px 為 RANSAC 內點的重投影 RMS 誤差（全解析度 px）"""
+    index: int
+    ok: bool
+    matches: int = 0
+    inliers: int = 0
+    residual_px: float = 0.0
+    reason: str = ""
+
+
+class StarAligner:
+    """
+    星點對齊引擎 — 基準影像特徵只計算一次，之後每幀：
+      1. 在金字塔縮小層（pyramid_levels 次 pyrDown）偵測 ORB 並匹配，RANSAC 求 homography
+      2. 有縮小層時，把內點放大回全解析度，以亮度質心修正兩邊位置後重新擬合
+      3. 計算內點重投影殘差，內點太少或殘差過大即判定失敗
+    """
+
+    def __init__(self, reference: np.ndarray, max_features: int = 1000,
+                 pyramid_levels: int = 1, ratio: float = 0.75,
+                 ransac_px: float = 5.0, max_residual_px: float = 2.0,
+                 min_inliers: int = 8):
+        self.max_features = max_features
+        self.pyramid_levels = pyramid_levels
+        self.ratio = ratio
+        self.ransac_px = ransac_px
+        self.max_residual_px = max_residual_px
+        self.min_inliers = min_inliers
+        self.scale = 2 ** pyramid_levels
+        self.ref_gray = self._gray(reference)
+        self.ref_pts, self.ref_des = detect_stars(self._downscale(self.ref_gray), max_features)
+        self._matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
+        self._buffer = None
+
+    @property
+    def ready(self) -> bool:
+        return self.ref_des is not None and len(self.ref_pts) >= 4
+
+    @staticmethod
+    def _gray(img: np.ndarray) -> np.ndarray:
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+    def _downscale(self, gray: np.ndarray) -> np.ndarray:
+        for _ in range(self.pyramid_levels):
+            gray = cv2.pyrDown(gray)
+        return gray
+
+    def estimate(self, img: np.ndarray, index: int = 0):
+        """估計 img → 基準影像的 homography，回傳 (M 或 None, AlignResult)"""
+        gray = self._gray(img)
+        pts, des = detect_stars(self._downscale(gray), self.max_features)
+        if des is None or len(pts) < 4:
+            return None, AlignResult(index, False, reason="特徵點不足")
+
+        good = []
+        for pair in self._matcher.knnMatch(des, self.ref_des, k=2):
+            # Lowe's ratio test
+            if len(pair) == 2 and pair[0].distance < self.ratio * pair[1].distance:
+                good.append(pair[0])
+        if len(good) < 4:
+            return None, AlignResult(index, False, len(good), reason="匹配點不足")
+
+        src = pts[[m.queryIdx for m in good]] * self.scale
+        dst = self.ref_pts[[m.trainIdx for m in good]] * self.scale
+        M, inlier = cv2.findHomography(src, dst, cv2.RANSAC, self.ransac_px)
+        if M is None:
+            return None, AlignResult(index, False, len(good), reason="無法估計 homography")
+        inlier = inlier.ravel().astype(bool)
+        src, dst = src[inlier], dst[inlier]
+
+        if self.scale > 1 and len(src) >= 4:
+            # 全解析度精修：縮小層的位置誤差會被放大 scale 倍
+            src = refine_centroids(gray, src)
+            dst = refine_centroids(self.ref_gray, dst)
+            refined, _ = cv2.findHomography(src, dst, 0)
+            if refined is not None:
+                M = refined
+
+        proj = cv2.perspectiveTransform(src.reshape(-1, 1, 2), M).reshape(-1, 2)
+        residual = float(np.sqrt(np.mean(np.sum((proj - dst) ** 2, axis=1)))) if len(src) else float("inf")
+        result = AlignResult(index, True, len(good), len(src), round(residual, 3))
+        if len(src) < self.min_inliers:
+            result.ok, result.reason = False, "內點不足"
+        elif residual > self.max_residual_px:
+            result.ok, result.reason = False, "殘差過大"
+        return (M if result.ok else None), result
+
+    def warp_into(self, img: np.ndarray, M: np.ndarray, out: np.ndarray):
+        """透過預先配置的暫存區 warp，再寫入 out（可與 img 為同一塊記憶體）"""
+        if self._buffer is None or self._buffer.shape != img.shape:
+            self._buffer = np.empty_like(img)
+        h, w = self.ref_gray.shape[:2]
+        cv2.warpPerspective(img, M, (w, h), dst=self._buffer)
+        out[...] = self._buffer
+
+
+# 對齊子行程狀態（由 _align_worker_init 建立，每個行程一份）
+_ALIGN_WORKER = {}
+
+
+def _align_worker_init(path: str, shape: tuple, ref_index: int, aligner_kwargs: dict):
+    data = np.memmap(path, dtype=np.uint8, mode="r+", shape=shape)
+    _ALIGN_WORKER["data"] = data
+    _ALIGN_WORKER["aligner"] = StarAligner(np.array(data[ref_index]), **aligner_kwargs)
+
+
+def _align_worker(index: int) -> AlignResult:
+    data, aligner = _ALIGN_WORKER["data"], _ALIGN_WORKER["aligner"]
+    M, result = aligner.estimate(data[index], index)
+    if M is not None:
+        aligner.warp_into(data[index], M, data[index])
+    return result
+
+
+def align_spool(spool: FrameSpool, ref_index: int = 0, workers: int = 0,
+                reject: bool = True, **aligner_kwargs) -> list:
+    """
+    以行程池對齊 FrameSpool 內所有幀，warp 結果直接寫回磁碟暫存
+    每個子行程各自開啟 memmap 並只建立一次基準特徵；reject=True 時移除對齊失敗的幀
+    回傳每幀的 AlignResult（索引為對齊前的位置）
+    """
+    n = len(spool)
+    ref = StarAligner(spool[ref_index], **aligner_kwargs)
+    if n < 2 or not ref.ready:
+        if not ref.ready:
+            print("⚠️ 基準影像無法偵測特徵點，跳過對齊")
+        return [AlignResult(i, i == ref_index) for i in range(n)]
+
+    spool.flush()
+    targets = [i for i in range(n) if i != ref_index]
+    workers = min(workers or os.cpu_count() or 1, len(targets))
+    results = {ref_index: AlignResult(ref_index, True)}
+    if workers <= 1:
+        for i in targets:
+            M, results[i] = ref.estimate(spool[i], i)
+            if M is not None:
+                ref.warp_into(spool[i], M, spool[i])
+    else:
+        init = (spool.path, (spool.capacity,) + spool.shape, ref_index, aligner_kwargs)
+        with ProcessPoolExecutor(workers, initializer=_align_worker_init, initargs=init) as pool:
+            for done, result in enumerate(pool.map(_align_worker, targets, chunksize=4), 1):
+                results[result.index] = result
+                if done % 10 == 0:
+                    print(f"  對齊進度：{done}/{len(targets)}")
+    results = [results[i] for i in range(n)]
+
+    for r in results:
+        if not r.ok:
+            print(f"  幀 {r.index}: {r.reason}（匹配 {r.matches}、內點 {r.inliers}、殘差 {r.residual_px} px）")
+    ok = sum(r.ok for r in results)
+    print(f"星點對齊完成：{ok}/{n} 張成功，{workers} 行程")
+    if reject and ok < n:
+        spool.compact([r.index for r in results if r.ok])
+        print(f"  已排除 {n - ok} 張對齊失敗的幀")
+    return results
+
+
+def align_to_reference(imgs: list, ref_index: int = 0, in_place: bool = False,
+                       **aligner_kwargs) -> list:
     """
     以第一張為基準，對齊所有影像（使用 ORB 特徵匹配 + Homography）
-    適用於補償地球自轉造成的星點位移
+    適用於補償地球自轉造成的星點位移；對齊失敗的幀保留原圖
+    in_place=True 時對齊結果直接寫回 imgs，不另外保留整組影像
     """
     if len(imgs) < 2:
         return imgs
 
-    ref = cv2.cvtColor(imgs[ref_index], cv2.COLOR_BGR2GRAY)
-    orb = cv2.ORB_create(nfeatures=500)
-    ref_kps, ref_des = orb.detectAndCompute(ref, None)
-
-    if ref_des is None:
+    aligner = StarAligner(imgs[ref_index], **aligner_kwargs)
+    if not aligner.ready:
         print("⚠️ 基準影像無法偵測特徵點，跳過對齊")
         return imgs
 
-    bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
-    aligned = []
-    h, w = ref.shape[:2]
-    success = 0
-
+    aligned = imgs if in_place else list(imgs)
+    success = 1
     for i, img in enumerate(imgs):
         if i == ref_index:
-            aligned.append(img)
-            success += 1
-            continue
-
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        kps, des = orb.detectAndCompute(gray, None)
-
-        if des is None or len(kps) < 4:
-            print(f"  幀 {i}: 特徵點不足，使用原圖")
-            aligned.append(img)
             continue
-
-        matches = bf.knnMatch(des, ref_des, k=2)
-        # Lowe's ratio test
-        good = []
-        for m_pair in matches:
-            if len(m_pair) == 2:
-                m, n = m_pair
-                if m.distance < 0.75 * n.distance:
-                    good.append(m)
-
-        if len(good) < 4:
-            print(f"  幀 {i}: 匹配點不足 ({len(good)})，使用原圖")
-            aligned.append(img)
+        M, result = aligner.estimate(img, i)
+        if M is None:
+            print(f"  幀 {i}: {result.reason}，使用原圖")
             continue
-
-        src_pts = np.float32([kps[m.queryIdx].pt for m in good]).reshape(-1, 1, 2)
-        dst_pts = np.float32([ref_kps[m.trainIdx].pt for m in good]).reshape(-1, 1, 2)
-
-        M, mask_h = cv2.findHomography(src_pts, dst_pts, cv2.RANSAC, 5.0)
-        if M is not None:
-            warped = cv2.warpPerspective(img, M, (w, h))
-            aligned.append(warped)
-            success += 1
-            if (i + 1) % 10 == 0:
-                print(f"  對齊進度：{i+1}/{len(imgs)}")
+        if in_place:
+            aligner.warp_into(img, M, img)
         else:
-            aligned.append(img)
+            aligned[i] = np.empty_like(img)
+            aligner.warp_into(img, M, aligned[i])
+        success += 1
+        if (i + 1) % 10 == 0:
+            print(f"  對齊進度：{i+1}/{len(imgs)}")
 
     print(f"星點對齊完成：{success}/{len(imgs)} 張成功")
     return aligned
@@ -266,71 +615,88 @@ def advanced_stack(input_dir: str, output_path: str = None,
                    max_brightness: float = 80.0,
                    min_brightness: float = 5.0,
                    trail_decay: float = 0.95,
-                   max_count: int = 0) -> dict:
+                   max_count: int = 0,
+                   memory_mb: float = DEFAULT_MEMORY_MB,
+                   workers: int = 0,
+                   work_dir: str = None,
+                   pyramid_levels: int = 1,
+                   max_residual_px: float = 2.0) -> dict:
     """
     進階疊圖主函式
 
     method: sigma_clip | median | mean | star_trails | star_trails_fade
+    影像逐張讀入並寫入 work_dir（預設為輸入目錄的上層）的暫存檔，
+    sigma_clip / median / mean 依 memory_mb 分塊並行疊合，星軌模式逐幀累積
+    align=True 時以行程池對齊（pyramid_levels 層縮小匹配 + 全解析度精修），
+    殘差超過 max_residual_px 的幀在疊圖前排除
     """
     print(f"=== 進階疊圖引擎 ===")
     print(f"方法：{method}")
     print(f"輸入：{input_dir}")
 
-    # 載入影像
-    files, imgs = load_images(input_dir, pattern, max_count)
-    if len(imgs) < 2:
-        raise ValueError(f"影像不足：找到 {len(imgs)} 張，至少需要 2 張")
-    print(f"載入 {len(imgs)} 張影像")
+    files = sorted(Path(input_dir).glob(pattern))
+    if max_count > 0:
+        files = files[:max_count]
+    work_dir = work_dir or str(Path(input_dir).parent)
 
+    # Dark frame 校正（先建立 master dark，載入時逐幀扣除）
+    master_dark = None
+    if dark_dir:
+        print(f"載入暗場校正：{dark_dir}")
+        master_dark = create_master_dark(dark_dir, pattern, work_dir, memory_mb)
+
+    # 載入 + 自動曝光過濾 + 暗場校正，逐幀寫入磁碟暫存
+    spool, _, brightness_report = spool_frames(
+        files, work_dir, max_brightness, min_brightness, master_dark)
     report = {
         "method": method,
         "input_dir": str(input_dir),
-        "total_frames": len(imgs),
+        "total_frames": brightness_report["total"],
         "timestamp": datetime.now().isoformat()
     }
-
-    # 自動曝光過濾
-    imgs, files, brightness_report = filter_bright_frames(
-        imgs, files, max_brightness, min_brightness)
     report["brightness_filter"] = brightness_report
-    if len(imgs) < 2:
+    if spool is None or len(spool) < 2:
+        if spool is not None:
+            spool.close()
+        if brightness_report["total"] < 2:
+            raise ValueError(f"影像不足：找到 {brightness_report['total']} 張，至少需要 2 張")
         raise ValueError(f"過濾後影像不足：{brightness_report['kept']} 張")
-    print(f"曝光過濾後：{len(imgs)} 張（排除 {brightness_report['rejected_bright']} 過亮、"
+    print(f"載入 {brightness_report['total']} 張影像")
+    print(f"曝光過濾後：{len(spool)} 張（排除 {brightness_report['rejected_bright']} 過亮、"
           f"{brightness_report['rejected_dark']} 過暗）")
 
-    # Dark frame 校正
-    if dark_dir:
-        print(f"載入暗場校正：{dark_dir}")
-        master_dark = create_master_dark(dark_dir, pattern)
-        imgs = apply_dark_calibration(imgs, master_dark)
-        report["dark_calibration"] = True
-        # 儲存 master dark
-        dark_out = str(Path(input_dir).parent / "master_dark.png")
-        cv2.imwrite(dark_out, master_dark.astype(np.uint8))
-        print(f"Master Dark 已儲存 → {dark_out}")
-
-    # 星點對齊
-    if align and method not in ("star_trails", "star_trails_fade"):
-        print("執行星點對齊...")
-        imgs = align_to_reference(imgs)
-        report["alignment"] = True
-
-    # 疊圖
-    print(f"開始疊圖（{method}）...")
-    if method == "sigma_clip":
-        result = sigma_clip_stack(imgs, sigma, sigma_iterations)
-    elif method == "median":
-        stack = np.array(imgs, dtype=np.float32)
-        result = np.median(stack, axis=0).astype(np.uint8)
-    elif method == "mean":
-        stack = np.array(imgs, dtype=np.float32)
-        result = np.mean(stack, axis=0).astype(np.uint8)
-    elif method == "star_trails":
-        result = star_trails_max(imgs)
-    elif method == "star_trails_fade":
-        result = star_trails_fade(imgs, trail_decay)
-    else:
-        raise ValueError(f"不支援的方法：{method}")
+    with spool:
+        if master_dark is not None:
+            report["dark_calibration"] = True
+            # 儲存 master dark
+            dark_out = str(Path(input_dir).parent / "master_dark.png")
+            cv2.imwrite(dark_out, master_dark.astype(np.uint8))
+            print(f"Master Dark 已儲存 → {dark_out}")
+
+        # 星點對齊（結果直接寫回暫存）
+        if align and method not in ("star_trails", "star_trails_fade"):
+            print("執行星點對齊...")
+            results = align_spool(spool, workers=workers, pyramid_levels=pyramid_levels,
+                                  max_residual_px=max_residual_px)
+            report["alignment"] = {
+                "rejected": sum(not r.ok for r in results),
+                "frames": [asdict(r) for r in results],
+            }
+            if len(spool) < 2:
+                raise ValueError(f"對齊後影像不足：{len(spool)} 張")
+
+        # 疊圖
+        print(f"開始疊圖（{method}）...")
+        if method in ("sigma_clip", "median", "mean"):
+            result, report["tiling"] = tiled_stack(
+                spool, method, sigma, sigma_iterations, memory_mb, workers)
+            result = np.clip(result, 0, 255).astype(np.uint8)
+        elif method == "star_trails":
+            result = star_trails_max(spool)
+        elif method == "star_trails_fade":
+            result = star_trails_fade(spool, trail_decay)
+        else:
+            raise ValueError(f"不支援的方法：{method}")
 
     # 儲存結果
     if output_path is None:
@@ -374,13 +740,23 @@ def main():
                         help="星軌漸變衰減係數（預設 0.95）")
     parser.add_argument("--max-count", type=int, default=0,
                         help="最大載入幀數（0=全部）")
+    parser.add_argument("--memory-mb", type=float, default=DEFAULT_MEMORY_MB,
+                        help=f"分塊疊圖記憶體上限 MB（預設 {DEFAULT_MEMORY_MB}）")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="分塊疊圖執行緒數 / 對齊行程數（0=CPU 核心數）")
+    parser.add_argument("--work-dir", help="幀暫存檔目錄（預設為輸入目錄的上層）")
+    parser.add_argument("--pyramid-levels", type=int, default=1,
+                        help="對齊時縮小匹配的金字塔層數（0=全解析度，預設 1）")
+    parser.add_argument("--max-residual", type=float, default=2.0,
+                        help="對齊殘差上限 px，超過則排除該幀（預設 2.0）")
     args = parser.parse_args()
 
     advanced_stack(
         args.input_dir, args.output, args.method, args.pattern,
         args.dark_dir, args.sigma, args.sigma_iter, args.align,
         args.max_brightness, args.min_brightness, args.trail_decay,
-        args.max_count
+        args.max_count, args.memory_mb, args.workers, args.work_dir,
+        args.pyramid_levels, args.max_residual
     )
 
 
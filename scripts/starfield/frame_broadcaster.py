@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+WebSocket 畫面廣播 — 每張新畫面只編碼一次，分送給所有觀看者
+
+  - 偵測執行緒呼叫 publish(frame)，廣播任務在 event loop 中把 JPEG 編碼丟到執行緒池，一張畫面一次
+  - 畫面以二進位 WebSocket 訊息送出（不再 base64 + JSON），統計等 metadata 另以小型 JSON 訊息送出
+  - 每個觀看者只保留「最新一張」待送畫面：慢速連線直接跳過過期畫面而不是排隊，
+    新增觀看者只多一次 send，不多任何編碼 / 序列化
+  - 事件通知（events）不會被丟棄，依序送出
+"""
+
+import asyncio
+import json
+import threading
+import time
+from typing import Callable, List, Optional
+
+import cv2
+import numpy as np
+
+
+class _Viewer:
+    """單一觀看者的送出狀態（最新畫面 / 最新 metadata 各一格，事件排隊）"""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.frame: Optional[bytes] = None
+        self.meta: Optional[str] = None
+        self.events: List[str] = []
+        self.wake = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+        self.connected_at = time.time()
+
+    def offer(self, frame: Optional[bytes], meta: Optional[str], events: Optional[str]):
+        if frame is not None:
+            if self.frame is not None:
+                self.dropped += 1   # 上一張還沒送出 → 直接換成最新的
+            self.frame = frame
+        if meta is not None:
+            self.meta = meta
+        if events is not None:
+            self.events.append(events)
+        self.wake.set()
+
+
+class FrameBroadcaster:
+    """
+    一對多畫面廣播
+
+    Args:
+        meta_fn: 產生 metadata dict 的函式（每張畫面呼叫一次，所有觀看者共用序列化結果）
+        events_fn: 回傳自上次呼叫以來的新事件 list（有事件才送）
+        quality: JPEG 品質
+        max_fps: 廣播上限，偵測跑得比這快時只送最新畫面
+        meta_interval: metadata 最短間隔秒數（有新事件時不受限）
+    """
+
+    def __init__(self, meta_fn: Callable[[], dict] = None,
+                 events_fn: Callable[[], list] = None,
+                 quality: int = 70, max_fps: float = 25.0,
+                 meta_interval: float = 0.5):
+        self.meta_fn = meta_fn
+        self.events_fn = events_fn
+        self.quality = quality
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.meta_interval = meta_interval
+        self._viewers = {}                    # ws → _Viewer
+        self._lock = threading.Lock()
+        self._pending = None                  # 偵測執行緒交過來的最新畫面
+        self._seq = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._new_frame: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_meta = 0.0
+        self._stats = {"published": 0, "encoded": 0, "skipped": 0,
+                       "encode_ms": 0.0, "bytes_encoded": 0}
+
+    # ----- 生命週期（於 event loop 中呼叫） -----
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._new_frame = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    # ----- 生產端（任何執行緒） -----
+
+    def publish(self, frame: np.ndarray):
+        """交出最新標註畫面；沒有觀看者時不做任何事"""
+        if not self._viewers or self._loop is None:
+            return
+        with self._lock:
+            if self._pending is not None:
+                self._stats["skipped"] += 1
+            self._pending = frame
+            self._seq += 1
+            self._stats["published"] += 1
+        self._loop.call_soon_threadsafe(self._new_frame.set)
+
+    # ----- 觀看者 -----
+
+    async def serve(self, ws):
+        """服務一個已 accept 的 WebSocket，直到斷線"""
+        viewer = _Viewer(ws)
+        if not self._viewers and self.events_fn:
+            self.events_fn()    # 沒有觀看者期間累積的事件不補送
+        self._viewers[ws] = viewer
+        try:
+            while True:
+                await viewer.wake.wait()
+                viewer.wake.clear()
+                events, viewer.events = viewer.events, []
+                meta, viewer.meta = viewer.meta, None
+                frame, viewer.frame = viewer.frame, None
+                for text in events:
+                    await ws.send_text(text)
+                if meta is not None:
+                    await ws.send_text(meta)
+                if frame is not None:
+                    await ws.send_bytes(frame)
+                    viewer.sent += 1
+                    viewer.bytes_sent += len(frame)
+        finally:
+            self._viewers.pop(ws, None)
+
+    @property
+    def viewer_count(self) -> int:
+        return len(self._viewers)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        encoded = max(stats["encoded"], 1)
+        stats["encode_ms_avg"] = round(stats.pop("encode_ms") / encoded, 2)
+        stats["viewers"] = [{"sent": v.sent, "dropped": v.dropped, "bytes_sent": v.bytes_sent,
+                             "connected_sec": round(time.time() - v.connected_at, 1)}
+                            for v in list(self._viewers.values())]
+        return stats
+
+    # ----- 廣播任務 -----
+
+    def _encode(self, frame: np.ndarray) -> bytes:
+        t = time.perf_counter()
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        with self._lock:
+            self._stats["encoded"] += 1
+            self._stats["encode_ms"] += (time.perf_counter() - t) * 1000
+            self._stats["bytes_encoded"] += len(buf) if ok else 0
+        return buf.tobytes() if ok else b""
+
+    async def _run(self):
+        last_sent = 0.0
+        while True:
+            await self._new_frame.wait()
+            self._new_frame.clear()
+            wait = self.min_interval - (time.monotonic() - last_sent)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            with self._lock:
+                frame, self._pending = self._pending, None
+            if frame is None or not self._viewers:
+                continue
+            last_sent = time.monotonic()
+            jpeg = await self._loop.run_in_executor(None, self._encode, frame)
+            if not jpeg:
+                continue
+
+            events = self.events_fn() if self.events_fn else None
+            events_msg = json.dumps({"type": "events", "events": events},
+                                    ensure_ascii=False) if events else None
+            meta_msg = None
+            if self.meta_fn and (events_msg or last_sent - self._last_meta >= self.meta_interval):
+                self._last_meta = last_sent
+                meta_msg = json.dumps({"type": "meta", "seq": self._seq, **self.meta_fn()},
+                                      ensure_ascii=False)
+            for viewer in list(self._viewers.values()):
+                viewer.offer(jpeg, meta_msg, events_msg)
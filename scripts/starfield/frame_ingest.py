@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+攝影機畫面接收 — JPEG 解碼移出 event loop + 單格最新畫面信箱
+
+  - CameraIngest.submit(jpg_bytes) 只暫存最新一筆 bytes，立即返回（可在 asyncio handler 中呼叫）
+  - 背景執行緒解碼；JPEG 夠大時直接以 IMREAD_REDUCED_COLOR_2/4/8 縮小解碼到接近偵測解析度
+  - 解碼結果放進 FrameMailbox：只保留最新一張，消費端以 Condition 等待新畫面（不用 sleep 輪詢）
+  - 來不及解碼 / 來不及偵測的畫面直接覆蓋並計數，不排隊造成延遲累積
+"""
+
+import struct
+import threading
+import time
+from collections import deque
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# SOF 標記（排除 DHT 0xC4、JPG 0xC8、DAC 0xCC）
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """只讀 JPEG 標頭取得 (寬, 高)；格式不符回傳 None"""
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    i = 2
+    n = len(data)
+    while i + 9 < n:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:          # 填充位元組
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        seg_len = struct.unpack(">H", data[i + 2:i + 4])[0]
+        if marker in _SOF_MARKERS:
+            h, w = struct.unpack(">HH", data[i + 5:i + 9])
+            return w, h
+        i += 2 + seg_len
+    return None
+
+
+def decode_jpeg(data: bytes, target_size: Optional[Tuple[int, int]] = None) -> Optional[np.ndarray]:
+    """
+    解碼 JPEG；指定 target_size=(寬, 高) 時選擇不小於目標的最大 DCT 縮小倍率解碼，
+    再縮放成剛好 target_size
+    """
+    scale = 1
+    size = jpeg_size(data) if target_size else None
+    if size:
+        for s in (8, 4, 2):
+            if size[0] // s >= target_size[0] and size[1] // s >= target_size[1]:
+                scale = s
+                break
+    frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), _REDUCED_FLAGS[scale])
+    if frame is not None and target_size and (frame.shape[1], frame.shape[0]) != tuple(target_size):
+        frame = cv2.resize(frame, tuple(target_size), interpolation=cv2.INTER_AREA)
+    return frame
+
+
+class FrameMailbox:
+    """單格最新畫面信箱：put 覆蓋舊畫面，get 等待比 last_seq 新的畫面"""
+
+    def __init__(self, latency_window: int = 200):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._ts = 0.0
+        self._seq = 0
+        self._taken = 0
+        self._closed = False
+        self.put_count = 0
+        self.dropped = 0
+        self._latency = deque(maxlen=latency_window)
+
+    def put(self, frame: np.ndarray, ts: float = None):
+        """放入最新畫面；ts 為畫面收到的時間（time.time()），用於計算延遲"""
+        with self._cond:
+            if self._seq > self._taken:
+                self.dropped += 1   # 上一張還沒被取走
+            self._frame = frame
+            self._ts = ts if ts is not None else time.time()
+            self._seq += 1
+            self.put_count += 1
+            self._cond.notify_all()
+
+    def get(self, last_seq: int = 0, timeout: float = None):
+        """等待 seq > last_seq 的畫面，回傳 (seq, frame, ts)；逾時或已關閉回傳 None"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > last_seq or self._closed, timeout):
+                return None
+            if self._seq <= last_seq:
+                return None
+            self._taken = self._seq
+            self._latency.append(time.time() - self._ts)
+            return self._seq, self._frame, self._ts
+
+    @property
+    def latest_seq(self) -> int:
+        """最新畫面的序號（不等待、不取走）"""
+        return self._seq
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            lat = sorted(self._latency)
+            return {
+                "frames": self.put_count,
+                "dropped": self.dropped,
+                "latency_ms": {
+                    "p50": round(lat[len(lat) // 2] * 1000, 1) if lat else 0.0,
+                    "p95": round(lat[int(len(lat) * 0.95)] * 1000, 1) if lat else 0.0,
+                    "max": round(lat[-1] * 1000, 1) if lat else 0.0,
+                },
+            }
+
+
+class CameraIngest:
+    """
+    JPEG 串流接收：submit 於 event loop 呼叫，解碼在專屬執行緒完成後放進 mailbox
+
+    Args:
+        target_size: 解碼輸出尺寸 (寬, 高)，None 表示原尺寸
+    """
+
+    def __init__(self, target_size: Optional[Tuple[int, int]] = (640, 480),
+                 mailbox: FrameMailbox = None):
+        self.target_size = target_size
+        self.mailbox = mailbox or FrameMailbox()
+        self._cond = threading.Condition()
+        self._pending: Optional[Tuple[bytes, float]] = None
+        self._closed = False
+        self._stats = {"received": 0, "decoded": 0, "skipped": 0, "errors": 0, "decode_ms": 0.0}
+        self._thread = threading.Thread(target=self._run, name="camera-ingest", daemon=True)
+        self._thread.start()
+
+    def submit(self, data: bytes, recv_ts: float = None):
+        """交出一筆 JPEG；前一筆尚未開始解碼時直接取代（計入 skipped）"""
+        with self._cond:
+            if self._pending is not None:
+                self._stats["skipped"] += 1
+            self._pending = (data, recv_ts if recv_ts is not None else time.time())
+            self._stats["received"] += 1
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._closed)
+                if self._closed:
+                    return
+                (data, recv_ts), self._pending = self._pending, None
+            t = time.perf_counter()
+            frame = decode_jpeg(data, self.target_size)
+            elapsed = (time.perf_counter() - t) * 1000
+            with self._cond:
+                if frame is None:
+                    self._stats["errors"] += 1
+                    continue
+                self._stats["decoded"] += 1
+                self._stats["decode_ms"] += elapsed
+            self.mailbox.put(frame, recv_ts)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self.mailbox.close()
+        self._thread.join(timeout=2)
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+        stats["decode_ms_avg"] = round(stats.pop("decode_ms") / max(stats["decoded"], 1), 2)
+        mb = self.mailbox.get_stats()
+        stats["dropped"] = stats["skipped"] + mb["dropped"]
+        stats["latency_ms"] = mb["latency_ms"]
+        return stats
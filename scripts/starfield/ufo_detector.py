@@ -7,7 +7,7 @@ UFO 偵測引擎 — Tapo C230 夜空不明飛行物偵測
   3. 星點排除 — 靜態亮點過濾（星星不動）
   4. 軌跡追蹤 — 多幀關聯 + 卡爾曼濾波預測
   5. 物體分類 — 依亮度/速度/軌跡形狀/閃爍模式分類
-  6. 事件記錄 — 自動截圖 + JSON 事件日誌
+  6. 事件記錄 — 自動截圖 + JSON 事件日誌 + SQLite 事件資料庫
 """
 
 import os
@@ -18,11 +18,19 @@ import numpy as np
 import json
 import time
 import uuid
+from collections import deque
 from dataclasses import dataclass, field, asdict
 from datetime import datetime
 from pathlib import Path
 from typing import List, Optional, Tuple
 
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # 未安裝 SciPy 時追蹤器退回貪心匹配
+    linear_sum_assignment = None
+
+from ufo_event_store import UFOEventStore
+
 
 # ---------------------------------------------------------------------------
 # 資料結構
@@ -51,7 +59,7 @@ class Track:
     detections: List[Detection] = field(default_factory=list)
     predicted_x: float = 0.0
     predicted_y: float = 0.0
-    velocity_x: float = 0.0
+    velocity_x: float = 0.0  # px/sec（卡爾曼估計）
     velocity_y: float = 0.0
     speed_px_per_sec: float = 0.0
     age: int = 0             # 存活幀數
@@ -63,6 +71,8 @@ class Track:
     last_seen: float = 0.0
     is_flashing: bool = False
     flash_frequency: float = 0.0
+    kf_state: Optional[np.ndarray] = field(default=None, repr=False)  # [x, y, vx, vy]
+    kf_cov: Optional[np.ndarray] = field(default=None, repr=False)    # 4x4 共變異數
 
     def __post_init__(self):
         if not self.track_id:
@@ -90,6 +100,7 @@ class UFOEvent:
     bbox_last: dict
     screenshot_path: str = ""
     trail_image_path: str = ""
+    stream_id: str = ""          # 多路串流時的來源 ID
 
 
 # ---------------------------------------------------------------------------
@@ -309,14 +320,40 @@ class SkyObjectClassifier:
 # ---------------------------------------------------------------------------
 
 class MultiTracker:
-    """多物體追蹤器（簡化版 SORT）"""
+    """
+    多物體追蹤器（SORT）
+    - 等速卡爾曼濾波：以預測位置與不確定度做關聯，短暫漏偵測時沿速度外推
+    - 最佳指派：SciPy linear_sum_assignment（匈牙利法），避免交會時貪心匹配造成 ID 互換；
+      已確認軌跡優先匹配（matching cascade），雜訊產生的暫定軌跡只能用剩下的偵測
+    - 所有軌跡的預測、距離矩陣與更新皆以 NumPy 批次計算
+    """
+
+    _H = np.array([[1.0, 0, 0, 0], [0, 1.0, 0, 0]])
 
     def __init__(self, max_missed: int = 15, min_hits: int = 3,
-                 max_distance: float = 80.0):
+                 max_distance: float = 80.0, frame_interval: float = 1 / 15,
+                 accel_noise: float = 50.0, meas_noise: float = 3.0,
+                 init_speed_std: float = 100.0, miss_cost: float = 6.0):
+        """
+        Args:
+            max_distance: 關聯閘門（預測位置與偵測中心距離，px）
+            frame_interval: 偵測時間戳無法提供間隔時使用的幀間隔（秒）
+            accel_noise: 過程雜訊，加速度標準差（px/s²）
+            meas_noise: 量測雜訊，偵測中心標準差（px）
+            init_speed_std: 新軌跡初始速度不確定度（px/s）
+            miss_cost: 軌跡 / 偵測不匹配的成本（與負對數似然同單位），越小越不願意配對
+        """
         self.tracks: List[Track] = []
+        self.removed: List[Track] = []   # 本次 update 移除的過期軌跡（供事件結算）
         self.max_missed = max_missed
         self.min_hits = min_hits
         self.max_distance = max_distance
+        self.frame_interval = frame_interval
+        self.accel_noise = accel_noise
+        self.meas_noise = meas_noise
+        self.init_speed_std = init_speed_std
+        self.miss_cost = miss_cost
+        self._last_time: Optional[float] = None
         self.next_color_idx = 0
         self.colors = [
             (0, 255, 0), (255, 255, 0), (0, 255, 255), (255, 0, 255),
@@ -328,86 +365,141 @@ class MultiTracker:
         self.next_color_idx += 1
         return c
 
+    def _predict(self, X: np.ndarray, P: np.ndarray, dt: float) -> Tuple[np.ndarray, np.ndarray]:
+        """批次預測 (T, 4), (T, 4, 4)"""
+        F = np.eye(4)
+        F[0, 2] = F[1, 3] = dt
+        G = np.array([[dt * dt / 2, 0], [0, dt * dt / 2], [dt, 0], [0, dt]])
+        Q = G @ G.T * self.accel_noise ** 2
+        return X @ F.T, F @ P @ F.T + Q
+
+    def _correct(self, X: np.ndarray, P: np.ndarray, Z: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """批次量測更新（只量測位置）"""
+        S = P[:, :2, :2] + np.eye(2) * self.meas_noise ** 2
+        K = P[:, :, :2] @ np.linalg.inv(S)                       # (m, 4, 2)
+        X = X + np.einsum("mij,mj->mi", K, Z - X[:, :2])
+        P = P - K @ P[:, :2, :]
+        return X, P
+
+    def _assign(self, costs: np.ndarray, gated: np.ndarray) -> List[Tuple[int, int]]:
+        """在閘門內求總成本最小的一對一指派"""
+        if not gated.any():
+            return []
+        if linear_sum_assignment is not None:
+            # 只有閘門內有候選的軌跡 / 偵測需要求解
+            rows = np.flatnonzero(gated.any(axis=1))
+            cols = np.flatnonzero(gated.any(axis=0))
+            sub_gated = gated[np.ix_(rows, cols)]
+            # 擴充矩陣：軌跡 / 偵測各可選擇「不匹配」（成本 miss_cost），
+            # 否則求解器會為了多配一對而讓真實軌跡讓出偵測給雜訊軌跡
+            n, m = sub_gated.shape
+            big = 2 * self.miss_cost * (n + m) + 1
+            full = np.full((n + m, m + n), big)
+            full[:n, :m] = np.where(sub_gated, costs[np.ix_(rows, cols)], big)
+            full[:n, m:][np.diag_indices(n)] = self.miss_cost
+            full[n:, :m][np.diag_indices(m)] = self.miss_cost
+            full[n:, m:] = 0
+            r, c = linear_sum_assignment(full)
+            keep = (r < n) & (c < m)
+            r, c = r[keep], c[keep]
+            keep = sub_gated[r, c]
+            return list(zip(rows[r[keep]].tolist(), cols[c[keep]].tolist()))
+        # 貪心：由成本最低的一對開始
+        ii, jj = np.nonzero(gated)
+        order = np.argsort(costs[ii, jj], kind="stable")
+        used_trk, used_det, pairs = set(), set(), []
+        for i, j in zip(ii[order].tolist(), jj[order].tolist()):
+            if i not in used_trk and j not in used_det:
+                used_trk.add(i)
+                used_det.add(j)
+                pairs.append((i, j))
+        return pairs
+
     def update(self, detections: List[Detection]) -> List[Track]:
         """用新偵測結果更新追蹤器"""
         now = time.time()
+        frame_time = max((d.timestamp for d in detections), default=now)
+        dt = frame_time - self._last_time if self._last_time is not None else 0.0
+        if dt <= 0:
+            dt = self.frame_interval
+        self._last_time = frame_time
+
+        # 預測現有軌跡在本幀的位置
+        tracks = self.tracks
+        pairs = []
+        if tracks:
+            X, P = self._predict(np.array([t.kf_state for t in tracks]),
+                                 np.array([t.kf_cov for t in tracks]), dt)
+            for t, x in zip(tracks, X):
+                t.predicted_x = float(x[0])
+                t.predicted_y = float(x[1])
+
+            if detections:
+                Z = np.array([(d.cx, d.cy) for d in detections])
+                # 成本為量測負對數似然（馬氏距離² + ln|S|）：剛建立或久未更新的軌跡
+                # 不確定度大，同樣距離下輸給預測精準的軌跡
+                diff = Z[None, :, :] - X[:, None, :2]                  # (T, D, 2)
+                S = P[:, :2, :2] + np.eye(2) * self.meas_noise ** 2
+                costs = np.einsum("tdi,tij,tdj->td", diff, np.linalg.inv(S), diff) \
+                    + np.log(np.linalg.det(S))[:, None]
+                # 成本高於兩側都不匹配的一對不可能被選中，直接排除
+                gated = (np.hypot(diff[..., 0], diff[..., 1]) <= self.max_distance) \
+                    & (costs <= 2 * self.miss_cost)
+                # 兩階段：已確認軌跡先匹配，剩下的偵測再給暫定軌跡，
+                # 避免雜訊亮點產生的暫定軌跡搶走真實物體的偵測
+                confirmed = np.array([t.age >= self.min_hits for t in tracks])
+                free_det = np.arange(len(detections))
+                for rows in (np.flatnonzero(confirmed), np.flatnonzero(~confirmed)):
+                    if len(rows) == 0 or len(free_det) == 0:
+                        continue
+                    sel = np.ix_(rows, free_det)
+                    stage = self._assign(costs[sel], gated[sel])
+                    pairs += [(int(rows[i]), int(free_det[j])) for i, j in stage]
+                    free_det = np.setdiff1d(free_det, [j for _, j in pairs])
+
+            if pairs:
+                rows = np.array([i for i, _ in pairs])
+                cols = np.array([j for _, j in pairs])
+                X[rows], P[rows] = self._correct(X[rows], P[rows], Z[cols])
+
+            for t, x, cov in zip(tracks, X, P):
+                t.kf_state = x
+                t.kf_cov = cov
+                t.velocity_x = float(x[2])
+                t.velocity_y = float(x[3])
 
-        # 預測現有軌跡的下一個位置
-        for t in self.tracks:
-            if len(t.detections) >= 2:
-                t.predicted_x = t.detections[-1].cx + t.velocity_x
-                t.predicted_y = t.detections[-1].cy + t.velocity_y
-            elif t.detections:
-                t.predicted_x = t.detections[-1].cx
-                t.predicted_y = t.detections[-1].cy
-
-        # 匈牙利匹配（簡化版：貪心最近鄰）
         used_det = set()
         used_trk = set()
-
-        if self.tracks and detections:
-            # 計算距離矩陣
-            costs = np.zeros((len(self.tracks), len(detections)))
-            for i, t in enumerate(self.tracks):
-                for j, d in enumerate(detections):
-                    costs[i, j] = np.sqrt(
-                        (t.predicted_x - d.cx) ** 2 +
-                        (t.predicted_y - d.cy) ** 2
-                    )
-
-            # 貪心匹配
-            while True:
-                min_val = costs.min() if costs.size > 0 else self.max_distance + 1
-                if min_val > self.max_distance:
-                    break
-                i, j = np.unravel_index(costs.argmin(), costs.shape)
-                if i in used_trk or j in used_det:
-                    costs[i, j] = 99999
-                    continue
-
-                # 匹配成功
-                self.tracks[i].detections.append(detections[j])
-                self.tracks[i].missed = 0
-                self.tracks[i].age += 1
-                self.tracks[i].last_seen = now
-
-                # 更新速度
-                if len(self.tracks[i].detections) >= 2:
-                    d_prev = self.tracks[i].detections[-2]
-                    d_curr = self.tracks[i].detections[-1]
-                    dt = d_curr.timestamp - d_prev.timestamp
-                    if dt > 0:
-                        self.tracks[i].velocity_x = (d_curr.cx - d_prev.cx) / dt * 0.033
-                        self.tracks[i].velocity_y = (d_curr.cy - d_prev.cy) / dt * 0.033
-                        speed = np.sqrt(
-                            (d_curr.cx - d_prev.cx) ** 2 +
-                            (d_curr.cy - d_prev.cy) ** 2
-                        ) / dt
-                        # 指數移動平均
-                        self.tracks[i].speed_px_per_sec = (
-                            0.7 * self.tracks[i].speed_px_per_sec + 0.3 * speed
-                        )
-
-                used_trk.add(i)
-                used_det.add(j)
-                costs[i, :] = 99999
-                costs[:, j] = 99999
+        for i, j in pairs:
+            t = tracks[i]
+            t.detections.append(detections[j])
+            t.missed = 0
+            t.age += 1
+            t.last_seen = now
+            t.speed_px_per_sec = float(np.hypot(t.velocity_x, t.velocity_y))
+            used_trk.add(i)
+            used_det.add(j)
+
+        # 未匹配的軌跡 → 增加 missed（狀態已沿速度外推）
+        for i, t in enumerate(tracks):
+            if i not in used_trk:
+                t.missed += 1
 
         # 未匹配的偵測 → 新軌跡
+        pos_var = self.meas_noise ** 2
+        vel_var = self.init_speed_std ** 2
         for j, d in enumerate(detections):
             if j not in used_det:
                 t = Track(color=self._get_color(), first_seen=now, last_seen=now)
                 t.detections.append(d)
                 t.predicted_x = d.cx
                 t.predicted_y = d.cy
+                t.kf_state = np.array([d.cx, d.cy, 0.0, 0.0])
+                t.kf_cov = np.diag([pos_var, pos_var, vel_var, vel_var])
                 self.tracks.append(t)
 
-        # 未匹配的軌跡 → 增加 missed
-        for i, t in enumerate(self.tracks):
-            if i not in used_trk:
-                t.missed += 1
-
         # 移除過期軌跡
+        self.removed = [t for t in self.tracks if t.missed > self.max_missed]
         self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
 
         # 回傳已確認的軌跡（至少 min_hits 次偵測）
@@ -434,8 +526,12 @@ class UFODetector:
     def __init__(self, sensitivity: float = 0.5,
                  min_area: int = 8, max_area: int = 5000,
                  star_mask_frames: int = 60,
-                 output_dir: str = "ufo_events"):
+                 output_dir: str = "ufo_events",
+                 event_store: Optional[UFOEventStore] = None,
+                 recent_events: int = 200,
+                 stream_id: str = ""):
         self.sensitivity = sensitivity
+        self.stream_id = stream_id
         self.min_area = min_area
         self.max_area = max_area
         self.star_mask_frames = star_mask_frames
@@ -462,7 +558,15 @@ class UFODetector:
 
         # 狀態
         self.frame_id = 0
-        self.events: List[UFOEvent] = []
+        # 事件：完整歷史寫入資料庫，記憶體只保留最近 recent_events 筆
+        self.event_store = event_store or UFOEventStore(
+            self.output_dir / "events.db", import_dir=self.output_dir)
+        self.events = deque(maxlen=recent_events)
+        self.total_events = 0        # 本次執行的事件數
+        self._cls_counts = {}        # 本次執行的分類計數
+        self._sum_duration = 0.0     # 本次執行的持續時間 / 速度累計（平均值用）
+        self._sum_speed = 0.0
+        self._speed_count = 0
         self.active_events = {}  # track_id → event_id
         self.fps_estimate = 15.0
         self.running = False
@@ -471,6 +575,16 @@ class UFODetector:
         thresh_base = 20 + int((1 - sensitivity) * 40)
         self.fg_threshold = thresh_base
 
+    def set_sensitivity(self, value: float):
+        """調整靈敏度：重建背景模型與星點遮罩"""
+        self.sensitivity = value
+        self.fg_threshold = 20 + int((1 - value) * 40)
+        self.bg_subtractor = cv2.createBackgroundSubtractorMOG2(
+            history=300, varThreshold=int(16 + (1 - value) * 30), detectShadows=False)
+        self.star_mask = None
+        self.star_accumulator = None
+        self.star_frame_count = 0
+
     def build_star_mask(self, gray: np.ndarray):
         """累積建立星點遮罩 — 靜態亮點（星星）會在累積影像中保持高亮度"""
         if self.star_accumulator is None:
@@ -584,7 +698,7 @@ class UFODetector:
         for tid in ended:
             # 找到對應的 track（可能已從 tracker 移除）
             track = None
-            for t in self.tracker.tracks:
+            for t in self.tracker.tracks + self.tracker.removed:
                 if t.track_id == tid:
                     track = t
                     break
@@ -593,6 +707,13 @@ class UFODetector:
                 event = self._build_event(track, frame)
                 if event:
                     self.events.append(event)
+                    self.total_events += 1
+                    self._cls_counts[event.classification] = \
+                        self._cls_counts.get(event.classification, 0) + 1
+                    self._sum_duration += event.duration_sec
+                    if event.avg_speed > 0:
+                        self._sum_speed += float(event.avg_speed)
+                        self._speed_count += 1
                     self._save_event(event)
 
             del self.active_events[tid]
@@ -632,7 +753,7 @@ class UFODetector:
             event_id=event_id,
             track_id=track.track_id,
             classification=track.classification,
-            confidence=track.confidence,
+            confidence=float(track.confidence),
             start_time=datetime.fromtimestamp(track.first_seen).isoformat(),
             end_time=datetime.fromtimestamp(track.last_seen).isoformat(),
             duration_sec=round(track.last_seen - track.first_seen, 2),
@@ -641,12 +762,13 @@ class UFODetector:
             trajectory_points=len(points),
             trajectory_length_px=round(traj_len, 1),
             avg_brightness=round(np.mean([d.brightness for d in track.detections]), 1),
-            is_flashing=track.is_flashing,
-            flash_frequency=track.flash_frequency,
+            is_flashing=bool(track.is_flashing),
+            flash_frequency=float(track.flash_frequency),
             bbox_first={"x": d_first.x, "y": d_first.y, "w": d_first.w, "h": d_first.h},
             bbox_last={"x": d_last.x, "y": d_last.y, "w": d_last.w, "h": d_last.h},
             screenshot_path=str(self.output_dir / "screenshots" / f"{event_id}.png"),
             trail_image_path=trail_path,
+            stream_id=self.stream_id,
         )
 
     def _draw_trail_image(self, track: Track, frame_shape: tuple, output_path: str):
@@ -744,7 +866,7 @@ class UFODetector:
         cv2.putText(frame, f"UFO Detector | Frame: {self.frame_id}",
                     (10, hud_y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1, cv2.LINE_AA)
         hud_y += 20
-        cv2.putText(frame, f"Detections: {len(detections)} | Tracks: {len(confirmed)} | Events: {len(self.events)}",
+        cv2.putText(frame, f"Detections: {len(detections)} | Tracks: {len(confirmed)} | Events: {self.total_events}",
                     (10, hud_y), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 200, 0), 1, cv2.LINE_AA)
         hud_y += 20
         star_status = "Ready" if self.star_mask is not None else f"Building ({self.star_frame_count}/{self.star_mask_frames})"
@@ -759,26 +881,28 @@ class UFODetector:
         return frame
 
     def _save_event(self, event: UFOEvent):
-        """儲存事件到 JSON"""
+        """儲存事件到 JSON + 事件資料庫"""
+        data = asdict(event)
         event_path = self.output_dir / f"{event.event_id}.json"
         with open(event_path, "w", encoding="utf-8") as f:
-            json.dump(asdict(event), f, ensure_ascii=False, indent=2)
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        self.event_store.add(data)
         print(f"📡 事件記錄：{event.event_id} [{event.classification}] "
               f"信心度={event.confidence:.0%} 持續={event.duration_sec}s "
               f"速度={event.avg_speed:.0f}px/s")
 
     def get_stats(self) -> dict:
-        """取得統計資訊"""
-        cls_count = {}
-        for e in self.events:
-            cls_count[e.classification] = cls_count.get(e.classification, 0) + 1
+        """取得統計資訊（本次執行）"""
         return {
             "total_frames": self.frame_id,
-            "total_events": len(self.events),
+            "total_events": self.total_events,
             "active_tracks": len(self.tracker.tracks),
             "confirmed_tracks": len([t for t in self.tracker.tracks if t.age >= self.tracker.min_hits]),
             "star_mask_ready": self.star_mask is not None,
-            "classification_counts": cls_count,
+            "classification_counts": dict(self._cls_counts),
+            "avg_duration": round(self._sum_duration / self.total_events, 1) if self.total_events else 0,
+            "avg_speed": round(self._sum_speed / self._speed_count, 1) if self._speed_count else 0,
+            "ufo_count": self._cls_counts.get("ufo", 0),
         }
 
 
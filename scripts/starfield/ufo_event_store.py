@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+UFO 事件資料庫 — SQLite 持久化 + 索引查詢 + 增量統計
+
+  - UFODetector 在事件結束時寫入（同時保留原本的 JSON 檔）
+  - 依時間 / 分類 / 速度篩選並分頁，走索引不必掃描全部 JSON
+  - 各分類的筆數、持續時間與速度總和隨寫入增量更新，統計查詢與事件總數無關
+  - 首次建立資料庫時自動匯入事件目錄中既有的 UFO-*.json
+"""
+
+import json
+import sqlite3
+import threading
+from dataclasses import asdict, is_dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Union
+
+# 查詢結果的摘要欄位（/api/events 使用）
+SUMMARY_FIELDS = ("event_id", "stream_id", "classification", "confidence", "start_time",
+                  "duration_sec", "avg_speed", "is_flashing", "trajectory_points")
+
+
+def _to_ts(value: Union[str, float, int, datetime, None]) -> Optional[float]:
+    """時間參數轉 epoch 秒：接受 epoch 數字、ISO 字串或 datetime"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+class UFOEventStore:
+    """UFO 事件儲存（執行緒安全，可同時被偵測執行緒寫入、API 讀取）"""
+
+    def __init__(self, db_path: Union[str, Path], import_dir: Union[str, Path] = None):
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._init_database()
+        if import_dir and self.count() == 0:
+            self.import_json_dir(import_dir)
+
+    def _init_database(self):
+        """初始化資料庫"""
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS events (
+                    event_id TEXT PRIMARY KEY,
+                    stream_id TEXT NOT NULL DEFAULT '',
+                    start_ts REAL NOT NULL,
+                    start_time TEXT NOT NULL,
+                    end_time TEXT,
+                    classification TEXT NOT NULL,
+                    confidence REAL,
+                    duration_sec REAL,
+                    avg_speed REAL,
+                    max_speed REAL,
+                    trajectory_points INTEGER,
+                    is_flashing INTEGER,
+                    payload TEXT NOT NULL
+                )
+            ''')
+            # 舊版資料庫沒有 stream_id 欄位 → 補上
+            columns = {r["name"] for r in self._conn.execute("PRAGMA table_info(events)")}
+            if "stream_id" not in columns:
+                self._conn.execute("ALTER TABLE events ADD COLUMN stream_id TEXT NOT NULL DEFAULT ''")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_events_time ON events(start_ts)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_events_stream_time ON events(stream_id, start_ts)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_events_cls_time ON events(classification, start_ts)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_events_speed ON events(avg_speed)")
+            # 增量統計：每個分類一列
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS event_stats (
+                    classification TEXT PRIMARY KEY,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    sum_duration REAL NOT NULL DEFAULT 0,
+                    sum_speed REAL NOT NULL DEFAULT 0,
+                    speed_count INTEGER NOT NULL DEFAULT 0,
+                    max_speed REAL NOT NULL DEFAULT 0,
+                    first_ts REAL,
+                    last_ts REAL
+                )
+            ''')
+
+    # ===== 寫入 =====
+
+    def add(self, event) -> bool:
+        """寫入一筆事件（UFOEvent 或 dict）；重複的 event_id 忽略，回傳是否為新事件"""
+        return self.add_many([event]) == 1
+
+    def add_many(self, events) -> int:
+        """批次寫入，回傳新增筆數"""
+        added = 0
+        with self._lock, self._conn:
+            for event in events:
+                data = asdict(event) if is_dataclass(event) else dict(event)
+                start_ts = _to_ts(data.get("start_time")) or 0.0
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO events (event_id, stream_id, start_ts, start_time, end_time, "
+                    "classification, confidence, duration_sec, avg_speed, max_speed, "
+                    "trajectory_points, is_flashing, payload) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                    (data["event_id"], data.get("stream_id") or "", start_ts, data.get("start_time", ""), data.get("end_time"),
+                     data.get("classification", "unknown"), data.get("confidence", 0),
+                     data.get("duration_sec", 0), data.get("avg_speed", 0), data.get("max_speed", 0),
+                     data.get("trajectory_points", 0), int(bool(data.get("is_flashing"))),
+                     json.dumps(data, ensure_ascii=False)))
+                if cur.rowcount != 1:
+                    continue
+                added += 1
+                speed = data.get("avg_speed") or 0
+                self._conn.execute('''
+                    INSERT INTO event_stats (classification, count, sum_duration, sum_speed,
+                                             speed_count, max_speed, first_ts, last_ts)
+                    VALUES (?, 1, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(classification) DO UPDATE SET
+                        count = count + 1,
+                        sum_duration = sum_duration + excluded.sum_duration,
+                        sum_speed = sum_speed + excluded.sum_speed,
+                        speed_count = speed_count + excluded.speed_count,
+                        max_speed = MAX(max_speed, excluded.max_speed),
+                        first_ts = MIN(first_ts, excluded.first_ts),
+                        last_ts = MAX(last_ts, excluded.last_ts)
+                ''', (data.get("classification", "unknown"), data.get("duration_sec") or 0,
+                      speed, 1 if speed > 0 else 0, data.get("max_speed") or 0, start_ts, start_ts))
+        return added
+
+    def import_json_dir(self, event_dir: Union[str, Path]) -> int:
+        """匯入目錄中的 UFO-*.json（舊版只寫 JSON 檔的事件）"""
+        events = []
+        for f in sorted(Path(event_dir).glob("UFO-*.json")):
+            try:
+                with open(f, encoding="utf-8") as fp:
+                    events.append(json.load(fp))
+            except (OSError, ValueError):
+                continue
+        added = self.add_many(e for e in events if "event_id" in e)
+        if added:
+            print(f"📂 已匯入 {added} 筆既有事件 → {self.db_path}")
+        return added
+
+    # ===== 查詢 =====
+
+    @staticmethod
+    def _where(since, until, classification, min_speed, max_speed, stream_id):
+        clauses, params = [], []
+        if stream_id is not None:
+            clauses.append("stream_id = ?")
+            params.append(stream_id)
+        if classification:
+            clauses.append("classification = ?")
+            params.append(classification)
+        for col, op, value in (("start_ts", ">=", _to_ts(since)), ("start_ts", "<", _to_ts(until)),
+                               ("avg_speed", ">=", min_speed), ("avg_speed", "<=", max_speed)):
+            if value is not None:
+                clauses.append(f"{col} {op} ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, since=None, until=None, classification: str = None,
+              min_speed: float = None, max_speed: float = None,
+              limit: int = 50, offset: int = 0, full: bool = False,
+              stream_id: str = None) -> dict:
+        """
+        依條件查詢事件（新到舊），回傳 {"events", "total", "limit", "offset"}
+        full=True 回傳完整事件內容，否則只回傳 SUMMARY_FIELDS；stream_id 指定時只查該路串流
+        """
+        where, params = self._where(since, until, classification, min_speed, max_speed, stream_id)
+        cols = "payload" if full else ", ".join(SUMMARY_FIELDS)
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM events{where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {cols} FROM events{where} ORDER BY start_ts DESC, event_id DESC LIMIT ? OFFSET ?",
+                params + [max(int(limit), 0), max(int(offset), 0)]).fetchall()
+        if full:
+            events = [json.loads(r["payload"]) for r in rows]
+        else:
+            events = [dict(r) for r in rows]
+            for e in events:
+                e["is_flashing"] = bool(e["is_flashing"])
+        return {"events": events, "total": total, "limit": limit, "offset": offset}
+
+    def get(self, event_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM events WHERE event_id = ?",
+                                     (event_id,)).fetchone()
+        return json.loads(row["payload"]) if row else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(count), 0) FROM event_stats").fetchone()[0]
+
+    def stats(self) -> dict:
+        """所有已儲存事件的統計（讀取增量統計表）"""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM event_stats").fetchall()
+        total = sum(r["count"] for r in rows)
+        speed_n = sum(r["speed_count"] for r in rows)
+        return {
+            "total_events": total,
+            "classification_counts": {r["classification"]: r["count"] for r in rows},
+            "avg_duration": round(sum(r["sum_duration"] for r in rows) / total, 1) if total else 0,
+            "avg_speed": round(sum(r["sum_speed"] for r in rows) / speed_n, 1) if speed_n else 0,
+            "max_speed": max((r["max_speed"] for r in rows), default=0),
+            "ufo_count": next((r["count"] for r in rows if r["classification"] == "ufo"), 0),
+            "first_event": datetime.fromtimestamp(min(r["first_ts"] for r in rows)).isoformat() if rows else None,
+            "last_event": datetime.fromtimestamp(max(r["last_ts"] for r in rows)).isoformat() if rows else None,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
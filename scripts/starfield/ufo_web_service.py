@@ -8,13 +8,13 @@ FastAPI + WebSocket，整合 UFO 偵測引擎
   - 偵測參數即時調整
   - 統計 API
   - 告警推播（可選 Ntfy 整合）
+  - 多路串流：/api/streams 管理多台攝影機，共用偵測 worker 與 CPU 預算
 """
 
 import os
 os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp|stimeout;5000000"
 
 import asyncio
-import base64
 import json
 import time
 import threading
@@ -29,7 +29,11 @@ from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
+from frame_broadcaster import FrameBroadcaster
+from frame_ingest import CameraIngest
 from ufo_detector import UFODetector, UFOEvent
+from ufo_event_store import UFOEventStore
+from ufo_multistream import MultiStreamRuntime
 from virtual_cam_params import (VirtualParams, apply_params, night_sky_preset,
     starfield_preset, raw_preset, daytime_preset, stacked_raw_preset, ai_enhanced_preset,
     auto_select_preset, apply_stacked, apply_ai_enhanced, get_stack_depth,
@@ -44,6 +48,8 @@ from virtual_cam_params import (VirtualParams, apply_params, night_sky_preset,
 SCRIPT_DIR = Path(__file__).resolve().parent
 EVENT_DIR = SCRIPT_DIR / "ufo_events"
 EVENT_DIR.mkdir(exist_ok=True)
+DETECT_SIZE = (640, 480)   # 偵測解析度 (寬, 高)
+ACK_INTERVAL = 0.25        # iPhone 串流 ack 最短間隔（秒），期間收到的幀合併成一次 ack
 
 
 class AppState:
@@ -71,8 +77,18 @@ class AppState:
         # 來源資訊
         self.source_type = "none"  # rtsp / http / local / none
         self.source_resolution = "unknown"
-        # WebSocket 客戶端
-        self.ws_clients = set()
+        self.ingest: CameraIngest = None  # iPhone PWA 串流解碼（背景執行緒 + 最新畫面信箱）
+        # WebSocket 畫面廣播（每張畫面只編碼一次）
+        self.broadcaster = FrameBroadcaster(meta_fn=ws_meta, events_fn=ws_new_events)
+        self._ws_event_count = 0
+        # 事件資料庫（跨偵測器重建保留；首次啟動匯入既有 JSON 事件）
+        self.event_store = UFOEventStore(EVENT_DIR / "events.db", import_dir=EVENT_DIR)
+        # 多路串流（UFO_WORKERS / UFO_CPU_BUDGET 調整 worker 數與 CPU 預算）
+        self.runtime = MultiStreamRuntime(
+            workers=int(os.environ.get("UFO_WORKERS", 0)) or None,
+            cpu_budget=float(os.environ.get("UFO_CPU_BUDGET", 0)) or None,
+            output_dir=str(EVENT_DIR), event_store=self.event_store,
+            on_tracks=lambda stream, tracks: check_alerts(tracks))
 
     def connect(self, url: str) -> bool:
         """
@@ -151,8 +167,40 @@ class AppState:
     def init_detector(self):
         self.detector = UFODetector(
             sensitivity=self.sensitivity,
-            output_dir=str(EVENT_DIR)
+            output_dir=str(EVENT_DIR),
+            event_store=self.event_store,
         )
+        self._ws_event_count = 0
+
+
+def ws_meta() -> dict:
+    """/ws/detect metadata 訊息內容"""
+    return {
+        "fps": round(state.fps, 1),
+        "frame_id": state.frame_count,
+        "preset": state.preset_name,
+        "stack_depth": get_stack_depth(),
+        "smart_info": get_smart_info(),
+        "progressive": get_progressive_info(),
+        "stats": state.detector.get_stats() if state.detector else {},
+    }
+
+
+def ws_new_events() -> list:
+    """自上次呼叫以來的新事件（/ws/detect events 訊息）"""
+    if not state.detector:
+        return []
+    detector = state.detector
+    n_new = min(detector.total_events - state._ws_event_count, len(detector.events))
+    state._ws_event_count = detector.total_events
+    new = list(detector.events)[-n_new:] if n_new > 0 else []
+    return [{
+        "event_id": e.event_id,
+        "classification": e.classification,
+        "confidence": e.confidence,
+        "duration_sec": e.duration_sec,
+        "avg_speed": e.avg_speed,
+    } for e in new]
 
 
 state = AppState()
@@ -173,25 +221,26 @@ def detection_loop():
         "raw": raw_preset,
     }
 
-    last_iphone_frame_id = 0
+    last_iphone_seq = 0
     while state.detecting and state.connected:
-        # iPhone PWA 來源：從 WebSocket 寫入的 last_raw 讀取
+        # iPhone PWA 來源：等待 ingest 解碼好的最新畫面（已是偵測解析度）
         if state.source_type == "iphone-pwa":
-            with state.lock:
-                frame = state.last_raw
-                fid = state.frame_count
-            if frame is None or fid == last_iphone_frame_id:
-                time.sleep(0.02)
+            ingest = state.ingest
+            item = ingest.mailbox.get(last_iphone_seq, timeout=0.5) if ingest else None
+            if item is None:
+                if ingest is None:
+                    time.sleep(0.05)
                 continue
-            last_iphone_frame_id = fid
-            frame = frame.copy()
+            last_iphone_seq, frame, _ = item
+            state.last_raw = frame
         else:
             frame = state.read_frame()
             if frame is None:
                 time.sleep(0.05)
                 continue
 
-        frame = cv2.resize(frame, (640, 480))
+        if (frame.shape[1], frame.shape[0]) != DETECT_SIZE:
+            frame = cv2.resize(frame, DETECT_SIZE)
 
         # 自動偵測亮度 → 選擇預設（僅首幀或 auto 模式）
         if state.preset_name == "auto" and not state.auto_detected:
@@ -214,6 +263,7 @@ def detection_loop():
         # UFO 偵測
         annotated, dets, tracks = state.detector.detect_frame(frame)
         state.last_annotated = annotated
+        state.broadcaster.publish(annotated)
 
         # FPS
         fps_count += 1
@@ -285,7 +335,20 @@ async def lifespan(app: FastAPI):
         if ok:
             state.init_detector()
             print(f"✅ 自動連線 RTSP 成功")
+    state.broadcaster.start()
+    # 多路串流：UFO_STREAMS="roof=rtsp://...,yard=synthetic://?objects=3"
+    for spec in filter(None, os.environ.get("UFO_STREAMS", "").split(",")):
+        stream_id, _, url = spec.strip().partition("=")
+        try:
+            stream = await asyncio.to_thread(state.runtime.add_stream, stream_id, url)
+            stream.broadcaster.start()
+        except (ValueError, RuntimeError) as e:
+            print(f"⚠️ 串流 {stream_id} 啟動失敗：{e}")
     yield
+    for stream in list(state.runtime.streams.values()):
+        await stream.broadcaster.stop()
+    await asyncio.to_thread(state.runtime.stop)
+    await state.broadcaster.stop()
     state.disconnect()
 
 
@@ -349,14 +412,19 @@ async def ws_cam_feed(ws: WebSocket):
         threading.Thread(target=detection_loop, daemon=True).start()
         print("📱 自動啟動偵測 + AI 漸進增強模式")
 
+    # JPEG 解碼移到背景執行緒，handler 只負責收 bytes
+    ingest = state.ingest = CameraIngest(target_size=DETECT_SIZE)
     cam_fps_count = 0
     cam_fps_time = time.time()
+    last_ack = 0.0
 
     try:
         while True:
             data = await ws.receive()
 
-            if "text" in data:
+            if data.get("type") == "websocket.disconnect":
+                break
+            if data.get("text") is not None:
                 # JSON 控制訊息
                 msg = json.loads(data["text"])
                 if msg.get("type") == "init":
@@ -365,27 +433,28 @@ async def ws_cam_feed(ws: WebSocket):
                     state.source_resolution = f"{w}x{h}"
                     print(f"📱 iPhone 解析度: {w}x{h} | UA: {msg.get('userAgent','')[:50]}")
 
-            elif "bytes" in data:
-                # 二進位 JPEG 幀
-                jpg_bytes = data["bytes"]
-                arr = np.frombuffer(jpg_bytes, dtype=np.uint8)
-                frame = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-                if frame is not None:
-                    with state.lock:
-                        state.last_raw = frame
-                        state.frame_count += 1
-                    # FPS 計算
-                    cam_fps_count += 1
-                    now = time.time()
-                    if now - cam_fps_time >= 1.0:
-                        state.fps = cam_fps_count / (now - cam_fps_time)
-                        cam_fps_count = 0
-                        cam_fps_time = now
-                    # 回傳 ack（用於延遲計算）
+            elif data.get("bytes") is not None:
+                # 二進位 JPEG 幀 → 交給 ingest（立即返回）
+                now = time.time()
+                ingest.submit(data["bytes"], now)
+                state.frame_count += 1
+                # FPS 計算
+                cam_fps_count += 1
+                if now - cam_fps_time >= 1.0:
+                    state.fps = cam_fps_count / (now - cam_fps_time)
+                    cam_fps_count = 0
+                    cam_fps_time = now
+                # 合併 ack：每 ACK_INTERVAL 最多一次（用於延遲計算）
+                if now - last_ack >= ACK_INTERVAL:
+                    last_ack = now
+                    stats = ingest.get_stats()
                     await ws.send_text(json.dumps({
                         "type": "ack",
-                        "ts": int(time.time() * 1000),
+                        "ts": int(now * 1000),
                         "frame": state.frame_count,
+                        "decoded": stats["decoded"],
+                        "dropped": stats["dropped"],
+                        "latency_ms": stats["latency_ms"]["p50"],
                     }))
 
     except WebSocketDisconnect:
@@ -394,6 +463,9 @@ async def ws_cam_feed(ws: WebSocket):
         print(f"📱 iPhone WebSocket 錯誤：{e}")
     finally:
         print("📱 iPhone 攝影機已斷線")
+        ingest.close()
+        if state.ingest is ingest:
+            state.ingest = None
         if state.source_type == "iphone-pwa":
             state.detecting = False
             state.connected = False
@@ -417,6 +489,9 @@ async def get_status():
         "source_type": state.source_type,
         "source_resolution": state.source_resolution,
         "stats": stats,
+        "broadcast": state.broadcaster.get_stats(),
+        "ingest": state.ingest.get_stats() if state.ingest else None,
+        "streams": list(state.runtime.streams),
     }
 
 
@@ -485,14 +560,7 @@ async def set_preset(name: str = Query(...)):
 async def set_sensitivity(value: float = Query(..., ge=0, le=1)):
     state.sensitivity = value
     if state.detector:
-        state.detector.sensitivity = value
-        thresh = 20 + int((1 - value) * 40)
-        state.detector.fg_threshold = thresh
-        state.detector.bg_subtractor = cv2.createBackgroundSubtractorMOG2(
-            history=300, varThreshold=int(16 + (1 - value) * 30), detectShadows=False)
-        state.detector.star_mask = None
-        state.detector.star_accumulator = None
-        state.detector.star_frame_count = 0
+        state.detector.set_sensitivity(value)
     return {"success": True, "sensitivity": value}
 
 
@@ -514,30 +582,27 @@ async def set_alert(enabled: bool = Query(True)):
 # --- 事件 ---
 
 @app.get("/api/events")
-async def list_events(limit: int = Query(50), classification: str = Query("")):
-    if not state.detector:
-        return {"events": []}
-    events = state.detector.events[-limit:]
-    if classification:
-        events = [e for e in events if e.classification == classification]
-    result = []
-    for e in reversed(events):
-        result.append({
-            "event_id": e.event_id,
-            "classification": e.classification,
-            "confidence": e.confidence,
-            "start_time": e.start_time,
-            "duration_sec": e.duration_sec,
-            "avg_speed": e.avg_speed,
-            "is_flashing": e.is_flashing,
-            "trajectory_points": e.trajectory_points,
-        })
-    return {"events": result, "total": len(state.detector.events)}
+async def list_events(limit: int = Query(50, ge=0, le=1000), offset: int = Query(0, ge=0),
+                      classification: str = Query(""),
+                      since: str = Query("", description="起始時間（epoch 秒或 ISO）"),
+                      until: str = Query("", description="結束時間（epoch 秒或 ISO，不含）"),
+                      min_speed: float = Query(None), max_speed: float = Query(None),
+                      stream_id: str = Query(None, description="只查某一路串流（主畫面為空字串）")):
+    """事件列表（新到舊，從事件資料庫分頁查詢）"""
+    try:
+        return state.event_store.query(since=since, until=until, classification=classification,
+                                       min_speed=min_speed, max_speed=max_speed,
+                                       limit=limit, offset=offset, stream_id=stream_id)
+    except ValueError as e:
+        return JSONResponse({"error": f"時間格式錯誤：{e}"}, status_code=400)
 
 
 @app.get("/api/events/{event_id}")
 async def get_event(event_id: str):
-    # 從檔案讀取
+    event = state.event_store.get(event_id)
+    if event:
+        return event
+    # 資料庫沒有 → 從檔案讀取
     path = EVENT_DIR / f"{event_id}.json"
     if path.exists():
         with open(path, encoding="utf-8") as f:
@@ -565,84 +630,140 @@ async def get_trail(event_id: str):
 async def get_stats():
     if not state.detector:
         return {"error": "偵測器未初始化"}
+    # 頂層欄位皆為本次執行；歷史事件統計（資料庫增量統計，不掃描事件）放在 history
     stats = state.detector.get_stats()
-    # 加入歷史事件統計
-    all_events = state.detector.events
-    if all_events:
-        durations = [e.duration_sec for e in all_events]
-        speeds = [e.avg_speed for e in all_events if e.avg_speed > 0]
-        stats["avg_duration"] = round(np.mean(durations), 1) if durations else 0
-        stats["avg_speed"] = round(np.mean(speeds), 1) if speeds else 0
-        stats["ufo_count"] = sum(1 for e in all_events if e.classification == "ufo")
+    stats["history"] = state.event_store.stats()
     return stats
 
 
-# --- 歷史事件（從檔案系統讀取） ---
+# --- 歷史事件（完整內容，從事件資料庫讀取） ---
 
 @app.get("/api/history")
-async def list_history(limit: int = Query(100)):
-    events = []
-    for f in sorted(EVENT_DIR.glob("UFO-*.json"), reverse=True)[:limit]:
-        try:
-            with open(f, encoding="utf-8") as fp:
-                events.append(json.load(fp))
-        except Exception:
-            pass
-    return {"events": events, "total": len(events)}
+async def list_history(limit: int = Query(100, ge=0, le=1000), offset: int = Query(0, ge=0)):
+    result = state.event_store.query(limit=limit, offset=offset, full=True)
+    return {"events": result["events"], "total": result["total"]}
+
+
+# --- 多路串流 ---
+
+def _get_stream(stream_id: str):
+    stream = state.runtime.get(stream_id)
+    if stream is None:
+        return None, JSONResponse({"error": f"串流不存在：{stream_id}"}, status_code=404)
+    return stream, None
+
+
+@app.get("/api/streams")
+async def list_streams():
+    return state.runtime.get_stats()
+
+
+@app.post("/api/streams")
+async def add_stream(stream_id: str = Query(..., pattern=r"^[\w-]{1,32}$"),
+                     url: str = Query(..., description="rtsp:// / http:// / 本機編號 / synthetic://?objects=3"),
+                     preset: str = Query("auto"), sensitivity: float = Query(0.5, ge=0, le=1),
+                     max_fps: float = Query(15.0, gt=0), weight: float = Query(1.0, gt=0)):
+    try:
+        stream = await asyncio.to_thread(state.runtime.add_stream, stream_id, url, preset=preset,
+                                         sensitivity=sensitivity, max_fps=max_fps, weight=weight)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except RuntimeError as e:
+        return JSONResponse({"error": str(e)}, status_code=502)
+    stream.broadcaster.start()
+    return {"success": True, "stream": stream.get_stats()}
+
+
+@app.delete("/api/streams/{stream_id}")
+async def remove_stream(stream_id: str):
+    stream, error = _get_stream(stream_id)
+    if error:
+        return error
+    await stream.broadcaster.stop()
+    await asyncio.to_thread(state.runtime.remove_stream, stream_id)
+    return {"success": True}
+
+
+@app.get("/api/streams/{stream_id}")
+async def get_stream(stream_id: str):
+    stream, error = _get_stream(stream_id)
+    return error or stream.get_stats()
+
+
+@app.post("/api/streams/{stream_id}/preset")
+async def set_stream_preset(stream_id: str, name: str = Query(...)):
+    stream, error = _get_stream(stream_id)
+    if error:
+        return error
+    try:
+        stream.set_preset(name)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return {"success": True, "preset": name, "use_params": stream.use_params}
+
+
+@app.post("/api/streams/{stream_id}/sensitivity")
+async def set_stream_sensitivity(stream_id: str, value: float = Query(..., ge=0, le=1)):
+    stream, error = _get_stream(stream_id)
+    if error:
+        return error
+    stream.set_sensitivity(value)
+    return {"success": True, "sensitivity": value}
+
+
+@app.get("/api/streams/{stream_id}/events")
+async def list_stream_events(stream_id: str, limit: int = Query(50, ge=0, le=1000),
+                             offset: int = Query(0, ge=0), classification: str = Query("")):
+    return state.event_store.query(stream_id=stream_id, classification=classification,
+                                   limit=limit, offset=offset)
 
 
 # --- WebSocket 即時串流 ---
 
 @app.websocket("/ws/detect")
 async def ws_detect(ws: WebSocket):
+    """
+    即時偵測畫面：二進位訊息為 JPEG 畫面，文字訊息為
+    {"type": "meta", ...統計} 與 {"type": "events", "events": [...]}
+    """
     await ws.accept()
-    state.ws_clients.add(ws)
-    print(f"🔌 WebSocket 客戶端連線（共 {len(state.ws_clients)}）")
-    prev_event_count = len(state.detector.events) if state.detector else 0
-
-    try:
-        while True:
-            if state.last_annotated is not None and state.detecting:
-                _, buf = cv2.imencode(".jpg", state.last_annotated,
-                                      [cv2.IMWRITE_JPEG_QUALITY, 70])
-                b64 = base64.b64encode(buf).decode("utf-8")
-
-                stats = state.detector.get_stats() if state.detector else {}
-                # 檢查新事件
-                new_events = []
-                if state.detector:
-                    current_count = len(state.detector.events)
-                    if current_count > prev_event_count:
-                        for e in state.detector.events[prev_event_count:]:
-                            new_events.append({
-                                "event_id": e.event_id,
-                                "classification": e.classification,
-                                "confidence": e.confidence,
-                                "duration_sec": e.duration_sec,
-                                "avg_speed": e.avg_speed,
-                            })
-                        prev_event_count = current_count
-
-                await ws.send_text(json.dumps({
-                    "type": "frame",
-                    "data": b64,
-                    "fps": round(state.fps, 1),
-                    "frame_id": state.frame_count,
-                    "preset": state.preset_name,
-                    "stack_depth": get_stack_depth(),
-                    "smart_info": get_smart_info(),
-                    "progressive": get_progressive_info(),
-                    "stats": stats,
-                    "new_events": new_events,
-                }))
-            await asyncio.sleep(0.04)  # ~25fps
-    except WebSocketDisconnect:
-        pass
-    except Exception as e:
-        print(f"WebSocket 錯誤：{e}")
-    finally:
-        state.ws_clients.discard(ws)
-        print(f"🔌 WebSocket 客戶端斷線（剩 {len(state.ws_clients)}）")
+    sender = asyncio.create_task(state.broadcaster.serve(ws))
+    receiver = asyncio.create_task(_wait_disconnect(ws))
+    print(f"🔌 WebSocket 客戶端連線（共 {state.broadcaster.viewer_count + 1}）")
+
+    # 畫面由 broadcaster 推送；任一方結束（斷線或送出失敗）即收尾
+    done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    for task in done:
+        if not task.cancelled() and task.exception() and \
+                not isinstance(task.exception(), WebSocketDisconnect):
+            print(f"WebSocket 錯誤：{task.exception()}")
+    await asyncio.gather(*pending, return_exceptions=True)
+    print(f"🔌 WebSocket 客戶端斷線（剩 {state.broadcaster.viewer_count}）")
+
+
+@app.websocket("/ws/streams/{stream_id}/detect")
+async def ws_stream_detect(ws: WebSocket, stream_id: str):
+    """單一路串流的即時偵測畫面（訊息格式同 /ws/detect）"""
+    stream = state.runtime.get(stream_id)
+    if stream is None:
+        await ws.close(code=4404)
+        return
+    await ws.accept()
+    sender = asyncio.create_task(stream.broadcaster.serve(ws))
+    receiver = asyncio.create_task(_wait_disconnect(ws))
+    done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _wait_disconnect(ws: WebSocket):
+    while True:
+        msg = await ws.receive()
+        if msg["type"] == "websocket.disconnect":
+            return
 
 
 # ---------------------------------------------------------------------------
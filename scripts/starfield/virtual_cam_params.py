@@ -536,7 +536,9 @@ _smart = SmartEnhancer()
 _progressive = ProgressiveEnhancer(stack_size=16)
 
 
-def apply_params(frame: np.ndarray, p: VirtualParams) -> np.ndarray:
+def apply_params(frame: np.ndarray, p: VirtualParams,
+                 temporal: "TemporalDenoiser" = None) -> np.ndarray:
+    """套用虛擬參數；temporal 指定時域降噪器（多路串流各自一個），預設共用模組層級實例"""
     out = frame.astype(np.float32)
     if p.brightness != 0:
         out = np.clip(out + p.brightness, 0, 255)
@@ -569,7 +571,7 @@ def apply_params(frame: np.ndarray, p: VirtualParams) -> np.ndarray:
         l = np.clip(l.astype(np.float32) * 1.2 - 10, 0, 255).astype(np.uint8)
         out = cv2.cvtColor(cv2.merge([l, a, b]), cv2.COLOR_Lab2BGR)
     if p.temporal_denoise:
-        out = _temporal.process(out, p.temporal_weight)
+        out = (temporal or _temporal).process(out, p.temporal_weight)
     return out
 
 
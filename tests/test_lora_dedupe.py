@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+LoRaGateway 接收端重傳去重測試
+═══════════════════════════════════════════
+驗證 seq 重複使用時，新指令不會被當成重傳而只 ACK 不觸發回呼：
+  1. 發送端重啟（seq 歸零）後的新指令仍觸發回呼
+  2. seq 繞回（8 位元）後在視窗內重新使用，payload 不同即為新指令
+  3. 視窗逾時後同一 seq / payload 視為新指令
+  4. 視窗內的真正重傳仍只觸發一次回呼
+
+執行：
+  python tests/test_lora_dedupe.py
+"""
+import struct
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from water_alert.lora_gateway import (  # noqa: E402
+    LoopbackBus, LoRaGateway, LoRaPacket, MsgType,
+)
+
+PASSED = 0
+FAILED = 0
+ERRORS = []
+
+STATION = 3
+
+
+def _test(name, fn):
+    global PASSED, FAILED
+    try:
+        fn()
+        PASSED += 1
+        print(f"  ✅ {name}")
+    except AssertionError as e:
+        FAILED += 1
+        ERRORS.append(f"{name}: {e}")
+        print(f"  ❌ {name} — {e}")
+    except Exception as e:
+        FAILED += 1
+        ERRORS.append(f"{name}: {type(e).__name__}: {e}")
+        print(f"  💥 {name} — {type(e).__name__}: {e}")
+
+
+def _gateway(bus, addr, **kw):
+    gw = LoRaGateway(my_addr=addr, duty_cycle=0, ack_timeout_sec=0.05, max_retries=2, **kw)
+    gw.connect(bus.port(timeout=0.05))
+    gw.start()
+    return gw
+
+
+def _siren(seq, on, src=0):
+    return LoRaPacket(src_addr=src, dst_addr=STATION, msg_type=MsgType.SIREN_CMD,
+                      seq_num=seq, payload=struct.pack(">BH", 1 if on else 0, 10))
+
+
+def _wait(cond, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return cond()
+
+
+# ── Test 1: 總機重啟後 seq 歸零 ──
+def test_sender_restart():
+    bus = LoopbackBus(seed=0)
+    got = []
+    station = _gateway(bus, STATION)
+    station.on(MsgType.SIREN_CMD, lambda pkt: got.append(pkt.payload[0]))
+    try:
+        hq = _gateway(bus, 0)
+        for _ in range(3):
+            assert hq.send_siren_cmd(STATION, True)
+            assert hq.flush(timeout=3)
+        acked_before = hq._stats["acked"]
+        hq.stop()
+
+        hq = _gateway(bus, 0)
+        for _ in range(3):
+            assert hq.send_siren_cmd(STATION, False)
+            assert hq.flush(timeout=3)
+        acked = acked_before + hq._stats["acked"]
+        hq.stop()
+
+        assert acked == 6, f"ACK 數 {acked}"
+        assert _wait(lambda: len(got) == 6), f"回呼 {got}"
+        assert got == [1, 1, 1, 0, 0, 0], f"回呼順序 {got}"
+        assert station._stats["rx_duplicates"] == 0
+    finally:
+        station.stop()
+
+
+# ── Test 2: seq 繞回後重新使用 ──
+def test_seq_wrap_within_horizon():
+    # 總機的 seq 由所有目的地共用：其間 255 個封包送往其他站，本站只看到同一 seq 的兩則新指令
+    gw = LoRaGateway(my_addr=STATION)
+    got = []
+    gw.on(MsgType.SIREN_CMD, lambda pkt: got.append(pkt.payload[0]))
+    gw._handle_packet(_siren(7, True))
+    gw._handle_packet(_siren(7, False))
+    gw._handle_packet(_siren(7, True))
+    assert got == [1, 0, 1], f"回呼 {got}"
+    assert gw._stats["rx_duplicates"] == 0
+
+
+# ── Test 3: 視窗逾時 ──
+def test_entry_expires_after_horizon():
+    gw = LoRaGateway(my_addr=STATION, ack_timeout_sec=0.01, max_retries=1)
+    got = []
+    gw.on(MsgType.SIREN_CMD, lambda pkt: got.append(pkt.seq_num))
+    gw._handle_packet(_siren(5, True))
+    time.sleep(gw.dedupe_horizon + 0.02)
+    gw._handle_packet(_siren(5, True))
+    assert got == [5, 5], f"回呼 {got}"
+    assert gw._stats["rx_duplicates"] == 0
+
+
+# ── Test 4: 視窗內重傳仍去重 ──
+def test_retransmit_deduplicated():
+    gw = LoRaGateway(my_addr=STATION)
+    got = []
+    gw.on(MsgType.SIREN_CMD, lambda pkt: got.append(pkt.seq_num))
+    for _ in range(4):
+        gw._handle_packet(_siren(9, True))
+    gw._handle_packet(_siren(9, True, src=1))
+    assert got == [9, 9], f"回呼 {got}"
+    assert gw._stats["rx_duplicates"] == 3
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("LoRaGateway 重傳去重測試")
+    print("=" * 60)
+    _test("總機重啟後新指令仍觸發回呼", test_sender_restart)
+    _test("seq 繞回後新指令仍觸發回呼", test_seq_wrap_within_horizon)
+    _test("視窗逾時後視為新指令", test_entry_expires_after_horizon)
+    _test("視窗內重傳只觸發一次", test_retransmit_deduplicated)
+    print("\n" + "=" * 60)
+    total = PASSED + FAILED
+    print(f"結果: {PASSED}/{total} 通過, {FAILED} 失敗")
+    if ERRORS:
+        print("\n失敗詳情:")
+        for e in ERRORS:
+            print(f"  • {e}")
+    print("=" * 60)
+    sys.exit(1 if FAILED else 0)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+TWD97 ↔ WGS84 向量化投影精度測試
+═══════════════════════════════════════════
+驗證 batch_wgs84_to_twd97 / batch_twd97_to_wgs84（numpy 向量化）
+與逐點 wgs84_to_twd97 / twd97_to_wgs84 的差異在次毫米等級：
+  1. 正算：台灣本島 + 離島範圍隨機點
+  2. 反算：TWD97 座標範圍隨機點
+  3. 往返：WGS84 → TWD97 → WGS84
+  4. (N, 2) / (N, 3) 形狀、分塊與 memmap 輸出
+
+執行：
+  python tests/test_twd97_vectorized.py
+"""
+import math
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from construction_brain.pointcloud.coordinate import (  # noqa: E402
+    batch_twd97_to_wgs84, batch_wgs84_to_twd97, twd97_to_wgs84, wgs84_to_twd97,
+)
+
+PASSED = 0
+FAILED = 0
+ERRORS = []
+
+TOL_M = 1e-4          # 0.1 mm
+N_POINTS = 20000
+
+
+def _test(name, fn):
+    global PASSED, FAILED
+    try:
+        fn()
+        PASSED += 1
+        print(f"  ✅ {name}")
+    except AssertionError as e:
+        FAILED += 1
+        ERRORS.append(f"{name}: {e}")
+        print(f"  ❌ {name} — {e}")
+    except Exception as e:
+        FAILED += 1
+        ERRORS.append(f"{name}: {type(e).__name__}: {e}")
+        print(f"  💥 {name} — {type(e).__name__}: {e}")
+
+
+def _lonlat(n=N_POINTS, seed=0):
+    """台灣本島 + 澎湖、金門範圍（經度 118~122.5，緯度 21.5~26.5）"""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(118.0, 122.5, n), rng.uniform(21.5, 26.5, n),
+                            rng.uniform(-50, 4000, n)])
+
+
+def _deg_to_m(d_lon, d_lat, lat):
+    """經緯度差 → 約略地面距離 (公尺)"""
+    return np.hypot(d_lon * 111320.0 * np.cos(np.radians(lat)), d_lat * 110574.0)
+
+
+# ── Test 1: 正算與逐點一致 ──
+def test_forward_matches_scalar():
+    coords = _lonlat()
+    vec = batch_wgs84_to_twd97(coords)
+    ref = np.array([wgs84_to_twd97(*c) for c in coords])
+    err = np.hypot(vec[:, 0] - ref[:, 0], vec[:, 1] - ref[:, 1]).max()
+    assert err < TOL_M, f"最大平面差 {err:.2e} m"
+    assert np.array_equal(vec[:, 2], coords[:, 2]), "高程應原樣保留"
+
+
+# ── Test 2: 反算與逐點一致 ──
+def test_inverse_matches_scalar():
+    rng = np.random.default_rng(1)
+    coords = np.column_stack([rng.uniform(150000, 350000, N_POINTS),
+                              rng.uniform(2400000, 2950000, N_POINTS),
+                              rng.uniform(0, 100, N_POINTS)])
+    vec = batch_twd97_to_wgs84(coords)
+    ref = np.array([twd97_to_wgs84(*c) for c in coords])
+    err = _deg_to_m(vec[:, 0] - ref[:, 0], vec[:, 1] - ref[:, 1], ref[:, 1]).max()
+    assert err < TOL_M, f"最大差 {err:.2e} m"
+
+
+# ── Test 3: 往返 ──
+def test_round_trip():
+    coords = _lonlat(seed=2)
+    back = batch_twd97_to_wgs84(batch_wgs84_to_twd97(coords))
+    ref = np.array([twd97_to_wgs84(*wgs84_to_twd97(*c)) for c in coords[:2000]])
+    vec_err = _deg_to_m(back[:2000, 0] - ref[:, 0], back[:2000, 1] - ref[:, 1], ref[:, 1]).max()
+    assert vec_err < TOL_M, f"往返結果與逐點往返差 {vec_err:.2e} m"
+
+
+# ── Test 4: 形狀、分塊、memmap ──
+def test_shapes_and_chunks():
+    coords = _lonlat(5000, seed=3)
+    full = batch_wgs84_to_twd97(coords)
+    xy = batch_wgs84_to_twd97(coords[:, :2])
+    assert xy.shape == (5000, 2) and np.array_equal(xy, full[:, :2]), "(N, 2) 輸入結果不一致"
+    chunked = batch_wgs84_to_twd97(coords, chunk_size=777)
+    assert np.array_equal(chunked, full), "分塊結果不一致"
+    f32 = batch_wgs84_to_twd97(coords.astype(np.float32))
+    assert f32.dtype == np.float64, "float32 輸入應輸出 float64"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = np.lib.format.open_memmap(str(Path(tmp) / "src.npy"), mode="w+",
+                                        dtype=np.float64, shape=coords.shape)
+        src[:] = coords
+        dst = np.lib.format.open_memmap(str(Path(tmp) / "dst.npy"), mode="w+",
+                                        dtype=np.float64, shape=coords.shape)
+        batch_wgs84_to_twd97(src, out=dst, chunk_size=1000)
+        assert np.array_equal(np.asarray(dst), full), "memmap 輸出不一致"
+        del src, dst
+
+    try:
+        batch_wgs84_to_twd97(np.zeros((3, 4)))
+        raise AssertionError("(N, 4) 應拋出 ValueError")
+    except ValueError:
+        pass
+
+
+# ── Test 5: 已知點 ──
+def test_known_point():
+    # 中央經線上：E 應為 250000
+    e, n, _ = batch_wgs84_to_twd97(np.array([[121.0, 23.5, 0.0]]))[0]
+    assert math.isclose(e, 250000.0, abs_tol=1e-6), f"中央經線 E={e}"
+    ref_e, ref_n, _ = wgs84_to_twd97(121.0, 23.5)
+    assert abs(n - ref_n) < TOL_M
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("TWD97 ↔ WGS84 向量化投影精度測試")
+    print("=" * 60)
+    _test("正算與逐點一致 (< 0.1 mm)", test_forward_matches_scalar)
+    _test("反算與逐點一致 (< 0.1 mm)", test_inverse_matches_scalar)
+    _test("往返一致", test_round_trip)
+    _test("形狀 / 分塊 / memmap", test_shapes_and_chunks)
+    _test("中央經線已知點", test_known_point)
+    print("\n" + "=" * 60)
+    total = PASSED + FAILED
+    print(f"結果: {PASSED}/{total} 通過, {FAILED} 失敗")
+    if ERRORS:
+        print("\n失敗詳情:")
+        for e in ERRORS:
+            print(f"  • {e}")
+    print("=" * 60)
+    sys.exit(1 if FAILED else 0)
@@ -4,18 +4,20 @@
 
 擴充功能：
 - 多節點角色（compute, sensor, gateway, display, storage）
-- 任務佇列系統（TaskQueue, Worker）
+- 任務佇列系統（優先級 heap 排程 + 工作執行緒池，各後端並行上限）
 - 多後端推理支援（可配置多個模型後端）
 - 狀態上報整合
 """
 import asyncio
+import heapq
+import itertools
 import json
 import os
 import platform
 import threading
 import time
 import uuid
-from collections import deque
+from collections import defaultdict, deque
 from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
@@ -28,6 +30,19 @@ except ImportError:
 
 BASE = Path(__file__).parent.resolve()
 
+# ===== 排程設定 =====
+DEFAULT_WORKERS = int(os.environ.get("EDGE_WORKERS", "4"))
+# 各通道（compute 任務 = cpu，推理任務 = 後端名稱，自動選擇後端 = inference）同時執行上限
+DEFAULT_LANE_LIMITS = {
+    "cpu": max(1, (os.cpu_count() or 2) - 1),
+    "ollama": 2,       # 本地模型，併發過多只會排隊在 GPU 上
+    "groq": 4,
+    "gemini": 4,
+    "inference": 2,
+}
+DEFAULT_LANE_LIMIT = 2
+STATS_WINDOW = 1000    # 等待 / 執行時間統計保留最近幾筆
+
 # ===== 節點角色定義 =====
 class NodeRole(str, Enum):
     COMPUTE = "compute"  # 運算節點（預設）
@@ -95,6 +110,7 @@ class Task:
     error: Optional[str] = None
     retry_count: int = 0
     max_retries: int = 3
+    enqueued_at: Optional[float] = None  # 最近一次進入佇列時間（重試會更新）
 
 
 class EdgeCompute:
@@ -102,25 +118,54 @@ class EdgeCompute:
     邊緣計算節點管理：本地推理、任務佇列、狀態上報
     """
 
-    def __init__(self):
+    def __init__(self, workers: int = DEFAULT_WORKERS, lane_limits: Optional[dict] = None):
+        """
+        Args:
+            workers: 工作執行緒數（每條執行緒持有一個常駐 event loop）
+            lane_limits: 各通道同時執行上限，覆寫 DEFAULT_LANE_LIMITS；
+                         也可用環境變數 EDGE_LANE_LIMITS（JSON）設定
+        """
         self.nodes: list[EdgeNode] = []
         self._start_time = time.perf_counter()
         self._ops = 0
         self._bytes = 0
         self._lock = threading.Lock()
         
-        # 任務佇列
-        self._task_queue: deque[Task] = deque()
-        self._task_lock = threading.Lock()
+        # 任務佇列：每個通道一個 heap，項目為 (-priority, seq, task)；
+        # seq 遞增確保同優先級先進先出，取消的任務留在 heap 中於取出時略過
+        self._lane_heaps: dict[str, list] = defaultdict(list)
+        self._queued: dict[str, Task] = {}
+        self._seq = itertools.count()
+        self._retry_seq = itertools.count(-1, -1)  # 重試任務排在同優先級最前面
+        self._stale_entries = 0
+        self._task_cond = threading.Condition()
         self._running_tasks: dict[str, Task] = {}
+        self._running_handles: dict[str, tuple] = {}  # task_id → (loop, asyncio.Task)
+        
+        # 通道並行上限
+        self._lane_limits = dict(DEFAULT_LANE_LIMITS)
+        env_limits = os.environ.get("EDGE_LANE_LIMITS", "").strip()
+        if env_limits:
+            try:
+                self._lane_limits.update({k: int(v) for k, v in json.loads(env_limits).items()})
+            except (json.JSONDecodeError, TypeError, ValueError, AttributeError):
+                pass
+        self._lane_limits.update(lane_limits or {})
+        self._lane_running: dict[str, int] = defaultdict(int)
+        
+        # 排程統計
+        self._wait_times: dict[str, deque] = defaultdict(lambda: deque(maxlen=STATS_WINDOW))
+        self._run_times: dict[str, deque] = defaultdict(lambda: deque(maxlen=STATS_WINDOW))
+        self._task_counts = {"completed": 0, "failed": 0, "cancelled": 0, "retried": 0}
         
         # 推理後端
         self._backends: list[InferenceBackend] = []
         self._current_backend_index = 0
         
-        # 工作執行緒
+        # 工作執行緒池
+        self._num_workers = max(1, workers)
         self._worker_running = False
-        self._worker_thread: Optional[threading.Thread] = None
+        self._worker_threads: list[threading.Thread] = []
         
         # 初始化後端
         self._init_backends()
@@ -409,6 +454,7 @@ class EdgeCompute:
             ],
             "task_queue_size": self.get_task_queue_size(),
             "running_tasks": len(self._running_tasks),
+            "scheduler": self.get_scheduler_stats(),
         }
         
         if include_nodes:
@@ -454,24 +500,63 @@ class EdgeCompute:
             **kwargs
         )
         
-        with self._task_lock:
-            # 依優先級插入佇列（高優先級在前）
-            inserted = False
-            for i, t in enumerate(self._task_queue):
-                if task.priority > t.priority:
-                    self._task_queue.insert(i, task)
-                    inserted = True
-                    break
-            if not inserted:
-                self._task_queue.append(task)
+        with self._task_cond:
+            self._enqueue(task)
         
         return task.id
 
+    def _enqueue(self, task: Task, retry: bool = False):
+        """放入所屬通道的 heap（需持有 _task_cond）"""
+        seq = next(self._retry_seq) if retry else next(self._seq)
+        task.enqueued_at = time.time()
+        heapq.heappush(self._lane_heaps[self._task_lane(task)], (-int(task.priority), seq, task))
+        self._queued[task.id] = task
+        self._task_cond.notify()
+
+    @staticmethod
+    def _task_lane(task: Task) -> str:
+        """任務所屬並行通道：compute → cpu，推理 → 指定後端（未指定為 inference）"""
+        if task.type == "compute":
+            return "cpu"
+        if task.type == "inference":
+            return task.payload.get("backend") or "inference"
+        return "default"
+
+    def _lane_limit(self, lane: str) -> int:
+        return self._lane_limits.get(lane, DEFAULT_LANE_LIMIT)
+
+    def _pop_runnable(self) -> Optional[tuple[Task, str]]:
+        """取出未達並行上限的通道中，優先級最高、最早提交的任務（需持有 _task_cond）"""
+        best_lane = None
+        for lane, heap in self._lane_heaps.items():
+            while heap and heap[0][2].status == TaskStatus.CANCELLED:
+                heapq.heappop(heap)
+                self._stale_entries -= 1
+            if not heap or self._lane_running[lane] >= self._lane_limit(lane):
+                continue
+            if best_lane is None or heap[0][:2] < self._lane_heaps[best_lane][0][:2]:
+                best_lane = lane
+        if best_lane is None:
+            return None
+        _, _, task = heapq.heappop(self._lane_heaps[best_lane])
+        del self._queued[task.id]
+        self._lane_running[best_lane] += 1
+        return task, best_lane
+
+    def _compact_heaps(self):
+        """取消的任務過多時重建 heap（需持有 _task_cond）"""
+        if self._stale_entries <= 64 or self._stale_entries <= len(self._queued):
+            return
+        for lane, heap in self._lane_heaps.items():
+            heap[:] = [e for e in heap if e[2].status != TaskStatus.CANCELLED]
+            heapq.heapify(heap)
+        self._stale_entries = 0
+
     def get_task_status(self, task_id: str) -> Optional[dict]:
         """取得任務狀態"""
         # 檢查正在執行的任務
-        if task_id in self._running_tasks:
-            task = self._running_tasks[task_id]
+        task = self._running_tasks.get(task_id)
+        if task is not None:
             return {
                 "id": task.id,
                 "type": task.type,
@@ -483,39 +568,91 @@ class EdgeCompute:
             }
         
         # 檢查佇列中的任務
-        with self._task_lock:
-            for task in self._task_queue:
-                if task.id == task_id:
-                    return {
-                        "id": task.id,
-                        "type": task.type,
-                        "status": task.status.value,
-                        "created_at": task.created_at,
-                        "priority": task.priority.value
-                    }
+        with self._task_cond:
+            task = self._queued.get(task_id)
+            if task is not None:
+                return {
+                    "id": task.id,
+                    "type": task.type,
+                    "status": task.status.value,
+                    "created_at": task.created_at,
+                    "priority": task.priority.value
+                }
         
         return None
 
     def get_task_queue_size(self) -> int:
         """取得任務佇列大小"""
-        with self._task_lock:
-            return len(self._task_queue)
+        with self._task_cond:
+            return len(self._queued)
 
     def cancel_task(self, task_id: str) -> bool:
-        """取消任務"""
-        with self._task_lock:
-            for i, task in enumerate(self._task_queue):
-                if task.id == task_id:
-                    task.status = TaskStatus.CANCELLED
-                    self._task_queue.remove(task)
-                    return True
-        
-        if task_id in self._running_tasks:
-            # 正在執行的任務無法直接取消，只能標記
-            return False
+        """
+        取消任務：佇列中的任務直接移除；執行中的非同步任務（推理）送出取消，
+        同步的 compute 任務無法中斷，回傳 False
+        """
+        with self._task_cond:
+            task = self._queued.pop(task_id, None)
+            if task is not None:
+                task.status = TaskStatus.CANCELLED
+                self._task_counts["cancelled"] += 1
+                self._stale_entries += 1
+                self._compact_heaps()
+                return True
+            handle = self._running_handles.get(task_id)
+            task = self._running_tasks.get(task_id)
+        
+        if handle and task and task.type != "compute":
+            loop, atask = handle
+            loop.call_soon_threadsafe(atask.cancel)
+            return True
         
         return False
 
+    def get_scheduler_stats(self) -> dict:
+        """
+        排程統計：佇列深度、各通道執行數與上限、等待 / 執行時間（最近 STATS_WINDOW 筆，ms）
+        """
+        with self._task_cond:
+            depth_by_lane = {}
+            for lane, heap in self._lane_heaps.items():
+                n = sum(1 for e in heap if e[2].status != TaskStatus.CANCELLED)
+                if n:
+                    depth_by_lane[lane] = n
+            lanes = set(depth_by_lane) | {k for k, v in self._lane_running.items() if v} | set(self._wait_times)
+            return {
+                "workers": len(self._worker_threads),
+                "queue_depth": len(self._queued),
+                "running": len(self._running_tasks),
+                **self._task_counts,
+                "lanes": {
+                    lane: {
+                        "queued": depth_by_lane.get(lane, 0),
+                        "running": self._lane_running.get(lane, 0),
+                        "limit": self._lane_limit(lane),
+                        "wait_ms": self._summarize(self._wait_times.get(lane, ())),
+                        "run_ms": self._summarize(self._run_times.get(lane, ())),
+                    }
+                    for lane in sorted(lanes)
+                },
+                "wait_ms": self._summarize([v for d in self._wait_times.values() for v in d]),
+                "run_ms": self._summarize([v for d in self._run_times.values() for v in d]),
+            }
+
+    @staticmethod
+    def _summarize(values) -> dict:
+        values = sorted(values)
+        if not values:
+            return {"count": 0}
+        n = len(values)
+        return {
+            "count": n,
+            "avg": round(sum(values) / n, 2),
+            "p50": round(values[n // 2], 2),
+            "p95": round(values[min(n - 1, int(n * 0.95))], 2),
+            "max": round(values[-1], 2),
+        }
+
     async def _process_task(self, task: Task) -> dict:
         """
         處理單個任務
@@ -557,86 +694,107 @@ class EdgeCompute:
 
     def _worker_loop(self, on_task_complete: Optional[Callable] = None):
         """
-        工作執行緒主迴圈
+        工作執行緒主迴圈：整個執行緒共用一個 event loop，無任務時等待通知而非輪詢
         
         Args:
             on_task_complete: 任務完成回呼函數
         """
-        while self._worker_running:
-            task = None
-            
-            # 取得任務
-            with self._task_lock:
-                if self._task_queue:
-                    task = self._task_queue.popleft()
-            
-            if task:
-                # 執行任務
-                task.status = TaskStatus.PROCESSING
-                task.started_at = time.time()
-                self._running_tasks[task.id] = task
-                
-                # 執行任務（使用 asyncio）
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    result = loop.run_until_complete(self._process_task(task))
-                finally:
-                    loop.close()
-                
-                # 處理結果
-                if result["success"]:
-                    task.status = TaskStatus.COMPLETED
-                    task.result = result["result"]
-                else:
-                    task.status = TaskStatus.FAILED
-                    task.error = result["error"]
-                    
-                    # 重試邏輯
-                    if task.retry_count < task.max_retries:
-                        task.retry_count += 1
-                        task.status = TaskStatus.PENDING
-                        task.started_at = None
-                        with self._task_lock:
-                            self._task_queue.appendleft(task)  # 重新加入佇列前端
-                        del self._running_tasks[task.id]
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            while self._worker_running:
+                with self._task_cond:
+                    picked = self._pop_runnable()
+                    if picked is None:
+                        self._task_cond.wait(0.5)
                         continue
-                
-                task.completed_at = time.time()
-                del self._running_tasks[task.id]
-                
-                # 呼叫回呼
-                if on_task_complete:
-                    on_task_complete(task)
+                self._run_task(loop, *picked, on_task_complete)
+        finally:
+            loop.close()
+
+    def _run_task(self, loop: asyncio.AbstractEventLoop, task: Task, lane: str,
+                  on_task_complete: Optional[Callable]):
+        """在工作執行緒的 event loop 上執行任務並處理結果 / 重試"""
+        task.status = TaskStatus.PROCESSING
+        task.started_at = time.time()
+        atask = loop.create_task(self._process_task(task))
+        with self._task_cond:
+            self._running_tasks[task.id] = task
+            self._running_handles[task.id] = (loop, atask)
+        
+        try:
+            result = loop.run_until_complete(atask)
+        except asyncio.CancelledError:
+            result = None
+        run_sec = time.time() - task.started_at
+        
+        with self._task_cond:
+            self._lane_running[lane] -= 1
+            self._wait_times[lane].append((task.started_at - task.enqueued_at) * 1000)
+            self._run_times[lane].append(run_sec * 1000)
+            del self._running_handles[task.id]
+            del self._running_tasks[task.id]
+            
+            # 處理結果
+            if result is None:
+                task.status = TaskStatus.CANCELLED
+                self._task_counts["cancelled"] += 1
+            elif result["success"]:
+                task.status = TaskStatus.COMPLETED
+                task.result = result["result"]
+                self._task_counts["completed"] += 1
             else:
-                # 無任務時短暫休眠
-                time.sleep(0.1)
+                task.status = TaskStatus.FAILED
+                task.error = result["error"]
+                
+                # 重試邏輯
+                if task.retry_count < task.max_retries:
+                    task.retry_count += 1
+                    task.status = TaskStatus.PENDING
+                    task.started_at = None
+                    self._task_counts["retried"] += 1
+                    self._enqueue(task, retry=True)  # 重新加入同優先級最前端
+                    return
+                self._task_counts["failed"] += 1
+            
+            task.completed_at = time.time()
+            self._task_cond.notify()  # 釋出通道名額
+        
+        # 呼叫回呼
+        if on_task_complete:
+            on_task_complete(task)
 
     def start_worker(self, on_task_complete: Optional[Callable] = None):
         """
-        啟動工作執行緒
+        啟動工作執行緒池
         
         Args:
-            on_task_complete: 任務完成回呼函數
+            on_task_complete: 任務完成回呼函數（在工作執行緒中呼叫）
         """
         if self._worker_running:
             return
         
         self._worker_running = True
-        self._worker_thread = threading.Thread(
-            target=self._worker_loop,
-            args=(on_task_complete,),
-            daemon=True,
-            name="EdgeWorker"
-        )
-        self._worker_thread.start()
+        self._worker_threads = [
+            threading.Thread(
+                target=self._worker_loop,
+                args=(on_task_complete,),
+                daemon=True,
+                name=f"EdgeWorker-{i}"
+            )
+            for i in range(self._num_workers)
+        ]
+        for t in self._worker_threads:
+            t.start()
 
     def stop_worker(self):
-        """停止工作執行緒"""
+        """停止工作執行緒池"""
         self._worker_running = False
-        if self._worker_thread:
-            self._worker_thread.join(timeout=5)
-            self._worker_thread = None
+        with self._task_cond:
+            self._task_cond.notify_all()
+        for t in self._worker_threads:
+            t.join(timeout=5)
+        self._worker_threads = []
 
     async def run_edge_daemon(
         self,
@@ -651,9 +809,10 @@ class EdgeCompute:
         邊緣守護：週期性 ping 本地服務、更新節點狀態、處理任務佇列、上報狀態
         
         Args:
-            on_status: 狀態回呼函數，每輪呼叫一次
+            on_status: 狀態回呼函數，每輪呼叫一次；info["scheduler"] 含佇列深度、
+                       各通道執行數 / 上限與等待、執行時間統計（亦隨狀態上報送出）
             on_task_complete: 任務完成回呼函數
-            enable_worker: 是否啟動工作執行緒
+            enable_worker: 是否啟動工作執行緒池
             enable_reporting: 是否啟用狀態上報
             report_url: 上報 URL（HTTP POST）
             report_interval: 上報間隔（秒）
@@ -800,6 +959,9 @@ async def main():
         print(f"吞吐量: {info['throughput_mbps']} MB/s")
         print(f"任務佇列: {info['task_queue_size']} 個")
         print(f"執行中任務: {info['running_tasks']} 個")
+        sched = info["scheduler"]
+        print(f"工作執行緒: {sched['workers']} 條，完成 {sched['completed']} / 失敗 {sched['failed']}，"
+              f"等待 p95 {sched['wait_ms'].get('p95', 0)} ms，執行 p95 {sched['run_ms'].get('p95', 0)} ms")
         print(f"可用後端: {len(info['backends'])} 個")
         
         if "services" in info:
@@ -15,6 +15,12 @@ INFLUXDB_URL = os.environ.get("INFLUXDB_URL", "http://localhost:8086")
 INFLUXDB_TOKEN = os.environ.get("INFLUXDB_TOKEN", "")
 INFLUXDB_ORG = os.environ.get("INFLUXDB_ORG", "zhewei")
 INFLUXDB_BUCKET = os.environ.get("INFLUXDB_BUCKET", "water_alert")
+# 本地時序資料庫（先落地再批次上傳 InfluxDB；無 InfluxDB 時由本地提供查詢）
+LOCAL_TS_DB = os.environ.get(
+    "WA_LOCAL_TS_DB",
+    os.path.join(os.environ.get("WA_DATA_DIR", os.path.expanduser("~/water_alert/data")), "timeseries.db"),
+)
+LOCAL_TS_RETENTION_DAYS = float(os.environ.get("WA_LOCAL_TS_RETENTION_DAYS", "30"))
 
 # LoRa
 LORA_SERIAL_PORT = os.environ.get("LORA_SERIAL_PORT", "/dev/ttyUSB0")
@@ -22,6 +28,7 @@ LORA_BAUD_RATE = int(os.environ.get("LORA_BAUD_RATE", "9600"))
 LORA_FREQUENCY = float(os.environ.get("LORA_FREQUENCY", "433.0"))  # MHz
 LORA_SPREAD_FACTOR = int(os.environ.get("LORA_SPREAD_FACTOR", "7"))
 LORA_BANDWIDTH = int(os.environ.get("LORA_BANDWIDTH", "125"))  # kHz
+LORA_DUTY_CYCLE = float(os.environ.get("LORA_DUTY_CYCLE", "0.01"))  # 發射佔空比上限（每小時），0 = 不限
 
 # Ntfy 推播
 NTFY_SERVER = os.environ.get("NTFY_SERVER", "https://ntfy.sh")
@@ -79,6 +86,10 @@ class SystemConfig:
     weight_cloud: float = 0.15         # 雲量權重 15%
     weight_dht: float = 0.10           # 溫濕度權重 10%
     weight_forecast: float = 0.10      # 氣象預報權重 10%
+    # 趨勢分析
+    trend_samples: int = 10            # 決策用趨勢：最近 N 筆線性回歸
+    trend_windows_sec: tuple = (3600, 21600)  # 額外時間窗趨勢（1h / 6h）
+    trend_ewma_halflife_sec: float = 0.0      # 指數加權上升率半衰期（秒），0 = 停用
     # 輪詢間隔
     poll_interval_sec: int = 30        # 感測器輪詢間隔
     upload_interval_sec: int = 60      # LoRa 上傳間隔
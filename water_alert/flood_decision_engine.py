@@ -9,9 +9,11 @@
 """
 import json
 import logging
+import math
 import os
 import sys
 import time
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Dict, List, Optional
@@ -56,6 +58,9 @@ class FloodDecision:
     # 預估到達時間
     eta_warning_min: Optional[float] = None   # 預估幾分鐘後到警戒水位
     eta_critical_min: Optional[float] = None  # 預估幾分鐘後到危險水位
+    # 多時間窗趨勢（分數/hr）與指數加權上升率
+    trend_rates: Dict[str, float] = field(default_factory=dict)
+    ewma_rate: Optional[float] = None
 
     def to_dict(self) -> dict:
         return {
@@ -73,6 +78,8 @@ class FloodDecision:
             "rate_of_change": round(self.rate_of_change, 3),
             "eta_warning_min": self.eta_warning_min,
             "eta_critical_min": self.eta_critical_min,
+            "trend_rates": {k: round(v, 3) for k, v in self.trend_rates.items()},
+            "ewma_rate": round(self.ewma_rate, 3) if self.ewma_rate is not None else None,
         }
 
 
@@ -84,6 +91,99 @@ ALERT_LEVELS = {
     3: {"name": "危險", "color": "red", "threshold": 85},
     4: {"name": "撤離", "color": "darkred", "threshold": 100},
 }
+_LEVELS_DESC = sorted(ALERT_LEVELS.keys(), reverse=True)
+
+# ===== 各等級建議行動 =====
+_ACTIONS = {
+    0: ("持續監測",),
+    1: ("加密監測頻率至每 15 分鐘", "通知工地主任注意水情"),
+    2: ("通知所有人員準備撤離", "啟動工地排水設備", "確認撤離路線暢通",
+        "將重要機具移至高處"),
+    3: ("立即啟動撤離程序", "啟動廣播喇叭警報", "啟動警示閃光燈",
+        "通報 119 / 水利署", "停止所有施工作業"),
+    4: ("全員立即撤離至安全高地", "確認人員清點完成", "關閉電力/瓦斯",
+        "啟動國家級災害通報"),
+}
+
+
+# ===== 趨勢窗 =====
+
+def _window_label(seconds: float) -> str:
+    """時間窗名稱：3600 → 1h、900 → 15m"""
+    if seconds % 3600 == 0:
+        return f"{int(seconds // 3600)}h"
+    if seconds % 60 == 0:
+        return f"{int(seconds // 60)}m"
+    return f"{seconds:g}s"
+
+
+class TrendWindow:
+    """
+    線性回歸趨勢窗 — 環狀緩衝 + 累計和，每筆更新 O(1)
+
+    以筆數（max_samples）或時間長度（max_age_sec）限制窗口。時間以窗口內最舊一筆為原點，
+    每累積一個窗口長度的更新就從緩衝重算累計和（攤提 O(1)），避免大時間戳平方相減與長期浮點漂移。
+    """
+
+    __slots__ = ("max_samples", "max_age_sec", "_buf", "_t0",
+                 "_st", "_ss", "_sts", "_stt", "_updates")
+
+    def __init__(self, max_samples: Optional[int] = None, max_age_sec: Optional[float] = None):
+        self.max_samples = max_samples
+        self.max_age_sec = max_age_sec
+        self._buf = deque()      # (相對時間, 分數)
+        self._t0 = 0.0
+        self._st = self._ss = self._sts = self._stt = 0.0
+        self._updates = 0
+
+    def __len__(self) -> int:
+        return len(self._buf)
+
+    def add(self, ts: float, value: float):
+        if not self._buf:
+            self._t0 = ts
+        t = ts - self._t0
+        self._buf.append((t, value))
+        self._st += t
+        self._ss += value
+        self._sts += t * value
+        self._stt += t * t
+
+        buf = self._buf
+        while (self.max_samples and len(buf) > self.max_samples) or \
+                (self.max_age_sec is not None and t - buf[0][0] > self.max_age_sec):
+            ot, ov = buf.popleft()
+            self._st -= ot
+            self._ss -= ov
+            self._sts -= ot * ov
+            self._stt -= ot * ot
+
+        self._updates += 1
+        if self._updates >= len(buf):
+            self._rebase()
+
+    def _rebase(self):
+        """以最舊一筆為新原點重算累計和"""
+        shift = self._buf[0][0]
+        self._t0 += shift
+        self._buf = deque((t - shift, v) for t, v in self._buf)
+        self._st = self._ss = self._sts = self._stt = 0.0
+        for t, v in self._buf:
+            self._st += t
+            self._ss += v
+            self._sts += t * v
+            self._stt += t * t
+        self._updates = 0
+
+    def slope(self) -> Optional[float]:
+        """最小平方法斜率（分數/秒）；不足兩筆或時間全相同時回傳 None"""
+        n = len(self._buf)
+        if n < 2:
+            return None
+        denom = n * self._stt - self._st * self._st
+        if abs(denom) < 1e-10:
+            return None
+        return (n * self._sts - self._st * self._ss) / denom
 
 
 class FloodDecisionEngine:
@@ -101,20 +201,29 @@ class FloodDecisionEngine:
     def __init__(self, station: StationConfig, system: SystemConfig = None):
         self.station = station
         self.system = system or DEFAULT_SYSTEM
-        self._history: list = []  # 歷史決策（用於趨勢分析）
         self._max_history = 120   # 保留最近 120 筆（約 1 小時 @30s 間隔）
-
-    def decide(self, inputs: List[SensorInput]) -> FloodDecision:
+        self._history = deque(maxlen=self._max_history)  # 歷史決策
+        # 趨勢：決策用最近 N 筆 + 額外時間窗，皆為增量更新
+        self._trend = TrendWindow(max_samples=self.system.trend_samples)
+        self._windows = {_window_label(sec): TrendWindow(max_age_sec=sec)
+                         for sec in self.system.trend_windows_sec}
+        self._ewma_rate: Optional[float] = None
+        self._last_sample: Optional[tuple] = None  # (ts, score)
+
+    def decide(self, inputs: List[SensorInput], ts: Optional[float] = None) -> FloodDecision:
         """
         核心決策：五源加權計算 + 趨勢分析 + 警報等級判定
 
         Args:
             inputs: 各感測源輸入列表
+            ts: 觀測時間（epoch 秒），預設為現在；重播歷史紀錄時傳入原始時間
 
         Returns:
             FloodDecision 決策結果
         """
-        now = datetime.now().isoformat()
+        if ts is None:
+            ts = time.time()
+        now = datetime.fromtimestamp(ts).isoformat()
 
         # 1. 加權計算
         weights = {
@@ -139,13 +248,18 @@ class FloodDecisionEngine:
 
         # 2. 判定警報等級
         alert_level = 0
-        for lvl in sorted(ALERT_LEVELS.keys(), reverse=True):
+        for lvl in _LEVELS_DESC:
             if score >= ALERT_LEVELS[lvl]["threshold"]:
                 alert_level = lvl
                 break
 
-        # 3. 趨勢分析
+        # 3. 趨勢分析（決策用趨勢只看此筆之前的紀錄；額外時間窗與 EWMA 含此筆）
         trend, rate = self._analyze_trend(score)
+        self._record(ts, score, alert_level)
+        trend_rates = {f"n{self.system.trend_samples}": rate}
+        for label, window in self._windows.items():
+            slope = window.slope()
+            trend_rates[label] = slope * 3600 if slope is not None else 0.0
 
         # 4. ETA 預估
         eta_warning = None
@@ -175,15 +289,30 @@ class FloodDecisionEngine:
             rate_of_change=rate,
             eta_warning_min=eta_warning,
             eta_critical_min=eta_critical,
+            trend_rates=trend_rates,
+            ewma_rate=self._ewma_rate,
         )
-
-        # 記錄歷史
-        self._history.append({"ts": time.time(), "score": score, "level": alert_level})
-        if len(self._history) > self._max_history:
-            self._history.pop(0)
-
         return decision
 
+    def _record(self, ts: float, score: float, level: int):
+        """記錄歷史並增量更新各趨勢窗與指數加權上升率"""
+        self._history.append({"ts": ts, "score": score, "level": level})
+        self._trend.add(ts, score)
+        for window in self._windows.values():
+            window.add(ts, score)
+
+        halflife = self.system.trend_ewma_halflife_sec
+        if halflife > 0 and self._last_sample is not None:
+            dt = ts - self._last_sample[0]
+            if dt > 0:
+                rate = (score - self._last_sample[1]) / dt * 3600
+                if self._ewma_rate is None:
+                    self._ewma_rate = rate
+                else:
+                    alpha = 1 - math.exp(-dt * math.log(2) / halflife)
+                    self._ewma_rate += alpha * (rate - self._ewma_rate)
+        self._last_sample = (ts, score)
+
     def normalize_radar(self, water_level_m: float) -> SensorInput:
         """正規化雷達水位到 0-100 分數"""
         s = self.station
@@ -253,25 +382,13 @@ class FloodDecisionEngine:
         )
 
     def _analyze_trend(self, current_score: float) -> tuple:
-        """分析趨勢（rising/stable/falling）和變化率"""
-        if len(self._history) < 3:
+        """分析趨勢（rising/stable/falling）和變化率（最近 trend_samples 筆的線性回歸）"""
+        if len(self._trend) < 3:
             return "stable", 0.0
 
-        recent = self._history[-10:]  # 最近 10 筆
-        scores = [h["score"] for h in recent]
-        times = [h["ts"] for h in recent]
-
-        # 線性回歸斜率
-        n = len(scores)
-        sum_t = sum(times)
-        sum_s = sum(scores)
-        sum_ts = sum(t * s for t, s in zip(times, scores))
-        sum_t2 = sum(t * t for t in times)
-        denom = n * sum_t2 - sum_t * sum_t
-        if abs(denom) < 1e-10:
+        slope = self._trend.slope()  # 分數/秒
+        if slope is None:
             return "stable", 0.0
-
-        slope = (n * sum_ts - sum_t * sum_s) / denom  # 分數/秒
         rate_per_hour = slope * 3600
 
         if rate_per_hour > 2:
@@ -286,17 +403,7 @@ class FloodDecisionEngine:
     @staticmethod
     def _suggest_actions(level: int, trend: str, rate: float) -> list:
         """根據警報等級建議行動"""
-        actions = {
-            0: ["持續監測"],
-            1: ["加密監測頻率至每 15 分鐘", "通知工地主任注意水情"],
-            2: ["通知所有人員準備撤離", "啟動工地排水設備", "確認撤離路線暢通",
-                "將重要機具移至高處"],
-            3: ["立即啟動撤離程序", "啟動廣播喇叭警報", "啟動警示閃光燈",
-                "通報 119 / 水利署", "停止所有施工作業"],
-            4: ["全員立即撤離至安全高地", "確認人員清點完成", "關閉電力/瓦斯",
-                "啟動國家級災害通報"],
-        }
-        result = actions.get(level, ["持續監測"])
+        result = list(_ACTIONS.get(level, _ACTIONS[0]))
 
         if trend == "rising" and level >= 1:
             result.insert(0, f"⚠️ 水位持續上升中（{rate:+.1f} 分/hr）")
@@ -3,16 +3,24 @@
 水情預警系統 — InfluxDB 時序資料庫
 儲存水位/氣象/決策歷史，供 Grafana 儀表板查詢
 
-依賴：pip install influxdb-client
+寫入先落地到本地 SQLite（LocalTSStore），背景執行緒批次上傳 InfluxDB，失敗時指數退避重試；
+查詢在本地保留範圍內直接由本地提供，沒有 InfluxDB 時全部由本地提供。
+
+依賴：pip install influxdb-client（可選）
 """
 import logging
 import os
+import random
+import threading
+import time
 from datetime import datetime
 from typing import Dict, List, Optional
 
 log = logging.getLogger("water_alert.influxdb")
 
-from water_alert.config import INFLUXDB_URL, INFLUXDB_TOKEN, INFLUXDB_ORG, INFLUXDB_BUCKET
+from water_alert.config import (INFLUXDB_URL, INFLUXDB_TOKEN, INFLUXDB_ORG, INFLUXDB_BUCKET,
+                                LOCAL_TS_DB, LOCAL_TS_RETENTION_DAYS)
+from water_alert.local_ts_store import LocalTSStore
 
 
 class InfluxDBStore:
@@ -27,15 +35,30 @@ class InfluxDBStore:
     - alert: 警報記錄
     """
 
-    def __init__(self):
+    def __init__(self, local_path: str = LOCAL_TS_DB, batch_size: int = 5000,
+                 flush_interval_sec: float = 5.0, max_backoff_sec: float = 300.0):
         self._client = None
         self._write_api = None
         self._query_api = None
+        self.local = LocalTSStore(local_path, retention_days=LOCAL_TS_RETENTION_DAYS,
+                                  track_sync=bool(INFLUXDB_TOKEN))
+        self.batch_size = batch_size
+        self.flush_interval_sec = flush_interval_sec
+        self.max_backoff_sec = max_backoff_sec
+        self._sync_thread: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+        self._running = False
+        self._backoff = 0.0
+        self._retry_at = 0.0                # 退避中：此時間（monotonic）前不重試
+        self._lock = threading.Lock()       # 保護 _unflushed（寫入端與上傳執行緒共用）
+        self._uploaded = 0
+        self._unflushed = 0
+        self._last_error = ""
 
     def connect(self) -> bool:
         """連接 InfluxDB"""
         if not INFLUXDB_TOKEN:
-            log.warning("INFLUXDB_TOKEN 未設定，InfluxDB 儲存停用")
+            log.warning("INFLUXDB_TOKEN 未設定，僅使用本地時序資料庫")
             return False
         try:
             from influxdb_client import InfluxDBClient
@@ -45,20 +68,31 @@ class InfluxDBStore:
             )
             self._write_api = self._client.write_api(write_options=SYNCHRONOUS)
             self._query_api = self._client.query_api()
-            # 驗證連線
-            self._client.ping()
-            log.info(f"InfluxDB 連接成功: {INFLUXDB_URL}")
+            # 驗證連線（失敗也保留 client，上傳迴圈會退避重試）
+            ok = self._client.ping()
+            self.local.track_sync = True
+            self._start_sync()
+            log.info(f"InfluxDB {'連接成功' if ok else '暫時無法連線，先寫入本地'}: {INFLUXDB_URL}")
             return True
         except ImportError:
             log.error("influxdb-client 未安裝: pip install influxdb-client")
-            return False
         except Exception as e:
             log.error(f"InfluxDB 連接失敗: {e}")
-            return False
+            if self._client:
+                self._client.close()
+        # 沒有上傳執行緒：本地過期資料照常清除，避免無限成長
+        self._client = self._write_api = self._query_api = None
+        self.local.track_sync = False
+        return False
 
     def close(self):
+        self._running = False
+        self._wake.set()
+        if self._sync_thread:
+            self._sync_thread.join(timeout=10)
         if self._client:
             self._client.close()
+        self.local.close()
 
     # ===== 寫入 =====
 
@@ -116,38 +150,107 @@ class InfluxDBStore:
         return self._query_measurement("alert", station_id, hours)
 
     def get_latest(self, measurement: str, station_id: str) -> Optional[dict]:
-        """查詢最新一筆"""
-        results = self._query_measurement(measurement, station_id, hours=1)
-        return results[-1] if results else None
+        """查詢最新一筆（本地記憶體）"""
+        return self.local.get_latest(measurement, station_id)
+
+    def query_rollup(self, measurement: str, station_id: str, field: str,
+                     every: int = 3600, hours: int = 24 * 7) -> list:
+        """降採樣彙總（本地，每個時間桶的 count / mean / min / max / last）"""
+        return self.local.query_rollup(measurement, station_id, field, every, hours)
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """立即上傳並等待本地待傳資料清空，回傳是否完成"""
+        deadline = time.time() + timeout
+        while self._write_api and self.local.pending_count():
+            if time.time() > deadline:
+                return False
+            self._wake.set()
+            time.sleep(0.05)
+        return not self.local.pending_count()
+
+    def get_stats(self) -> dict:
+        stats = self.local.get_stats()
+        stats.update({"upstream": self._write_api is not None, "uploaded": self._uploaded,
+                      "backoff_sec": round(self._backoff, 1), "last_error": self._last_error})
+        return stats
 
     # ===== 內部 =====
 
     def _write_point(self, measurement: str, station_id: str,
-                     fields: dict, extra_tags: dict = None):
-        """寫入單筆資料點"""
-        if not self._write_api:
-            return
+                     fields: dict, extra_tags: dict = None, ts: float = None):
+        """寫入單筆資料點（本地落地，上傳由背景執行緒批次處理）"""
         try:
-            from influxdb_client import Point
-            p = Point(measurement).tag("station_id", station_id)
-            if extra_tags:
-                for k, v in extra_tags.items():
-                    if v:
-                        p = p.tag(k, str(v))
-            for k, v in fields.items():
-                if isinstance(v, (int, float)):
-                    p = p.field(k, v)
-                elif isinstance(v, str):
-                    p = p.field(k, v)
-            self._write_api.write(bucket=INFLUXDB_BUCKET, record=p)
+            self.local.add(measurement, station_id, fields, extra_tags, ts)
         except Exception as e:
-            log.error(f"InfluxDB 寫入失敗 [{measurement}]: {e}")
+            log.error(f"本地時序寫入失敗 [{measurement}]: {e}")
+            return
+        with self._lock:
+            self._unflushed += 1
+            full = self._unflushed >= self.batch_size
+            if full:
+                self._unflushed = 0
+        if full and self._write_api:
+            self._wake.set()
+
+    def _start_sync(self):
+        if self._sync_thread and self._sync_thread.is_alive():
+            return
+        self._running = True
+        self._sync_thread = threading.Thread(target=self._sync_loop, daemon=True, name="influx-sync")
+        self._sync_thread.start()
+
+    def _sync_loop(self):
+        """
+        上傳迴圈：每 flush_interval_sec 或累積 batch_size 筆上傳一批，失敗指數退避
+        退避期間被喚醒（批次已滿 / flush）不提前重試，等到退避時間再上傳
+        """
+        while self._running:
+            wait = self._retry_at - time.monotonic() if self._backoff else self.flush_interval_sec
+            self._wake.wait(max(wait, 0.0))
+            self._wake.clear()
+            if self._backoff and time.monotonic() < self._retry_at:
+                continue
+            with self._lock:
+                self._unflushed = 0
+            while self._running:
+                batch = self.local.pending(self.batch_size)
+                if not batch:
+                    break
+                try:
+                    self._upload(batch)
+                except Exception as e:
+                    self._backoff = min(max(self._backoff * 2, 1.0), self.max_backoff_sec)
+                    self._backoff *= random.uniform(1.0, 1.2)
+                    self._retry_at = time.monotonic() + self._backoff
+                    self._last_error = str(e)
+                    log.warning(f"InfluxDB 上傳失敗（{len(batch)} 筆待傳，{self._backoff:.0f}s 後重試）: {e}")
+                    break
+                self.local.mark_synced(batch[-1]["id"])
+                self._uploaded += len(batch)
+                self._backoff = 0.0
+                self._last_error = ""
+
+    def _upload(self, batch: list):
+        """一次 HTTP 寫入整批資料點（保留原始時間戳）"""
+        from influxdb_client import Point, WritePrecision
+        points = []
+        for row in batch:
+            p = Point(row["measurement"]).tag("station_id", row["station_id"])
+            for k, v in row["tags"].items():
+                p = p.tag(k, v)
+            for k, v in row["fields"].items():
+                if isinstance(v, (int, float, str)):
+                    p = p.field(k, v)
+            points.append(p.time(int(row["ts"] * 1e9), WritePrecision.NS))
+        self._write_api.write(bucket=INFLUXDB_BUCKET, record=points)
 
     def _query_measurement(self, measurement: str, station_id: str,
                            hours: int = 24) -> list:
-        """查詢 measurement"""
-        if not self._query_api:
-            return []
+        """查詢 measurement：本地資料涵蓋查詢範圍（或沒有 InfluxDB）時直接由本地提供"""
+        oldest = self.local.oldest_ts(measurement, station_id)
+        covered = oldest is not None and oldest <= time.time() - hours * 3600
+        if not self._query_api or covered or self.local.retention_days <= 0:
+            return self.local.query(measurement, station_id, hours)
         try:
             flux = f'''
 from(bucket: "{INFLUXDB_BUCKET}")
@@ -173,8 +276,8 @@ from(bucket: "{INFLUXDB_BUCKET}")
                     results.append(row)
             return results
         except Exception as e:
-            log.error(f"InfluxDB 查詢失敗 [{measurement}]: {e}")
-            return []
+            log.error(f"InfluxDB 查詢失敗 [{measurement}]，改用本地資料: {e}")
+            return self.local.query(measurement, station_id, hours)
 
 
 # ===== Grafana Dashboard JSON 範本 =====
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+水情預警系統 — 站端本地時序資料庫（SQLite）
+
+  - 每筆資料點先落地（WAL），上游 InfluxDB 斷線時不遺失；上傳進度以游標記錄
+  - 寫入時同步更新降採樣彙總（預設 5 分鐘 / 1 小時：筆數、總和、最小、最大、最後值）
+  - 各站各 measurement 的最新一筆常駐記憶體，get_latest 不必查詢
+  - 無 InfluxDB 時所有查詢都由本地提供
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+log = logging.getLogger("water_alert.local_ts")
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+class LocalTSStore:
+    """
+    本地時序儲存（執行緒安全）
+
+    Args:
+        db_path: SQLite 檔案路徑
+        rollups_sec: 降採樣彙總的時間桶（秒）
+        retention_days: 原始資料保留天數（彙總永久保留）；0 = 不清除
+        track_sync: 有上游時為 True，尚未上傳的資料點不因過期而清除
+    """
+
+    def __init__(self, db_path: Union[str, Path], rollups_sec: Sequence[int] = (300, 3600),
+                 retention_days: float = 30, track_sync: bool = False):
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.rollups_sec = tuple(rollups_sec)
+        self.retention_days = retention_days
+        self.track_sync = track_sync
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._latest: Dict[tuple, dict] = {}
+        self._last_prune = 0.0
+        self._init_database()
+        self._load_latest()
+
+    def _init_database(self):
+        """初始化資料庫"""
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS points (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    measurement TEXT NOT NULL,
+                    station_id TEXT NOT NULL,
+                    ts REAL NOT NULL,
+                    tags TEXT NOT NULL DEFAULT '{}',
+                    fields TEXT NOT NULL
+                )
+            ''')
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_points_series ON points(measurement, station_id, ts)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_points_time ON points(measurement, ts)")
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS rollups (
+                    measurement TEXT NOT NULL,
+                    station_id TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    bucket_sec INTEGER NOT NULL,
+                    bucket_ts REAL NOT NULL,
+                    count INTEGER NOT NULL,
+                    sum REAL NOT NULL,
+                    min REAL NOT NULL,
+                    max REAL NOT NULL,
+                    last REAL NOT NULL,
+                    last_ts REAL NOT NULL,
+                    PRIMARY KEY (measurement, station_id, field, bucket_sec, bucket_ts)
+                )
+            ''')
+            # 上傳游標：id ≤ synced_id 的資料點已寫入上游
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            ''')
+            self._conn.execute("INSERT OR IGNORE INTO sync_state (key, value) VALUES ('synced_id', 0)")
+
+    def _load_latest(self):
+        with self._lock:
+            rows = self._conn.execute('''
+                SELECT * FROM points WHERE id IN (
+                    SELECT MAX(id) FROM points GROUP BY measurement, station_id)
+            ''').fetchall()
+        for r in rows:
+            self._latest[(r["measurement"], r["station_id"])] = self._row(r)
+
+    # ===== 寫入 =====
+
+    def add(self, measurement: str, station_id: str, fields: dict,
+            tags: dict = None, ts: float = None) -> int:
+        """寫入一筆資料點，回傳 id"""
+        return self.add_many([(measurement, station_id, fields, tags, ts)])[-1]
+
+    def add_many(self, points) -> List[int]:
+        """批次寫入 (measurement, station_id, fields, tags, ts) 序列，單一交易"""
+        ids = []
+        with self._lock, self._conn:
+            for measurement, station_id, fields, tags, ts in points:
+                ts = time.time() if ts is None else float(ts)
+                tags = {k: str(v) for k, v in (tags or {}).items() if v}
+                cur = self._conn.execute(
+                    "INSERT INTO points (measurement, station_id, ts, tags, fields) VALUES (?,?,?,?,?)",
+                    (measurement, station_id, ts, json.dumps(tags, ensure_ascii=False),
+                     json.dumps(fields, ensure_ascii=False)))
+                ids.append(cur.lastrowid)
+                for name, value in fields.items():
+                    if not isinstance(value, (int, float)):
+                        continue
+                    value = float(value)
+                    for sec in self.rollups_sec:
+                        self._conn.execute('''
+                            INSERT INTO rollups VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?)
+                            ON CONFLICT(measurement, station_id, field, bucket_sec, bucket_ts) DO UPDATE SET
+                                count = count + 1,
+                                sum = sum + excluded.sum,
+                                min = MIN(min, excluded.min),
+                                max = MAX(max, excluded.max),
+                                last = CASE WHEN excluded.last_ts >= last_ts THEN excluded.last ELSE last END,
+                                last_ts = MAX(last_ts, excluded.last_ts)
+                        ''', (measurement, station_id, name, sec, ts - ts % sec,
+                              value, value, value, value, ts))
+                key = (measurement, station_id)
+                prev = self._latest.get(key)
+                if prev is None or ts >= prev["_ts"]:
+                    row = {"time": _iso(ts), "_ts": ts, "station_id": station_id}
+                    row.update(tags)
+                    row.update(fields)
+                    self._latest[key] = row
+        self._maybe_prune()
+        return ids
+
+    # ===== 查詢 =====
+
+    def get_latest(self, measurement: str, station_id: str) -> Optional[dict]:
+        """最新一筆（記憶體）"""
+        with self._lock:
+            row = self._latest.get((measurement, station_id))
+        return {k: v for k, v in row.items() if k != "_ts"} if row else None
+
+    def query(self, measurement: str, station_id: str = "", hours: float = 24,
+              limit: int = 1000, until: float = None) -> List[dict]:
+        """原始資料點（舊到新），欄位格式同 InfluxDBStore 查詢結果：time + station_id + tags + fields"""
+        until = time.time() if until is None else until
+        sql = "SELECT * FROM points WHERE measurement = ? AND ts >= ? AND ts <= ?"
+        params = [measurement, until - hours * 3600, until]
+        if station_id:
+            sql += " AND station_id = ?"
+            params.append(station_id)
+        sql += " ORDER BY ts LIMIT ?"
+        params.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [{k: v for k, v in self._row(r).items() if k != "_ts"} for r in rows]
+
+    def query_rollup(self, measurement: str, station_id: str, field: str,
+                     every: int = 3600, hours: float = 24 * 7, until: float = None) -> List[dict]:
+        """降採樣彙總（舊到新）：time / count / mean / min / max / last"""
+        if every not in self.rollups_sec:
+            raise ValueError(f"沒有 {every}s 彙總，可用: {self.rollups_sec}")
+        until = time.time() if until is None else until
+        with self._lock:
+            rows = self._conn.execute('''
+                SELECT bucket_ts, count, sum, min, max, last FROM rollups
+                WHERE measurement = ? AND station_id = ? AND field = ? AND bucket_sec = ?
+                  AND bucket_ts >= ? AND bucket_ts <= ?
+                ORDER BY bucket_ts
+            ''', (measurement, station_id, field, every,
+                  until - hours * 3600 - every, until)).fetchall()
+        return [{"time": _iso(r["bucket_ts"]), "count": r["count"], "mean": r["sum"] / r["count"],
+                 "min": r["min"], "max": r["max"], "last": r["last"]} for r in rows]
+
+    def oldest_ts(self, measurement: str, station_id: str = "") -> Optional[float]:
+        """
+        本地原始資料的起點：指定站時為該站最舊一筆；未指定站時取各站最舊一筆中最晚者
+        （所有站都涵蓋到的起點），供判斷查詢範圍是否都在本地
+        """
+        with self._lock:
+            if station_id:
+                return self._conn.execute(
+                    "SELECT MIN(ts) FROM points WHERE measurement = ? AND station_id = ?",
+                    (measurement, station_id)).fetchone()[0]
+            return self._conn.execute('''
+                SELECT MAX(first_ts) FROM (
+                    SELECT MIN(ts) AS first_ts FROM points WHERE measurement = ? GROUP BY station_id)
+            ''', (measurement,)).fetchone()[0]
+
+    @staticmethod
+    def _row(r: sqlite3.Row) -> dict:
+        row = {"time": _iso(r["ts"]), "_ts": r["ts"], "station_id": r["station_id"]}
+        row.update(json.loads(r["tags"]))
+        row.update(json.loads(r["fields"]))
+        return row
+
+    # ===== 上傳 =====
+
+    def pending(self, limit: int = 5000) -> List[dict]:
+        """尚未上傳的資料點（依寫入順序），含 id / measurement / ts / tags / fields"""
+        with self._lock:
+            rows = self._conn.execute('''
+                SELECT * FROM points WHERE id > (SELECT value FROM sync_state WHERE key = 'synced_id')
+                ORDER BY id LIMIT ?
+            ''', (int(limit),)).fetchall()
+        return [{"id": r["id"], "measurement": r["measurement"], "station_id": r["station_id"],
+                 "ts": r["ts"], "tags": json.loads(r["tags"]), "fields": json.loads(r["fields"])}
+                for r in rows]
+
+    def mark_synced(self, upto_id: int):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE sync_state SET value = MAX(value, ?) WHERE key = 'synced_id'",
+                               (int(upto_id),))
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._conn.execute('''
+                SELECT COUNT(*) FROM points WHERE id > (SELECT value FROM sync_state WHERE key = 'synced_id')
+            ''').fetchone()[0]
+
+    # ===== 維護 =====
+
+    def _maybe_prune(self, interval_sec: float = 3600):
+        now = time.monotonic()
+        if self.retention_days <= 0 or now - self._last_prune < interval_sec:
+            return
+        self._last_prune = now
+        self.prune()
+
+    def prune(self) -> int:
+        """清除超過保留天數的原始資料點（track_sync 時只清除已上傳的），回傳筆數"""
+        cutoff = time.time() - self.retention_days * 86400
+        sql = "DELETE FROM points WHERE ts < ?"
+        if self.track_sync:
+            sql += " AND id <= (SELECT value FROM sync_state WHERE key = 'synced_id')"
+        with self._lock, self._conn:
+            deleted = self._conn.execute(sql, (cutoff,)).rowcount
+        if deleted:
+            log.info(f"本地時序資料清除 {deleted} 筆（> {self.retention_days} 天）")
+        return deleted
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            points = self._conn.execute("SELECT COUNT(*) FROM points").fetchone()[0]
+            rollups = self._conn.execute("SELECT COUNT(*) FROM rollups").fetchone()[0]
+        return {"db_path": self.db_path, "points": points, "rollup_rows": rollups,
+                "pending": self.pending_count(), "series": len(self._latest)}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
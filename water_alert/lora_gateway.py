@@ -7,19 +7,33 @@
   - SX1276 LoRa 模組（433MHz / 868MHz / 915MHz）
   - 介面：SPI（Pi5 GPIO）或 UART（USB dongle）
   - 有效距離：鄉村 5-10km / 城市 1-3km
+
+傳送：優先權佇列 + 空中時間（airtime）佔空比預算 + 警報 / 指令類 ACK 重傳 + 同類狀態合併
+接收：bytearray 緩衝分框（FrameParser），CRC 錯誤逐位元組重新同步
+測試：LoopbackBus 虛擬空中介面，多節點不需無線模組即可模擬 / 壓測
 """
+import heapq
 import json
 import logging
+import math
+import random
 import struct
 import threading
 import time
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime
 from enum import IntEnum
-from typing import Callable, Optional
+from typing import Callable, List, Optional
+
+from water_alert.config import LORA_SPREAD_FACTOR, LORA_BANDWIDTH, LORA_DUTY_CYCLE
 
 log = logging.getLogger("water_alert.lora")
 
+SYNC = b"\xAA\x55"
+HEADER_LEN = 8              # SYNC(2) + SRC + DST + TYPE + SEQ + LEN(2)
+MAX_PAYLOAD = 255           # SX1276 單包上限；長度欄超過視為雜訊並重新同步
+
 
 class MsgType(IntEnum):
     """LoRa 訊息類型"""
@@ -35,6 +49,46 @@ class MsgType(IntEnum):
     NACK = 0xF1             # 否認回覆
 
 
+# 單播時需要對方 ACK 的訊息（兩端依訊息類型判斷，不另佔封包欄位）
+ACK_TYPES = frozenset({MsgType.ALERT, MsgType.BROADCAST_CMD, MsgType.SIREN_CMD, MsgType.CALIBRATE_CMD})
+
+# 傳送優先權（數字小優先）：ACK / 警報 / 指令 > 校準 > 數據 > 心跳
+PRIORITY = {
+    MsgType.ACK: 0, MsgType.NACK: 0,
+    MsgType.ALERT: 0, MsgType.SIREN_CMD: 0, MsgType.BROADCAST_CMD: 0,
+    MsgType.CALIBRATE_CMD: 1,
+    MsgType.WATER_LEVEL: 2, MsgType.WEATHER: 2, MsgType.CLOUD_COVER: 2,
+    MsgType.HEARTBEAT: 3,
+}
+
+
+def _crc16_table() -> tuple:
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+_CRC16_TABLE = _crc16_table()
+
+
+def lora_airtime(frame_len: int, spread_factor: int = LORA_SPREAD_FACTOR,
+                 bandwidth_khz: float = LORA_BANDWIDTH, coding_rate: int = 1,
+                 preamble: int = 8) -> float:
+    """
+    LoRa 空中時間（秒），Semtech AN1200.13 公式：顯式標頭、含 CRC、
+    符號時間 > 16ms（SF11/12 @125kHz）時啟用低速率最佳化；coding_rate 1 = 4/5
+    """
+    t_sym = (2 ** spread_factor) / (bandwidth_khz * 1000)
+    de = 1 if t_sym > 0.016 else 0
+    n_payload = 8 + max(math.ceil((8 * frame_len - 4 * spread_factor + 28 + 16) /
+                                  (4 * (spread_factor - 2 * de))) * (coding_rate + 4), 0)
+    return (preamble + 4.25) * t_sym + n_payload * t_sym
+
+
 @dataclass
 class LoRaPacket:
     """LoRa 封包結構"""
@@ -53,41 +107,116 @@ class LoRaPacket:
                              self.src_addr, self.dst_addr,
                              self.msg_type, self.seq_num,
                              len(self.payload))
-        data = b"\xAA\x55" + header + self.payload
-        crc = self._crc16(data[2:])  # CRC 不含 SYNC
+        data = SYNC + header + self.payload
+        crc = self._crc16(memoryview(data)[2:])  # CRC 不含 SYNC
         return data + struct.pack(">H", crc)
 
     @classmethod
-    def decode(cls, raw: bytes) -> Optional["LoRaPacket"]:
-        """解碼接收封包"""
-        if len(raw) < 10 or raw[0:2] != b"\xAA\x55":
+    def decode(cls, raw) -> Optional["LoRaPacket"]:
+        """解碼接收封包（bytes / bytearray / memoryview）"""
+        if len(raw) < 10 or raw[0] != 0xAA or raw[1] != 0x55:
             return None
-        src, dst, mtype, seq, plen = struct.unpack(">BBBBH", raw[2:8])
-        if len(raw) < 8 + plen + 2:
+        src, dst, mtype, seq, plen = struct.unpack_from(">BBBBH", raw, 2)
+        if len(raw) < HEADER_LEN + plen + 2:
             return None
-        payload = raw[8:8 + plen]
-        crc_recv = struct.unpack(">H", raw[8 + plen:10 + plen])[0]
-        crc_calc = cls._crc16(raw[2:8 + plen])
+        crc_recv = struct.unpack_from(">H", raw, HEADER_LEN + plen)[0]
+        crc_calc = cls._crc16(memoryview(raw)[2:HEADER_LEN + plen])
         if crc_recv != crc_calc:
             log.warning(f"CRC 錯誤: recv={crc_recv:#06x} calc={crc_calc:#06x}")
             return None
         return cls(
             src_addr=src, dst_addr=dst, msg_type=mtype,
-            seq_num=seq, payload=payload,
+            seq_num=seq, payload=bytes(raw[HEADER_LEN:HEADER_LEN + plen]),
             timestamp=datetime.now().isoformat(),
         )
 
     @staticmethod
-    def _crc16(data: bytes) -> int:
+    def _crc16(data) -> int:
+        """CRC-16/MODBUS（查表）"""
         crc = 0xFFFF
+        table = _CRC16_TABLE
         for b in data:
-            crc ^= b
-            for _ in range(8):
-                if crc & 1:
-                    crc = (crc >> 1) ^ 0xA001
-                else:
-                    crc >>= 1
-        return crc & 0xFFFF
+            crc = (crc >> 8) ^ table[(crc ^ b) & 0xFF]
+        return crc
+
+
+class FrameParser:
+    """
+    串流分框器：bytearray 緩衝 + 讀取位移
+
+    每次 feed 只掃描新資料，已消耗的前綴累積超過一半才一次刪除（攤提 O(1)）；
+    長度欄不合理或 CRC 錯誤時只跳過一個位元組重新找 SYNC，不會把後面的好封包一起丟掉。
+    """
+
+    def __init__(self, max_payload: int = MAX_PAYLOAD):
+        self.max_payload = max_payload
+        self._buf = bytearray()
+        self._pos = 0
+        self.crc_errors = 0
+        self.skipped_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._buf) - self._pos
+
+    def feed(self, data) -> List[LoRaPacket]:
+        buf = self._buf
+        buf += data
+        packets = []
+        pos, n = self._pos, len(buf)
+        view = memoryview(buf)
+        try:
+            while n - pos >= 10:
+                idx = buf.find(SYNC, pos)
+                if idx < 0:
+                    keep = n - 1 if buf[-1] == SYNC[0] else n   # 尾端可能是半個 SYNC
+                    self.skipped_bytes += keep - pos
+                    pos = keep
+                    break
+                self.skipped_bytes += idx - pos
+                pos = idx
+                if n - pos < 10:
+                    break
+                plen = (buf[pos + 6] << 8) | buf[pos + 7]
+                if plen > self.max_payload:
+                    pos += 1
+                    self.skipped_bytes += 1
+                    continue
+                total = HEADER_LEN + plen + 2
+                if n - pos < total:
+                    break
+                pkt = LoRaPacket.decode(view[pos:pos + total])
+                if pkt is None:
+                    self.crc_errors += 1
+                    self.skipped_bytes += 1
+                    pos += 1
+                    continue
+                packets.append(pkt)
+                pos += total
+        finally:
+            view.release()
+
+        if pos == n:
+            buf.clear()
+            pos = 0
+        elif pos > 4096 or pos * 2 > n:
+            del buf[:pos]
+            pos = 0
+        self._pos = pos
+        return packets
+
+
+@dataclass
+class _TxFrame:
+    """傳送佇列中的一筆（合併時直接替換 payload）"""
+    dst_addr: int
+    msg_type: int
+    seq_num: int
+    payload: bytes
+    priority: int
+    enqueued: float
+    attempts: int = 0
+    next_retry: float = 0.0
+    cancelled: bool = False
 
 
 class LoRaGateway:
@@ -99,57 +228,102 @@ class LoRaGateway:
     2. 下行廣播觸發（警報器/喇叭）
     3. Mesh 中繼（多跳轉發）
     4. 心跳監控（斷線偵測）
+
+    傳送由背景執行緒依優先權送出，每包依空中時間佔用佔空比預算（滑動一小時窗），
+    非最高優先權只能用到 (1 - reserve) 的預算，保留餘裕給警報；ACK_TYPES 的單播
+    等對方 ACK，逾時以指數退避重傳 max_retries 次。
     """
 
     BROADCAST_ADDR = 0xFF
 
     def __init__(self, my_addr: int = 0, serial_port: str = "/dev/ttyUSB0",
-                 baud_rate: int = 9600):
+                 baud_rate: int = 9600, spread_factor: int = LORA_SPREAD_FACTOR,
+                 bandwidth_khz: float = LORA_BANDWIDTH, duty_cycle: float = LORA_DUTY_CYCLE,
+                 duty_window_sec: float = 3600.0, reserve: float = 0.2,
+                 ack_timeout_sec: float = 2.0, max_retries: int = 3, max_queue: int = 256):
         self.my_addr = my_addr
         self.serial_port = serial_port
         self.baud_rate = baud_rate
+        self.spread_factor = spread_factor
+        self.bandwidth_khz = bandwidth_khz
+        self.duty_cycle = duty_cycle
+        self.duty_window_sec = duty_window_sec
+        self.reserve = reserve
+        self.ack_timeout_sec = ack_timeout_sec
+        self.max_retries = max_retries
+        self.max_queue = max_queue
         self._serial = None
         self._running = False
         self._rx_thread: Optional[threading.Thread] = None
+        self._tx_thread: Optional[threading.Thread] = None
         self._seq = 0
         self._callbacks: dict = {}  # msg_type -> [callback]
         self._node_status: dict = {}  # addr -> {last_seen, rssi, snr}
         self._lock = threading.Lock()
+        self._parser = FrameParser()
+        self._rx_seen: dict = {}      # src -> {seq: (收到時間, msg_type, payload)}（重傳去重）
+        # 傳送佇列
+        self._tx_cond = threading.Condition()
+        self._tx_heap: list = []      # (priority, order, _TxFrame)
+        self._tx_order = 0
+        self._tx_latest: dict = {}    # (dst, msg_type) -> 尚未送出的可合併 _TxFrame
+        self._pending: dict = {}      # (dst, seq) -> 已送出、等待 ACK 的 _TxFrame
+        self._airtime_log = deque()   # (送出時間, 空中時間)
+        self._airtime_used = 0.0
+        self._latencies = deque(maxlen=1000)
+        self._stats = {"queued": 0, "sent": 0, "sent_bytes": 0, "airtime_sec": 0.0,
+                       "retransmits": 0, "acked": 0, "failed": 0, "coalesced": 0,
+                       "dropped": 0, "rx": 0, "rx_duplicates": 0}
 
-    def connect(self) -> bool:
-        """連接 LoRa 模組"""
-        try:
-            import serial
-            self._serial = serial.Serial(
-                port=self.serial_port,
-                baudrate=self.baud_rate,
-                timeout=1,
-            )
-            log.info(f"LoRa 閘道器連接: {self.serial_port}")
-            return True
-        except ImportError:
-            log.error("pyserial 未安裝: pip install pyserial")
-            return False
-        except Exception as e:
-            log.error(f"LoRa 連接失敗: {e}")
-            return False
+    def connect(self, port=None) -> bool:
+        """
+        連接 LoRa 模組並啟動傳送執行緒
+
+        Args:
+            port: 已開啟的序列埠物件（如 LoopbackSerial）；None 則以 serial_port 開啟 pyserial
+        """
+        if port is not None:
+            self._serial = port
+        else:
+            try:
+                import serial
+                self._serial = serial.Serial(
+                    port=self.serial_port,
+                    baudrate=self.baud_rate,
+                    timeout=1,
+                )
+                log.info(f"LoRa 閘道器連接: {self.serial_port}")
+            except ImportError:
+                log.error("pyserial 未安裝: pip install pyserial")
+                return False
+            except Exception as e:
+                log.error(f"LoRa 連接失敗: {e}")
+                return False
+        if not self._tx_thread or not self._tx_thread.is_alive():
+            self._tx_thread = threading.Thread(target=self._tx_loop, daemon=True, name="lora-tx")
+            self._tx_thread.start()
+        return True
 
     def start(self):
         """啟動接收迴圈"""
         if self._running:
             return
         self._running = True
-        self._rx_thread = threading.Thread(target=self._rx_loop, daemon=True)
+        self._rx_thread = threading.Thread(target=self._rx_loop, daemon=True, name="lora-rx")
         self._rx_thread.start()
         log.info("LoRa 接收迴圈已啟動")
 
     def stop(self):
-        """停止接收"""
+        """停止收發（佇列中尚未送出的封包捨棄）"""
         self._running = False
-        if self._rx_thread:
-            self._rx_thread.join(timeout=3)
-        if self._serial and self._serial.is_open:
-            self._serial.close()
+        serial, self._serial = self._serial, None
+        with self._tx_cond:
+            self._tx_cond.notify_all()
+        for th in (self._rx_thread, self._tx_thread):
+            if th and th is not threading.current_thread():
+                th.join(timeout=3)
+        if serial and serial.is_open:
+            serial.close()
         log.info("LoRa 閘道器已停止")
 
     def on(self, msg_type: int, callback: Callable):
@@ -158,46 +332,84 @@ class LoRaGateway:
             self._callbacks[msg_type] = []
         self._callbacks[msg_type].append(callback)
 
-    def send(self, dst_addr: int, msg_type: int, payload: bytes = b"") -> bool:
-        """發送封包"""
+    def send(self, dst_addr: int, msg_type: int, payload: bytes = b"",
+             priority: Optional[int] = None, coalesce: bool = False) -> bool:
+        """
+        排入傳送佇列，回傳是否已排入
+
+        Args:
+            priority: 優先權（小者先送），預設依 PRIORITY
+            coalesce: 同一目的地 / 類型尚未送出的封包直接以新 payload 取代（狀態類訊息只需最新值），
+                      並取消舊封包的 ACK 重傳
+        """
         if not self._serial or not self._serial.is_open:
             return False
-        self._seq = (self._seq + 1) % 256
-        pkt = LoRaPacket(
-            src_addr=self.my_addr,
-            dst_addr=dst_addr,
-            msg_type=msg_type,
-            seq_num=self._seq,
-            payload=payload,
-        )
-        try:
-            self._serial.write(pkt.encode())
-            return True
-        except Exception as e:
-            log.error(f"LoRa 發送失敗: {e}")
-            return False
+        if priority is None:
+            priority = PRIORITY.get(msg_type, 2)
+        key = (dst_addr, msg_type)
+        now = time.monotonic()
+        with self._tx_cond:
+            if coalesce:
+                for pkey, f in list(self._pending.items()):
+                    if (f.dst_addr, f.msg_type) == key:
+                        del self._pending[pkey]
+                queued = self._tx_latest.get(key)
+                if queued is not None and not queued.cancelled:
+                    queued.payload = payload
+                    self._stats["coalesced"] += 1
+                    if priority < queued.priority:
+                        queued.cancelled = True
+                    else:
+                        return True
+            if len(self._tx_heap) >= self.max_queue and not self._drop_lowest(priority):
+                self._stats["dropped"] += 1
+                return False
+            self._seq = (self._seq + 1) % 256
+            frame = _TxFrame(dst_addr=dst_addr, msg_type=msg_type, seq_num=self._seq,
+                             payload=payload, priority=priority, enqueued=now)
+            self._push(frame)
+            if coalesce:
+                self._tx_latest[key] = frame
+            self._stats["queued"] += 1
+            self._tx_cond.notify()
+        return True
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """等待佇列送完且所有 ACK 都已收到或放棄，回傳是否在時限內完成"""
+        deadline = time.monotonic() + timeout
+        with self._tx_cond:
+            while self._tx_heap or self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._tx_cond.wait(min(remaining, 0.05))
+        return True
 
     def broadcast_alert(self, alert_level: int, message: str = "") -> bool:
         """
-        廣播警報指令到所有站端
+        廣播警報指令到所有站端（尚未送出的前一則警報直接以本則取代）
         alert_level: 1=注意, 2=警戒, 3=危險, 4=撤離
         """
         payload = struct.pack(">B", alert_level) + message.encode("utf-8")[:100]
-        ok = self.send(self.BROADCAST_ADDR, MsgType.ALERT, payload)
+        ok = self.send(self.BROADCAST_ADDR, MsgType.ALERT, payload, coalesce=True)
         if ok:
-            log.info(f"已廣播警報: level={alert_level}")
+            log.info(f"已排入廣播警報: level={alert_level}")
         return ok
 
     def send_siren_cmd(self, dst_addr: int, on: bool, duration_sec: int = 10) -> bool:
         """發送警報器開關指令"""
         payload = struct.pack(">BH", 1 if on else 0, duration_sec)
-        return self.send(dst_addr, MsgType.SIREN_CMD, payload)
+        return self.send(dst_addr, MsgType.SIREN_CMD, payload, coalesce=True)
 
     def send_broadcast_cmd(self, dst_addr: int, text: str, repeat: int = 3) -> bool:
         """發送語音廣播指令"""
         payload = struct.pack(">B", repeat) + text.encode("utf-8")[:200]
         return self.send(dst_addr, MsgType.BROADCAST_CMD, payload)
 
+    def airtime(self, frame_len: int) -> float:
+        """此閘道器設定下一個 frame_len 位元組封包的空中時間（秒）"""
+        return lora_airtime(frame_len, self.spread_factor, self.bandwidth_khz)
+
     def get_node_status(self) -> dict:
         """取得所有節點狀態"""
         with self._lock:
@@ -212,42 +424,138 @@ class LoRaGateway:
             elapsed = time.time() - status.get("last_seen_ts", 0)
             return elapsed < timeout_sec
 
-    # ===== 內部 =====
+    def get_stats(self) -> dict:
+        """收發統計：佇列長度、佔空比使用率、重傳 / 合併 / 失敗次數、ACK 延遲"""
+        with self._tx_cond:
+            self._expire_airtime(time.monotonic())
+            stats = dict(self._stats)
+            stats["queue"] = len(self._tx_heap)
+            stats["pending_ack"] = len(self._pending)
+            stats["duty_used"] = (self._airtime_used / self.duty_window_sec)
+            lat = sorted(self._latencies)
+        stats["airtime_sec"] = round(stats["airtime_sec"], 3)
+        stats["crc_errors"] = self._parser.crc_errors
+        if lat:
+            stats["ack_latency_ms"] = {"p50": round(lat[len(lat) // 2] * 1000, 1),
+                                       "p95": round(lat[int(len(lat) * 0.95)] * 1000, 1)}
+        return stats
+
+    # ===== 內部：傳送 =====
+
+    def _push(self, frame: _TxFrame):
+        self._tx_order += 1
+        heapq.heappush(self._tx_heap, (frame.priority, self._tx_order, frame))
+
+    def _drop_lowest(self, priority: int) -> bool:
+        """佇列滿：捨棄優先權最低（同級取最新）的一筆，讓給更高優先權的新封包"""
+        victim = max(self._tx_heap, key=lambda e: (e[0], e[1]))
+        if victim[0] <= priority:
+            return False
+        self._tx_heap.remove(victim)
+        heapq.heapify(self._tx_heap)
+        victim[2].cancelled = True
+        self._stats["dropped"] += 1
+        return True
+
+    def _expire_airtime(self, now: float):
+        log_ = self._airtime_log
+        while log_ and log_[0][0] <= now - self.duty_window_sec:
+            self._airtime_used -= log_.popleft()[1]
+
+    def _budget_wait(self, now: float, airtime: float, priority: int) -> float:
+        """依佔空比預算還需等待多久才能送出（秒）"""
+        if self.duty_cycle <= 0:
+            return 0.0
+        self._expire_airtime(now)
+        budget = self.duty_cycle * self.duty_window_sec * (1.0 if priority == 0 else 1.0 - self.reserve)
+        excess = self._airtime_used + airtime - budget
+        if excess <= 0:
+            return 0.0
+        for t, used in self._airtime_log:
+            excess -= used
+            if excess <= 0:
+                return t + self.duty_window_sec - now
+        return self.duty_window_sec
+
+    def _next_frame(self, now: float) -> tuple:
+        """（持有 _tx_cond）取出下一筆可送的封包，回傳 (frame, 無封包時的等待秒數)"""
+        for key, f in list(self._pending.items()):
+            if f.next_retry <= now:
+                del self._pending[key]
+                if f.attempts > self.max_retries:
+                    self._stats["failed"] += 1
+                    log.warning(f"LoRa 未收到 ACK，放棄: dst={f.dst_addr} type={f.msg_type:#04x} seq={f.seq_num}")
+                else:
+                    self._stats["retransmits"] += 1
+                    self._push(f)
+        wait = min((f.next_retry - now for f in self._pending.values()), default=1.0)
+
+        while self._tx_heap and self._tx_heap[0][2].cancelled:
+            heapq.heappop(self._tx_heap)
+        if not self._tx_heap:
+            return None, wait
+        frame = self._tx_heap[0][2]
+        budget_wait = self._budget_wait(now, self.airtime(HEADER_LEN + len(frame.payload) + 2), frame.priority)
+        if budget_wait > 0:
+            return None, min(wait, budget_wait)
+        heapq.heappop(self._tx_heap)
+        if self._tx_latest.get((frame.dst_addr, frame.msg_type)) is frame:
+            del self._tx_latest[(frame.dst_addr, frame.msg_type)]
+        return frame, 0.0
+
+    def _tx_loop(self):
+        """傳送迴圈（背景執行緒）：一次只送一包，送出後等待空中時間（半雙工）"""
+        while self._serial is not None:
+            with self._tx_cond:
+                frame, wait = self._next_frame(time.monotonic())
+                if frame is None:
+                    self._tx_cond.notify_all()      # 喚醒 flush
+                    self._tx_cond.wait(max(wait, 0.001))
+                    continue
+            raw = LoRaPacket(src_addr=self.my_addr, dst_addr=frame.dst_addr, msg_type=frame.msg_type,
+                             seq_num=frame.seq_num, payload=frame.payload).encode()
+            airtime = self.airtime(len(raw))
+            try:
+                serial = self._serial
+                if serial is None:
+                    break
+                serial.write(raw)
+            except Exception as e:
+                log.error(f"LoRa 發送失敗: {e}")
+            now = time.monotonic()
+            with self._tx_cond:
+                self._airtime_log.append((now, airtime))
+                self._airtime_used += airtime
+                self._stats["sent"] += 1
+                self._stats["sent_bytes"] += len(raw)
+                self._stats["airtime_sec"] += airtime
+                frame.attempts += 1
+                if frame.msg_type in ACK_TYPES and frame.dst_addr != self.BROADCAST_ADDR:
+                    backoff = self.ack_timeout_sec * (2 ** (frame.attempts - 1)) * random.uniform(1.0, 1.5)
+                    frame.next_retry = now + airtime + backoff
+                    self._pending[(frame.dst_addr, frame.seq_num)] = frame
+            time.sleep(airtime)
+
+    # ===== 內部：接收 =====
 
     def _rx_loop(self):
         """接收迴圈（背景執行緒）"""
-        buffer = b""
         while self._running:
             try:
-                if not self._serial or not self._serial.is_open:
+                serial = self._serial
+                if not serial or not serial.is_open:
                     time.sleep(1)
                     continue
-                chunk = self._serial.read(256)
+                # 有多少讀多少；沒有資料時讀 1 byte 阻塞到 timeout，不必湊滿固定長度才回傳
+                chunk = serial.read(min(max(serial.in_waiting, 1), 4096))
                 if not chunk:
                     continue
-                buffer += chunk
-                # 搜尋封包
-                while len(buffer) >= 10:
-                    idx = buffer.find(b"\xAA\x55")
-                    if idx < 0:
-                        buffer = b""
-                        break
-                    if idx > 0:
-                        buffer = buffer[idx:]
-                    # 嘗試解碼
-                    if len(buffer) < 8:
-                        break
-                    plen = struct.unpack(">H", buffer[6:8])[0]
-                    total_len = 8 + plen + 2
-                    if len(buffer) < total_len:
-                        break
-                    pkt = LoRaPacket.decode(buffer[:total_len])
-                    buffer = buffer[total_len:]
-                    if pkt:
-                        self._handle_packet(pkt)
+                for pkt in self._parser.feed(chunk):
+                    self._handle_packet(pkt)
             except Exception as e:
-                log.error(f"LoRa 接收錯誤: {e}")
-                time.sleep(1)
+                if self._running:
+                    log.error(f"LoRa 接收錯誤: {e}")
+                    time.sleep(1)
 
     def _handle_packet(self, pkt: LoRaPacket):
         """處理收到的封包"""
@@ -264,6 +572,16 @@ class LoRaGateway:
         # 如果不是給我的，且不是廣播，則忽略（或中繼）
         if pkt.dst_addr != self.my_addr and pkt.dst_addr != self.BROADCAST_ADDR:
             return
+        self._stats["rx"] += 1
+
+        if pkt.msg_type == MsgType.ACK and pkt.payload:
+            self._on_ack(pkt.src_addr, pkt.payload[0])
+        elif pkt.msg_type in ACK_TYPES and pkt.dst_addr == self.my_addr:
+            # 重傳的封包也要再回 ACK（前一個 ACK 可能遺失），但回呼只觸發一次
+            self.send(pkt.src_addr, MsgType.ACK, struct.pack(">B", pkt.seq_num))
+            if self._is_duplicate(pkt):
+                self._stats["rx_duplicates"] += 1
+                return
 
         # 觸發回呼
         callbacks = self._callbacks.get(pkt.msg_type, [])
@@ -272,3 +590,107 @@ class LoRaGateway:
                 cb(pkt)
             except Exception as e:
                 log.error(f"LoRa callback 錯誤: {e}")
+
+    @property
+    def dedupe_horizon(self) -> float:
+        """重傳去重視窗（秒）：對方最後一次重傳可能抵達的時間上限"""
+        return self.ack_timeout_sec * (2 ** (self.max_retries + 1) - 1) * 1.5
+
+    def _is_duplicate(self, pkt: LoRaPacket) -> bool:
+        """
+        同一來源在重傳視窗內收到相同 seq / 類型 / payload 才視為重傳
+
+        seq 只有 8 位元且對方重啟後歸零，逾時的紀錄必須過期，
+        否則重新使用同一 seq 的新指令會被 ACK 卻不觸發回呼
+        """
+        now = time.monotonic()
+        horizon = self.dedupe_horizon
+        seen = self._rx_seen.setdefault(pkt.src_addr, {})
+        for seq in [s for s, (ts, _, _) in seen.items() if now - ts >= horizon]:
+            del seen[seq]
+        prev = seen.get(pkt.seq_num)
+        if prev is not None and prev[1] == pkt.msg_type and prev[2] == pkt.payload:
+            return True
+        seen[pkt.seq_num] = (now, pkt.msg_type, pkt.payload)
+        return False
+
+    def _on_ack(self, src_addr: int, seq: int):
+        with self._tx_cond:
+            frame = self._pending.pop((src_addr, seq), None)
+            if frame is not None:
+                self._stats["acked"] += 1
+                self._latencies.append(time.monotonic() - frame.enqueued)
+                self._tx_cond.notify_all()
+
+
+# ===== 迴路測試 =====
+
+class LoopbackBus:
+    """
+    虛擬空中介面：寫入任一埠的一個封包送達其他所有埠
+
+    loss：整包遺失機率；corrupt：每包隨機翻轉一個位元組的機率（測 CRC / 重新同步）
+    """
+
+    def __init__(self, loss: float = 0.0, corrupt: float = 0.0, seed: Optional[int] = None):
+        self.loss = loss
+        self.corrupt = corrupt
+        self._rng = random.Random(seed)
+        self._ports: List["LoopbackSerial"] = []
+        self._lock = threading.Lock()
+
+    def port(self, timeout: float = 1.0) -> "LoopbackSerial":
+        p = LoopbackSerial(self, timeout)
+        with self._lock:
+            self._ports.append(p)
+        return p
+
+    def _deliver(self, sender: "LoopbackSerial", data: bytes):
+        with self._lock:
+            ports = [p for p in self._ports if p is not sender and p.is_open]
+            for p in ports:
+                if self._rng.random() < self.loss:
+                    continue
+                chunk = bytearray(data)
+                if chunk and self._rng.random() < self.corrupt:
+                    chunk[self._rng.randrange(len(chunk))] ^= 1 << self._rng.randrange(8)
+                p._receive(chunk)
+
+
+class LoopbackSerial:
+    """pyserial 相容的迴路序列埠（write / read / in_waiting / is_open / close）"""
+
+    def __init__(self, bus: LoopbackBus, timeout: float = 1.0):
+        self._bus = bus
+        self.timeout = timeout
+        self.is_open = True
+        self._rx = bytearray()
+        self._cond = threading.Condition()
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._rx)
+
+    def write(self, data: bytes) -> int:
+        if not self.is_open:
+            raise OSError("port closed")
+        self._bus._deliver(self, bytes(data))
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        with self._cond:
+            if not self._rx and self.is_open:
+                self._cond.wait(self.timeout)
+            data = bytes(self._rx[:size])
+            del self._rx[:size]
+            return data
+
+    def close(self):
+        with self._cond:
+            self.is_open = False
+            self._cond.notify_all()
+
+    def _receive(self, data: bytes):
+        with self._cond:
+            self._rx += data
+            self._cond.notify_all()
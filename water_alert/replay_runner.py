@@ -0,0 +1,532 @@
+# -*- coding: utf-8 -*-
+"""
+水情預警系統 — 多站歷史重播 / 回測
+
+以錄製（CSV）或合成（颱風情境）的多站感測紀錄，比即時快上萬倍地重跑決策流程：
+  - 正規化、五源加權、警報等級：numpy 一次處理「站 × 時間」整個矩陣
+  - 決策用趨勢（最近 trend_samples 筆回歸）：各站壓縮掉缺測後以滑動窗向量化
+  - 報告各站首次達到各等級的時間、距水位峰值的預警提前量、等級轉換與吞吐量
+  - --engine / --verify 以 FloodDecisionEngine 逐筆重播，作為精確參考與決策路徑效能回歸基準
+
+站端與 API 的輸入組合方式相同：雷達 → 雲量 → 溫濕度 → 預報 → 視覺，缺測的來源不列入；
+該時刻所有來源都缺測時不做決策（對應 StationController 沒有輸入就不呼叫 decide）。
+1h / 6h 時間窗與 EWMA 僅供顯示、不影響警報等級，向量化路徑不計算，需要時用 --engine。
+
+執行：
+  python -m water_alert.replay_runner --stations 50 --days 3 --verify
+  python -m water_alert.replay_runner --csv history.csv --thresholds 25,45,65,80,100
+"""
+import argparse
+import csv
+import json
+import logging
+import math
+import os
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Sequence
+
+import numpy as np
+
+# 確保能 import 主專案
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from water_alert.config import StationConfig, SystemConfig, DEFAULT_STATIONS, DEFAULT_SYSTEM
+from water_alert.flood_decision_engine import ALERT_LEVELS, FloodDecisionEngine, SensorInput
+
+log = logging.getLogger("water_alert.replay")
+
+# CSV 欄位（與 /api/flood/decide 的 SensorData 同名）
+FIELDS = ("water_level_m", "temperature", "humidity", "cloud_cover_pct",
+          "forecast_rainfall_mm", "vision_score")
+HEAVY_CLOUDS = ("cumulonimbus", "nimbostratus", "積雨雲", "雨層雲")
+DEFAULT_THRESHOLDS = tuple(ALERT_LEVELS[lvl]["threshold"] for lvl in sorted(ALERT_LEVELS))
+
+
+@dataclass
+class SensorHistory:
+    """多站感測紀錄：每個欄位為 (站數, 時刻數) 陣列，NaN = 缺測"""
+    station_ids: List[str]
+    ts: np.ndarray                       # (T,) epoch 秒，遞增
+    water_level_m: np.ndarray
+    temperature: np.ndarray
+    humidity: np.ndarray
+    cloud_cover_pct: np.ndarray
+    cloud_heavy: np.ndarray              # bool，雲型為積雨雲 / 雨層雲
+    forecast_rainfall_mm: np.ndarray
+    vision_score: np.ndarray
+
+    @property
+    def shape(self) -> tuple:
+        return self.water_level_m.shape
+
+    def save_csv(self, path: str):
+        """存成長格式 CSV（每站每時刻一列），可再以 load_csv 讀回"""
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(("timestamp", "station_id") + FIELDS + ("cloud_type",))
+            cols = [getattr(self, name) for name in FIELDS]
+            for s, sid in enumerate(self.station_ids):
+                for t, ts in enumerate(self.ts):
+                    values = ["" if math.isnan(c[s, t]) else f"{c[s, t]:.4f}" for c in cols]
+                    if all(v == "" for v in values):
+                        continue
+                    writer.writerow([f"{ts:.0f}", sid] + values +
+                                    ["cumulonimbus" if self.cloud_heavy[s, t] else ""])
+
+
+def _parse_ts(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def load_csv(path: str) -> SensorHistory:
+    """
+    讀取長格式 CSV：timestamp（epoch 或 ISO）, station_id, water_level_m, temperature,
+    humidity, cloud_cover_pct, cloud_type, forecast_rainfall_mm, vision_score；欄位可缺、值可空
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    station_ids = sorted({r["station_id"] for r in rows})
+    ts = np.array(sorted({_parse_ts(r["timestamp"]) for r in rows}))
+    s_index = {sid: i for i, sid in enumerate(station_ids)}
+    t_index = {t: i for i, t in enumerate(ts.tolist())}
+
+    shape = (len(station_ids), len(ts))
+    data = {name: np.full(shape, np.nan) for name in FIELDS}
+    heavy = np.zeros(shape, dtype=bool)
+    for r in rows:
+        s, t = s_index[r["station_id"]], t_index[_parse_ts(r["timestamp"])]
+        for name in FIELDS:
+            value = r.get(name)
+            if value not in (None, ""):
+                data[name][s, t] = float(value)
+        heavy[s, t] = (r.get("cloud_type") or "") in HEAVY_CLOUDS
+    log.info(f"載入 {path}: {len(station_ids)} 站 × {len(ts)} 時刻（{len(rows)} 列）")
+    return SensorHistory(station_ids=station_ids, ts=ts, cloud_heavy=heavy, **data)
+
+
+# ===== 合成情境 =====
+
+def typhoon_scenario(n_stations: int = 20, hours: float = 72.0, interval: float = 30.0,
+                     seed: int = 0, dropout: float = 0.01,
+                     start: float = 1_780_000_000.0) -> tuple:
+    """
+    颱風情境：預報雨量與濕度先升、雲量轉為積雨雲，水位依距離延遲上漲後退水；
+    各站警戒水位不同，並有隨機缺測（dropout 比例，雷達 / 溫濕度各自獨立）。
+
+    Returns:
+        (SensorHistory, List[StationConfig])
+    """
+    rng = np.random.default_rng(seed)
+    T = int(hours * 3600 / interval)
+    ts = start + np.arange(T) * interval
+    hrs = (ts - start) / 3600
+
+    stations = []
+    for i in range(n_stations):
+        warning = round(float(rng.uniform(1.5, 2.5)), 2)
+        stations.append(StationConfig(
+            station_id=f"WA-{i + 1:03d}", station_name=f"回測站 {i + 1}",
+            distance_km=round(float(rng.uniform(0, 10)), 1),
+            water_level_warning_m=warning, water_level_alert_m=warning + 1.0,
+            water_level_critical_m=warning + 2.0, water_level_evacuate_m=warning + 3.0,
+        ))
+    dist = np.array([[st.distance_km] for st in stations])
+    warning = np.array([[st.water_level_warning_m] for st in stations])
+
+    # 颱風最接近時刻（全情境中段附近），離工地越遠的上游站水位越早上漲
+    landfall = hours * rng.uniform(0.45, 0.6)
+    peak = landfall + 2.0 - dist * 0.3 + rng.normal(0, 0.5, (n_stations, 1))
+    intensity = rng.uniform(0.6, 1.3, (n_stations, 1))       # 峰值約為 警戒水位 + 3m × 強度
+    rise, fall = rng.uniform(6, 12, (n_stations, 1)), rng.uniform(10, 24, (n_stations, 1))
+    x = hrs[None, :] - peak
+    pulse = np.where(x < 0, np.exp(-(x / rise) ** 2 * 3), np.exp(-x / fall * 2))
+    base = warning * rng.uniform(0.3, 0.5, (n_stations, 1))
+    level = base + (warning + 3.0 * intensity - base) * pulse
+    level += np.cumsum(rng.normal(0, 0.003, level.shape), axis=1)  # 感測漂移
+    level = np.maximum(level + rng.normal(0, 0.02, level.shape), 0.05)
+
+    storm = np.exp(-((hrs[None, :] - landfall) / 18) ** 2)      # 外圍環流，比水位峰值早且寬
+    rain = np.clip(120 * storm * intensity + rng.normal(0, 3, level.shape), 0, None)
+    humidity = np.clip(65 + 33 * storm + rng.normal(0, 2, level.shape), 0, 100)
+    temperature = 29 - 5 * storm + rng.normal(0, 0.3, level.shape)
+    cloud = np.clip(30 + 70 * storm + rng.normal(0, 5, level.shape), 0, 100)
+    heavy = (storm > 0.5) & (cloud > 80)
+
+    level[rng.random(level.shape) < dropout] = np.nan
+    dht_gap = rng.random(level.shape) < dropout
+    humidity[dht_gap] = np.nan
+    temperature[dht_gap] = np.nan
+    # 雲量每 5 分鐘一筆（同 StationController._cloud_loop），其餘時刻沿用前值
+    step = max(1, int(300 / interval))
+    cloud = np.repeat(cloud[:, ::step], step, axis=1)[:, :T]
+    heavy = np.repeat(heavy[:, ::step], step, axis=1)[:, :T]
+
+    history = SensorHistory(
+        station_ids=[st.station_id for st in stations], ts=ts,
+        water_level_m=level, temperature=temperature, humidity=humidity,
+        cloud_cover_pct=cloud, cloud_heavy=heavy, forecast_rainfall_mm=rain,
+        vision_score=np.full(level.shape, np.nan),
+    )
+    return history, stations
+
+
+# ===== 向量化正規化（與 FloodDecisionEngine.normalize_* 相同公式）=====
+
+def normalize_radar(level: np.ndarray, stations: Sequence[StationConfig]) -> np.ndarray:
+    w = np.array([[s.water_level_warning_m] for s in stations])
+    a = np.array([[s.water_level_alert_m] for s in stations])
+    c = np.array([[s.water_level_critical_m] for s in stations])
+    e = np.array([[s.water_level_evacuate_m] for s in stations])
+    with np.errstate(invalid="ignore"):
+        score = np.select(
+            [level <= 0, level <= w, level <= a, level <= c, level <= e],
+            [0.0, (level / w) * 25, 25 + (level - w) / (a - w) * 25,
+             50 + (level - a) / (c - a) * 20, 70 + (level - c) / (e - c) * 15],
+            np.minimum(100, 85 + (level - e) * 10))
+    return np.where(np.isnan(level), np.nan, score)
+
+
+def normalize_cloud(cover: np.ndarray, heavy: np.ndarray) -> np.ndarray:
+    return np.minimum(100, np.where(heavy, cover * 0.5 * 1.8, cover * 0.5))
+
+
+def normalize_dht(humidity: np.ndarray) -> np.ndarray:
+    score = np.select([humidity > 90, humidity > 80, humidity > 70],
+                      [60 + (humidity - 90) * 4, 30 + (humidity - 80) * 3, (humidity - 70) * 3], 0.0)
+    return np.where(np.isnan(humidity), np.nan, np.minimum(100, score))
+
+
+def normalize_forecast(rain: np.ndarray) -> np.ndarray:
+    score = np.select([rain <= 10, rain <= 40, rain <= 80],
+                      [rain * 2, 20 + (rain - 10) * 1.5, 65 + (rain - 40) * 0.5],
+                      np.minimum(100, 85 + (rain - 80) * 0.2))
+    return np.where(np.isnan(rain), np.nan, score)
+
+
+def _rolling_slope(t: np.ndarray, s: np.ndarray, n: int, chunk_cells: int = 1_000_000) -> np.ndarray:
+    """
+    每列（站）第 j 筆之前最近 n 筆的最小平方法斜率；t / s 為壓縮後的序列，尾端 NaN。
+    每個窗口以窗內第一筆為時間原點（同 TrendWindow），不足 3 筆或時間全相同為 NaN。
+    """
+    S, T = s.shape
+    pad = np.full((S, n), np.nan)
+    tw_all = np.lib.stride_tricks.sliding_window_view(np.concatenate([pad, t], axis=1), n, axis=1)
+    sw_all = np.lib.stride_tricks.sliding_window_view(np.concatenate([pad, s], axis=1), n, axis=1)
+    first = np.maximum(np.arange(T) - n, 0)
+    out = np.full((S, T), np.nan)
+    step = max(1, chunk_cells // max(S * n, 1))
+    for j0 in range(0, T, step):
+        j1 = min(T, j0 + step)
+        tw, sw = tw_all[:, j0:j1], sw_all[:, j0:j1]
+        valid = ~np.isnan(sw)
+        cnt = valid.sum(axis=2)
+        dt = np.where(valid, tw - t[:, first[j0:j1], None], 0.0)
+        sv = np.where(valid, sw, 0.0)
+        st, ss = dt.sum(axis=2), sv.sum(axis=2)
+        sts, stt = (dt * sv).sum(axis=2), (dt * dt).sum(axis=2)
+        denom = cnt * stt - st * st
+        ok = (cnt >= 3) & (np.abs(denom) >= 1e-10)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[:, j0:j1] = np.where(ok, (cnt * sts - st * ss) / denom, np.nan)
+    return out
+
+
+# ===== 重播 =====
+
+@dataclass
+class ReplayResult:
+    """重播結果：score / rate 為 (站數, 時刻數)，沒有做決策的時刻為 NaN、level 為 -1"""
+    station_ids: List[str]
+    ts: np.ndarray
+    score: np.ndarray
+    level: np.ndarray
+    rate: np.ndarray                     # 決策用趨勢變化率（分/hr）
+    trend: np.ndarray                    # -1 falling / 0 stable / 1 rising
+    water_level_m: np.ndarray
+    elapsed_sec: float = 0.0
+    mode: str = "vectorized"
+
+    @property
+    def decisions(self) -> int:
+        return int((self.level >= 0).sum())
+
+    def transitions(self) -> List[dict]:
+        """各站相鄰兩次決策間的等級變化"""
+        result = []
+        for s, sid in enumerate(self.station_ids):
+            idx = np.flatnonzero(self.level[s] >= 0)
+            lv = self.level[s, idx]
+            for k in np.flatnonzero(lv[1:] != lv[:-1]):
+                result.append({"station_id": sid, "ts": float(self.ts[idx[k + 1]]),
+                               "from": int(lv[k]), "to": int(lv[k + 1])})
+        return result
+
+    def summary(self) -> List[dict]:
+        """各站：最高等級、分數峰值、首次達各等級時間與相對水位峰值的提前量（分鐘）、轉換次數"""
+        rows = []
+        wl = np.where(np.isnan(self.water_level_m), -np.inf, self.water_level_m)
+        for s, sid in enumerate(self.station_ids):
+            lv = self.level[s]
+            if not (lv >= 0).any():
+                rows.append({"station_id": sid, "decisions": 0})
+                continue
+            peak_t = self.ts[int(np.argmax(wl[s]))] if np.isfinite(wl[s]).any() else None
+            first = {}
+            for level in range(1, len(ALERT_LEVELS)):
+                hit = np.flatnonzero(lv >= level)
+                if len(hit):
+                    t = float(self.ts[hit[0]])
+                    first[level] = {
+                        "time": datetime.fromtimestamp(t).isoformat(),
+                        "lead_min": round((peak_t - t) / 60, 1) if peak_t is not None else None,
+                    }
+            valid = lv[lv >= 0]
+            rows.append({
+                "station_id": sid,
+                "decisions": int(len(valid)),
+                "max_level": int(valid.max()),
+                "peak_score": round(float(np.nanmax(self.score[s])), 1),
+                "peak_water_level_time": datetime.fromtimestamp(peak_t).isoformat() if peak_t else None,
+                "first_alert": first,
+                "transitions": int((valid[1:] != valid[:-1]).sum()),
+                "level_counts": np.bincount(valid, minlength=len(ALERT_LEVELS)).tolist(),
+            })
+        return rows
+
+    def to_dict(self) -> dict:
+        return {
+            "mode": self.mode,
+            "stations": len(self.station_ids),
+            "decisions": self.decisions,
+            "elapsed_sec": round(self.elapsed_sec, 4),
+            "decisions_per_sec": round(self.decisions / self.elapsed_sec) if self.elapsed_sec else None,
+            "summary": self.summary(),
+        }
+
+
+def _replay_block(history: SensorHistory, rows: slice, stations: Sequence[StationConfig],
+                  system: SystemConfig, thr: np.ndarray) -> tuple:
+    """一組站的 (score, level, rate)；各站互不相關，切塊只為限制暫存陣列大小"""
+    # 1. 正規化 + 加權（與 decide 相同的累加順序，結果逐位元一致）
+    sources = (
+        (normalize_radar(history.water_level_m[rows], stations), system.weight_radar),
+        (normalize_cloud(history.cloud_cover_pct[rows], history.cloud_heavy[rows]), system.weight_cloud),
+        (normalize_dht(history.humidity[rows]), system.weight_dht),
+        (normalize_forecast(history.forecast_rainfall_mm[rows]), system.weight_forecast),
+        (history.vision_score[rows], system.weight_vision),
+    )
+    shape = sources[0][0].shape
+    weighted_sum = np.zeros(shape)
+    total_weight = np.zeros(shape)
+    for value, w in sources:
+        if w <= 0:
+            continue
+        valid = ~np.isnan(value)
+        weighted_sum += np.where(valid, value * w, 0.0)
+        total_weight += np.where(valid, w, 0.0)
+    active = total_weight > 0
+    score = np.where(active, weighted_sum / np.where(active, total_weight, 1.0), np.nan)
+
+    # 2. 警報等級：分數 ≥ 門檻的最高等級（門檻遞增）
+    level = np.where(active, (score[..., None] >= thr[1:]).sum(axis=-1), -1)
+
+    # 3. 決策用趨勢：各站壓縮掉沒決策的時刻 → 滑動窗回歸 → 放回原位置
+    order = np.argsort(~active, axis=1, kind="stable")
+    tail = np.arange(shape[1])[None, :] >= active.sum(axis=1, keepdims=True)
+    t_c = np.where(tail, np.nan, history.ts[order])
+    s_c = np.where(tail, np.nan, np.take_along_axis(score, order, axis=1))
+    slope_c = _rolling_slope(t_c, s_c, system.trend_samples)
+    rate = np.full(shape, np.nan)
+    np.put_along_axis(rate, order, slope_c * 3600, axis=1)
+    rate = np.where(active, np.nan_to_num(rate, nan=0.0), np.nan)
+    return score, level, rate
+
+
+def replay(history: SensorHistory, stations: Sequence[StationConfig],
+           system: SystemConfig = None, thresholds: Sequence[float] = None,
+           block_cells: int = 1_000_000) -> ReplayResult:
+    """
+    向量化重播整段紀錄
+
+    Args:
+        history: 多站感測紀錄
+        stations: 與 history.station_ids 同順序的站點配置（水位閾值）
+        system: 權重與 trend_samples
+        thresholds: 各等級分數門檻（0~4 級），預設為 ALERT_LEVELS，調參時傳入
+        block_cells: 每次處理的 站數 × 時刻數 上限（控制記憶體用量）
+    """
+    system = system or DEFAULT_SYSTEM
+    thr = np.asarray(thresholds or DEFAULT_THRESHOLDS, dtype=float)
+    S, T = history.shape
+    score = np.empty((S, T))
+    rate = np.empty((S, T))
+    level = np.empty((S, T), dtype=np.int8)
+
+    start = time.perf_counter()
+    step = max(1, block_cells // max(T, 1))
+    for s0 in range(0, S, step):
+        rows = slice(s0, min(S, s0 + step))
+        score[rows], level[rows], rate[rows] = _replay_block(history, rows, stations[rows], system, thr)
+    trend = np.where(rate > 2, 1, np.where(rate < -2, -1, 0)).astype(np.int8)
+
+    return ReplayResult(station_ids=list(history.station_ids), ts=history.ts, score=score,
+                        level=level, rate=rate, trend=trend, water_level_m=history.water_level_m,
+                        elapsed_sec=time.perf_counter() - start)
+
+
+def replay_engine(history: SensorHistory, stations: Sequence[StationConfig],
+                  system: SystemConfig = None, thresholds: Sequence[float] = None) -> ReplayResult:
+    """
+    以 FloodDecisionEngine 逐站逐筆重播（精確參考，含完整 FloodDecision 物件的成本）
+    thresholds: 同 replay()；指定時以決策分數依此門檻重新分級，否則採引擎的 ALERT_LEVELS 分級
+    """
+    system = system or DEFAULT_SYSTEM
+    thr = tuple(float(x) for x in thresholds[1:]) if thresholds else None
+    engines = [FloodDecisionEngine(st, system) for st in stations]
+    S, T = history.shape
+    score = np.full((S, T), np.nan)
+    rate = np.full((S, T), np.nan)
+    level = np.full((S, T), -1, dtype=np.int8)
+    trend = np.zeros((S, T), dtype=np.int8)
+    trend_code = {"rising": 1, "stable": 0, "falling": -1}
+    cols = [getattr(history, name).tolist() for name in FIELDS]
+    heavy = history.cloud_heavy.tolist()
+    ts = history.ts.tolist()
+
+    start = time.perf_counter()
+    for t in range(T):
+        for s, engine in enumerate(engines):
+            wl, temp, hum, cloud, rain, vision = (c[s][t] for c in cols)
+            inputs = []
+            if not math.isnan(wl):
+                inputs.append(engine.normalize_radar(wl))
+            if not math.isnan(cloud):
+                inputs.append(engine.normalize_cloud(cloud, "cumulonimbus" if heavy[s][t] else ""))
+            if not math.isnan(hum):
+                inputs.append(engine.normalize_dht(25 if math.isnan(temp) else temp, hum))
+            if not math.isnan(rain):
+                inputs.append(engine.normalize_forecast(rain))
+            if not math.isnan(vision):
+                inputs.append(SensorInput(source="vision", value=vision, raw_value=vision, unit="score"))
+            if not inputs:
+                continue
+            d = engine.decide(inputs, ts=ts[t])
+            score[s, t], level[s, t], rate[s, t] = d.weighted_score, d.alert_level, d.rate_of_change
+            if thr:
+                level[s, t] = sum(d.weighted_score >= x for x in thr)
+            trend[s, t] = trend_code[d.trend]
+    return ReplayResult(station_ids=list(history.station_ids), ts=history.ts, score=score,
+                        level=level, rate=rate, trend=trend, water_level_m=history.water_level_m,
+                        elapsed_sec=time.perf_counter() - start, mode="engine")
+
+
+def compare(a: ReplayResult, b: ReplayResult) -> dict:
+    """比對兩次重播：決策時刻、等級、趨勢是否一致，分數 / 變化率最大差"""
+    both = (a.level >= 0) & (b.level >= 0)
+    return {
+        "same_decisions": bool(((a.level >= 0) == (b.level >= 0)).all()),
+        "level_mismatch": int((a.level != b.level).sum()),
+        "trend_mismatch": int((a.trend[both] != b.trend[both]).sum()),
+        "max_score_diff": float(np.abs(a.score[both] - b.score[both]).max(initial=0.0)),
+        "max_rate_diff": float(np.abs(a.rate[both] - b.rate[both]).max(initial=0.0)),
+    }
+
+
+def _stations_for(history: SensorHistory) -> List[StationConfig]:
+    """CSV 紀錄的站點配置：預設站點沿用其閾值，其餘用 StationConfig 預設值"""
+    known = {st.station_id: st for st in DEFAULT_STATIONS}
+    return [known.get(sid) or StationConfig(station_id=sid, station_name=sid)
+            for sid in history.station_ids]
+
+
+def _print_report(result: ReplayResult, span_hours: float, top: int):
+    n = result.decisions
+    print(f"[{result.mode}] {len(result.station_ids)} 站 × {span_hours:,.1f} 小時 ＝ {n:,} 次決策，"
+          f"{result.elapsed_sec:.3f} s（{n / max(result.elapsed_sec, 1e-9):,.0f} 決策/s，"
+          f"{span_hours * 3600 / max(result.elapsed_sec, 1e-9):,.0f}× 即時）")
+    rows = result.summary()
+    counts = np.bincount([r["max_level"] for r in rows if r["decisions"]], minlength=len(ALERT_LEVELS))
+    print("  最高等級分布：" + "  ".join(f"{ALERT_LEVELS[i]['name']} {c}" for i, c in enumerate(counts)))
+    print(f"  等級轉換 {sum(r.get('transitions', 0) for r in rows):,} 次")
+    for lvl in range(1, len(ALERT_LEVELS)):
+        leads = [r["first_alert"][lvl]["lead_min"] for r in rows
+                 if r["decisions"] and lvl in r["first_alert"] and r["first_alert"][lvl]["lead_min"] is not None]
+        if leads:
+            print(f"  首次達「{ALERT_LEVELS[lvl]['name']}」{len(leads):>4} 站  距水位峰值提前 "
+                  f"中位 {np.median(leads):7.1f} 分  最短 {min(leads):7.1f} 分")
+    for r in sorted((r for r in rows if r["decisions"]), key=lambda r: -r["peak_score"])[:top]:
+        firsts = "  ".join(f"{ALERT_LEVELS[k]['name']} {v['time'][5:16]}" for k, v in r["first_alert"].items())
+        print(f"    {r['station_id']:<8} 峰值 {r['peak_score']:5.1f}  轉換 {r['transitions']:3d}  {firsts}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="水情預警決策重播 / 回測")
+    parser.add_argument("--csv", help="錄製紀錄（長格式 CSV）；未指定則產生颱風情境")
+    parser.add_argument("--stations", type=int, default=50, help="合成情境站數")
+    parser.add_argument("--days", type=float, default=3.0, help="合成情境天數")
+    parser.add_argument("--interval", type=float, default=30.0, help="合成情境取樣間隔（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="把合成情境存成 CSV")
+    parser.add_argument("--thresholds", help="各等級分數門檻，如 25,50,70,85,100")
+    parser.add_argument("--engine", action="store_true", help="改用 FloodDecisionEngine 逐筆重播")
+    parser.add_argument("--verify", action="store_true", help="向量化與逐筆重播都跑並比對")
+    parser.add_argument("--transitions-out", help="等級轉換明細輸出 CSV")
+    parser.add_argument("--json", action="store_true", help="輸出 JSON 報告")
+    parser.add_argument("--top", type=int, default=5, help="列出分數峰值最高的前 N 站")
+    args = parser.parse_args()
+
+    if args.csv:
+        history = load_csv(args.csv)
+        stations = _stations_for(history)
+    else:
+        history, stations = typhoon_scenario(args.stations, args.days * 24, args.interval, args.seed)
+        if args.save:
+            history.save_csv(args.save)
+    thresholds = None
+    if args.thresholds:
+        try:
+            thresholds = [float(x) for x in args.thresholds.split(",")]
+        except ValueError:
+            parser.error(f"--thresholds 需為數字：{args.thresholds}")
+        if len(thresholds) != len(ALERT_LEVELS):
+            parser.error(f"--thresholds 需為 {len(ALERT_LEVELS)} 個值（0~{len(ALERT_LEVELS) - 1} 級），"
+                         f"收到 {len(thresholds)} 個")
+        if any(a > b for a, b in zip(thresholds, thresholds[1:])):
+            parser.error("--thresholds 需由小到大排列")
+    span_hours = (history.ts[-1] - history.ts[0]) / 3600 if len(history.ts) > 1 else 0.0
+
+    results = []
+    if not args.engine or args.verify:
+        results.append(replay(history, stations, thresholds=thresholds))
+    if args.engine or args.verify:
+        results.append(replay_engine(history, stations, thresholds=thresholds))
+
+    if args.json:
+        report = {"results": [r.to_dict() for r in results]}
+        if len(results) == 2:
+            report["compare"] = compare(*results)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        for r in results:
+            _print_report(r, span_hours, args.top)
+        if len(results) == 2:
+            print(f"比對：{compare(*results)}  加速 ×{results[1].elapsed_sec / results[0].elapsed_sec:,.0f}")
+
+    if args.transitions_out:
+        with open(args.transitions_out, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=("station_id", "time", "from", "to"))
+            writer.writeheader()
+            for tr in results[0].transitions():
+                writer.writerow({"station_id": tr["station_id"],
+                                 "time": datetime.fromtimestamp(tr["ts"]).isoformat(),
+                                 "from": tr["from"], "to": tr["to"]})
+
+
+if __name__ == "__main__":
+    main()
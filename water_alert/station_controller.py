@@ -129,8 +129,9 @@ class StationController:
         # 啟動雲量辨識執行緒（間隔較長）
         if self._cloud:
             threading.Thread(target=self._cloud_loop, daemon=True, name="cloud").start()
-        # 啟動 LoRa 上報執行緒
+        # 啟動 LoRa 接收（ACK 與總機指令）與上報執行緒
         if self._lora:
+            self._lora.start()
             threading.Thread(target=self._upload_loop, daemon=True, name="upload").start()
 
         log.info(f"站端 {self.config.station_id} 已啟動")
@@ -240,7 +241,7 @@ class StationController:
                 if wl and self._lora:
                     level_mm = int(wl.get("water_level_m", 0) * 1000)
                     payload = struct.pack(">H", level_mm)
-                    self._lora.send(0, MsgType.WATER_LEVEL, payload)
+                    self._lora.send(0, MsgType.WATER_LEVEL, payload, coalesce=True)
 
                 # 上報決策
                 decision = data.get("decision")
@@ -248,7 +249,7 @@ class StationController:
                     alert_level = decision.get("alert_level", 0)
                     score = int(decision.get("weighted_score", 0))
                     payload = struct.pack(">BB", alert_level, score)
-                    self._lora.send(0, MsgType.ALERT, payload)
+                    self._lora.send(0, MsgType.ALERT, payload, coalesce=True)
 
             except Exception as e:
                 log.error(f"LoRa 上報錯誤: {e}")
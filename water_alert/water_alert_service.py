@@ -53,13 +53,13 @@ def _init():
     for station in DEFAULT_STATIONS:
         _decision_engines[station.station_id] = FloodDecisionEngine(station, DEFAULT_SYSTEM)
 
-    # InfluxDB（可選）
+    # 時序資料：本地 SQLite 一定啟用，InfluxDB 可選（有則背景批次上傳）
     try:
         from water_alert.influxdb_store import InfluxDBStore
         _influxdb = InfluxDBStore()
         _influxdb.connect()
     except Exception as e:
-        log.warning(f"InfluxDB 不可用: {e}")
+        log.warning(f"時序資料庫不可用: {e}")
 
     # 廣播控制器（可選，僅 Pi 環境）
     try:
@@ -110,7 +110,7 @@ async def health():
         "status": "ok",
         "service": "water-alert",
         "stations": list(_decision_engines.keys()),
-        "influxdb": _influxdb is not None,
+        "influxdb": _influxdb.get_stats() if _influxdb else None,
         "broadcast": _broadcast is not None,
         "timestamp": datetime.now().isoformat(),
     }
@@ -227,11 +227,19 @@ async def query_history(
     station_id: str = Query("WA-001"),
     measurement: str = Query("water_level"),
     hours: int = Query(24),
+    field: Optional[str] = Query(None, description="指定欄位時回傳降採樣彙總"),
+    every: int = Query(3600, description="彙總時間桶（秒）：300 / 3600"),
 ):
-    """查詢歷史數據"""
+    """查詢歷史數據（原始資料點，或指定 field 時的降採樣彙總）"""
     if not _influxdb:
-        raise HTTPException(503, "InfluxDB 未連接")
-    data = _influxdb._query_measurement(measurement, station_id, hours)
+        raise HTTPException(503, "時序資料庫未初始化")
+    if field:
+        try:
+            data = _influxdb.query_rollup(measurement, station_id, field, every, hours)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+    else:
+        data = _influxdb._query_measurement(measurement, station_id, hours)
     return {"count": len(data), "data": data}
 
 